@@ -5,9 +5,13 @@ functions responsible for instantiating the application.
 
 from flask import Flask
 from app.extensions import bcrypt, ma, socketio
+from app.concurrency import password_hashing_pool, image_processing_pool, init_concurrency
+from app import json_backend
 from app.api import api as api_blueprint
+from app.api.image_pipeline import image_pipeline
 from app.auth import auth as auth_blueprint
 from app.sockets import sockets as sockets_blueprint
+from app.sockets.packets import init_packet_serializers
 from config import CONFIG_MAPPER
 
 
@@ -17,6 +21,8 @@ def create_app(config_name):
     """
     app = Flask(__name__.split(".")[0])
     app.config.from_object(CONFIG_MAPPER[config_name])
+    init_concurrency(app)
+    json_backend.init_json_backend(app)
     register_extensions(app)
     register_blueprints(app)
     return app
@@ -26,7 +32,11 @@ def register_extensions(app):
     """Register the Flask app with various extensions."""
     bcrypt.init_app(app)
     ma.init_app(app)
-    socketio.init_app(app)
+    socketio.init_app(app, json=json_backend)
+    init_packet_serializers(app, socketio)
+    password_hashing_pool.init_app(app)
+    image_processing_pool.init_app(app)
+    image_pipeline.init_app(app)
     
 
 def register_blueprints(app):
@@ -18,4 +18,4 @@ def authentication_hook():
     return None
     
 
-from app.api import users, communities, private_chats, group_chats, admin
+from app.api import users, communities, private_chats, group_chats, admin, search
@@ -5,6 +5,7 @@ from http import HTTPStatus
 from flask import request
 from app.api import api
 from app.repositories import database_repository
+from app.concurrency import password_hashing_pool, image_processing_pool
 from app.decorators.views import handle_request, handle_response
 from app.decorators.auth import admin_required
 from app.models import RolePermission
@@ -67,4 +68,15 @@ def unban_user(user_id):
     if not user.is_banned:
         return {"error": "User is not currently banned"}, HTTPStatus.BAD_REQUEST
     database_repository.update_user(user, {"is_banned": False})
-    return {}, HTTPStatus.NO_CONTENT
\ No newline at end of file
+    return {}, HTTPStatus.NO_CONTENT
+
+@api.route("/worker_pools")
+@admin_required
+def get_worker_pools():
+    """Return the queue depth and counters of the pools that run
+    CPU-heavy work off the event loop.
+    """
+    return (
+        {"worker_pools": [password_hashing_pool.stats(), image_processing_pool.stats()]},
+        HTTPStatus.OK,
+    )
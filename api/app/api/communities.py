@@ -7,18 +7,24 @@ from flask import url_for, current_app, g
 from app.api import api
 from app.decorators.views import handle_request, handle_response, handle_file_request
 from app.decorators.auth import permission_required 
-from app.api.helpers import process_image
+from app.api.image_pipeline import submit_image, start_image_upload, complete_image_upload
 from app.schemas import (
     CommunitySchema,
     UrlParamsSchema,
     CommunityUrlParamsSchema,
+    NearbyUrlParamsSchema,
     UserSchema,
-    GroupChatSchema
+    GroupChatSchema,
+    ImageUploadSchema
 )
 from app.models.factories import CommunityFactory
 from app.models import ImageType, GroupChat, RolePermission
-from app.repositories import database_repository, file_repository
-from app.repositories.exceptions import DatabaseException, NotFoundException
+from app.repositories import database_repository
+from app.repositories.exceptions import (
+    DatabaseException, 
+    NotFoundException, 
+    InvalidCursorException
+)
 from werkzeug.utils import secure_filename
 
 
@@ -29,13 +35,34 @@ def get_communities(url_params):
     """Return a list of community resources."""
     per_page = url_params.pop("per_page", current_app.config["RESULTS_PER_PAGE"])
     kwargs = {}
-    if "next_cursor" in kwargs:
-        kwargs["cursor"] = kwargs["next_cursor"]
+    if "next_cursor" in url_params:
+        kwargs["cursor"] = url_params.pop("next_cursor")
     if "topic" in url_params:
         kwargs["topic"] = url_params["topic"].name
     else:
         kwargs.update(url_params)
-    results = database_repository.get_communities(per_page, **kwargs)
+    try:
+        results = database_repository.get_communities(per_page, **kwargs)
+    except InvalidCursorException as err:
+        return {"error": str(err)}, HTTPStatus.BAD_REQUEST
+    return results, HTTPStatus.OK
+
+
+@api.route("/communities/nearby")
+@handle_request(NearbyUrlParamsSchema())
+@handle_response(CommunitySchema(many=True))
+def get_nearby_communities(url_params):
+    """Return the community resources within a radius, in kilometers,
+    of a point, closest first.
+    """
+    radius = url_params.get("radius", current_app.config["NEARBY_RADIUS_KM"])
+    limit = url_params.get("limit", current_app.config["RESULTS_PER_PAGE"])
+    try:
+        results = database_repository.get_nearby_communities(
+            url_params["latitude"], url_params["longitude"], radius, limit
+        )
+    except DatabaseException as err:
+        return {"error": str(err)}, HTTPStatus.BAD_REQUEST
     return results, HTTPStatus.OK
 
 
@@ -141,9 +168,7 @@ def upload_community_cover_photo(file, community_id):
         return {"error": "Community not found"}, HTTPStatus.NOT_FOUND
     if g.current_user.id != community.founder_id:
         return {"error": "You do not have the required permissions to perform this action"}, HTTPStatus.UNAUTHORIZED
-    image_data = process_image(community.id, file_repository, file, ImageType.COMMUNITY_COVER_PHOTO)
-    database_repository.update_community_image(community, image_data)
-    return {}, HTTPStatus.NO_CONTENT
+    return submit_image(community.id, file, ImageType.COMMUNITY_COVER_PHOTO)
 
 
 @api.route("/communities/<community_id>/profile_photo", methods=["PUT"])
@@ -155,9 +180,48 @@ def upload_community_profile_photo(file, community_id):
         return {"error": "Community not found"}, HTTPStatus.NOT_FOUND
     if g.current_user.id != community.founder_id:
         return {"error": "You do not have the required permissions to perform this action"}, HTTPStatus.UNAUTHORIZED
-    image_data = process_image(community.id, file_repository, file, ImageType.COMMUNITY_PROFILE_PHOTO)
-    database_repository.update_community_image(community, image_data)
-    return {}, HTTPStatus.NO_CONTENT
+    return submit_image(community.id, file, ImageType.COMMUNITY_PROFILE_PHOTO)
+
+
+COMMUNITY_IMAGE_TYPES = {
+    "profile_photo": ImageType.COMMUNITY_PROFILE_PHOTO,
+    "cover_photo": ImageType.COMMUNITY_COVER_PHOTO,
+}
+
+
+@api.route(
+    "/communities/<community_id>/<any(profile_photo, cover_photo):image_name>/uploads",
+    methods=["POST"]
+)
+@handle_request(ImageUploadSchema())
+def start_community_image_upload(upload_data, community_id, image_name):
+    """Return a presigned POST that uploads one of the community's
+    images directly to file storage.
+    """
+    community = database_repository.get_community(community_id)
+    if not community:
+        return {"error": "Community not found"}, HTTPStatus.NOT_FOUND
+    if g.current_user.id != community.founder_id:
+        return {"error": "You do not have the required permissions to perform this action"}, HTTPStatus.UNAUTHORIZED
+    return start_image_upload(
+        community.id, COMMUNITY_IMAGE_TYPES[image_name], upload_data["content_type"]
+    )
+
+
+@api.route(
+    "/communities/<community_id>/<any(profile_photo, cover_photo):image_name>/uploads/<upload_id>",
+    methods=["PUT"]
+)
+def complete_community_image_upload(community_id, image_name, upload_id):
+    """Add or replace one of the community's images with an image
+    uploaded directly to file storage.
+    """
+    community = database_repository.get_community(community_id)
+    if not community:
+        return {"error": "Community not found"}, HTTPStatus.NOT_FOUND
+    if g.current_user.id != community.founder_id:
+        return {"error": "You do not have the required permissions to perform this action"}, HTTPStatus.UNAUTHORIZED
+    return complete_image_upload(community.id, COMMUNITY_IMAGE_TYPES[image_name], upload_id)
 
 
 @api.route("/communities/<community_id>/group_chats")
@@ -182,12 +246,11 @@ def get_community_group_chats(url_params, community_id):
 @handle_response(GroupChatSchema())
 def create_community_group_chat(group_chat_data, community_id):
     """Create a new group chat resource."""
-    community = database_repository.get_community(community_id)
-    if not community:
-        return {"error": "Community not found"}, HTTPStatus.NOT_FOUND
     group_chat = GroupChat(uuid4().hex, community_id, group_chat_data["name"], group_chat_data["description"])
     try:
         database_repository.add_group_chat(g.current_user.id, community_id, group_chat)
+    except NotFoundException as err:
+        return {"error": str(err)}, HTTPStatus.NOT_FOUND
     except DatabaseException as err: # The user isn't a member of the community yet
         return {"error": str(err)}, HTTPStatus.UNAUTHORIZED
     headers = {
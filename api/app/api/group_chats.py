@@ -6,9 +6,20 @@ chat resources.
 from http import HTTPStatus
 from flask import current_app, request, g
 from app.api import api
-from app.schemas import UrlParamsSchema, GroupChatMessageSchema, UserSchema, GroupChatUrlParamsSchema
+from app.schemas import (
+    UrlParamsSchema,
+    MessageSearchUrlParamsSchema,
+    GroupChatMessageSchema,
+    UserSchema,
+    GroupChatUrlParamsSchema
+)
 from app.repositories import database_repository
-from app.repositories.exceptions import NotFoundException, DatabaseException
+from app.repositories.exceptions import (
+    NotFoundException,
+    DatabaseException,
+    CapacityExceededException,
+    InvalidCursorException
+)
 from app.decorators.views import handle_response, handle_request
 from app.models import MessageType
 
@@ -25,7 +36,9 @@ def get_group_chat_messages(url_params, group_chat_id):
     if not member:
         return {"error": "User is not a member of this group chat"}, HTTPStatus.UNAUTHORIZED
     try:
-        results = database_repository.get_group_chat_messages(community_id, group_chat_id, per_page, cursor=cursor)
+        results = database_repository.get_group_chat_messages(
+            community_id, group_chat_id, per_page, cursor=cursor, schema=GroupChatMessageSchema
+        )
     except NotFoundException as err:
         return {"error": str(err)}, HTTPStatus.NOT_FOUND
     except DatabaseException as err:
@@ -33,6 +46,29 @@ def get_group_chat_messages(url_params, group_chat_id):
     return results, HTTPStatus.OK
 
 
+@api.route("/group_chats/<group_chat_id>/messages/search")
+@handle_request(MessageSearchUrlParamsSchema())
+@handle_response(GroupChatMessageSchema(many=True))
+def search_group_chat_messages(url_params, group_chat_id):
+    """Return a list of the group chat message resources that contain
+    every word in the search query, newest first.
+    """
+    per_page = url_params.get("per_page", current_app.config["RESULTS_PER_PAGE"])
+    cursor = url_params.get("next_cursor")
+    member = database_repository.get_group_chat_member(group_chat_id, g.current_user.id)
+    if not member:
+        return {"error": "User is not a member of this group chat"}, HTTPStatus.UNAUTHORIZED
+    try:
+        results = database_repository.search_chat_messages(
+            group_chat_id, MessageType.GROUP_CHAT, url_params["query"], per_page, cursor
+        )
+    except InvalidCursorException as err:
+        return {"error": str(err)}, HTTPStatus.BAD_REQUEST
+    except DatabaseException as err:
+        return {"error": str(err)}, HTTPStatus.SERVICE_UNAVAILABLE
+    return results, HTTPStatus.OK
+
+
 @api.route("/group_chats/<group_chat_id>/messages/<message_id>")
 @handle_response(GroupChatMessageSchema())
 def get_group_chat_message(group_chat_id, message_id):
@@ -58,10 +94,15 @@ def join_group_chat(group_chat_id, user_id):
  
     try:
         database_repository.add_group_chat_member(
-            community_id, group_chat_id, g.current_user.id
+            community_id,
+            group_chat_id,
+            g.current_user.id,
+            capacity=current_app.config["MAX_GROUP_CHAT_CAPACITY"]
         )
     except NotFoundException as err:
         return {"error": str(err)}, HTTPStatus.NOT_FOUND
+    except CapacityExceededException as err:
+        return {"error": str(err)}, HTTPStatus.CONFLICT
     except DatabaseException as err:
         return {"error": str(err)}, HTTPStatus.BAD_REQUEST
     return {}, HTTPStatus.OK
@@ -0,0 +1,452 @@
+"""This module contains the pipeline that turns uploaded images into
+resized variants in the background.
+
+Clients upload images directly to file storage with a presigned POST
+and then complete the upload, which checks the stored image's header
+and hands it to the pipeline. Small images can also be uploaded through
+the api itself. A background task then decodes the image once, in the
+image processing pool, renders every size in WebP and JPEG without its
+EXIF data, uploads the variants in parallel and finally points the user
+or community at them.
+
+Uploads are stored as blobs identified by their content, which are
+shared by identical uploads and counted by reference. Direct uploads
+also keep their original, copied within file storage. Their files are
+never overwritten, so their URLs can be cached forever, and are deleted
+in the background once no image has referred to them for a while.
+"""
+
+
+import io
+import logging
+import threading
+from uuid import uuid4
+from datetime import datetime, timedelta
+from http import HTTPStatus
+from PIL import Image as PillowImage, ImageOps, UnidentifiedImageError
+from flask import current_app
+from app.api.helpers import upload_to_cdn
+from app.extensions import socketio
+from app.concurrency import image_processing_pool, WorkerPoolFullError
+from app.models import ImageType, ImageVariant, ImageBlob
+from app.repositories import database_repository, file_repository
+from app.repositories.exceptions import NotFoundException
+from app.repositories.utils import hash_file_contents
+
+
+logger = logging.getLogger(__name__)
+
+
+# Content types of the formats images can be uploaded in
+ACCEPTED_FORMATS = {"JPEG": "image/jpeg", "PNG": "image/png"}
+MAX_IMAGE_DIMENSION = 8000
+# Bytes of a direct upload read to check its header
+UPLOAD_HEADER_SIZE = 256 * 1024
+# Widths rendered for each type of image, never wider than the upload
+VARIANT_WIDTHS = {
+    ImageType.USER_PROFILE_PHOTO: (64, 200, 400),
+    ImageType.USER_COVER_PHOTO: (640, 1280, 1920),
+    ImageType.COMMUNITY_PROFILE_PHOTO: (64, 200, 400),
+    ImageType.COMMUNITY_COVER_PHOTO: (640, 1280, 1920),
+}
+VARIANT_FORMATS = {
+    "webp": {"format": "WEBP", "quality": 80, "method": 4},
+    "jpeg": {"format": "JPEG", "quality": 82, "optimize": True, "progressive": True},
+}
+CONTENT_TYPES = {"webp": "image/webp", "jpeg": "image/jpeg"}
+# Stored variants are never overwritten, so the CDN and browsers can
+# keep them for as long as they like
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+USER_IMAGE_TYPES = {ImageType.USER_PROFILE_PHOTO, ImageType.USER_COVER_PHOTO}
+
+
+def read_image_header(file):
+    """Return the format, width and height of an uploaded image read from
+    its header alone, or None if it isn't an image that can be processed.
+    """
+    try:
+        with PillowImage.open(file) as pillow_image:
+            header = (pillow_image.format, pillow_image.width, pillow_image.height)
+    except (UnidentifiedImageError, PillowImage.DecompressionBombError, OSError):
+        return None
+    finally:
+        file.seek(0)
+    image_format, width, height = header
+    if image_format not in ACCEPTED_FORMATS:
+        return None
+    if max(width, height) > MAX_IMAGE_DIMENSION:
+        return None
+    return header
+
+
+def render_variants(image_bytes, widths, formats=VARIANT_FORMATS):
+    """Decode an image once and return a list of (width, height, format,
+    bytes) tuples of it resized to each width in each format, largest
+    first. Each size is resized from the one before it.
+    """
+    with PillowImage.open(io.BytesIO(image_bytes)) as pillow_image:
+        # JPEGs can be decoded at a fraction of their size when only
+        # smaller variants are needed
+        pillow_image.draft("RGB", (max(widths), max(widths)))
+        pillow_image = _flatten(ImageOps.exif_transpose(pillow_image))
+    original_width, original_height = pillow_image.size
+    variant_widths = sorted({min(width, original_width) for width in widths}, reverse=True)
+    rendered = []
+    source = pillow_image
+    for width in variant_widths:
+        height = max(1, round(original_height * width / original_width))
+        if source.size != (width, height):
+            source = source.resize((width, height), PillowImage.LANCZOS)
+        for extension, options in formats.items():
+            buffer = io.BytesIO()
+            # Nothing is copied from the upload's metadata, which strips EXIF
+            source.save(buffer, **options)
+            rendered.append((width, height, extension, buffer.getvalue()))
+    return rendered
+
+
+def _flatten(pillow_image):
+    """Return the image in RGB, with any transparency laid over white."""
+    if pillow_image.mode in ("RGBA", "LA") or "transparency" in pillow_image.info:
+        rgba_image = pillow_image.convert("RGBA")
+        flattened_image = PillowImage.new("RGB", rgba_image.size, (255, 255, 255))
+        flattened_image.paste(rgba_image, mask=rgba_image.getchannel("A"))
+        return flattened_image
+    return pillow_image.convert("RGB")
+
+
+class ImagePipeline:
+    """Class that processes uploaded images in background tasks, keeps
+    track of how many are in progress and collects the stored variants
+    nothing refers to anymore.
+    """
+
+    def __init__(self, file_repository, pool, app=None):
+        self._file_repository = file_repository
+        self._pool = pool
+        self._max_queue = 16
+        self._gc_grace_period = 60 * 60
+        # Only held to update the pending count and start the collector,
+        # never across calls that can yield to other green threads, so a
+        # native lock can't block the event loop
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._collector_started = False
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Configure the pipeline from the app's config."""
+        self._max_queue = app.config.get("IMAGE_PROCESSING_MAX_QUEUE", self._max_queue)
+        self._gc_grace_period = app.config.get("IMAGE_GC_GRACE_PERIOD", self._gc_grace_period)
+
+    def submit(self, owner_id, image_type, image_bytes):
+        """Start processing an uploaded image of a user or community in
+        the background. Raise a WorkerPoolFullError if the pipeline is
+        already processing as many images as it queues.
+        """
+        return self._start(owner_id, image_type, image_bytes, None)
+
+    def submit_upload(self, owner_id, image_type, upload_file_id):
+        """Start processing an image uploaded directly to file storage in
+        the background. The upload is deleted once it's processed. Raise
+        a WorkerPoolFullError if the pipeline is already processing as
+        many images as it queues.
+        """
+        return self._start(owner_id, image_type, None, upload_file_id)
+
+    def pending(self):
+        """Return the number of images being processed."""
+        with self._lock:
+            return self._pending
+
+    def release_image(self, image):
+        """Drop an image's reference to its stored variants. Variants
+        left without references are collected by the periodic collector
+        once they're older than the grace period.
+        """
+        if image is None or not image.variants:
+            # Default images aren't stored by the pipeline
+            return
+        ref_count = database_repository.release_image_blob(image.id)
+        if ref_count is not None and ref_count <= 0:
+            self._start_collector()
+
+    def collect_garbage(self):
+        """Delete the image blobs and stored variants that have had no
+        references for longer than the grace period and return how many
+        blobs were deleted.
+        """
+        orphaned_before = datetime.now() - timedelta(seconds=self._gc_grace_period)
+        num_collected = 0
+        for blob in database_repository.get_orphaned_image_blobs(orphaned_before):
+            # The blob may have been retained since it was listed
+            if database_repository.remove_image_blob(blob.id) is None:
+                continue
+            for file_id in self._file_ids(blob):
+                self._file_repository.remove(file_id)
+            num_collected += 1
+        return num_collected
+
+    @staticmethod
+    def blob_id(image_bytes, widths):
+        """Return the id of the blob that stores an upload rendered at the
+        given widths, derived from the upload's content and the settings
+        it's rendered with, so identical uploads share a blob.
+        """
+        rendition = repr((widths, VARIANT_FORMATS)).encode("utf-8")
+        return hash_file_contents(image_bytes) + "_" + hash_file_contents(rendition)[:8]
+
+    def _start(self, owner_id, image_type, image_bytes, upload_file_id):
+        """Start a background task that processes an image."""
+        with self._lock:
+            if self._pending >= self._max_queue:
+                raise WorkerPoolFullError("The image pipeline is full")
+            self._pending += 1
+        try:
+            return socketio.start_background_task(
+                self._process, owner_id, image_type, image_bytes, upload_file_id
+            )
+        except Exception:
+            with self._lock:
+                self._pending -= 1
+            raise
+
+    def _process(self, owner_id, image_type, image_bytes, upload_file_id):
+        """Store the variants of an image, or reuse those of an identical
+        upload, and point the user or community at them.
+        """
+        try:
+            if image_bytes is None:
+                image_bytes = self._file_repository.get(upload_file_id)
+                if image_bytes is None:
+                    raise FileNotFoundError(upload_file_id)
+            blob = self._retain_blob(image_bytes, VARIANT_WIDTHS[image_type], upload_file_id)
+            if not self._save_image(owner_id, image_type, blob):
+                database_repository.release_image_blob(blob.id)
+        except Exception:
+            logger.exception(f"Failed to process the {image_type.name} of {owner_id}")
+        finally:
+            with self._lock:
+                self._pending -= 1
+            if upload_file_id is not None:
+                self._remove_files([upload_file_id])
+
+    def _retain_blob(self, image_bytes, widths, upload_file_id=None):
+        """Return the blob that stores the upload with a reference added,
+        rendering and storing its files only if no identical upload is
+        stored.
+        """
+        blob_id = self.blob_id(image_bytes, widths)
+        blob = database_repository.retain_image_blob(blob_id)
+        if blob is not None:
+            return blob
+        rendered = self._pool.run(render_variants, image_bytes, widths)
+        blob = self._store_files(blob_id, rendered, image_bytes, upload_file_id)
+        while not database_repository.add_image_blob(blob):
+            # An identical upload was stored at the same time
+            existing_blob = database_repository.retain_image_blob(blob_id)
+            if existing_blob is not None:
+                self._remove_files(self._file_ids(blob))
+                return existing_blob
+        return blob
+
+    def _store_files(self, blob_id, rendered, image_bytes, upload_file_id):
+        """Upload the rendered variants, and copy a direct upload's
+        original, in parallel and return a blob with a reference to them.
+        Each blob's files get keys of their own, so they are never
+        overwritten and can be cached forever.
+        """
+        key_prefix = f"images/{blob_id}/{uuid4().hex[:8]}/"
+        variants = []
+        original_id = None
+        errors = []
+
+        def store(store_file, *args, **kwargs):
+            try:
+                store_file(*args, **kwargs)
+            except Exception as err:
+                errors.append(err)
+
+        tasks = []
+        for width, height, extension, contents in rendered:
+            variant_id = f"{key_prefix}{width}.{extension}"
+            variant = ImageVariant(
+                variant_id, upload_to_cdn(None, variant_id), height, width, extension
+            )
+            variants.append(variant)
+            tasks.append(socketio.start_background_task(
+                store, self._file_repository.add, variant.id, contents,
+                content_type=CONTENT_TYPES[variant.format],
+                cache_control=IMMUTABLE_CACHE_CONTROL,
+            ))
+        if upload_file_id is not None:
+            image_format = read_image_header(io.BytesIO(image_bytes))[0]
+            original_id = key_prefix + "original." + image_format.lower()
+            tasks.append(socketio.start_background_task(
+                store, self._file_repository.copy, upload_file_id, original_id,
+                content_type=ACCEPTED_FORMATS[image_format],
+                cache_control=IMMUTABLE_CACHE_CONTROL,
+            ))
+        for task in tasks:
+            task.join()
+        blob = ImageBlob(blob_id, variants, original_id=original_id, ref_count=1)
+        if errors:
+            self._remove_files(self._file_ids(blob))
+            raise errors[0]
+        return blob
+
+    def _remove_files(self, file_ids):
+        """Delete files, logging rather than raising errors."""
+        for file_id in file_ids:
+            try:
+                self._file_repository.remove(file_id)
+            except Exception:
+                logger.exception(f"Failed to delete {file_id}")
+
+    @staticmethod
+    def _file_ids(blob):
+        """Return the ids of the files a blob refers to."""
+        file_ids = [variant.id for variant in blob.variants]
+        if blob.original_id is not None:
+            file_ids.append(blob.original_id)
+        return file_ids
+
+    def _save_image(self, owner_id, image_type, blob):
+        """Point the user or community at the blob's variants, with the
+        largest JPEG as the image that every client can display, and drop
+        the reference of the image it replaces. Return False if the owner
+        no longer exists.
+        """
+        largest_variant = max(
+            (variant for variant in blob.variants if variant.format == "jpeg"),
+            key=lambda variant: variant.width,
+        )
+        image_data = {
+            "id": blob.id,
+            "image_type": image_type,
+            "url": largest_variant.url,
+            "height": largest_variant.height,
+            "width": largest_variant.width,
+            "uploaded_at": datetime.now(),
+            "variants": blob.variants,
+        }
+        if image_type in USER_IMAGE_TYPES:
+            owner = database_repository.get_user(owner_id)
+            update_image = database_repository.update_user_image
+        else:
+            owner = database_repository.get_community(owner_id)
+            update_image = database_repository.update_community_image
+        if owner is None:
+            return False
+        # The image the write replaced is released rather than the one the
+        # owner was read with, since a concurrent upload may have replaced
+        # it in between
+        try:
+            replaced_image = update_image(owner, image_data)
+        except NotFoundException:
+            return False
+        self.release_image(replaced_image)
+        return True
+
+    def _start_collector(self):
+        """Start the background task that collects garbage, unless it's
+        already running.
+        """
+        with self._lock:
+            if self._collector_started:
+                return
+            self._collector_started = True
+        socketio.start_background_task(self._collect_periodically)
+
+    def _collect_periodically(self):
+        """Collect garbage once every grace period, so a blob is collected
+        within two grace periods of being orphaned. Orphaned blobs are
+        listed from the database, so blobs orphaned before a restart are
+        collected too.
+        """
+        while True:
+            socketio.sleep(self._gc_grace_period)
+            try:
+                self.collect_garbage()
+            except Exception:
+                logger.exception("Failed to collect image garbage")
+
+
+image_pipeline = ImagePipeline(file_repository, image_processing_pool)
+
+
+def submit_image(owner_id, file, image_type):
+    """Hand an uploaded image of a user or community to the pipeline and
+    return the response to the upload request.
+    """
+    if read_image_header(file) is None:
+        return {"error": "The file is not a valid image"}, HTTPStatus.BAD_REQUEST
+    try:
+        image_pipeline.submit(owner_id, image_type, file.read())
+    except WorkerPoolFullError:
+        return (
+            {"error": "The server is busy, please try again shortly"},
+            HTTPStatus.SERVICE_UNAVAILABLE,
+            {"Retry-After": "1"},
+        )
+    return {}, HTTPStatus.ACCEPTED
+
+
+def upload_file_id(owner_id, image_type, upload_id):
+    """Return the id of the file an image is uploaded directly to."""
+    return f"uploads/{owner_id}/{image_type.name}/{upload_id}"
+
+
+def start_image_upload(owner_id, image_type, content_type):
+    """Return the response to a request to upload an image of a user or
+    community directly to file storage, which holds the presigned POST
+    the client uploads the image with.
+    """
+    upload_id = uuid4().hex
+    max_size = current_app.config["IMAGE_UPLOAD_MAX_SIZE"]
+    expires_in = current_app.config["IMAGE_UPLOAD_EXPIRATION"]
+    upload = file_repository.create_upload(
+        upload_file_id(owner_id, image_type, upload_id), content_type, max_size, expires_in
+    )
+    return (
+        {
+            "upload_id": upload_id,
+            "url": upload["url"],
+            "fields": upload["fields"],
+            "max_size": max_size,
+            "expires_in": expires_in,
+        },
+        HTTPStatus.CREATED,
+    )
+
+
+def complete_image_upload(owner_id, image_type, upload_id):
+    """Check an image uploaded directly to file storage and hand it to
+    the pipeline. Return the response to the completion request.
+    """
+    if len(upload_id) != 32 or not all(char in "0123456789abcdef" for char in upload_id):
+        return {"error": "Upload not found"}, HTTPStatus.NOT_FOUND
+    file_id = upload_file_id(owner_id, image_type, upload_id)
+    metadata = file_repository.get_metadata(file_id)
+    if metadata is None:
+        return {"error": "Upload not found"}, HTTPStatus.NOT_FOUND
+    header = file_repository.get(file_id, byte_range=(0, UPLOAD_HEADER_SIZE - 1))
+    image_header = read_image_header(io.BytesIO(header)) if header else None
+    if (
+        image_header is None
+        or metadata["size"] > current_app.config["IMAGE_UPLOAD_MAX_SIZE"]
+        or metadata["content_type"] != ACCEPTED_FORMATS[image_header[0]]
+    ):
+        file_repository.remove(file_id)
+        return {"error": "The file is not a valid image"}, HTTPStatus.BAD_REQUEST
+    try:
+        image_pipeline.submit_upload(owner_id, image_type, file_id)
+    except WorkerPoolFullError:
+        # The upload is kept, so completing it can be retried
+        return (
+            {"error": "The server is busy, please try again shortly"},
+            HTTPStatus.SERVICE_UNAVAILABLE,
+            {"Retry-After": "1"},
+        )
+    return {}, HTTPStatus.ACCEPTED
@@ -11,16 +11,22 @@ from app.repositories import database_repository
 from app.repositories.exceptions import (
     DatabaseException,
     NotFoundException,
-    UniqueConstraintException,
+    InvalidCursorException,
+)
+from app.schemas import (
+    UrlParamsSchema,
+    MessageSearchUrlParamsSchema,
+    PrivateChatMessageSchema,
+    PrivateChatSchema
 )
-from app.schemas import UrlParamsSchema, PrivateChatMessageSchema, PrivateChatSchema
 from app.decorators.views import handle_request, handle_response
 from app.decorators.auth import permission_required
 from app.models import RolePermission, PrivateChat, MessageType
 from app.extensions import ma
+from app.schemas.base import BaseSchema
 
 
-PrivateChatGeneratedSchema = ma.Schema.from_dict(
+PrivateChatGeneratedSchema = BaseSchema.from_dict(
     {"other_user_id": ma.UUID(required=True)}
 )
 
@@ -39,7 +45,7 @@ def get_private_chat_messages(url_params, private_chat_id):
         return {"error": "User is not a member of this private chat"}, HTTPStatus.UNAUTHORIZED
     try:
         results = database_repository.get_private_chat_messages(
-            private_chat_id, per_page, cursor=cursor
+            private_chat_id, per_page, cursor=cursor, schema=PrivateChatMessageSchema
         )
     except NotFoundException as err:
         return {"error": str(err)}, HTTPStatus.NOT_FOUND
@@ -48,6 +54,31 @@ def get_private_chat_messages(url_params, private_chat_id):
     return results, HTTPStatus.OK
 
 
+@api.route("/private_chats/<private_chat_id>/messages/search")
+@handle_request(MessageSearchUrlParamsSchema())
+@handle_response(PrivateChatMessageSchema(many=True))
+def search_private_chat_messages(url_params, private_chat_id):
+    """Return a list of the private chat message resources that contain
+    every word in the search query, newest first.
+    """
+    per_page = url_params.get("per_page", current_app.config["RESULTS_PER_PAGE"])
+    cursor = url_params.get("next_cursor")
+    private_chat = database_repository.get_private_chat(private_chat_id)
+    if not private_chat:
+        return {"error": "Private chat not found"}, HTTPStatus.NOT_FOUND
+    if not private_chat.is_member(g.current_user.id):
+        return {"error": "User is not a member of this private chat"}, HTTPStatus.UNAUTHORIZED
+    try:
+        results = database_repository.search_chat_messages(
+            private_chat_id, MessageType.PRIVATE_CHAT, url_params["query"], per_page, cursor
+        )
+    except InvalidCursorException as err:
+        return {"error": str(err)}, HTTPStatus.BAD_REQUEST
+    except DatabaseException as err:
+        return {"error": str(err)}, HTTPStatus.SERVICE_UNAVAILABLE
+    return results, HTTPStatus.OK
+
+
 @api.route("/private_chats/<private_chat_id>/messages/<message_id>")
 @handle_response(PrivateChatMessageSchema())
 def get_private_chat_message(private_chat_id, message_id):
@@ -95,16 +126,12 @@ def create_private_chat(data):
     private_chat_id = md5(
         g.current_user.id.encode("utf-8") + other_user.id.encode("utf-8")
     ).hexdigest()
-    existing_private_chat = database_repository.get_private_chat(private_chat_id)
-    if existing_private_chat:
-        return (
-            {"error": "A private chat already exists between these two users"},
-            HTTPStatus.BAD_REQUEST,
-        )
+    # The other user is read for the response body. Whether the users
+    # already have a private chat is left to the write's conditions.
     private_chat = PrivateChat(private_chat_id, g.current_user, other_user)
     try:
         database_repository.add_private_chat(private_chat)
-    except UniqueConstraintException as err:
+    except DatabaseException as err:
         return {"error": str(err)}, HTTPStatus.BAD_REQUEST
     headers = {
         "Location": url_for("api.get_private_chat", private_chat_id=private_chat.id)
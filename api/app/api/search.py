@@ -0,0 +1,35 @@
+"""This module contains view functions for searching user and
+community resources by prefix, such as for mentions and type-ahead.
+"""
+
+
+from http import HTTPStatus
+from flask import current_app
+from app.api import api
+from app.decorators.views import handle_request, handle_response
+from app.schemas import SearchUrlParamsSchema, UserSchema, CommunitySchema
+from app.repositories import database_repository
+
+
+@api.route("/search/users")
+@handle_request(SearchUrlParamsSchema())
+@handle_response(UserSchema(many=True))
+def search_users(url_params):
+    """Return the first user resources, sorted by username, whose
+    usernames begin with the query.
+    """
+    limit = url_params.get("limit", current_app.config["SEARCH_RESULTS_LIMIT"])
+    results = database_repository.search_users(url_params["query"], limit)
+    return results, HTTPStatus.OK
+
+
+@api.route("/search/communities")
+@handle_request(SearchUrlParamsSchema())
+@handle_response(CommunitySchema(many=True))
+def search_communities(url_params):
+    """Return the first community resources, sorted by name, whose
+    names begin with the query.
+    """
+    limit = url_params.get("limit", current_app.config["SEARCH_RESULTS_LIMIT"])
+    results = database_repository.search_communities(url_params["query"], limit)
+    return results, HTTPStatus.OK
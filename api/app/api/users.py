@@ -9,26 +9,47 @@ from app.decorators.auth import permission_required
 from app.schemas import (
     UserSchema, 
     UrlParamsSchema, 
+    ImageUploadSchema,
+    UserUrlParamsSchema,
     CommunitySchema, 
     NotificationSchema, 
     GroupChatSchema, 
     PrivateChatSchema
 )
-from app.api.helpers import process_image, upload_to_cdn
+from app.api.helpers import upload_to_cdn
+from app.concurrency import WorkerPoolFullError
+from app.api.image_pipeline import (
+    image_pipeline,
+    submit_image,
+    start_image_upload,
+    complete_image_upload,
+)
 from app.repositories import database_repository, file_repository
-from app.repositories.exceptions import DatabaseException, NotFoundException, UniqueConstraintException
+from app.repositories.exceptions import (
+    DatabaseException, 
+    NotFoundException, 
+    UniqueConstraintException, 
+    InvalidCursorException
+)
 from app.models.factories import UserFactory
 from app.models import ImageType, RolePermission
 
 
 @api.route("/users") 
-@handle_request(UrlParamsSchema())
+@handle_request(UserUrlParamsSchema())
 @handle_response(UserSchema(many=True))
 def get_users(url_params):
-    """Return a list of user resources."""
+    """Return a list of user resources sorted by username. The list
+    can be narrowed to users whose usernames begin with a prefix.
+    """
     per_page = url_params.get("per_page", current_app.config["RESULTS_PER_PAGE"])
     cursor = url_params.get("next_cursor")
-    results = database_repository.get_users(per_page, cursor)
+    try:
+        results = database_repository.get_users(
+            per_page, cursor, prefix=url_params.get("username")
+        )
+    except InvalidCursorException as err:
+        return {"error": str(err)}, HTTPStatus.BAD_REQUEST
     return results, HTTPStatus.OK
 
 
@@ -89,7 +110,14 @@ def update_user(user_data, user_id):
     user = database_repository.get_user(user_id)
     if not user:
         return {"error": "User not found"}, HTTPStatus.NOT_FOUND
-    database_repository.update_user(user, user_data)
+    try:
+        database_repository.update_user(user, user_data)
+    except WorkerPoolFullError:
+        return (
+            {"error": "The server is busy, please try again shortly"},
+            HTTPStatus.SERVICE_UNAVAILABLE,
+            {"Retry-After": "1"},
+        )
     return {}, HTTPStatus.NO_CONTENT
 
 
@@ -106,6 +134,8 @@ def delete_user(user_id):
     cover_photo_id = user.id + "_" + ImageType.USER_COVER_PHOTO.name
     file_repository.remove(profile_photo_id)
     file_repository.remove(cover_photo_id)
+    image_pipeline.release_image(user.avatar)
+    image_pipeline.release_image(user.cover_photo)
     return {}, HTTPStatus.NO_CONTENT
 
 
@@ -115,9 +145,7 @@ def upload_user_cover_photo(file, user_id):
     """Add or replace the user's cover photo."""
     if g.current_user.id != user_id:
         return {"error": "You do not have the permissions to perform this action"}, HTTPStatus.UNAUTHORIZED
-    image_data = process_image(g.current_user.id, file_repository, file, ImageType.USER_COVER_PHOTO)
-    database_repository.update_user_image(g.current_user, image_data)
-    return {}, HTTPStatus.NO_CONTENT
+    return submit_image(g.current_user.id, file, ImageType.USER_COVER_PHOTO)
 
 
 @api.route("/users/<user_id>/profile_photo", methods=["PUT"])
@@ -126,11 +154,41 @@ def upload_user_profile_photo(file, user_id):
     """Add or a replace the user's profile photo."""
     if g.current_user.id != user_id:
         return {"error": "You do not have the permissions to perform this action"}, HTTPStatus.UNAUTHORIZED
-    image_data = process_image(
-        g.current_user.id, file_repository, file, ImageType.USER_PROFILE_PHOTO
+    return submit_image(g.current_user.id, file, ImageType.USER_PROFILE_PHOTO)
+
+
+USER_IMAGE_TYPES = {
+    "profile_photo": ImageType.USER_PROFILE_PHOTO,
+    "cover_photo": ImageType.USER_COVER_PHOTO,
+}
+
+
+@api.route(
+    "/users/<user_id>/<any(profile_photo, cover_photo):image_name>/uploads", methods=["POST"]
+)
+@handle_request(ImageUploadSchema())
+def start_user_image_upload(upload_data, user_id, image_name):
+    """Return a presigned POST that uploads one of the user's images
+    directly to file storage.
+    """
+    if g.current_user.id != user_id:
+        return {"error": "You do not have the permissions to perform this action"}, HTTPStatus.UNAUTHORIZED
+    return start_image_upload(
+        user_id, USER_IMAGE_TYPES[image_name], upload_data["content_type"]
     )
-    database_repository.update_user_image(g.current_user, image_data)
-    return {}, HTTPStatus.NO_CONTENT
+
+
+@api.route(
+    "/users/<user_id>/<any(profile_photo, cover_photo):image_name>/uploads/<upload_id>",
+    methods=["PUT"]
+)
+def complete_user_image_upload(user_id, image_name, upload_id):
+    """Add or replace one of the user's images with an image uploaded
+    directly to file storage.
+    """
+    if g.current_user.id != user_id:
+        return {"error": "You do not have the permissions to perform this action"}, HTTPStatus.UNAUTHORIZED
+    return complete_image_upload(user_id, USER_IMAGE_TYPES[image_name], upload_id)
 
 
 @api.route("/users/<user_id>/notifications")
@@ -144,12 +202,15 @@ def get_user_notifications(url_params, user_id):
     cursor = url_params.get("next_cursor")
     try:
         results = database_repository.get_user_notifications(
-            user_id, per_page, cursor=cursor
+            user_id, per_page, cursor=cursor, schema=NotificationSchema
         )
     except NotFoundException as err:
         return {"error": str(err)}, HTTPStatus.NOT_FOUND
     except DatabaseException as err:
         return {"error": str(str)}, HTTPStatus.BAD_REQUEST
+    # The user's unread count comes from the user read when their token
+    # was verified, so the notifications are the only thing queried
+    results["total_unread"] = g.current_user.unread_notification_count
     return results, HTTPStatus.OK
 
 
@@ -176,7 +237,7 @@ def update_user_notification(notification_data, user_id, notification_id):
         notification.mark_as_seen()
     elif notification_data.get("_read"):
         notification.mark_as_read()
-    database_repository.add_user_notification(notification)
+    database_repository.update_user_notification(notification)
     return {}, HTTPStatus.NO_CONTENT
 
 
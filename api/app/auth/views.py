@@ -4,8 +4,9 @@
 from http import HTTPStatus
 from flask import current_app, request, url_for, g
 from app.auth import auth
-from app.repositories import database_repository
+from app.repositories import database_repository, revoked_tokens
 from app.repositories.exceptions import DatabaseException
+from app.concurrency import WorkerPoolFullError
 from app.models import User, TokenType
 from app.models.factories import UserFactory
 from app.models.role import admin_user_role
@@ -45,7 +46,14 @@ def login():
 @handle_response(UserSchema())
 def create_user(user_data):
     """Create a new user resource."""
-    user = UserFactory.create_user(user_data)
+    try:
+        user = UserFactory.create_user(user_data)
+    except WorkerPoolFullError:
+        return (
+            {"error": "The server is busy, please try again shortly"},
+            HTTPStatus.SERVICE_UNAVAILABLE,
+            {"Retry-After": "1"},
+        )
     if user.email == current_app.config["ADMIN_EMAIL"]:
         user.role = admin_user_role
     try:
@@ -73,9 +81,8 @@ def refresh_access_token():
 @basic_auth_required
 def revoke_tokens():
     """Revoke both of a user's access and refresh tokens."""
-    # Get user's tokens and blacklist them
+    # Get user's tokens and revoke them
     tokens = database_repository.get_user_tokens(g.current_user.id)
     for token in tokens:
-        token.is_blacklisted = True
-        database_repository.add_token(token)
+        revoked_tokens.revoke(token)
     return {}, HTTPStatus.NO_CONTENT
@@ -0,0 +1,36 @@
+"""This module contains a wrapper around boto3 clients that creates the
+client on first use and makes its calls in the app's concurrency mode.
+"""
+
+
+import functools
+import threading
+import boto3
+from app.concurrency import run_blocking
+
+
+class BotoClient:
+    """Class that acts as a boto3 client. The client is only created
+    when it is first used, after the app factory has set the concurrency
+    mode, and each of its calls is made with run_blocking.
+    """
+
+    def __init__(self, service_name, **kwargs):
+        self._service_name = service_name
+        self._client_kwargs = kwargs
+        self._client = None
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        attribute = getattr(self._get_client(), name)
+        if callable(attribute) and not name.startswith("_"):
+            return functools.partial(run_blocking, attribute)
+        return attribute
+
+    def _get_client(self):
+        """Return the boto3 client, creating it if it doesn't exist yet."""
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = boto3.client(self._service_name, **self._client_kwargs)
+        return self._client
@@ -4,11 +4,14 @@ the boto3 library's DynamoDB resource.
 
 
 import os
+import time
 import logging
 import logging.config
-import boto3
 from enum import Enum
+from concurrent.futures import ThreadPoolExecutor
 from config import PROJECT_ROOT_DIRECTORY
+from app.dynamodb_mappers.constants import ItemType
+from app.clients.boto_client import BotoClient
 from pprint import pprint
 from botocore.exceptions import ClientError
 
@@ -16,6 +19,31 @@ from botocore.exceptions import ClientError
 logging.config.fileConfig(PROJECT_ROOT_DIRECTORY + "/logging.conf")
 logger = logging.getLogger("dynamoDBClient")
 
+# Number of segments full table and index scans are split into, each
+# scanned by its own worker
+SCAN_TOTAL_SEGMENTS = int(os.environ.get("AWS_DYNAMODB_SCAN_SEGMENTS", 4))
+# Most items a filtered query or scan reads while filling a single page
+READ_BUDGET = int(os.environ.get("AWS_DYNAMODB_READ_BUDGET", 1000))
+# Key attributes of each GSI, which continue queries on the index
+INDEX_KEY_ATTRIBUTES = {
+    "UsersIndex": ("USERS_GSI_PK", "USERS_GSI_SK"),
+    "InvertedIndex": ("INVERTED_GSI_PK", "INVERTED_GSI_SK"),
+    "CommunitiesByTopic": ("COMMUNITIES_BY_TOPIC_GSI_PK", "COMMUNITIES_BY_TOPIC_GSI_SK"),
+    "CommunitiesByLocation": (
+        "COMMUNITIES_BY_LOCATION_GSI_PK", "COMMUNITIES_BY_LOCATION_GSI_SK"
+    ),
+    "DirectoryIndex": ("DIRECTORY_GSI_PK", "DIRECTORY_GSI_SK"),
+    "CommunitiesByGeohash": ("GEOHASH_GSI_PK", "GEOHASH_GSI_SK"),
+}
+# Most keys DynamoDB accepts in a single batch get request
+BATCH_GET_MAX_KEYS = 100
+# Most requests DynamoDB accepts in a single batch write request
+BATCH_WRITE_MAX_ITEMS = 25
+# Number of requests made for keys a batch get or batch write leaves
+# unprocessed, and the delay before the first retry, which doubles with
+# each retry
+BATCH_GET_MAX_ATTEMPTS = 5
+BATCH_GET_RETRY_DELAY = 0.05
 
 
 class ErrorType(Enum):
@@ -23,6 +51,7 @@ class ErrorType(Enum):
     NOT_FOUND = 0
     UNIQUE_CONSTRAINT = 1
     OTHER = 2
+    CAPACITY_EXCEEDED = 3
 
 
 class _DynamoDBClient:
@@ -31,8 +60,11 @@ class _DynamoDBClient:
     """
 
     def __init__(self, region, endpoint_url=None):
-        self._dynamodb = boto3.client("dynamodb", region, endpoint_url=endpoint_url)
+        self._dynamodb = BotoClient("dynamodb", region_name=region, endpoint_url=endpoint_url)
         self._table_name = os.environ.get("AWS_DYNAMODB_TABLE_NAME")
+        self._executor = ThreadPoolExecutor(
+            max_workers=SCAN_TOTAL_SEGMENTS, thread_name_prefix="dynamodb-worker"
+        )
 
     def create_user(self, items):
         """Add a new user item to DynamoDB."""
@@ -159,16 +191,28 @@ class _DynamoDBClient:
                     error_type = ErrorType.UNIQUE_CONSTRAINT
             return {"error": error_message, "error_type": error_type}
 
-    def remove_community_member(self, key):
-        """Delete a community membership item from DynamoDB."""
+    def remove_community_member(self, keys):
+        """Delete a community membership item from DynamoDB and decrement
+        the community's member count.
+        """
+        parameters = [
+            {
+                "Delete": {
+                    "Key": keys["community_membership_key"],
+                    "TableName": self._table_name,
+                    "ConditionExpression": "attribute_exists(PK) AND attribute_exists(SK)",
+                }
+            },
+            self._build_increment_parameters(keys["community_key"], "_member_count", -1),
+        ]
         try:
-            return self.delete_item(key)
+            return self._execute_transact_write(parameters)
         except ClientError as err:
             logger.error(f"{err.response['Error']['Code']}")
             logger.error(f"{err.response['Error']['Message']}")
             
             error_message = "Could not remove member from community"
-            if err.response["Error"]["Code"] == "ConditionalCheckFailedException":
+            if err.response["Error"]["Code"] == "TransactionCanceledException":
                 error_message = "Community or user not found"
             return {"error": error_message}
 
@@ -183,14 +227,17 @@ class _DynamoDBClient:
             logger.error(f"{err.response['Error']['Message']}")
 
             error_message = "Could not create private chat"
+            error_type = ErrorType.OTHER
             if err.response["Error"]["Code"] == "TransactionCanceledException":
-                if (
-                    err.response["CancellationReasons"][0]["Code"]
-                    == "ConditionalCheckFailed"
+                # Each item is put only if it doesn't exist yet, so any of
+                # them failing means the users already have a private chat
+                if any(
+                    reason["Code"] == "ConditionalCheckFailed"
+                    for reason in err.response["CancellationReasons"]
                 ):
-                    error_message = "Users already have a private chat together"
-            
-            return {"error": error_message}
+                    error_message = "A private chat already exists between these two users"
+                    error_type = ErrorType.UNIQUE_CONSTRAINT
+            return {"error": error_message, "error_type": error_type}
     
     def create_group_chat(self, keys, items):
         """Add group chat, group chat member, and community group chat items
@@ -204,13 +251,19 @@ class _DynamoDBClient:
             error_message = "Could not create group chat"
             error_type = ErrorType.OTHER
             if err.response["Error"]["Code"] == "TransactionCanceledException":
-                if err.response["CancellationReasons"][2]["Code"] == "ConditionalCheckFailed":
+                if err.response["CancellationReasons"][3]["Code"] == "ConditionalCheckFailed":
+                    error_message = "Community not found"
+                    error_type = ErrorType.NOT_FOUND
+                elif err.response["CancellationReasons"][2]["Code"] == "ConditionalCheckFailed":
                     error_message = "User is not a member of the community"
             return {"error": error_message, "error_type": error_type}
 
-    def add_group_chat_member(self, keys, item):
-        """Add a group chat member item to DynamoDB."""
-        parameters = self._build_add_group_chat_member_parameters(keys, item)
+    def add_group_chat_member(self, keys, item, capacity=None):
+        """Add a group chat member item to DynamoDB. If a capacity is given,
+        the member is only added if the group chat has fewer members than
+        the capacity.
+        """
+        parameters = self._build_add_group_chat_member_parameters(keys, item, capacity)
         try:
             return self._execute_transact_write(parameters)
         except ClientError as err:
@@ -225,8 +278,14 @@ class _DynamoDBClient:
                     error_message = "User could not be found"
                     error_type = ErrorType.NOT_FOUND
                 elif err.response["CancellationReasons"][1]["Code"] == "ConditionalCheckFailed":
-                    error_message = "Group chat could not be found"
-                    error_type = ErrorType.NOT_FOUND
+                    # The old item is only returned if the group chat exists,
+                    # in which case it is full
+                    if "Item" in err.response["CancellationReasons"][1]:
+                        error_message = "Group chat is full"
+                        error_type = ErrorType.CAPACITY_EXCEEDED
+                    else:
+                        error_message = "Group chat could not be found"
+                        error_type = ErrorType.NOT_FOUND
                 elif err.response["CancellationReasons"][2]["Code"] == "ConditionalCheckFailed":
                     error_message = "User is not a member of the community this group chat is in"
                     error_type = ErrorType.NOT_FOUND
@@ -235,32 +294,378 @@ class _DynamoDBClient:
                     error_type = ErrorType.UNIQUE_CONSTRAINT
             return {"error": error_message, "error_type": error_type}
 
+    def remove_group_chat_member(self, keys):
+        """Delete a group chat membership item from DynamoDB and decrement
+        the group chat's member count.
+        """
+        parameters = [
+            {
+                "Delete": {
+                    "Key": keys["group_chat_membership_key"],
+                    "TableName": self._table_name,
+                    "ConditionExpression": "attribute_exists(PK) AND attribute_exists(SK)",
+                }
+            },
+            self._build_increment_parameters(keys["group_chat_key"], "_member_count", -1),
+        ]
+        try:
+            return self._execute_transact_write(parameters)
+        except ClientError as err:
+            logger.error(f"{err.response['Error']['Code']}")
+            logger.error(f"{err.response['Error']['Message']}")
+
+            error_message = "Could not remove member from group chat"
+            if err.response["Error"]["Code"] == "TransactionCanceledException":
+                error_message = "User is not a member of the given group chat"
+            return {"error": error_message}
+
+    def add_message_reaction(self, message_key, item, counter, replaced_reaction=None):
+        """Add a user's reaction item to DynamoDB and increment the message's
+        counter of the reaction's type in a transaction. If the type and
+        counter of the user's previous reaction are given, the reaction is
+        replaced and that counter is decremented instead of failing because
+        the user already reacted. When the transaction fails, the error is
+        returned along with the user's existing reaction item, if any.
+        """
+        parameters = self._build_add_message_reaction_parameters(
+            message_key, item, counter, replaced_reaction
+        )
+        try:
+            return self._execute_transact_write(parameters)
+        except ClientError as err:
+            logger.error(f"{err.response['Error']['Code']}")
+            logger.error(f"{err.response['Error']['Message']}")
+
+            response = {"error": "Could not react to chat message", "error_type": ErrorType.OTHER}
+            if err.response["Error"]["Code"] == "TransactionCanceledException":
+                reasons = err.response["CancellationReasons"]
+                if reasons[1]["Code"] == "ConditionalCheckFailed":
+                    response["error"] = "Chat message not found"
+                    response["error_type"] = ErrorType.NOT_FOUND
+                elif reasons[0]["Code"] == "ConditionalCheckFailed":
+                    response["error"] = "User has already reacted to this message"
+                    response["error_type"] = ErrorType.UNIQUE_CONSTRAINT
+                    response["item"] = reasons[0].get("Item")
+            return response
+
+    def remove_message_reaction(self, key, message_key, reaction_type, counter):
+        """Delete a user's reaction item from DynamoDB and decrement the
+        message's counter of the reaction's type in a transaction. The
+        reaction is only deleted if its type hasn't changed since it was
+        read. When the transaction fails, the error is returned along with
+        the user's current reaction item, if any.
+        """
+        parameters = [
+            {
+                "Delete": {
+                    "Key": key,
+                    "TableName": self._table_name,
+                    "ConditionExpression": "reaction_type = :reaction_type",
+                    "ExpressionAttributeValues": {":reaction_type": reaction_type},
+                    "ReturnValuesOnConditionCheckFailure": "ALL_OLD",
+                }
+            },
+            self._build_increment_parameters(message_key, counter, -1),
+        ]
+        try:
+            return self._execute_transact_write(parameters)
+        except ClientError as err:
+            logger.error(f"{err.response['Error']['Code']}")
+            logger.error(f"{err.response['Error']['Message']}")
+
+            response = {
+                "error": "Could not remove reaction from chat message",
+                "error_type": ErrorType.OTHER,
+            }
+            if err.response["Error"]["Code"] == "TransactionCanceledException":
+                reasons = err.response["CancellationReasons"]
+                if reasons[0]["Code"] == "ConditionalCheckFailed":
+                    response["error"] = "Reaction changed while it was being removed"
+                    response["item"] = reasons[0].get("Item")
+                elif reasons[1]["Code"] == "ConditionalCheckFailed":
+                    response["error"] = "Chat message not found"
+                    response["error_type"] = ErrorType.NOT_FOUND
+            return response
+
+    def add_notification(self, keys, item):
+        """Add a notification item to DynamoDB and increment the user's
+        unread notification count.
+        """
+        parameters = self._build_create_item_parameters({"notification": item})
+        parameters.append(
+            self._build_increment_parameters(
+                keys["user_key"], "_unread_notification_count", 1
+            )
+        )
+        try:
+            return self._execute_transact_write(parameters)
+        except ClientError as err:
+            logger.error(f"{err.response['Error']['Code']}")
+            logger.error(f"{err.response['Error']['Message']}")
+            
+            error_message = "Could not add notification"
+            if err.response["Error"]["Code"] == "TransactionCanceledException":
+                if err.response["CancellationReasons"][0]["Code"] == "ConditionalCheckFailed":
+                    error_message = "Notification already exists"
+                elif err.response["CancellationReasons"][1]["Code"] == "ConditionalCheckFailed":
+                    error_message = "User could not be found"
+            return {"error": error_message}
+
+    def mark_notification_as_read(self, keys, item):
+        """Replace an unread notification item with the given item and
+        decrement the user's unread notification count. Return False if
+        the notification was already read.
+        """
+        parameters = [
+            {
+                "Put": {
+                    "Item": item, 
+                    "TableName": self._table_name,
+                    "ConditionExpression": "attribute_exists(PK) AND #read = :false",
+                    "ExpressionAttributeNames": {"#read": "_read"},
+                    "ExpressionAttributeValues": {":false": {"BOOL": False}},
+                }
+            },
+            self._build_increment_parameters(
+                keys["user_key"], "_unread_notification_count", -1
+            ),
+        ]
+        try:
+            self._execute_transact_write(parameters)
+        except ClientError as err:
+            logger.error(f"{err.response['Error']['Code']}")
+            logger.error(f"{err.response['Error']['Message']}")
+            return False
+        return True
+
+    def update_message_postings(self, updates, max_postings=None):
+        """Add message ids to and delete message ids from the binary sets
+        of message search postings items, in parallel. Each update is a
+        tuple of the postings item's key, "ADD" or "DELETE" and the encoded
+        message ids. If a maximum is given, ids are only added to postings
+        items that would hold at most that many ids afterwards. Return False
+        if any update failed.
+        """
+        futures = [
+            (
+                key,
+                self._executor.submit(
+                    self._dynamodb.update_item,
+                    **self._build_update_postings_parameters(key, action, postings, max_postings)
+                ),
+            )
+            for key, action, postings in updates
+        ]
+        succeeded = True
+        for key, future in futures:
+            try:
+                future.result()
+            except ClientError as err:
+                logger.error(f"{err.response['Error']['Code']}")
+                logger.error(f"{err.response['Error']['Message']}")
+                if err.response["Error"]["Code"] == "ConditionalCheckFailedException":
+                    logger.error(
+                        f"Postings item {key['PK']['S']} {key['SK']['S']} holds the most "
+                        "message ids it can, so messages are no longer added to it"
+                    )
+                succeeded = False
+        return succeeded
+
+    def increment_counter(self, key, attribute, amount):
+        """Atomically add the amount to a counter attribute of an existing item."""
+        parameters = self._build_increment_parameters(key, attribute, amount)["Update"]
+        try:
+            self._dynamodb.update_item(**parameters)
+        except ClientError as err:
+            logger.error(f"{err.response['Error']['Code']}")
+            logger.error(f"{err.response['Error']['Message']}")
+            return False
+        return True
+
+    def retain_image_blob(self, key):
+        """Add a reference to an image blob, take it out of the directory
+        of orphaned blobs and return its item. Return None if the blob
+        doesn't exist.
+        """
+        try:
+            response = self._dynamodb.update_item(
+                TableName=self._table_name,
+                Key=key,
+                UpdateExpression="ADD ref_count :one REMOVE DIRECTORY_GSI_PK, DIRECTORY_GSI_SK",
+                ConditionExpression="attribute_exists(PK) AND attribute_exists(SK)",
+                ExpressionAttributeValues={":one": {"N": "1"}},
+                ReturnValues="ALL_NEW",
+            )
+        except ClientError as err:
+            logger.error(f"{err.response['Error']['Code']}")
+            logger.error(f"{err.response['Error']['Message']}")
+            return None
+        return response["Attributes"]
+
+    def release_image_blob(self, key, orphan_attributes):
+        """Remove a reference to an image blob and return the number of
+        references left, or None if the blob doesn't exist. A blob left
+        without references is given the orphan attributes, which list it
+        in the directory of orphaned blobs, unless it was retained again
+        in the meantime.
+        """
+        try:
+            response = self._dynamodb.update_item(
+                TableName=self._table_name,
+                Key=key,
+                UpdateExpression="ADD ref_count :minus_one",
+                ConditionExpression="attribute_exists(PK) AND attribute_exists(SK)",
+                ExpressionAttributeValues={":minus_one": {"N": "-1"}},
+                ReturnValues="UPDATED_NEW",
+            )
+        except ClientError as err:
+            logger.error(f"{err.response['Error']['Code']}")
+            logger.error(f"{err.response['Error']['Message']}")
+            return None
+        ref_count = int(response["Attributes"]["ref_count"]["N"])
+        if ref_count <= 0:
+            expression_attribute_values = {":zero": {"N": "0"}}
+            set_expressions = []
+            for index, (name, value) in enumerate(orphan_attributes.items()):
+                set_expressions.append(f"{name} = :orphan{index}")
+                expression_attribute_values[f":orphan{index}"] = value
+            try:
+                self._dynamodb.update_item(
+                    TableName=self._table_name,
+                    Key=key,
+                    UpdateExpression="SET " + ", ".join(set_expressions),
+                    ConditionExpression="ref_count <= :zero",
+                    ExpressionAttributeValues=expression_attribute_values,
+                )
+            except ClientError as err:
+                # The blob was retained again
+                logger.info(f"{err.response['Error']['Code']}")
+        return ref_count
+
+    def delete_image_blob(self, key):
+        """Delete an image blob that has no references and return its
+        item, or None if it doesn't exist or was retained again.
+        """
+        try:
+            response = self._dynamodb.delete_item(
+                TableName=self._table_name,
+                Key=key,
+                ConditionExpression="ref_count <= :zero",
+                ExpressionAttributeValues={":zero": {"N": "0"}},
+                ReturnValues="ALL_OLD",
+            )
+        except ClientError as err:
+            logger.error(f"{err.response['Error']['Code']}")
+            logger.error(f"{err.response['Error']['Message']}")
+            return None
+        return response.get("Attributes")
+
     def batch_delete_items(self, keys):
-        dynamodb = boto3.resource("dynamodb", endpoint_url=os.environ.get("AWS_DYNAMODB_ENDPOINT_URL"))
-        table = dynamodb.Table(self._table_name)
-        with table.batch_writer() as batch:
-            for key in keys:
-                batch.delete_item(Key=key)
+        """Delete multiple items from DynamoDB. Keys are deleted at most 25
+        at a time, and deletes DynamoDB leaves unprocessed are sent again
+        with exponential backoff. Return False if some of the items couldn't
+        be deleted.
+        """
+        logger.info("Making batch delete call")
+        num_unprocessed = 0
+        for start in range(0, len(keys), BATCH_WRITE_MAX_ITEMS):
+            pending_requests = [
+                {"DeleteRequest": {"Key": key}}
+                for key in keys[start:start + BATCH_WRITE_MAX_ITEMS]
+            ]
+            for attempt in range(BATCH_GET_MAX_ATTEMPTS):
+                if attempt:
+                    time.sleep(BATCH_GET_RETRY_DELAY * 2 ** (attempt - 1))
+                try:
+                    response = self._dynamodb.batch_write_item(
+                        RequestItems={self._table_name: pending_requests}
+                    )
+                except ClientError as err:
+                    logger.error(f"{err.response['Error']['Code']}")
+                    logger.error(f"{err.response['Error']['Message']}")
+                    break
+                pending_requests = response.get("UnprocessedItems", {}).get(self._table_name, [])
+                if not pending_requests:
+                    break
+            num_unprocessed += len(pending_requests)
+        if num_unprocessed:
+            logger.error(f"{num_unprocessed} items were left undeleted by batch delete")
+            return False
         return True
 
-    def get_items(self, limit, start_key, index=None):
-        """Return a list of items from the table or an index if given."""
-        logger.info("Getting items from DynamoDB")
-        results = {"Items": [], "LastEvaluatedKey": None}
-        if index:
-            response = self._scan_index(limit, start_key, index)
-        else:
-            response = self._scan_table(limit, start_key)
+    def get_items_in_segments(self, limit, segment_start_keys, index=None, **kwargs):
+        """Return a page of items from the table or an index if given by
+        scanning its segments in parallel. The segment start keys hold one
+        start key per segment, which is empty for a segment that hasn't been
+        scanned yet and None for a segment that has been scanned to the end.
+        An empty list starts a new scan. The limit is split between the
+        segments that haven't been scanned to the end.
 
-        results["Items"].extend(response["Items"])
-        results["LastEvaluatedKey"] = response.get("LastEvaluatedKey")
+        If an item type is given, DynamoDB only returns items of that type and
+        more rounds of scans are made until the limit is reached or the read
+        budget, the number of items read, is spent.
+        """
+        logger.info("Getting items from DynamoDB in parallel segments")
+        if not segment_start_keys:
+            segment_start_keys = [{} for _ in range(SCAN_TOTAL_SEGMENTS)]
+        item_type = kwargs.get("item_type")
+        read_budget = kwargs.get("read_budget", READ_BUDGET)
+        total_segments = len(segment_start_keys)
+        next_start_keys = list(segment_start_keys)
+        results = {"Items": [], "LastEvaluatedKey": None}
+        num_read = 0
+        while True:
+            segments = [
+                segment
+                for segment, start_key in enumerate(next_start_keys)
+                if start_key is not None
+            ]
+            remaining = limit - len(results["Items"])
+            if not segments or remaining <= 0:
+                break
+            # Each segment reads at most its share, so a round can never
+            # return more items than are missing from the page
+            segment_limits = {
+                segment: remaining // len(segments) + (
+                    1 if position < remaining % len(segments) else 0
+                )
+                for position, segment in enumerate(segments)
+            }
+            futures = {
+                segment: self._executor.submit(
+                    self._scan_segment,
+                    segment_limits[segment],
+                    next_start_keys[segment],
+                    index,
+                    segment,
+                    total_segments,
+                    item_type,
+                )
+                for segment in segments
+                if segment_limits[segment] > 0
+            }
+            for segment, future in futures.items():
+                response = future.result()
+                results["Items"].extend(response["Items"])
+                num_read += response.get("ScannedCount", len(response["Items"]))
+                next_start_keys[segment] = response.get("LastEvaluatedKey")
+            if not item_type or num_read >= read_budget:
+                break
+        if any(start_key is not None for start_key in next_start_keys):
+            results["LastEvaluatedKey"] = {"segments": next_start_keys}
         return results
 
-    def get_item(self, key):
+    def get_item(self, key, attributes=None):
         """Return a single item from DynamoDB. This method
-        will return the item with all of its attributes.
+        will return the item with all of its attributes unless
+        the names of the attributes to read are given.
         """
-        response = self._dynamodb.get_item(TableName=self._table_name, Key=key,)
+        parameters = {"TableName": self._table_name, "Key": key}
+        if attributes:
+            names = {f"#p{index}": attribute for index, attribute in enumerate(attributes)}
+            parameters["ProjectionExpression"] = ", ".join(names)
+            parameters["ExpressionAttributeNames"] = names
+        response = self._dynamodb.get_item(**parameters)
         return response.get("Item")
 
     def put_item(self, item, use_condition_expression=False):
@@ -285,6 +690,85 @@ class _DynamoDBClient:
             )
         return True
         
+    def replace_item(self, item):
+        """Replace an entire item in the table or create a new item if it
+        doesn't exist. Return the item that was replaced, if any.
+        """
+        response = self._dynamodb.put_item(
+            TableName=self._table_name, Item=item, ReturnValues="ALL_OLD"
+        )
+        return response.get("Attributes")
+
+    def update_item(self, key, item, attributes_to_remove=()):
+        """Overwrite the given attributes of an existing item and remove the
+        attributes in attributes_to_remove. Unlike put_item, attributes that
+        aren't given, such as counters, are left as they are.
+        """
+        parameters = self._build_update_item_parameters(key, item, attributes_to_remove)
+        try:
+            self._dynamodb.update_item(**parameters)
+        except ClientError as err:
+            logger.error(f"{err.response['Error']['Code']}")
+            logger.error(f"{err.response['Error']['Message']}")
+            return False
+        return True
+
+    def replace_item_attributes(self, key, item, attributes_to_remove=()):
+        """Overwrite the given attributes of an existing item like update_item
+        and return the item as it was right before the update, so callers
+        learn what the write actually replaced. Return None if the item
+        doesn't exist.
+        """
+        parameters = self._build_update_item_parameters(key, item, attributes_to_remove)
+        parameters["ReturnValues"] = "ALL_OLD"
+        try:
+            response = self._dynamodb.update_item(**parameters)
+        except ClientError as err:
+            logger.error(f"{err.response['Error']['Code']}")
+            logger.error(f"{err.response['Error']['Message']}")
+            return None
+        return response.get("Attributes")
+
+    def update_owned_item(self, key, item, owner_attribute, owner_id):
+        """Overwrite the given attributes of an existing item that belongs to
+        the given owner and return the item as it was before the update.
+        Return None if the item doesn't exist or belongs to someone else.
+        """
+        parameters = self._build_update_item_parameters(key, item)
+        parameters["ConditionExpression"] += " AND #owner = :owner"
+        parameters["ExpressionAttributeNames"]["#owner"] = owner_attribute
+        parameters.setdefault("ExpressionAttributeValues", {})[":owner"] = {"S": owner_id}
+        parameters["ReturnValues"] = "ALL_OLD"
+        try:
+            response = self._dynamodb.update_item(**parameters)
+        except ClientError as err:
+            logger.error(f"{err.response['Error']['Code']}")
+            logger.error(f"{err.response['Error']['Message']}")
+            return None
+        return response.get("Attributes")
+
+    def delete_owned_item(self, key, owner_attribute, owner_id):
+        """Delete an item that belongs to the given owner and return the
+        deleted item. Return None if the item doesn't exist or belongs to
+        someone else.
+        """
+        try:
+            response = self._dynamodb.delete_item(
+                TableName=self._table_name,
+                Key=key,
+                ConditionExpression=(
+                    "attribute_exists(PK) AND attribute_exists(SK) AND #owner = :owner"
+                ),
+                ExpressionAttributeNames={"#owner": owner_attribute},
+                ExpressionAttributeValues={":owner": {"S": owner_id}},
+                ReturnValues="ALL_OLD"
+            )
+        except ClientError as err:
+            logger.error(f"{err.response['Error']['Code']}")
+            logger.error(f"{err.response['Error']['Message']}")
+            return None
+        return response.get("Attributes")
+
     def delete_item(self, key):
         """Delete an item from DynamoDB and return the response."""
         try:
@@ -298,47 +782,62 @@ class _DynamoDBClient:
         return True
 
     def query(self, limit, start_key, primary_key, **kwargs):
+        """Return a page of items that match the primary key from the table
+        or an index if given.
+
+        If an item type is given, DynamoDB only returns items of that type and
+        continuation pages are read until the limit is reached or the read
+        budget, the number of items read, is spent. The returned start key then
+        points right after the last returned item.
+        """
         logger.info("Querying items from DynamoDB")
         results = {"Items": [], "LastEvaluatedKey": None}
-        if kwargs.get("index") is not None:
-            response = self._query_index(limit, start_key, primary_key, **kwargs)
-        else:
-            response = self._query_table(limit, start_key, primary_key, **kwargs)
-
-        results["Items"].extend(response["Items"])
-        results["LastEvaluatedKey"] = response.get("LastEvaluatedKey")
+        item_type = kwargs.get("item_type")
+        read_budget = kwargs.get("read_budget", READ_BUDGET)
+        num_read = 0
+        num_matched = 0
+        while True:
+            remaining = limit - len(results["Items"])
+            read_size = remaining
+            if item_type and num_read:
+                # Read enough to fill the page at the selectivity seen so far
+                read_size = -(-remaining * num_read // max(num_matched, 1))
+                read_size = max(remaining, min(read_size, read_budget - num_read))
+            response = self._query(read_size, start_key, primary_key, **kwargs)
+            items = response["Items"]
+            num_read += response.get("ScannedCount", len(items))
+            num_matched += len(items)
+            start_key = response.get("LastEvaluatedKey")
+            if len(items) > remaining:
+                items = items[:remaining]
+                start_key = self._extract_start_key(items[-1], primary_key, kwargs.get("index"))
+            results["Items"].extend(items)
+            results["LastEvaluatedKey"] = start_key
+            if (
+                not item_type
+                or not start_key
+                or len(results["Items"]) >= limit
+                or num_read >= read_budget
+            ):
+                break
         return results
 
-    def _query_index(self, limit, start_key, primary_key, **kwargs):
-        key_condition_expression = f"{primary_key['pk_name']} = :pk"
-        expression_attribute_values = {":pk": primary_key["pk_value"]}
-        if "sk_name" in primary_key:
-            key_condition_expression += (
-                f" AND begins_with({primary_key['sk_name']}, :sk)"
-            )
-            expression_attribute_values[":sk"] = primary_key["sk_value"]
-        if start_key:
-            response = self._dynamodb.query(
-                TableName=self._table_name,
-                IndexName=kwargs["index"],
-                Limit=limit,
-                ExclusiveStartKey=start_key,
-                KeyConditionExpression=key_condition_expression,
-                ExpressionAttributeValues=expression_attribute_values,
-                ScanIndexForward=kwargs.get("scan_forward", True)
-            )
-        else:
-            response = self._dynamodb.query(
-                TableName=self._table_name,
-                IndexName=kwargs["index"],
-                Limit=limit,
-                KeyConditionExpression=key_condition_expression,
-                ExpressionAttributeValues=expression_attribute_values,
-                ScanIndexForward=kwargs.get("scan_forward", True)
-            )
-        return response
+    def query_in_parallel(self, limit, primary_keys, start_keys=None, **kwargs):
+        """Run a query for each of the primary keys in parallel, starting
+        from the matching start key if given, and return the page of each,
+        in the same order as the keys.
+        """
+        start_keys = start_keys or [{}] * len(primary_keys)
+        futures = [
+            self._executor.submit(self.query, limit, start_key, primary_key, **kwargs)
+            for primary_key, start_key in zip(primary_keys, start_keys)
+        ]
+        return [future.result() for future in futures]
 
-    def _query_table(self, limit, start_key, primary_key, **kwargs):
+    def _query(self, limit, start_key, primary_key, **kwargs):
+        """Perform a single query on the table or an index if given and
+        return a list of items.
+        """
         key_condition_expression = f"{primary_key['pk_name']} = :pk"
         expression_attribute_values = {":pk": primary_key["pk_value"]}
         if "sk_name" in primary_key:
@@ -346,35 +845,69 @@ class _DynamoDBClient:
                 f" AND begins_with({primary_key['sk_name']}, :sk)"
             )
             expression_attribute_values[":sk"] = primary_key["sk_value"]
+        parameters = {
+            "TableName": self._table_name,
+            "Limit": limit,
+            "KeyConditionExpression": key_condition_expression,
+            "ExpressionAttributeValues": expression_attribute_values,
+            "ScanIndexForward": kwargs.get("scan_forward", True),
+        }
+        if kwargs.get("index") is not None:
+            parameters["IndexName"] = kwargs["index"]
         if start_key:
-            response = self._dynamodb.query(
-                TableName=self._table_name,
-                Limit=limit,
-                ExclusiveStartKey=start_key,
-                KeyConditionExpression=key_condition_expression,
-                ExpressionAttributeValues=expression_attribute_values,
-                ScanIndexForward=kwargs.get("scan_forward", True)
-            )
-        else:
-            response = self._dynamodb.query(
-                TableName=self._table_name,
-                Limit=limit,
-                KeyConditionExpression=key_condition_expression,
-                ExpressionAttributeValues=expression_attribute_values,
-                ScanIndexForward=kwargs.get("scan_forward", True)
-            )
-        return response
+            parameters["ExclusiveStartKey"] = start_key
+        if kwargs.get("item_type"):
+            parameters["FilterExpression"] = "#type = :type"
+            parameters["ExpressionAttributeNames"] = {"#type": "type"}
+            expression_attribute_values[":type"] = {"S": kwargs["item_type"]}
+        return self._dynamodb.query(**parameters)
+
+    def _extract_start_key(self, item, primary_key, index=None):
+        """Return the start key that continues a query on the table or an
+        index if given right after the given item.
+        """
+        key_attributes = ["PK", "SK"]
+        if index is not None:
+            key_attributes.extend(INDEX_KEY_ATTRIBUTES[index])
+        return {attribute: item[attribute] for attribute in key_attributes}
 
     def batch_get_items(self, keys):
-        """Return multiple items from DynamoDB."""
+        """Return multiple items from DynamoDB. Keys are requested at most
+        100 at a time, and keys DynamoDB leaves unprocessed are requested
+        again with exponential backoff. Keys that are still unprocessed
+        after the last attempt are returned under UnprocessedKeys, so
+        callers can tell them apart from keys whose items don't exist.
+        """
         logger.info("Making batch get call")
-        return self._dynamodb.batch_get_item(
-            RequestItems={
-                self._table_name: {
-                    "Keys": keys
-                }
-            }
-        )
+        items = []
+        unprocessed_keys = []
+        for start in range(0, len(keys), BATCH_GET_MAX_KEYS):
+            pending_keys = keys[start:start + BATCH_GET_MAX_KEYS]
+            for attempt in range(BATCH_GET_MAX_ATTEMPTS):
+                if attempt:
+                    time.sleep(BATCH_GET_RETRY_DELAY * 2 ** (attempt - 1))
+                response = self._dynamodb.batch_get_item(
+                    RequestItems={
+                        self._table_name: {
+                            "Keys": pending_keys
+                        }
+                    }
+                )
+                items.extend(response["Responses"].get(self._table_name, []))
+                pending_keys = (
+                    response.get("UnprocessedKeys", {})
+                    .get(self._table_name, {})
+                    .get("Keys", [])
+                )
+                if not pending_keys:
+                    break
+            if pending_keys:
+                logger.error(f"{len(pending_keys)} keys were left unprocessed by batch get")
+                unprocessed_keys.extend(pending_keys)
+        response = {"Responses": {self._table_name: items}}
+        if unprocessed_keys:
+            response["UnprocessedKeys"] = {self._table_name: {"Keys": unprocessed_keys}}
+        return response
 
     def batch_write_items(self, requests):
         """Write multiple items at a time to the table."""
@@ -396,30 +929,26 @@ class _DynamoDBClient:
         response = self._dynamodb.transact_write_items(TransactItems=parameters)
         return response
 
-    def _scan_index(self, limit, start_key, index):
-        """Perform a scan on an index and return a list of items."""
-        if start_key:
-            response = self._dynamodb.scan(
-                TableName=self._table_name,
-                IndexName=index,
-                ExclusiveStartKey=start_key,
-                Limit=limit,
-            )
-        else:
-            response = self._dynamodb.scan(
-                TableName=self._table_name, IndexName=index, Limit=limit
-            )
-        return response
-
-    def _scan_table(self, limit, start_key):
-        """Perform a scan on the table and return a list of items."""
+    def _scan_segment(self, limit, start_key, index, segment, total_segments, item_type=None):
+        """Perform a scan on a segment of the table or an index if given
+        and return a list of items, only of the item type if given.
+        """
+        parameters = {
+            "TableName": self._table_name,
+            "Segment": segment,
+            "TotalSegments": total_segments,
+        }
+        if index:
+            parameters["IndexName"] = index
         if start_key:
-            response = self._dynamodb.scan(
-                TableName=self._table_name, ExclusiveStartKey=start_key, Limit=limit
-            )
-        else:
-            response = self._dynamodb.scan(TableName=self._table_name, Limit=limit)
-        return response
+            parameters["ExclusiveStartKey"] = start_key
+        if limit:
+            parameters["Limit"] = limit
+        if item_type:
+            parameters["FilterExpression"] = "#type = :type"
+            parameters["ExpressionAttributeNames"] = {"#type": "type"}
+            parameters["ExpressionAttributeValues"] = {":type": {"S": item_type}}
+        return self._dynamodb.scan(**parameters)
 
     # May move these _build_* methods into another module and make them functions if this
     # module becomes too large
@@ -458,6 +987,10 @@ class _DynamoDBClient:
                     }
                 }
             )
+        if "user_update" in items:
+            parameters.append(
+                {"Update": self._build_update_item_parameters(*items.pop("user_update"))}
+            )
         for item in items:
             parameters.append(
                 {"Put": {"Item": items[item], "TableName": self._table_name}}
@@ -476,6 +1009,10 @@ class _DynamoDBClient:
                     }
                 }
             )
+        if "community_update" in items:
+            parameters.append(
+                {"Update": self._build_update_item_parameters(*items.pop("community_update"))}
+            )
         for item in items:
             parameters.append(
                 {"Put": {"Item": items[item], "TableName": self._table_name}}
@@ -517,13 +1054,7 @@ class _DynamoDBClient:
                     "ConditionExpression": "attribute_exists(PK) AND attribute_exists(SK)",
                 }
             },
-            {
-                "ConditionCheck": {
-                    "Key": keys["community_key"],
-                    "TableName": self._table_name,
-                    "ConditionExpression": "attribute_exists(PK) AND attribute_exists(SK)",
-                }
-            },
+            self._build_increment_parameters(keys["community_key"], "_member_count", 1),
             {
                 "Put": {
                     "Item": item, "TableName": self._table_name,
@@ -533,7 +1064,7 @@ class _DynamoDBClient:
         ]
         return parameters
     
-    def _build_add_group_chat_member_parameters(self, keys, item):
+    def _build_add_group_chat_member_parameters(self, keys, item, capacity=None):
         parameters = [
             {
                 "ConditionCheck": {
@@ -542,13 +1073,9 @@ class _DynamoDBClient:
                     "ConditionExpression": "attribute_exists(PK) AND attribute_exists(SK)",
                 }
             },
-            {
-                "ConditionCheck": {
-                    "Key": keys["group_chat_key"],
-                    "TableName": self._table_name,
-                    "ConditionExpression": "attribute_exists(PK) AND attribute_exists(SK)",
-                }
-            },
+            self._build_increment_parameters(
+                keys["group_chat_key"], "_member_count", 1, maximum=capacity
+            ),
             {
                 "ConditionCheck": {
                     "Key": keys["community_membership_key"],
@@ -565,6 +1092,110 @@ class _DynamoDBClient:
         ]
         return parameters
 
+    def _build_update_item_parameters(self, key, item, attributes_to_remove=()):
+        """Return the parameters necessary to overwrite the attributes of an
+        existing item with an update rather than a put.
+        """
+        names = {}
+        values = {}
+        clauses = []
+        if item:
+            set_expressions = []
+            for index, attribute in enumerate(item):
+                names[f"#a{index}"] = attribute
+                values[f":a{index}"] = item[attribute]
+                set_expressions.append(f"#a{index} = :a{index}")
+            clauses.append("SET " + ", ".join(set_expressions))
+        if attributes_to_remove:
+            remove_expressions = []
+            for index, attribute in enumerate(attributes_to_remove):
+                names[f"#r{index}"] = attribute
+                remove_expressions.append(f"#r{index}")
+            clauses.append("REMOVE " + ", ".join(remove_expressions))
+        parameters = {
+            "Key": key,
+            "TableName": self._table_name,
+            "UpdateExpression": " ".join(clauses),
+            "ConditionExpression": "attribute_exists(PK) AND attribute_exists(SK)",
+            "ExpressionAttributeNames": names,
+        }
+        # DynamoDB rejects empty expression attribute values
+        if values:
+            parameters["ExpressionAttributeValues"] = values
+        return parameters
+
+    def _build_update_postings_parameters(self, key, action, postings, max_postings=None):
+        """Return the parameters necessary to add message ids to or delete
+        message ids from a postings item's binary set. If a maximum is given,
+        ids are only added if the set would hold at most that many ids.
+        """
+        parameters = {
+            "Key": key,
+            "TableName": self._table_name,
+            "ExpressionAttributeValues": {":postings": {"BS": list(postings)}},
+        }
+        if action == "ADD":
+            parameters["UpdateExpression"] = "ADD postings :postings SET #type = :type"
+            parameters["ExpressionAttributeNames"] = {"#type": "type"}
+            parameters["ExpressionAttributeValues"][":type"] = {
+                "S": ItemType.MESSAGE_POSTINGS.name
+            }
+            if max_postings is not None:
+                parameters["ConditionExpression"] = (
+                    "attribute_not_exists(postings) OR size(postings) <= :max_existing"
+                )
+                parameters["ExpressionAttributeValues"][":max_existing"] = {
+                    "N": str(max_postings - len(postings))
+                }
+        else:
+            parameters["UpdateExpression"] = "DELETE postings :postings"
+        return parameters
+
+    def _build_increment_parameters(self, key, attribute, amount, maximum=None):
+        """Return the parameters necessary to atomically add the amount to a
+        counter attribute of an existing item in a transaction. If a maximum
+        is given, the update fails if it would take the counter above it, and
+        the old item is returned with the failure to tell it apart from the
+        item not existing.
+        """
+        parameters = {
+            "Key": key,
+            "TableName": self._table_name,
+            "UpdateExpression": "ADD #counter :amount",
+            "ConditionExpression": "attribute_exists(PK) AND attribute_exists(SK)",
+            "ExpressionAttributeNames": {"#counter": attribute},
+            "ExpressionAttributeValues": {":amount": {"N": str(amount)}},
+        }
+        if maximum is not None:
+            parameters["ConditionExpression"] += (
+                " AND (attribute_not_exists(#counter) OR #counter <= :limit)"
+            )
+            parameters["ExpressionAttributeValues"][":limit"] = {"N": str(maximum - amount)}
+            parameters["ReturnValuesOnConditionCheckFailure"] = "ALL_OLD"
+        return {"Update": parameters}
+
+    def _build_add_message_reaction_parameters(
+        self, message_key, item, counter, replaced_reaction=None
+    ):
+        """Return the parameters necessary to add or replace a user's reaction
+        to a message and update the message's reaction counters in a
+        transaction.
+        """
+        put = {"Item": item, "TableName": self._table_name}
+        update = self._build_increment_parameters(message_key, counter, 1)["Update"]
+        if replaced_reaction is None:
+            put["ConditionExpression"] = "attribute_not_exists(PK) AND attribute_not_exists(SK)"
+            put["ReturnValuesOnConditionCheckFailure"] = "ALL_OLD"
+        else:
+            # The reaction is only replaced if it hasn't changed since it was read
+            replaced_reaction_type, replaced_counter = replaced_reaction
+            put["ConditionExpression"] = "reaction_type = :replaced_type"
+            put["ExpressionAttributeValues"] = {":replaced_type": replaced_reaction_type}
+            update["UpdateExpression"] += ", #replaced_counter :decrement"
+            update["ExpressionAttributeNames"]["#replaced_counter"] = replaced_counter
+            update["ExpressionAttributeValues"][":decrement"] = {"N": "-1"}
+        return [{"Put": put}, {"Update": update}]
+
     def _build_create_group_chat_parameters(self, keys, items):
         parameters = self._build_create_item_parameters(items)
         parameters.append({
@@ -574,6 +1205,13 @@ class _DynamoDBClient:
                 "ConditionExpression": "attribute_exists(PK) AND attribute_exists(SK)",
             }
         })
+        parameters.append({
+            "ConditionCheck": {
+                "Key": keys["community_key"],
+                "TableName": self._table_name,
+                "ConditionExpression": "attribute_exists(PK)",
+            }
+        })
         return parameters
 
 
@@ -0,0 +1,181 @@
+"""This module contains the tools that keep blocking work from stalling
+the server's event loop: the concurrency mode boto3 calls run in and a
+bounded pool for CPU-heavy work such as password hashing.
+
+Under the eventlet server every request and socket shares a single OS
+thread, so a call that holds the thread for tens of milliseconds stalls
+all of them. The concurrency mode, set by the CONCURRENCY_MODE config
+value, decides how blocking I/O avoids that:
+
+- ``green``: the standard library is monkey patched by the entrypoint
+before anything else is imported, so boto3's sockets yield to the hub.
+- ``tpool``: each boto3 call made on the hub's thread runs on eventlet's
+pool of native threads while the calling green thread yields.
+- ``none``: calls run directly, for servers without an event loop.
+
+Calls made through a worker pool run on eventlet's native threads under
+the eventlet server. Under any other server the calling thread is
+already a native thread, so calls run in it directly, still bounded by
+the pool.
+"""
+
+
+import logging
+import threading
+
+
+logger = logging.getLogger(__name__)
+
+
+class ConcurrencyMode:
+    """Class that holds constants of the ways blocking I/O can be kept
+    from stalling the event loop.
+    """
+
+    GREEN = "green"
+    TPOOL = "tpool"
+    NONE = "none"
+
+
+_concurrency_mode = ConcurrencyMode.NONE
+
+
+def init_concurrency(app):
+    """Set the concurrency mode from the app's config. Must be called
+    before any boto3 client is used. Falls back to the tpool mode if the
+    green mode is configured but the standard library wasn't patched,
+    since patching after boto3 is imported isn't safe.
+    """
+    mode = app.config.get("CONCURRENCY_MODE", ConcurrencyMode.NONE)
+    if mode == ConcurrencyMode.GREEN:
+        from eventlet import patcher
+
+        if not patcher.is_monkey_patched("socket"):
+            logger.warning(
+                "The green concurrency mode needs eventlet.monkey_patch() to be called "
+                "before the app is imported, falling back to the tpool mode"
+            )
+            mode = ConcurrencyMode.TPOOL
+    set_concurrency_mode(mode)
+
+
+def set_concurrency_mode(mode):
+    """Set the way blocking I/O calls are made."""
+    global _concurrency_mode
+    if mode not in (ConcurrencyMode.GREEN, ConcurrencyMode.TPOOL, ConcurrencyMode.NONE):
+        raise ValueError(f"Unknown concurrency mode: {mode}")
+    _concurrency_mode = mode
+
+
+def get_concurrency_mode():
+    """Return the way blocking I/O calls are made."""
+    return _concurrency_mode
+
+
+def run_blocking(func, *args, **kwargs):
+    """Call a function that blocks on I/O the way the concurrency mode
+    calls for and return its result.
+    """
+    if (
+        _concurrency_mode == ConcurrencyMode.TPOOL
+        and threading.current_thread() is threading.main_thread()
+    ):
+        from eventlet import tpool
+
+        return tpool.execute(func, *args, **kwargs)
+    # Calls from other native threads, such as the DynamoDB client's
+    # workers, already run off the hub
+    return func(*args, **kwargs)
+
+
+class WorkerPoolFullError(Exception):
+    """Exception raised when a pool can't accept any more waiting calls."""
+
+    pass
+
+
+class WorkerPool:
+    """Class that runs a bounded number of calls at a time and keeps
+    track of how many are running and waiting.
+    """
+
+    def __init__(self, name, app=None):
+        self.name = name
+        self._max_workers = 4
+        self._max_queue = 64
+        self._use_native_threads = False
+        self._execute = None
+        self._slots = threading.BoundedSemaphore(self._max_workers)
+        # Only held to update the counters, never across calls that can
+        # yield to other green threads, so a native lock can't block the
+        # event loop
+        self._lock = threading.Lock()
+        self._running = 0
+        self._waiting = 0
+        self._max_waiting = 0
+        self._completed = 0
+        self._rejected = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Configure the pool from the app's config. Must be called after
+        the socketio extension is initialized, so the server it runs on
+        is known.
+        """
+        prefix = self.name.upper()
+        self._max_workers = app.config.get(prefix + "_WORKERS", self._max_workers)
+        self._max_queue = app.config.get(prefix + "_MAX_QUEUE", self._max_queue)
+        socketio = app.extensions.get("socketio")
+        self._use_native_threads = getattr(socketio, "async_mode", None) == "eventlet"
+        if self._use_native_threads:
+            from eventlet import tpool
+            from eventlet.semaphore import BoundedSemaphore
+
+            self._execute = tpool.execute
+            self._slots = BoundedSemaphore(self._max_workers)
+        else:
+            self._execute = None
+            self._slots = threading.BoundedSemaphore(self._max_workers)
+
+    def run(self, func, *args, **kwargs):
+        """Run the function in the pool once a worker is free and return
+        its result. Raise a WorkerPoolFullError if too many calls are
+        already waiting.
+        """
+        with self._lock:
+            if self._waiting >= self._max_queue:
+                self._rejected += 1
+                raise WorkerPoolFullError(f"The {self.name} pool is full")
+            self._waiting += 1
+            self._max_waiting = max(self._max_waiting, self._waiting)
+        self._slots.acquire()
+        with self._lock:
+            self._waiting -= 1
+            self._running += 1
+        try:
+            if self._execute is not None:
+                return self._execute(func, *args, **kwargs)
+            return func(*args, **kwargs)
+        finally:
+            with self._lock:
+                self._running -= 1
+                self._completed += 1
+            self._slots.release()
+
+    def stats(self):
+        """Return the pool's queue depth and counters."""
+        with self._lock:
+            return {
+                "name": self.name,
+                "workers": self._max_workers,
+                "running": self._running,
+                "waiting": self._waiting,
+                "max_waiting": self._max_waiting,
+                "completed": self._completed,
+                "rejected": self._rejected,
+            }
+
+
+password_hashing_pool = WorkerPool("password_hashing")
+image_processing_pool = WorkerPool("image_processing")
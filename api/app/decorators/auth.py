@@ -3,14 +3,14 @@
 
 import functools
 import base64
-import json
 from json.decoder import JSONDecodeError
 from http import HTTPStatus
 from flask import request, current_app, g
 from flask_socketio import disconnect, emit, ConnectionRefusedError
-from app.repositories import database_repository
+from app.repositories import database_repository, revoked_tokens
 from app.repositories.exceptions import NotFoundException, DatabaseException
 from app.models import User, TokenType
+from app.concurrency import WorkerPoolFullError
 
 
 def permission_required(permission):
@@ -59,7 +59,7 @@ def socketio_permission_required(permission):
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
             if not g.current_user.has_permission(permission):
-                emit("error", json.dumps({"error": "You do not have the required permissions to perform this action"}))
+                emit("error", {"error": "You do not have the required permissions to perform this action"})
                 disconnect()
             else:
                 return func(*args, **kwargs)
@@ -69,12 +69,12 @@ def socketio_permission_required(permission):
     return decorator
 
 
-def is_blacklisted(decoded_token, token_type):
-    """Return True if the given token is blacklisted."""
-    token = database_repository.get_token(decoded_token.raw_jwt, token_type)
-    if not token:
-        return True
-    return token.is_blacklisted
+def is_blacklisted(decoded_token):
+    """Return True if the given token has been revoked. This is checked
+    against the worker's in-memory revocation list, so verifying a token
+    doesn't read from the database.
+    """
+    return revoked_tokens.is_revoked(decoded_token.jti)
 
 
 def jwt_required(token_type):
@@ -110,7 +110,7 @@ def jwt_required(token_type):
                     HTTPStatus.UNAUTHORIZED,
                 )
 
-            if is_blacklisted(decoded_token, token_type):
+            if is_blacklisted(decoded_token):
                 return (
                     {"error": f"Token is blacklisted"},
                     HTTPStatus.UNAUTHORIZED,
@@ -145,7 +145,7 @@ def socketio_jwt_required(token_type):
                     disconnect()
                 elif decoded_token.token_type != token_type:
                     disconnect()
-                elif is_blacklisted(decoded_token, token_type):
+                elif is_blacklisted(decoded_token):
                     disconnect()
                 else:
                     current_user = database_repository.get_user(decoded_token.user_id)
@@ -192,8 +192,18 @@ def basic_auth_required(func):
             return {"error": "User could not be found"}, HTTPStatus.NOT_FOUND
         if current_user.is_banned:
             return {"error": "User is banned"}, HTTPStatus.UNAUTHORIZED
-        if not current_user.verify_password(password):
-            return {"error": "Incorrect password provided"}, HTTPStatus.UNAUTHORIZED
+        try:
+            if not current_user.verify_password(password):
+                return {"error": "Incorrect password provided"}, HTTPStatus.UNAUTHORIZED
+            if current_user.password_needs_rehash():
+                current_user.password = password
+                database_repository.update_user_password_hash(current_user)
+        except WorkerPoolFullError:
+            return (
+                {"error": "The server is busy, please try again shortly"},
+                HTTPStatus.SERVICE_UNAVAILABLE,
+                {"Retry-After": "1"},
+            )
         g.current_user = current_user
         return func(*args, **kwargs)
 
@@ -4,7 +4,6 @@ server endpoints or socketio event handlers
 
 
 import functools
-import json
 from http import HTTPStatus
 from flask import request, make_response, current_app
 from flask_socketio import emit
@@ -69,6 +68,9 @@ def serialize_model_or_models(results, schema):
         elif key == "models":
             models = results[key]
             new_results[schema.COLLECTION_NAME] = schema.dump(models)
+        elif key == "serialized_models":
+            # Collections the repository already transcoded to this schema's output
+            new_results[schema.COLLECTION_NAME] = results[key]
         else:
             new_results[key] = results[key]
     return new_results
@@ -172,16 +174,24 @@ def handle_file_request(expected_filename):
 
 
 def socketio_handle_arguments(schema):
-    """Decorator to validate arguments sent to Socketio event handlers."""
+    """Decorator to validate arguments sent to Socketio event handlers.
+    Arguments are objects, or JSON strings from clients that encode them
+    before they're sent.
+    """
 
     def decorator(func):
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
-            data = request.event["args"][0]
+            data = request.event["args"][0] if request.event["args"] else None
             try:
-                deserialized_data = schema.loads(data)
+                if isinstance(data, (str, bytes)):
+                    deserialized_data = schema.loads(data)
+                else:
+                    deserialized_data = schema.load(data)
             except ValidationError as err:
-                emit("error", json.dumps({"error": err.messages}))
+                emit("error", {"error": err.messages})
+            except ValueError:
+                emit("error", {"error": "Arguments must be a JSON object"})
             else:
                 return func(deserialized_data, schema)
 
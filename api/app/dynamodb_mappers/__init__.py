@@ -18,10 +18,18 @@ from app.dynamodb_mappers.chat_mapper import (
     GroupChatMapper,
     PrivateChatMapper
 )
-from app.dynamodb_mappers.common_mappers import LocationMapper, ImageMapper
+from app.dynamodb_mappers.common_mappers import (
+    LocationMapper,
+    ImageMapper,
+    ImageVariantMapper,
+    ImageBlobMapper,
+)
 from app.dynamodb_mappers.message_mapper import (
     PrivateChatMessageMapper,
     GroupChatMessageMapper,
+    PrivateChatMessageBucketMapper,
+    GroupChatMessageBucketMapper,
+    ReactionMapper,
 )
 from app.dynamodb_mappers.notification_mapper import NotificationMapper
-from app.dynamodb_mappers.token_mapper import TokenMapper
+from app.dynamodb_mappers.token_mapper import TokenMapper, RevokedTokenMapper
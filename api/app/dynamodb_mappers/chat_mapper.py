@@ -61,9 +61,10 @@ class GroupChatMapper(ModelMapper):
 
     class Meta:
         model = GroupChat
-        fields = ("_id", "_community_id", "name", "description")
+        fields = ("_id", "_community_id", "name", "description", "_member_count")
         partition_key_attribute = "_community_id"
         partition_key_prefix = PrimaryKeyPrefix.COMMUNITY
         sort_key_attribute = "_id"
         sort_key_prefix = PrimaryKeyPrefix.GROUP_CHAT
         type_ = ItemType.GROUP_CHAT.name
+        counter_fields = ("_member_count",)
@@ -5,7 +5,8 @@ items.
 
 
 from app.dynamodb_mappers.mapper_core import ModelMapper
-from app.models import Location, Image, ImageType
+from app.dynamodb_mappers.constants import ItemType, PrimaryKeyPrefix
+from app.models import Location, Image, ImageType, ImageVariant, ImageBlob
 
 
 class LocationMapper(ModelMapper):
@@ -15,7 +16,17 @@ class LocationMapper(ModelMapper):
 
     class Meta:
         model = Location
-        fields = ("city", "state", "country")
+        fields = ("city", "state", "country", "latitude", "longitude")
+
+
+class ImageVariantMapper(ModelMapper):
+    """Class to serialize and deserialize image variant models to and
+    from DynamoDB items.
+    """
+
+    class Meta:
+        model = ImageVariant
+        fields = ("id", "url", "height", "width", "format")
 
 
 class ImageMapper(ModelMapper):
@@ -25,7 +36,25 @@ class ImageMapper(ModelMapper):
 
     class Meta:
         model = Image
-        fields = ("id", "image_type", "url", "height", "width", "uploaded_at")
+        fields = ("id", "image_type", "url", "height", "width", "uploaded_at", "variants")
 
     ENUMS = {"image_type": ImageType}
+    NESTED_MAPPERS = {"variants": ImageVariantMapper(ignore_partition_key=True)}
 
+
+class ImageBlobMapper(ModelMapper):
+    """Class to serialize and deserialize image blob models to and from
+    DynamoDB items.
+    """
+
+    class Meta:
+        model = ImageBlob
+        fields = ("id", "variants", "original_id", "ref_count", "created_at")
+        partition_key_attribute = "id"
+        sort_key_attribute = "id"
+        partition_key_prefix = PrimaryKeyPrefix.IMAGE_BLOB
+        sort_key_prefix = PrimaryKeyPrefix.IMAGE_BLOB
+        type_ = ItemType.IMAGE_BLOB.name
+        counter_fields = ("ref_count",)
+
+    NESTED_MAPPERS = {"variants": ImageVariantMapper(ignore_partition_key=True)}
@@ -27,10 +27,12 @@ class CommunityMapper(ModelMapper):
             "location",
             "_founder_id",
             "_created_at",
+            "_member_count",
         )
         partition_key_attribute = "_id"
         sort_key_attribute = "_id"
         type_ = ItemType.COMMUNITY.name
+        counter_fields = ("_member_count",)
 
     ENUMS = {"topic": CommunityTopic}
     NESTED_MAPPERS = {
@@ -23,6 +23,11 @@ class ItemType(Enum):
     COMMUNITY_GROUP_CHAT = 14
     JWT_ACCESS_TOKEN = 15
     JWT_REFRESH_TOKEN = 16
+    MESSAGE_BUCKET = 17
+    MESSAGE_POSTINGS = 18
+    REVOKED_TOKEN = 19
+    IMAGE_BLOB = 20
+    MESSAGE_REACTION = 21
 
 
 class PrimaryKeyPrefix:
@@ -45,3 +50,28 @@ class PrimaryKeyPrefix:
     GROUP_CHAT_MESSAGE = "GROUP_CHAT_MESSAGE#"
     JWT_ACCESS_TOKEN = "JWT_ACCESS_TOKEN#"
     JWT_REFRESH_TOKEN = "JWT_REFRESH_TOKEN#"
+    MESSAGE_BUCKET = "MESSAGE_BUCKET#"
+    SEARCH_TERM = "SEARCHTERM#"
+    GEOHASH = "GEOHASH#"
+    REVOKED_TOKENS = "REVOKEDTOKENS#"
+    IMAGE_BLOB = "IMAGEBLOB#"
+    MESSAGE_REACTION = "MESSAGEREACTION#"
+
+
+class MessageBucketGranularity:
+    """Class that holds constants of the time spans covered by a
+    single chat message partition.
+    """
+
+    DAY = "day"
+    WEEK = "week"
+
+
+class DirectoryPartition:
+    """Class that holds constants of the partitions of the sparse
+    directory index, which each list every item of a single type.
+    """
+
+    USERS = "USERDIRECTORY"
+    COMMUNITIES = "COMMUNITYDIRECTORY"
+    ORPHANED_IMAGE_BLOBS = "ORPHANEDIMAGEBLOBDIRECTORY"
@@ -17,6 +17,7 @@ from app.dynamodb_mappers.mapper_core.utils import (
     DateTimeParser,
     DynamoDBType,
     is_empty_collection,
+    are_equal_values,
 )
 from app.dynamodb_mappers.mapper_core.serializer_manager import serializer_manager
 
@@ -70,6 +71,9 @@ class MapperOptions:
                 "`attributes_to_monkey_patch` option must be a list or a tuple"
             )
 
+        self.counter_fields = getattr(meta, "counter_fields", ())
+        if not isinstance(self.counter_fields, (list, tuple)):
+            raise ValueError("`counter_fields` option must be a list or a tuple")
 
         partition_key_prefix = getattr(
             meta, "partition_key_prefix", self.model.__name__.upper() + "#"
@@ -135,7 +139,9 @@ class ModelMapper(ABC):
             - ``type_``: String that indicates the type of the item
             - ``attributes_to_monkey_patch``: A tuple of attributes that should be set on the model
             but aren't passed in to the constructor during instantiation. Used on deserialization
-
+            - ``counter_fields``: A tuple of fields that are maintained by atomic counters in 
+            DynamoDB. They are serialized when an item is created but are left out when an 
+            existing item is overwritten
             
 
 
@@ -153,6 +159,7 @@ class ModelMapper(ABC):
             datetime_format = "%Y-%m-%dT%H:%M:%S.%f"
             enum_attribute = "name"
             type_ = None
+            counter_fields = ()
         """
 
     def __init__(self, ignore_partition_key=False):
@@ -160,6 +167,16 @@ class ModelMapper(ABC):
         self.ignore_partition_key = ignore_partition_key
         self._serializer_manager = serializer_manager
 
+    @property
+    def fields(self):
+        """Return the fields that are serialized from the model."""
+        return self._options.fields
+
+    @property
+    def counter_fields(self):
+        """Return the fields that are maintained by atomic counters."""
+        return self._options.counter_fields
+
     def key(self, partition_key_value, sort_key_value=None, **kwargs):
         """Return a dictionary containing the formatted primary key for
         the item.
@@ -202,6 +219,29 @@ class ModelMapper(ABC):
         )
         return model_instance
 
+    def diff(self, old_item, new_item):
+        """Compare two serializations of the same model and return the
+        attributes of the new item that changed and the names of the
+        attributes the new item no longer has. The primary key, item type
+        and counter fields are left out since updates never write them.
+        """
+        attributes_to_skip = {
+            self._options.partition_key.column_name,
+            self._options.sort_key.column_name,
+            "type",
+            *self._options.counter_fields,
+        }
+        changed_attributes = {
+            attribute: value for attribute, value in new_item.items()
+            if attribute not in attributes_to_skip
+            and not are_equal_values(old_item.get(attribute), value)
+        }
+        attributes_to_remove = [
+            attribute for attribute in old_item
+            if attribute not in attributes_to_skip and attribute not in new_item
+        ]
+        return changed_attributes, attributes_to_remove
+
     @staticmethod
     def merge_items(*items):
         """Merge an arbitary number of DynamoDB items into a single itme."""
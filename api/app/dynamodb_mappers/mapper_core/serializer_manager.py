@@ -4,6 +4,7 @@ actual serialization and deserialization of models and items.
 
 
 from datetime import datetime, date, time
+from decimal import Decimal
 from app.dynamodb_mappers.mapper_core.exceptions import UnserialializableTypeException
 from boto3.dynamodb.types import TypeSerializer, TypeDeserializer
 from app.dynamodb_mappers.mapper_core.utils import (
@@ -53,6 +54,9 @@ class SerializerManager:
         elif TypeValidator.is_enum(value):
             enum_value = getattr(value, kwargs["enum_attribute"])
             serialized_value = self._serializer.serialize(enum_value)
+        elif TypeValidator.is_float(value):
+            # boto3 only serializes numbers given as decimals
+            serialized_value = self._serializer.serialize(Decimal(repr(value)))
         elif TypeValidator.is_datetime(value):
             formatted_datetime = datetime.strftime(value, kwargs["datetime_format"])
             serialized_value = self._serializer.serialize(formatted_datetime)
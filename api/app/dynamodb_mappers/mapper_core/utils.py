@@ -100,6 +100,11 @@ class TypeValidator:
             )
         return False
     
+    @staticmethod
+    def is_float(value):
+        """Return True if the value is a float, otherwise return False."""
+        return isinstance(value, float)
+
     @staticmethod
     def is_decimal(value):
         """Return True if the given value is of type decimal.Decimal, else
@@ -159,6 +164,36 @@ def is_empty_collection(value):
     )
     
 
+def are_equal_values(value, other_value):
+    """Return True if two serialized DynamoDB values are equal. The
+    elements of sets are compared regardless of the order they were
+    serialized in.
+    """
+    if not (TypeValidator.is_dict(value) and TypeValidator.is_dict(other_value)):
+        return value == other_value
+    if value.keys() != other_value.keys():
+        return False
+    for data_type in value:
+        if data_type in SET_TYPES:
+            if set(value[data_type]) != set(other_value[data_type]):
+                return False
+        elif data_type == DynamoDBType.MAP:
+            if value[data_type].keys() != other_value[data_type].keys() or not all(
+                are_equal_values(value[data_type][key], other_value[data_type][key])
+                for key in value[data_type]
+            ):
+                return False
+        elif data_type == DynamoDBType.LIST:
+            if len(value[data_type]) != len(other_value[data_type]) or not all(
+                are_equal_values(element, other_element)
+                for element, other_element in zip(value[data_type], other_value[data_type])
+            ):
+                return False
+        elif value[data_type] != other_value[data_type]:
+            return False
+    return True
+
+
 def convert_decimal_to_float_or_int(value):
     """Convert a object of type decimal.Decimal to a float or
     and int based on its value.
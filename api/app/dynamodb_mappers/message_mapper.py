@@ -4,19 +4,43 @@ items.
 """
 
 
+import os
+from datetime import date
 from app.dynamodb_mappers.mapper_core import ModelMapper
-from app.dynamodb_mappers.constants import ItemType, PrimaryKeyPrefix
-from app.models import Message, Reaction, ReactionType, MessageType
+from app.dynamodb_mappers.constants import (
+    ItemType,
+    PrimaryKeyPrefix,
+    MessageBucketGranularity,
+)
+from app.models import Message, Reaction, ReactionType, MessageType, MessageBucket
+
+
+def message_bucket(message_id, granularity=MessageBucketGranularity.DAY):
+    """Return the time bucket a message belongs to. Message ids begin
+    with the ISO formatted date the message was created on, so the bucket
+    can be derived from the id alone.
+    """
+    created_on = date.fromisoformat(message_id[:10])
+    if granularity == MessageBucketGranularity.WEEK:
+        year, week, _ = created_on.isocalendar()
+        return "%d-W%02d" % (year, week)
+    return created_on.isoformat()
 
 
 class ReactionMapper(ModelMapper):
     """Class to serialize and deserialize Reaction models
-    to and from DynamoDB items.
+    to and from DynamoDB items. Each user's reaction to a message is its
+    own item in a partition that holds the message's reactions.
     """
 
     class Meta:
         model = Reaction
-        fields = ("user_id", "reaction_type", "created_at")
+        fields = ("message_id", "user_id", "reaction_type", "created_at")
+        partition_key_attribute = "message_id"
+        partition_key_prefix = PrimaryKeyPrefix.MESSAGE_REACTION
+        sort_key_attribute = "user_id"
+        sort_key_prefix = PrimaryKeyPrefix.USER
+        type_ = ItemType.MESSAGE_REACTION.name
 
     ENUMS = {"reaction_type": ReactionType}
 
@@ -35,15 +59,69 @@ class MessageMapper(ModelMapper):
             "_content",
             "message_type",
             "_created_at",
-            "_reactions",
             "_editted",
         )
         partition_key_attribute = "_chat_id"
         sort_key_attribute = "_id"
-        attributes_to_monkey_patch = ("_reactions",)
 
     ENUMS = {"message_type": MessageType}
-    NESTED_MAPPERS = {"_reactions": ReactionMapper(ignore_partition_key=True)}
+    # A message's reactions are counted in an attribute per reaction type,
+    # which is only ever changed atomically
+    REACTION_COUNT_PREFIX = "reaction_count_"
+    BUCKET_GRANULARITY = os.environ.get(
+        "MESSAGE_BUCKET_GRANULARITY", MessageBucketGranularity.DAY
+    )
+
+    def key(self, partition_key_value, sort_key_value=None, **kwargs):
+        """Return a dictionary containing the formatted primary key for
+        the message. Messages are partitioned by chat and time bucket, so
+        the partition key is only bucketed when the message id is known.
+        """
+        if sort_key_value:
+            partition_key_value = self.bucket_partition_value(
+                partition_key_value, self.bucket(sort_key_value)
+            )
+        return super().key(partition_key_value, sort_key_value, **kwargs)
+
+    def deserialize_to_model(self, item):
+        """Deserialize the given item to a message along with the number
+        of reactions of each type it has.
+        """
+        message = super().deserialize_to_model(item)
+        for reaction_type, count in self.reaction_counts(item).items():
+            message.set_reaction_count(reaction_type, count)
+        return message
+
+    def reaction_counts(self, item):
+        """Return the number of reactions of each type the message the
+        given item holds has, leaving out types it has none of.
+        """
+        reaction_counts = {}
+        for reaction_type in ReactionType:
+            count = item.get(self.reaction_count_attribute(reaction_type))
+            if count is not None and int(count["N"]) > 0:
+                reaction_counts[reaction_type] = int(count["N"])
+        return reaction_counts
+
+    @classmethod
+    def reaction_count_attribute(cls, reaction_type):
+        """Return the name of the attribute that counts the reactions of
+        the given type.
+        """
+        return cls.REACTION_COUNT_PREFIX + reaction_type.name
+
+    def bucket(self, message_id):
+        """Return the time bucket of the given message."""
+        return message_bucket(message_id, self.BUCKET_GRANULARITY)
+
+    def bucket_key(self, chat_id, bucket):
+        """Return the partition key of the given chat's time bucket."""
+        return super().key(self.bucket_partition_value(chat_id, bucket))
+
+    @staticmethod
+    def bucket_partition_value(chat_id, bucket):
+        """Return the partition key value of a chat's time bucket."""
+        return chat_id + "#" + bucket
 
 
 class PrivateChatMessageMapper(MessageMapper):
@@ -66,3 +144,36 @@ class GroupChatMessageMapper(MessageMapper):
         partition_key_prefix = PrimaryKeyPrefix.GROUP_CHAT
         sort_key_prefix = PrimaryKeyPrefix.GROUP_CHAT_MESSAGE
         type_ = ItemType.GROUP_CHAT_MESSAGE.name
+
+
+class MessageBucketMapper(ModelMapper):
+    """Class to serialize and deserialize MessageBucket models
+    to and from DynamoDB items. Each chat has a directory of these
+    items that lists the time buckets holding its messages.
+    """
+
+    class Meta:
+        model = MessageBucket
+        fields = ("chat_id", "bucket", "created_at")
+        partition_key_attribute = "chat_id"
+        sort_key_attribute = "bucket"
+        sort_key_prefix = PrimaryKeyPrefix.MESSAGE_BUCKET
+        type_ = ItemType.MESSAGE_BUCKET.name
+
+
+class PrivateChatMessageBucketMapper(MessageBucketMapper):
+    """Class to serialize and deserialize MessageBucket models 
+    to and from DynamoDB items for private chats.
+    """
+
+    class Meta(MessageBucketMapper.Meta):
+        partition_key_prefix = PrimaryKeyPrefix.PRIVATE_CHAT
+
+
+class GroupChatMessageBucketMapper(MessageBucketMapper):
+    """Class to serialize and deserialize MessageBucket models 
+    to and from DynamoDB items for group chats.
+    """
+
+    class Meta(MessageBucketMapper.Meta):
+        partition_key_prefix = PrimaryKeyPrefix.GROUP_CHAT
@@ -6,7 +6,7 @@ items.
 
 from app.dynamodb_mappers.mapper_core import ModelMapper
 from app.dynamodb_mappers.constants import ItemType, PrimaryKeyPrefix
-from app.models import Token, TokenType
+from app.models import Token, TokenType, RevokedToken
 
 
 class TokenMapper(ModelMapper):
@@ -23,6 +23,7 @@ class TokenMapper(ModelMapper):
             "issued_at",
             "token_type",
             "is_blacklisted",
+            "jti",
         )
         partition_key_attribute = "user_id"
         partition_key_prefix = PrimaryKeyPrefix.USER
@@ -32,3 +33,16 @@ class TokenMapper(ModelMapper):
 
     ENUMS = {"token_type": TokenType}
 
+
+
+class RevokedTokenMapper(ModelMapper):
+    """Class to serialize and deserialize revoked token models to and
+    from DynamoDB items.
+    """
+
+    class Meta:
+        model = RevokedToken
+        fields = ("jti", "user_id", "expires_on_date", "revoked_at")
+        partition_key_prefix = PrimaryKeyPrefix.REVOKED_TOKENS
+        sort_key_prefix = ""
+        type_ = ItemType.REVOKED_TOKEN.name
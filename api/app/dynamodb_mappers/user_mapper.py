@@ -45,12 +45,14 @@ class UserMapper(ModelMapper):
             "is_online",
             "is_banned",
             "socketio_session_id",
+            "_unread_notification_count",
             "_rooms",
         )
         type_ = ItemType.USER.name
         partition_key_attribute = "_id"
         sort_key_attribute = "_id"
         attributes_to_monkey_patch = ("_password_hash", "_rooms")
+        counter_fields = ("_unread_notification_count",)
 
     NESTED_MAPPERS = {
         "location": LocationMapper(ignore_partition_key=True),
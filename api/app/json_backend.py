@@ -0,0 +1,191 @@
+"""This module contains the JSON backend used for Flask responses and
+request bodies, marshmallow's dumps and loads and Socket.IO payloads.
+
+The backend, set by the JSON_BACKEND config value, is either ``orjson``,
+used when the package is installed, or ``json`` from the standard
+library. Both encode datetimes, dates and times in ISO 8601, UUIDs as
+strings and enums as their values. The module itself has the ``dumps``
+and ``loads`` functions marshmallow and python-socketio expect of a JSON
+module, so it can be given to them in place of one.
+"""
+
+
+import datetime
+import decimal
+import enum
+import json
+import logging
+import uuid
+from flask.json import JSONEncoder as FlaskJSONEncoder, JSONDecoder as FlaskJSONDecoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+logger = logging.getLogger(__name__)
+
+
+class JSONBackend:
+    """Class that holds constants of the packages JSON can be encoded
+    and decoded with.
+    """
+
+    ORJSON = "orjson"
+    STDLIB = "json"
+
+
+_json_backend = JSONBackend.ORJSON if orjson is not None else JSONBackend.STDLIB
+
+# Keyword arguments of json.dumps orjson can only honour the default
+# values of, so other values are left to the standard library
+_STDLIB_ARGUMENT_DEFAULTS = {"cls": None, "skipkeys": False, "check_circular": True}
+# The indents orjson can write, none or 2 spaces
+_ORJSON_INDENTS = (None, 2)
+
+
+def init_json_backend(app):
+    """Set the JSON backend from the app's config and make the app encode
+    responses and decode request bodies with it. Falls back to the
+    standard library if orjson is configured but isn't installed.
+    """
+    backend = app.config.get("JSON_BACKEND", JSONBackend.ORJSON)
+    if backend == JSONBackend.ORJSON and orjson is None:
+        logger.warning("orjson isn't installed, falling back to the json module")
+        backend = JSONBackend.STDLIB
+    set_json_backend(backend)
+    app.json_encoder = JSONEncoder
+    app.json_decoder = JSONDecoder
+
+
+def set_json_backend(backend):
+    """Set the package JSON is encoded and decoded with."""
+    global _json_backend
+    if backend not in (JSONBackend.ORJSON, JSONBackend.STDLIB):
+        raise ValueError(f"Unknown JSON backend: {backend}")
+    if backend == JSONBackend.ORJSON and orjson is None:
+        raise ValueError("The orjson backend needs the orjson package")
+    _json_backend = backend
+
+
+def get_json_backend():
+    """Return the package JSON is encoded and decoded with."""
+    return _json_backend
+
+
+def to_serializable(obj):
+    """Return a JSON serializable version of objects the json module
+    can't encode itself.
+    """
+    if isinstance(obj, (datetime.date, datetime.time)):
+        return obj.isoformat()
+    if isinstance(obj, uuid.UUID):
+        return str(obj)
+    if isinstance(obj, enum.Enum):
+        return obj.value
+    if isinstance(obj, decimal.Decimal):
+        return str(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if hasattr(obj, "__html__"):
+        return str(obj.__html__())
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _orjson_default(default):
+    """Return a default function for orjson that falls back to the
+    given one for objects the module's can't encode.
+    """
+    if default is None:
+        return to_serializable
+
+    def chained_default(obj):
+        try:
+            return to_serializable(obj)
+        except TypeError:
+            return default(obj)
+
+    return chained_default
+
+
+def _orjson_supports(indent, kwargs):
+    """Return True if orjson can encode with the keyword arguments of
+    json.dumps.
+    """
+    if indent not in _ORJSON_INDENTS:
+        return False
+    separators = kwargs.get("separators")
+    # Pretty printed output keeps orjson's separators, since only the
+    # whitespace differs
+    if separators is not None and indent is None and tuple(separators) != (",", ":"):
+        return False
+    return all(
+        kwargs.get(argument, default) == default
+        for argument, default in _STDLIB_ARGUMENT_DEFAULTS.items()
+    )
+
+
+def dumps(obj, **kwargs):
+    """Serialize obj to a JSON formatted string. Takes the keyword
+    arguments of json.dumps, and uses the standard library for the ones
+    orjson doesn't support, such as an indent other than 2.
+    """
+    indent = kwargs.get("indent")
+    if _json_backend == JSONBackend.ORJSON and _orjson_supports(indent, kwargs):
+        option = orjson.OPT_NON_STR_KEYS
+        if kwargs.get("sort_keys"):
+            option |= orjson.OPT_SORT_KEYS
+        if indent == 2:
+            option |= orjson.OPT_INDENT_2
+        try:
+            return orjson.dumps(
+                obj, default=_orjson_default(kwargs.get("default")), option=option
+            ).decode()
+        except TypeError:
+            # orjson is stricter about some types, such as integers
+            # larger than 64 bits and dict subclasses with non string keys
+            pass
+    kwargs.setdefault("default", to_serializable)
+    kwargs.pop("cls", None)
+    return json.dumps(obj, **kwargs)
+
+
+def loads(s, **kwargs):
+    """Deserialize s, a str, bytes or bytearray instance containing a
+    JSON document, to a Python object.
+    """
+    if _json_backend == JSONBackend.ORJSON and not kwargs:
+        return orjson.loads(s)
+    return json.loads(s, **kwargs)
+
+
+class JSONEncoder(FlaskJSONEncoder):
+    """Flask JSON encoder that encodes with the JSON backend. Non ASCII
+    characters are encoded as UTF-8 rather than escaped by orjson, and
+    datetimes are encoded in ISO 8601 rather than as HTTP dates.
+    """
+
+    def encode(self, o):
+        return dumps(
+            o,
+            sort_keys=self.sort_keys,
+            indent=self.indent,
+            separators=(self.item_separator, self.key_separator),
+            default=self.default,
+        )
+
+    def default(self, o):
+        try:
+            return to_serializable(o)
+        except TypeError:
+            return super().default(o)
+
+
+class JSONDecoder(FlaskJSONDecoder):
+    """Flask JSON decoder that decodes with the JSON backend."""
+
+    def decode(self, s):
+        if self.object_hook or self.object_pairs_hook or not self.strict:
+            return super().decode(s)
+        return loads(s)
@@ -9,10 +9,10 @@ from app.models.community import (
     CommunityPermission,
     CommunityName
 )
-from app.models.image import Image, ImageType
-from app.models.message import Message, Reaction, ReactionType, MessageType
+from app.models.image import Image, ImageType, ImageVariant, ImageBlob
+from app.models.message import Message, Reaction, ReactionType, MessageType, MessageBucket
 from app.models.notification import Notification, NotificationType
 from app.models.role import Role, RolePermission, RoleName
 from app.models.user import User, UserEmail, Username
 from app.models.location import Location
-from app.models.token import TokenType, Token
\ No newline at end of file
+from app.models.token import TokenType, Token, RevokedToken
\ No newline at end of file
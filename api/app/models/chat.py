@@ -59,11 +59,12 @@ class GroupChat:
     in a specific community
     """
 
-    def __init__(self, id, community_id, name, description):
+    def __init__(self, id, community_id, name, description, member_count=1):
         self._id = id
         self.name = name
         self.description = description
         self._community_id = community_id
+        self._member_count = member_count
 
     @property
     def id(self):
@@ -75,6 +76,13 @@ class GroupChat:
         """Return the id of the community the group chat belongs to."""
         return self._community_id
 
+    @property
+    def member_count(self):
+        """Return the number of members in the group chat, including
+        its creator.
+        """
+        return self._member_count
+
     def __repr__(self):
         """Return a representation of a group chat."""
         return "GroupChat(id=%r, community_id=%r, name=%r, description=%r)" % (
@@ -20,6 +20,7 @@ class Community:
         location,
         founder_id,
         created_at=datetime.now(),
+        member_count=1,
     ):
         self._id = id
         self.name = name
@@ -30,12 +31,20 @@ class Community:
         self.location = location
         self._founder_id = founder_id
         self._created_at = created_at
+        self._member_count = member_count
 
     @property
     def id(self):
         """Return the community's id."""
         return self._id
 
+    @property
+    def member_count(self):
+        """Return the number of members in the community, including
+        its founder.
+        """
+        return self._member_count
+
     @property
     def founded_on(self):
         """Return the datetime when the community was created."""
@@ -3,10 +3,21 @@
 
 from uuid import uuid4
 from enum import Enum
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime
 
 
+@dataclass(frozen=True)
+class ImageVariant:
+    """Class to represent one size and format of an image."""
+
+    id: str
+    url: str
+    height: int
+    width: int
+    format: str
+
+
 @dataclass(frozen=True)
 class Image:
     """Class to represent an image."""
@@ -17,6 +28,20 @@ class Image:
     height: int
     width: int
     uploaded_at: datetime = datetime.now()
+    variants: list = field(default_factory=list)
+
+
+@dataclass
+class ImageBlob:
+    """Class to represent the stored variants of an upload, shared by
+    every image made from identical uploads and counted by reference.
+    """
+
+    id: str
+    variants: list = field(default_factory=list)
+    original_id: str = None
+    ref_count: int = 0
+    created_at: datetime = field(default_factory=datetime.now)
 
 
 class ImageType(Enum):
@@ -11,4 +11,6 @@ class Location:
     city: str
     state: str
     country: str
+    latitude: float = None
+    longitude: float = None
 
@@ -26,7 +26,7 @@ class Message:
         self._content = content
         self.message_type = message_type
         self._created_at = created_at
-        self._reactions = {}
+        self._reaction_counts = {}
         self._sent = sent
         self._editted = editted
 
@@ -58,23 +58,22 @@ class Message:
         return self._created_at
 
     @property
-    def reactions(self):
-        """Return a list of reactions attached to the message."""
-        return list(self._reactions.values())
+    def reaction_counts(self):
+        """Return the number of reactions of each type the message has."""
+        return dict(self._reaction_counts)
 
-    def add_reaction(self, reaction):
-        """Add a reaction to the message."""
-        self._reactions[reaction.user_id] = reaction
-
-    def remove_reaction(self, user_id):
-        """Remove and return a user's reaction from the chat message."""
-        return self._reactions.pop(user_id, None)
+    def set_reaction_count(self, reaction_type, count):
+        """Set the number of reactions of a type the message has."""
+        if count > 0:
+            self._reaction_counts[reaction_type] = count
+        else:
+            self._reaction_counts.pop(reaction_type, None)
 
     def has_reactions(self):
         """Return True if the message has any reactions, otherwise
         return False.
         """
-        return len(self._reactions) > 0
+        return len(self._reaction_counts) > 0
 
     def was_read(self):
         """Return True if the message has been read,
@@ -131,6 +130,18 @@ class ReactionType(Enum):
 class Reaction:
     """Class to represent a reaction a user has had to a message."""
 
+    message_id: str
     user_id: str
     reaction_type: ReactionType
     created_at: datetime = datetime.now()
+
+
+@dataclass(frozen=True)
+class MessageBucket:
+    """Class to represent a time bucket that partitions the messages
+    of a chat.
+    """
+
+    chat_id: str
+    bucket: str
+    created_at: datetime = datetime.now()
@@ -23,4 +23,15 @@ class Token:
     issued_at: int # In Unix epoch time format
     token_type: Enum
     is_blacklisted: bool = False
+    jti: str = None # Unique id of the token, used to revoke it
+
+
+@dataclass
+class RevokedToken:
+    """Class to represent the revocation of a JWT before it expires."""
+
+    jti: str
+    user_id: str
+    expires_on_date: int # In Unix epoch time format
+    revoked_at: datetime
     
\ No newline at end of file
@@ -25,6 +25,8 @@ def update_user_model(old_user, updated_user_data):
             updated_user.location.state = updated_user_data["location"]["state"]
             updated_user.location.city = updated_user_data["location"]["city"]
             updated_user.location.country = updated_user_data["location"]["country"]
+            updated_user.location.latitude = updated_user_data["location"].get("latitude")
+            updated_user.location.longitude = updated_user_data["location"].get("longitude")
         elif attribute == "role":
             update_user_role(updated_user, updated_user_data["role"])
         elif attribute == "rooms":
@@ -44,6 +46,8 @@ def update_community_model(old_community, updated_community_data):
             updated_community.location.state = updated_community_data["location"]["state"]
             updated_community.location.city = updated_community_data["location"]["city"]
             updated_community.location.country = updated_community_data["location"]["country"]
+            updated_community.location.latitude = updated_community_data["location"].get("latitude")
+            updated_community.location.longitude = updated_community_data["location"].get("longitude")
         else:
             setattr(updated_community, attribute, updated_community_data[attribute])
     return updated_community
@@ -2,11 +2,14 @@
 
 
 import jwt
+from flask import current_app
 from app.models.token import Token, TokenType
 from app.models.role import PermissionsError, RoleName
 from app import bcrypt
+from app.concurrency import password_hashing_pool
 from dataclasses import dataclass
 from datetime import datetime, timedelta
+from uuid import uuid4
 
 
 class User:
@@ -27,7 +30,8 @@ class User:
         cover_photo=None,
         is_online=True,
         is_banned=False,
-        socketio_session_id=""
+        socketio_session_id="",
+        unread_notification_count=0
     ):
         self._id = id
         self.username = username
@@ -44,6 +48,7 @@ class User:
         self.is_online = is_online
         self.is_banned = is_banned
         self.socketio_session_id = socketio_session_id
+        self._unread_notification_count = unread_notification_count
         self._rooms = set()
 
     @property
@@ -56,6 +61,13 @@ class User:
         """Return the timestamp of when the user was created."""
         return self._created_at
 
+    @property
+    def unread_notification_count(self):
+        """Return the number of the user's notifications that haven't
+        been read.
+        """
+        return self._unread_notification_count
+
     @property
     def password(self):
         """Raise an AttributeError is an attempt is made to read the
@@ -65,14 +77,26 @@ class User:
 
     @password.setter
     def password(self, password):
-        """Hash and set the user's password."""
-        self._password_hash = bcrypt.generate_password_hash(password).decode("utf-8")
+        """Hash and set the user's password. Hashing runs in the password
+        hashing pool so it doesn't block other requests.
+        """
+        password_hash = password_hashing_pool.run(bcrypt.generate_password_hash, password)
+        self._password_hash = password_hash.decode("utf-8")
 
     def verify_password(self, password):
         """Return True if the given password matches the user's password,
         otherwise return False.
         """
-        return bcrypt.check_password_hash(self._password_hash, password)
+        return password_hashing_pool.run(
+            bcrypt.check_password_hash, self._password_hash, password
+        )
+
+    def password_needs_rehash(self):
+        """Return True if the user's password was hashed with a work
+        factor other than the configured one.
+        """
+        log_rounds = int(self._password_hash.split("$")[2])
+        return log_rounds != current_app.config["BCRYPT_LOG_ROUNDS"]
 
     def ping(self):
         """Mark the user as recently seen and online."""
@@ -140,6 +164,7 @@ class User:
         expiration_date = now + timedelta(seconds=expires_in)
         claims.update({"exp": int(expiration_date.timestamp())})
         claims.update({"iat": int(now.timestamp())})
+        claims.update({"jti": uuid4().hex})
         encoded_token = jwt.encode(claims, secret, algorithm="HS256")
         return Token(
             claims["user_id"],
@@ -147,6 +172,7 @@ class User:
             claims["exp"],
             claims["iat"],
             TokenType[claims["token_type"]],
+            jti=claims["jti"],
         )
 
     @classmethod
@@ -157,12 +183,16 @@ class User:
             decoded_token = jwt.decode(encoded_token, secret, algorithms="HS256")
         except jwt.InvalidTokenError:
             return None
+        # Tokens issued without an id can't be revoked, so they aren't accepted
+        if "jti" not in decoded_token:
+            return None
         return Token(
             decoded_token["user_id"],
             encoded_token,
             decoded_token["exp"],
             decoded_token["iat"],
             TokenType[decoded_token["token_type"]],
+            jti=decoded_token["jti"],
         )
 
     def __repr__(self):
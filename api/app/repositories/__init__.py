@@ -4,4 +4,5 @@ and act as an abstraction over persitent storage.
 
 
 from app.repositories.dynamodb_repository import database_repository
-from app.repositories.s3_repository import file_repository
\ No newline at end of file
+from app.repositories.s3_repository import file_repository
+from app.repositories.revocation import revoked_tokens
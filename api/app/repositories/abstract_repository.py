@@ -29,12 +29,16 @@ class AbstractDatabaseRepository(ABC):
     def get_user_token(self, user_id):
         pass
 
+    @abstractmethod
+    def update_user_password_hash(self, user):
+        pass
+
     @abstractmethod
     def get_user_tokens(self, user_id):
         pass
 
     @abstractmethod
-    def get_token(self, user_id, token_type):
+    def get_revoked_tokens(self, since):
         pass
 
     @abstractmethod
@@ -57,6 +61,30 @@ class AbstractDatabaseRepository(ABC):
     def remove_user(self, user_id):
         pass
 
+    @abstractmethod
+    def get_image_blob(self, blob_id):
+        pass
+
+    @abstractmethod
+    def add_image_blob(self, blob):
+        pass
+
+    @abstractmethod
+    def retain_image_blob(self, blob_id):
+        pass
+
+    @abstractmethod
+    def release_image_blob(self, blob_id):
+        pass
+
+    @abstractmethod
+    def get_orphaned_image_blobs(self, orphaned_before):
+        pass
+
+    @abstractmethod
+    def remove_image_blob(self, blob_id):
+        pass
+
     @abstractmethod
     def get_users(self, *args, **kwargs):
         pass
@@ -101,6 +129,10 @@ class AbstractDatabaseRepository(ABC):
     def get_communities_by_location(self, *args, **kwargs):
         pass
 
+    @abstractmethod
+    def get_nearby_communities(self, latitude, longitude, radius_km, limit):
+        pass
+
     @abstractmethod
     def add_community_member(self, community_id, user_id):
         pass
@@ -121,6 +153,10 @@ class AbstractDatabaseRepository(ABC):
     def add_user_notification(self, notification):
         pass
 
+    @abstractmethod
+    def update_user_notification(self, notification):
+        pass
+
     @abstractmethod
     def get_user_notification(self, user_id, notification_id):
         pass
@@ -149,10 +185,38 @@ class AbstractDatabaseRepository(ABC):
     def add_chat_message(self, message):
         pass
 
+    @abstractmethod
+    def update_chat_message(self, message, previous_content=None):
+        pass
+
     @abstractmethod
     def remove_chat_message(self, message):
         pass
 
+    @abstractmethod
+    def edit_chat_message(self, chat_id, message_type, message_id, sender_id, content):
+        pass
+
+    @abstractmethod
+    def delete_chat_message(self, chat_id, message_type, message_id, sender_id):
+        pass
+
+    @abstractmethod
+    def get_chat_message_reaction(self, message_id, user_id):
+        pass
+
+    @abstractmethod
+    def add_chat_message_reaction(self, chat_id, message_type, reaction):
+        pass
+
+    @abstractmethod
+    def remove_chat_message_reaction(self, chat_id, message_type, message_id, user_id):
+        pass
+
+    @abstractmethod
+    def search_chat_messages(self, chat_id, message_type, query, limit, cursor=None):
+        pass
+
     @abstractmethod
     def add_group_chat(self, group_chat):
         pass
@@ -188,11 +252,23 @@ class FileStorageRepository(ABC):
     """
 
     @abstractmethod
-    def get(self, file_id):
+    def get(self, file_id, byte_range=None):
+        pass
+
+    @abstractmethod
+    def get_metadata(self, file_id):
+        pass
+
+    @abstractmethod
+    def add(self, file_id, file, content_type=None, cache_control=None):
+        pass
+
+    @abstractmethod
+    def copy(self, source_file_id, file_id, content_type=None, cache_control=None):
         pass
 
     @abstractmethod
-    def add(self, file_id, file):
+    def create_upload(self, file_id, content_type, max_size, expires_in):
         pass
 
     @abstractmethod
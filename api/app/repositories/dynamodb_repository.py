@@ -2,11 +2,20 @@
 
 
 import os
+import functools
+from datetime import datetime, date, timedelta
+from collections import OrderedDict
 from uuid import uuid4
 from http import HTTPStatus
 from pprint import pprint
 from app.repositories.abstract_repository import AbstractDatabaseRepository
-from app.repositories.exceptions import UniqueConstraintException, NotFoundException, DatabaseException
+from app.repositories.exceptions import (
+    UniqueConstraintException,
+    NotFoundException,
+    DatabaseException,
+    CapacityExceededException,
+    NotOwnerException,
+)
 from app.clients import dynamodb_client
 from app.clients.dynamodb_client import ErrorType
 from app.models import (
@@ -21,7 +30,9 @@ from app.models import (
     GroupChatMembership,
     GroupChat,
     TokenType,
-    MessageType
+    RevokedToken,
+    MessageType,
+    MessageBucket
 )
 from app.models.update_models import update_user_model, update_community_model
 from app.dynamodb_mappers import (
@@ -38,15 +49,44 @@ from app.dynamodb_mappers import (
     GroupChatMessageMapper,
     GroupChatMembershipMapper,
     GroupChatMapper,
-    TokenMapper
+    TokenMapper,
+    RevokedTokenMapper,
+    ImageBlobMapper,
+    PrivateChatMessageBucketMapper,
+    GroupChatMessageBucketMapper,
+    ReactionMapper,
+)
+from app.dynamodb_mappers.constants import PrimaryKeyPrefix, ItemType, DirectoryPartition
+from app.repositories.utils import encode_cursor, decode_cursor, directory_sort_key
+from app.repositories.item_transcoder import ItemTranscoder
+from app.repositories.message_search import (
+    tokenize,
+    postings_key,
+    encode_message_id,
+    decode_message_id,
+    MAX_POSTINGS_PER_ITEM,
 )
-from app.dynamodb_mappers.constants import PrimaryKeyPrefix, ItemType
-from app.repositories.utils import encode_cursor, decode_cursor
+from app.repositories import geohash
 
 
 class _DynamoDBRepository(AbstractDatabaseRepository):
     """Repository class for the DynamoDB backend."""
 
+    MAX_KNOWN_MESSAGE_BUCKETS = 10000
+    # Postings items of a search term read per query, newest bucket first
+    SEARCH_BUCKETS_PER_READ = 10
+    # Revoked tokens read per query when syncing revocations
+    REVOKED_TOKENS_PER_READ = 500
+    # Communities read per query of each geohash cell of a nearby search,
+    # and the most communities a nearby search reads
+    NEARBY_CANDIDATES_PER_CELL = 100
+    MAX_NEARBY_CANDIDATES = 2000
+    # Orphaned image blobs read per query when collecting garbage
+    ORPHANED_IMAGE_BLOBS_PER_READ = 100
+    # Reaction items read per query when deleting a message, the most a
+    # batch write can delete
+    REACTIONS_PER_DELETE = 25
+
     def __init__(self, dynamodb_client, **kwargs):
         self._dynamodb_client = dynamodb_client
         self._table_name = os.environ.get("AWS_DYNAMODB_TABLE_NAME")
@@ -64,6 +104,20 @@ class _DynamoDBRepository(AbstractDatabaseRepository):
         self._group_chat_membership_mapper = kwargs.get("group_chat_membership_mapper")
         self._group_chat_mapper = kwargs.get("group_chat_mapper")
         self._token_mapper = kwargs.get("token_mapper")
+        self._revoked_token_mapper = kwargs.get("revoked_token_mapper")
+        self._image_blob_mapper = kwargs.get("image_blob_mapper")
+        self._private_chat_message_bucket_mapper = kwargs.get(
+            "private_chat_message_bucket_mapper"
+        )
+        self._group_chat_message_bucket_mapper = kwargs.get(
+            "group_chat_message_bucket_mapper"
+        )
+        self._reaction_mapper = kwargs.get("reaction_mapper")
+        # Bucket directory items known to exist, so that adding a message
+        # only writes the directory item once per bucket per process
+        self._known_message_buckets = OrderedDict()
+        # Transcoders of read-only collections by mapper and schema class
+        self._item_transcoders = {}
 
     def get_user(self, user_id):
         """Return a user from DynamoDB by id."""
@@ -103,10 +157,7 @@ class _DynamoDBRepository(AbstractDatabaseRepository):
         """Add a new user to DynamoDB."""
         user_email = UserEmail(user.id, user.email)
         username = Username(user.id, user.username)
-        additional_attributes={
-            "USERS_GSI_PK": PrimaryKeyPrefix.USER + user.id,
-            "USERS_GSI_SK": user.username
-        }
+        additional_attributes = self._user_index_attributes(user)
         items = {
             "user": self._user_mapper.serialize_from_model(
                 user, additional_attributes=additional_attributes
@@ -119,19 +170,24 @@ class _DynamoDBRepository(AbstractDatabaseRepository):
             raise UniqueConstraintException(response["error"])
 
     def update_user(self, old_user, updated_user_data):
-        """Update a user item in DynamoDB."""
+        """Update a user item in DynamoDB, writing only the attributes that
+        changed. A transaction is only needed when the user's email or
+        username changes, since their uniqueness items change with them.
+        """
         updated_user = update_user_model(old_user, updated_user_data)
-        additional_attributes={
-            "USERS_GSI_PK": PrimaryKeyPrefix.USER + updated_user.id,
-            "USERS_GSI_SK": updated_user.username
-        }
-        items = {
-            "user": self._user_mapper.serialize_from_model(
-                updated_user,
-                additional_attributes=additional_attributes,
-            )
-        }
+        user_update = self._serialize_update(
+            self._user_mapper,
+            updated_user,
+            self._user_index_attributes(updated_user),
+            old_item=self._serialize_user(old_user),
+        )
+        if (
+            old_user.email == updated_user.email
+            and old_user.username == updated_user.username
+        ):
+            return self._write_update(*user_update)
 
+        items = {"user_update": user_update}
         if old_user.email != updated_user.email:
             items["updated_user_email"] = self._user_email_mapper.serialize_from_model(
                 UserEmail(updated_user.id, updated_user.email)
@@ -149,23 +205,33 @@ class _DynamoDBRepository(AbstractDatabaseRepository):
         response = self._dynamodb_client.update_user(items)
         return response
 
+    def update_user_password_hash(self, user):
+        """Overwrite only the password hash of a user item in DynamoDB."""
+        user_item = self._user_mapper.serialize_from_model(user)
+        return self._dynamodb_client.update_item(
+            self._user_mapper.key(user.id, user.id),
+            {"_password_hash": user_item["_password_hash"]}
+        )
+
     def update_user_image(self, user, image_data):
-        """Update one of the user's images in DynamoDB."""
+        """Update one of the user's images in DynamoDB and return the image
+        the write replaced, which may differ from the one the user was read
+        with if another upload replaced it in the meantime.
+        """
+        old_user_item = self._serialize_user(user)
         new_image = Image(**image_data)
         if image_data["image_type"] == ImageType.USER_PROFILE_PHOTO:
             user.avatar = new_image
         elif image_data["image_type"] == ImageType.USER_COVER_PHOTO:
             user.cover_photo = new_image
-        additional_attributes={
-            "USERS_GSI_PK": PrimaryKeyPrefix.USER + user.id,
-            "USERS_GSI_SK": user.username
-        }
-        user_item = self._user_mapper.serialize_from_model(
-            user, additional_attributes=additional_attributes,
+        return self._replace_image(
+            self._user_mapper,
+            user,
+            self._user_index_attributes(user),
+            old_user_item,
+            image_data["image_type"],
+            "User not found",
         )
-        
-        response = self._dynamodb_client.put_item(user_item)
-        return response
 
     def remove_user(self, user):
         """Delete a user item from DynamoDB."""
@@ -191,6 +257,11 @@ class _DynamoDBRepository(AbstractDatabaseRepository):
             (PrimaryKeyPrefix.GROUP_CHAT, PrimaryKeyPrefix.GROUP_CHAT_MESSAGE, True, "_chat_id", "_id"), 
             (PrimaryKeyPrefix.USER, PrimaryKeyPrefix.NOTIFICATION, False, "_user_id", "_id")
         ]
+        # Message keys are bucketed by time, so they are built by their mappers
+        key_mappers = {
+            PrimaryKeyPrefix.PRIVATE_CHAT_MESSAGE: self._private_chat_message_mapper,
+            PrimaryKeyPrefix.GROUP_CHAT_MESSAGE: self._group_chat_message_mapper
+        }
         tokens = self.get_user_tokens(user_id)
         for token in tokens:
             self.remove_token(token)
@@ -213,7 +284,8 @@ class _DynamoDBRepository(AbstractDatabaseRepository):
                 pk_prefix=pk_prefix,
                 sk_prefix=sk_prefix,
                 pk_attribute=partition_key_attribute,
-                sk_attribute=sort_key_attribute
+                sk_attribute=sort_key_attribute,
+                mapper=key_mappers.get(sk_prefix)
             )
 
     def get_user_token(self, user_id, token_type):
@@ -263,57 +335,70 @@ class _DynamoDBRepository(AbstractDatabaseRepository):
             return [token1, token2]
         return [token1]
 
-    def get_token(self, raw_jwt, token_type):
-        """Return a token from DynamoDB."""
-        if token_type == TokenType.ACCESS_TOKEN:
-            partition_key_prefix = PrimaryKeyPrefix.JWT_ACCESS_TOKEN
-        else:
-            partition_key_prefix = PrimaryKeyPrefix.JWT_REFRESH_TOKEN
-        limit = 25
-        cursor = {}
-        primary_key = self._token_mapper.key(raw_jwt, partition_key_prefix=partition_key_prefix)
-        query_results = self._dynamodb_client.query(
-            limit,
-            cursor,
-            {
-                "pk_name": "INVERTED_GSI_PK",
-                "pk_value": primary_key["PK"],
-                "sk_name": "INVERTED_GSI_SK",
-                "sk_value": {"S": PrimaryKeyPrefix.USER}
-            },
-            index="InvertedIndex"
-        )
-        if not query_results["Items"]:
-            return None
-        return self._token_mapper.deserialize_to_model(query_results["Items"][0])
-
     def add_token(self, token):
-        """Add a token to DynamoDB."""
+        """Add a token to DynamoDB, replacing the user's previous token of
+        the same type. The replaced token is revoked if it hasn't expired,
+        so a user only holds a single valid token of each type.
+        """
         if token.token_type == TokenType.ACCESS_TOKEN:
             item_type = ItemType.JWT_ACCESS_TOKEN.name
             sort_key_prefix = PrimaryKeyPrefix.JWT_ACCESS_TOKEN
         else:
             item_type = ItemType.JWT_REFRESH_TOKEN.name
             sort_key_prefix = PrimaryKeyPrefix.JWT_REFRESH_TOKEN
-        additional_attributes = {
-            "INVERTED_GSI_PK": sort_key_prefix + token.raw_jwt,
-            "INVERTED_GSI_SK": PrimaryKeyPrefix.USER + token.user_id
-        }
         token_item = self._token_mapper.serialize_from_model(
-            token, 
-            item_type=item_type, 
-            sort_key_prefix=sort_key_prefix,
-            additional_attributes=additional_attributes
+            token, item_type=item_type, sort_key_prefix=sort_key_prefix
         )
-        return self._dynamodb_client.put_item(token_item)
-        
+        old_token_item = self._dynamodb_client.replace_item(token_item)
+        if old_token_item:
+            old_token = self._token_mapper.deserialize_to_model(old_token_item)
+            if (
+                old_token.jti is not None
+                and old_token.jti != token.jti
+                and not old_token.is_blacklisted
+                and old_token.expires_on_date > datetime.now().timestamp()
+            ):
+                self._add_revoked_token(old_token)
+        return True
+
     def remove_token(self, token):
-        """Mark a token as blacklisted. Each token has a TTL set on it and
-        DynamoDB will delete the token once it reaches its expiration date,
+        """Revoke a token and mark it as blacklisted. Tokens and their
+        revocations each have a TTL set on them and DynamoDB will delete
+        them once the token reaches its expiration date.
         """
+        if token.jti is not None:
+            self._add_revoked_token(token)
         token.is_blacklisted = True
         return self.add_token(token)
 
+    def get_revoked_tokens(self, since):
+        """Return the tokens revoked at or after the given time, oldest
+        first. Revocations are partitioned by the day they were made, so
+        only the partitions of the days since then are read.
+        """
+        revoked_tokens = []
+        day = since.date()
+        start_key = self._revoked_token_mapper.key(
+            day.isoformat(), since.isoformat(timespec="microseconds")
+        )
+        while day <= date.today():
+            primary_key = self._revoked_token_mapper.key(day.isoformat())
+            while True:
+                query_results = self._dynamodb_client.query(
+                    self.REVOKED_TOKENS_PER_READ,
+                    start_key,
+                    {"pk_name": "PK", "pk_value": primary_key["PK"]}
+                )
+                revoked_tokens.extend(
+                    self._revoked_token_mapper.deserialize_to_model(item)
+                    for item in query_results["Items"]
+                )
+                start_key = query_results["LastEvaluatedKey"]
+                if not start_key:
+                    break
+            day += timedelta(days=1)
+        return revoked_tokens
+
     def _on_delete_cascade(self, query_params, **kwargs):
         while True:
             query_results = self._dynamodb_client.query(*query_params, index=kwargs["index"])
@@ -331,31 +416,48 @@ class _DynamoDBRepository(AbstractDatabaseRepository):
         for item in query_results["Items"]:
             partition_key_attribute = kwargs["pk_attribute"]
             sort_key_attribute = kwargs["sk_attribute"]
+            if kwargs.get("mapper"):
+                primary_key = kwargs["mapper"].key(
+                    item[partition_key_attribute]["S"], item[sort_key_attribute]["S"]
+                )
+                keys_to_delete.append(primary_key)
+                continue
             keys_to_delete.append({
-                "PK": kwargs["pk_prefix"] + item[partition_key_attribute]["S"],
-                "SK": kwargs["sk_prefix"] + item[sort_key_attribute]["S"]
+                "PK": {"S": kwargs["pk_prefix"] + item[partition_key_attribute]["S"]},
+                "SK": {"S": kwargs["sk_prefix"] + item[sort_key_attribute]["S"]}
             })
         return keys_to_delete
 
-    def get_users(self, limit, encoded_start_key=None):
-        """Return a collection of user models."""
-        decoded_start_key = {}
+    def get_users(self, limit, encoded_start_key=None, prefix=None):
+        """Return a collection of user models sorted by username. If a
+        prefix is given, only users whose usernames begin with it,
+        ignoring case, are returned.
+        """
+        cursor_context = "get_users:" + (prefix or "").lower()
+        cursor = {}
         if encoded_start_key:
-            decoded_start_key = decode_cursor(encoded_start_key)
-        results = self._dynamodb_client.get_items(
-            limit, decoded_start_key, "UsersIndex"
+            cursor = decode_cursor(encoded_start_key, cursor_context)
+        primary_key = {
+            "pk_name": "DIRECTORY_GSI_PK",
+            "pk_value": {"S": DirectoryPartition.USERS},
+        }
+        if prefix:
+            primary_key["sk_name"] = "DIRECTORY_GSI_SK"
+            primary_key["sk_value"] = {"S": prefix.lower()}
+        results = self._dynamodb_client.query(
+            limit, cursor, primary_key, index="DirectoryIndex", item_type=ItemType.USER.name
         )
-        return self._process_query_or_scan_results(results, self._user_mapper, ItemType.USER.name)          
-    
+        return self._process_query_or_scan_results(
+            results, self._user_mapper, ItemType.USER.name, cursor_context=cursor_context
+        )
+
     def get_user_communities(self, user_id, limit, **kwargs):
         """Return a collection of the user's communities."""
+        cursor_context = "get_user_communities:" + user_id
         cursor = {}
         if kwargs.get("cursor"):
-            cursor = decode_cursor(kwargs["cursor"])
-        user = self.get_user(user_id)
-        if not user:
-            raise NotFoundException("User not found")
-        primary_key = self._user_mapper.key(user_id)
+            cursor = decode_cursor(kwargs["cursor"], cursor_context)
+        primary_key = self._user_mapper.key(user_id, user_id)
         query_results = self._dynamodb_client.query(
             limit,
             cursor,
@@ -369,6 +471,7 @@ class _DynamoDBRepository(AbstractDatabaseRepository):
         )
         
         if not query_results["Items"]:
+            self._get_list_parent(primary_key, "User not found")
             response = {
                 "models": [],
                 "total": 0
@@ -385,7 +488,7 @@ class _DynamoDBRepository(AbstractDatabaseRepository):
                 batch_results, self._community_mapper, ItemType.COMMUNITY.name
             )
         response["has_next"] = query_results["LastEvaluatedKey"] is not None
-        response["next"] = encode_cursor(query_results["LastEvaluatedKey"] or {})
+        response["next"] = encode_cursor(query_results["LastEvaluatedKey"] or {}, cursor_context)
         return response
 
     def get_community(self, community_id):
@@ -425,18 +528,7 @@ class _DynamoDBRepository(AbstractDatabaseRepository):
             "INVERTED_GSI_PK": PrimaryKeyPrefix.USER + community.founder_id,
             "INVERTED_GSI_SK": PrimaryKeyPrefix.COMMUNITY + community.id
         }
-        community_additional_attributes = {
-            "COMMUNITIES_BY_TOPIC_GSI_PK": PrimaryKeyPrefix.TOPIC + community.topic.name,
-            "COMMUNITIES_BY_TOPIC_GSI_SK": PrimaryKeyPrefix.COMMUNITY + community.id,
-            "COMMUNITIES_BY_LOCATION_GSI_PK": PrimaryKeyPrefix.COUNTRY
-            + community.location.country,
-            "COMMUNITIES_BY_LOCATION_GSI_SK": (
-                PrimaryKeyPrefix.STATE
-                + community.location.state
-                + PrimaryKeyPrefix.CITY
-                + community.location.city
-            ),
-        }
+        community_additional_attributes = self._community_index_attributes(community)
         items = {
             "community": self._community_mapper.serialize_from_model(
                 community, additional_attributes=community_additional_attributes
@@ -454,29 +546,25 @@ class _DynamoDBRepository(AbstractDatabaseRepository):
             raise UniqueConstraintException(response["error"])
 
     def update_community(self, old_community, updated_community_data):
-        """Update a community item in DynamoDB."""
+        """Update a community item in DynamoDB, writing only the attributes
+        that changed. A transaction is only needed when the community's
+        name changes, since its uniqueness item changes with it.
+        """
         updated_community = update_community_model(
             old_community, updated_community_data
         )
-        additional_attributes = {
-            "COMMUNITIES_BY_TOPIC_GSI_PK": PrimaryKeyPrefix.TOPIC
-            + updated_community.topic.name,
-            "COMMUNITIES_BY_TOPIC_GSI_SK": PrimaryKeyPrefix.COMMUNITY
-            + updated_community.id,
-            "COMMUNITIES_BY_LOCATION_GSI_PK": PrimaryKeyPrefix.COUNTRY
-            + updated_community.location.country,
-            "COMMUNITIES_BY_LOCATION_GSI_SK": (
-                PrimaryKeyPrefix.STATE
-                + updated_community.location.state
-                + PrimaryKeyPrefix.CITY
-                + updated_community.location.city
-            ),
-        }
-        items = {
-            "community": self._community_mapper.serialize_from_model(
-                updated_community, additional_attributes=additional_attributes
-            )
-        }
+        # The geohash index attributes are removed along with the
+        # community's coordinates
+        community_update = self._serialize_update(
+            self._community_mapper,
+            updated_community,
+            self._community_index_attributes(updated_community),
+            old_item=self._serialize_community(old_community),
+        )
+        if old_community.name == updated_community.name:
+            return self._write_update(*community_update)
+
+        items = {"community_update": community_update}
 
         if old_community.name != updated_community.name:
             items[
@@ -491,50 +579,216 @@ class _DynamoDBRepository(AbstractDatabaseRepository):
         return response
 
     def update_community_image(self, community, image_data):
-        """Update a community's image data in DynamoDB."""
+        """Update a community's image data in DynamoDB and return the image
+        the write replaced.
+        """
+        old_community_item = self._serialize_community(community)
         new_image = Image(**image_data)
         if image_data["image_type"] == ImageType.COMMUNITY_PROFILE_PHOTO:
             community.avatar = new_image
         elif image_data["image_type"] == ImageType.COMMUNITY_COVER_PHOTO:
             community.cover_photo = new_image
-        additional_attributes = {
-            "COMMUNITIES_BY_TOPIC_GSI_PK": PrimaryKeyPrefix.TOPIC
-            + community.topic.name,
-            "COMMUNITIES_BY_TOPIC_GSI_SK": PrimaryKeyPrefix.COMMUNITY
-            + community.id,
-            "COMMUNITIES_BY_LOCATION_GSI_PK": PrimaryKeyPrefix.COUNTRY
-            + community.location.country,
-            "COMMUNITIES_BY_LOCATION_GSI_SK": (
-                PrimaryKeyPrefix.STATE
-                + community.location.state
-                + PrimaryKeyPrefix.CITY
-                + community.location.city
-            ),
-        }
-        community_item = self._community_mapper.serialize_from_model(
-            community, additional_attributes=additional_attributes,
+        return self._replace_image(
+            self._community_mapper,
+            community,
+            self._community_index_attributes(community),
+            old_community_item,
+            image_data["image_type"],
+            "Community not found",
         )
-        response = self._dynamodb_client.put_item(community_item)
-        return response
+
+    def get_image_blob(self, blob_id):
+        """Return an image blob from DynamoDB by id."""
+        primary_key = self._image_blob_mapper.key(blob_id, blob_id)
+        blob_item = self._dynamodb_client.get_item(primary_key)
+        if not blob_item:
+            return None
+        return self._image_blob_mapper.deserialize_to_model(blob_item)
+
+    def add_image_blob(self, blob):
+        """Add an image blob to DynamoDB with its reference count. Return
+        False if a blob with the same id already exists.
+        """
+        blob_item = self._image_blob_mapper.serialize_from_model(blob)
+        return self._dynamodb_client.put_item(blob_item, use_condition_expression=True)
+
+    def retain_image_blob(self, blob_id):
+        """Add a reference to an image blob and return it. Return None if
+        the blob doesn't exist, such as after it was garbage collected.
+        """
+        primary_key = self._image_blob_mapper.key(blob_id, blob_id)
+        blob_item = self._dynamodb_client.retain_image_blob(primary_key)
+        if not blob_item:
+            return None
+        return self._image_blob_mapper.deserialize_to_model(blob_item)
+
+    def release_image_blob(self, blob_id):
+        """Remove a reference to an image blob and return the number of
+        references left, or None if the blob doesn't exist. Blobs left
+        without references are listed in the orphaned blob directory,
+        sorted by the time they were orphaned.
+        """
+        primary_key = self._image_blob_mapper.key(blob_id, blob_id)
+        orphaned_at = datetime.now().isoformat(timespec="microseconds")
+        orphan_attributes = {
+            "DIRECTORY_GSI_PK": {"S": DirectoryPartition.ORPHANED_IMAGE_BLOBS},
+            "DIRECTORY_GSI_SK": {"S": orphaned_at + "#" + blob_id},
+        }
+        return self._dynamodb_client.release_image_blob(primary_key, orphan_attributes)
+
+    def get_orphaned_image_blobs(self, orphaned_before):
+        """Return the image blobs that have had no references since
+        before the given time, oldest first.
+        """
+        blobs = []
+        cutoff = orphaned_before.isoformat(timespec="microseconds")
+        primary_key = {
+            "pk_name": "DIRECTORY_GSI_PK",
+            "pk_value": {"S": DirectoryPartition.ORPHANED_IMAGE_BLOBS},
+        }
+        start_key = {}
+        while True:
+            query_results = self._dynamodb_client.query(
+                self.ORPHANED_IMAGE_BLOBS_PER_READ,
+                start_key,
+                primary_key,
+                index="DirectoryIndex",
+            )
+            for item in query_results["Items"]:
+                if item["DIRECTORY_GSI_SK"]["S"] >= cutoff:
+                    return blobs
+                blobs.append(self._image_blob_mapper.deserialize_to_model(item))
+            start_key = query_results["LastEvaluatedKey"]
+            if not start_key:
+                return blobs
+
+    def remove_image_blob(self, blob_id):
+        """Delete an image blob that has no references from DynamoDB and
+        return it, or None if it was retained again or doesn't exist.
+        """
+        primary_key = self._image_blob_mapper.key(blob_id, blob_id)
+        blob_item = self._dynamodb_client.delete_image_blob(primary_key)
+        if not blob_item:
+            return None
+        return self._image_blob_mapper.deserialize_to_model(blob_item)
 
     def get_communities(self, limit, **kwargs):
         """Return a collection of community models."""
+        location_attributes = ("country", "state", "city")
+        if "topic" in kwargs:
+            cursor_context = "get_communities:topic:" + kwargs["topic"]
+        else:
+            cursor_context = "get_communities:location:" + ":".join(
+                kwargs.get(attribute, "") for attribute in location_attributes
+            )
         cursor = {}
         if kwargs.get("cursor"):
-            cursor = decode_cursor(kwargs["cursor"])
+            cursor = decode_cursor(kwargs["cursor"], cursor_context)
         if "topic" in kwargs:
-            return self.get_communities_by_topic(limit, kwargs["topic"], cursor=cursor)
+            return self.get_communities_by_topic(
+                limit, kwargs["topic"], cursor=cursor, cursor_context=cursor_context
+            )
         elif "country" in kwargs:
-            return self.get_communities_by_location(limit, kwargs, cursor=cursor)
+            return self.get_communities_by_location(
+                limit, kwargs, cursor=cursor, cursor_context=cursor_context
+            )
         else:
-            results = self._dynamodb_client.get_items(
-                limit, cursor, "CommunitiesByLocation"
+            results = self._dynamodb_client.get_items_in_segments(
+                limit, 
+                cursor.get("segments", []), 
+                "CommunitiesByLocation", 
+                item_type=ItemType.COMMUNITY.name
             )
             return self._process_query_or_scan_results(
-                results, self._community_mapper, ItemType.COMMUNITY.name
+                results, 
+                self._community_mapper, 
+                ItemType.COMMUNITY.name, 
+                cursor_context=cursor_context
+            )
+
+    def search_users(self, prefix, limit):
+        """Return the first users, sorted by username, whose usernames
+        begin with the prefix, ignoring case.
+        """
+        return self._search_directory(
+            DirectoryPartition.USERS, prefix, limit, self._user_mapper, ItemType.USER.name
+        )
+
+    def search_communities(self, prefix, limit):
+        """Return the first communities, sorted by name, whose names
+        begin with the prefix, ignoring case.
+        """
+        return self._search_directory(
+            DirectoryPartition.COMMUNITIES,
+            prefix,
+            limit,
+            self._community_mapper,
+            ItemType.COMMUNITY.name
+        )
+
+    def get_nearby_communities(self, latitude, longitude, radius_km, limit):
+        """Return the communities within the radius of the given point,
+        closest first.
+
+        The geohash cells covering the circle are each queried in parallel
+        on the geohash index, and cells with more communities than a single
+        query reads are queried again until every community in them is
+        read, since a cell's communities aren't sorted by distance. Raise a
+        DatabaseException if the search area needs too many cells or holds
+        more than MAX_NEARBY_CANDIDATES communities.
+        """
+        try:
+            cells = geohash.covering_cells(latitude, longitude, radius_km)
+        except ValueError:
+            raise DatabaseException("The search area is too close to a pole")
+        queries = []
+        for cell in cells:
+            primary_key = {
+                "pk_name": "GEOHASH_GSI_PK",
+                "pk_value": {
+                    "S": PrimaryKeyPrefix.GEOHASH + cell[:geohash.PARTITION_PRECISION]
+                },
+            }
+            if len(cell) > geohash.PARTITION_PRECISION:
+                primary_key["sk_name"] = "GEOHASH_GSI_SK"
+                primary_key["sk_value"] = {"S": cell}
+            queries.append((primary_key, {}))
+        nearby_communities = []
+        num_read = 0
+        while queries:
+            pages = self._dynamodb_client.query_in_parallel(
+                self.NEARBY_CANDIDATES_PER_CELL,
+                [primary_key for primary_key, _ in queries],
+                [start_key for _, start_key in queries],
+                index="CommunitiesByGeohash"
             )
+            next_queries = []
+            for (primary_key, _), page in zip(queries, pages):
+                num_read += len(page["Items"])
+                if page["LastEvaluatedKey"]:
+                    next_queries.append((primary_key, page["LastEvaluatedKey"]))
+                for item in page["Items"]:
+                    if item["type"]["S"] != ItemType.COMMUNITY.name:
+                        continue
+                    community = self._community_mapper.deserialize_to_model(item)
+                    distance = geohash.distance_km(
+                        latitude,
+                        longitude,
+                        community.location.latitude,
+                        community.location.longitude,
+                    )
+                    if distance <= radius_km:
+                        nearby_communities.append((distance, community))
+            if next_queries and num_read >= self.MAX_NEARBY_CANDIDATES:
+                raise DatabaseException(
+                    "There are too many communities in the search area, try a smaller radius"
+                )
+            queries = next_queries
+        nearby_communities.sort(key=lambda nearby_community: nearby_community[0])
+        models = [community for _, community in nearby_communities[:limit]]
+        return {"models": models, "total": len(models)}
 
-    def get_communities_by_topic(self, limit, topic, cursor={}):
+    def get_communities_by_topic(self, limit, topic, cursor={}, cursor_context=""):
         """Return a collection of community models that have the given topic"""
         partition_key = PrimaryKeyPrefix.TOPIC + topic.upper()
         results = self._dynamodb_client.query(
@@ -542,12 +796,16 @@ class _DynamoDBRepository(AbstractDatabaseRepository):
             cursor,
             {"pk_name": "COMMUNITIES_BY_TOPIC_GSI_PK", "pk_value": {"S": partition_key}},
             index="CommunitiesByTopic",
+            item_type=ItemType.COMMUNITY.name
         )
         return self._process_query_or_scan_results(
-            results, self._community_mapper, ItemType.COMMUNITY.name
+            results, 
+            self._community_mapper, 
+            ItemType.COMMUNITY.name, 
+            cursor_context=cursor_context
         )
 
-    def get_communities_by_location(self, limit, location, cursor={}):
+    def get_communities_by_location(self, limit, location, cursor={}, cursor_context=""):
         """Return a collection of community models that are in the given location"""
         partition_key = PrimaryKeyPrefix.COUNTRY + location["country"].title()
         sort_key = ""
@@ -564,10 +822,17 @@ class _DynamoDBRepository(AbstractDatabaseRepository):
             primary_key["sk_value"] = {"S": sort_key}
             
         results = self._dynamodb_client.query(
-            limit, cursor, primary_key, index="CommunitiesByLocation",
+            limit, 
+            cursor, 
+            primary_key, 
+            index="CommunitiesByLocation", 
+            item_type=ItemType.COMMUNITY.name
         )
         return self._process_query_or_scan_results(
-            results, self._community_mapper, ItemType.COMMUNITY.name
+            results, 
+            self._community_mapper, 
+            ItemType.COMMUNITY.name, 
+            cursor_context=cursor_context
         )
 
     def add_community_member(self, community_id, user_id):
@@ -597,21 +862,24 @@ class _DynamoDBRepository(AbstractDatabaseRepository):
 
     def remove_community_member(self, community_id, user_id):
         """Remove a user from a community."""
-        key = self._community_membership_mapper.key(community_id, user_id)
-        response = self._dynamodb_client.remove_community_member(key)
+        keys = {
+            "community_membership_key": self._community_membership_mapper.key(
+                community_id, user_id
+            ),
+            "community_key": self._community_mapper.key(community_id, community_id)
+        }
+        response = self._dynamodb_client.remove_community_member(keys)
         if "error" in response:
             raise NotFoundException(response["error"])
         return True
 
     def get_community_members(self, community_id, limit, **kwargs):
         """Return a collection of users who are in the given community."""
+        cursor_context = "get_community_members:" + community_id
         cursor = {}
         if kwargs.get("cursor"):
-            cursor = decode_cursor(kwargs["cursor"])
-        community = self.get_community(community_id)
-        if not community:
-            raise NotFoundException("Community not found")
-        primary_key = self._community_mapper.key(community_id)
+            cursor = decode_cursor(kwargs["cursor"], cursor_context)
+        primary_key = self._community_mapper.key(community_id, community_id)
         query_results = self._dynamodb_client.query(
             limit,
             cursor,
@@ -622,16 +890,27 @@ class _DynamoDBRepository(AbstractDatabaseRepository):
                 "sk_value": {"S":PrimaryKeyPrefix.USER},
             }
         )
-        user_keys = [
-            self._user_mapper.key(item["user_id"]["S"], item["user_id"]["S"])
-            for item in query_results["Items"]
-        ]
-        batch_results = self._dynamodb_client.batch_get_items(user_keys)
-        response = self._process_batch_results(
-            batch_results, self._user_mapper, ItemType.USER.name
-        )
+        if not query_results["Items"]:
+            community_item = self._get_list_parent(
+                primary_key, "Community not found", attributes=["_member_count"]
+            )
+            response = {"models": []}
+        else:
+            # The community is read in the same batch as its members
+            user_keys = [
+                self._user_mapper.key(item["user_id"]["S"], item["user_id"]["S"])
+                for item in query_results["Items"]
+            ]
+            batch_results = self._dynamodb_client.batch_get_items(user_keys + [primary_key])
+            community_item = self._pop_batch_parent(
+                batch_results, primary_key, "Community not found", attributes=["_member_count"]
+            )
+            response = self._process_batch_results(
+                batch_results, self._user_mapper, ItemType.USER.name
+            )
+        response["total"] = self._counter_value(community_item, "_member_count")
         response["has_next"] = query_results["LastEvaluatedKey"] is not None
-        response["next"] = encode_cursor(query_results["LastEvaluatedKey"] or {})
+        response["next"] = encode_cursor(query_results["LastEvaluatedKey"] or {}, cursor_context)
         return response
 
     def get_community_membership(self, community_id, user_id):
@@ -644,13 +923,11 @@ class _DynamoDBRepository(AbstractDatabaseRepository):
 
     def get_user_notifications(self, user_id, limit, **kwargs):
         """Return a collection of the user's notifications."""
-        user = self.get_user(user_id)
-        if not user:
-            raise NotFoundException("User not found")
+        cursor_context = "get_user_notifications:" + user_id
         cursor = {}
         if kwargs.get("cursor"):
-            cursor = decode_cursor(kwargs["cursor"])
-        user_primary_key = self._user_mapper.key(user_id)
+            cursor = decode_cursor(kwargs["cursor"], cursor_context)
+        user_primary_key = self._user_mapper.key(user_id, user_id)
         query_results = self._dynamodb_client.query(
             limit,
             cursor,
@@ -660,20 +937,25 @@ class _DynamoDBRepository(AbstractDatabaseRepository):
                 "sk_name": "SK",
                 "sk_value": {"S":PrimaryKeyPrefix.NOTIFICATION},
             },
-            scan_forward=False
+            scan_forward=False,
+            item_type=ItemType.NOTIFICATION.name
         )
         
         if not query_results["Items"]:
+            self._get_list_parent(user_primary_key, "User not found")
             response = {
                 "models": [],
                 "total": 0
             }
         else:
             response = self._process_query_or_scan_results(
-                query_results, self._notification_mapper, ItemType.NOTIFICATION.name
+                query_results,
+                self._notification_mapper,
+                ItemType.NOTIFICATION.name,
+                schema=kwargs.get("schema")
             )
         response["has_next"] = query_results["LastEvaluatedKey"] is not None
-        response["next"] = encode_cursor(query_results["LastEvaluatedKey"] or {})
+        response["next"] = encode_cursor(query_results["LastEvaluatedKey"] or {}, cursor_context)
         return response
 
     def get_user_notification(self, user_id, notification_id):
@@ -685,12 +967,29 @@ class _DynamoDBRepository(AbstractDatabaseRepository):
         return self._notification_mapper.deserialize_to_model(notification_item)
 
     def add_user_notification(self, notification):
-        """Add or replace a notification in DynamoDB."""
+        """Add a new notification to DynamoDB and count it as unread."""
         notification_item = self._notification_mapper.serialize_from_model(
             notification
         )
-        response = self._dynamodb_client.put_item(notification_item)
-        return response
+        keys = {"user_key": self._user_mapper.key(notification.user_id, notification.user_id)}
+        response = self._dynamodb_client.add_notification(keys, notification_item)
+        if "error" in response:
+            raise DatabaseException(response["error"])
+        return True
+
+    def update_user_notification(self, notification):
+        """Replace a notification in DynamoDB. The user's unread notification
+        count is decremented only if this update is the one that marks
+        the notification as read.
+        """
+        notification_item = self._notification_mapper.serialize_from_model(
+            notification
+        )
+        if notification.was_read():
+            keys = {"user_key": self._user_mapper.key(notification.user_id, notification.user_id)}
+            if self._dynamodb_client.mark_notification_as_read(keys, notification_item):
+                return True
+        return self._dynamodb_client.put_item(notification_item)
 
     def get_private_chat(self, private_chat_id):
         """Return a private chat from DynamoDB."""
@@ -729,17 +1028,17 @@ class _DynamoDBRepository(AbstractDatabaseRepository):
         }
         response = self._dynamodb_client.create_private_chat(items)
         if "error" in response:
-            raise UniqueConstraintException(response["error"])
+            if response["error_type"] == ErrorType.UNIQUE_CONSTRAINT:
+                raise UniqueConstraintException(response["error"])
+            raise DatabaseException(response["error"])
         
     def get_user_private_chats(self, user_id, limit, **kwargs):
         """Return a collection of users that the given user has DMs with."""
-        user = self.get_user(user_id)
-        if not user:
-            raise NotFoundException("User not found")
+        cursor_context = "get_user_private_chats:" + user_id
         cursor = {}
         if kwargs.get("cursor"):
-            cursor = decode_cursor(kwargs["cursor"])
-        primary_key = self._user_mapper.key(user_id)
+            cursor = decode_cursor(kwargs["cursor"], cursor_context)
+        primary_key = self._user_mapper.key(user_id, user_id)
         query_results = self._dynamodb_client.query(
             limit,
             cursor,
@@ -752,18 +1051,27 @@ class _DynamoDBRepository(AbstractDatabaseRepository):
         )
         
         if not query_results["Items"]:
+            self._get_list_parent(primary_key, "User not found")
             response = {
                 "models": [],
                 "total": 0
             }
         else:
-            user_keys = []
+            # The user is read in the same batch as the users they chat with
+            user_keys = [primary_key]
             for item in query_results["Items"]:
                 user_key = self._user_mapper.key(
                     item["other_user_id"]["S"], item["other_user_id"]["S"]
                 )
-                user_keys.append(user_key)
+                if user_key not in user_keys:
+                    user_keys.append(user_key)
             batch_results = self._dynamodb_client.batch_get_items(user_keys)
+            user_item = self._pop_batch_item(batch_results, primary_key)
+            if not user_item and self._is_unprocessed(batch_results, primary_key):
+                user_item = self._dynamodb_client.get_item(primary_key)
+            if not user_item:
+                raise NotFoundException("User not found")
+            user = self._user_mapper.deserialize_to_model(user_item)
             response = self._process_batch_results(
                 batch_results, 
                 self._user_mapper, 
@@ -773,7 +1081,7 @@ class _DynamoDBRepository(AbstractDatabaseRepository):
                 user, response["models"], query_results["Items"]
             )
         response["has_next"] = query_results["LastEvaluatedKey"] is not None
-        response["next"] = encode_cursor(query_results["LastEvaluatedKey"] or {})
+        response["next"] = encode_cursor(query_results["LastEvaluatedKey"] or {}, cursor_context)
         return response
 
     def get_private_chat_messages(self, private_chat_id, limit, **kwargs):
@@ -796,67 +1104,478 @@ class _DynamoDBRepository(AbstractDatabaseRepository):
         )
         if not chat_query_results["Items"]:
             raise NotFoundException("Private chat not found")
-        cursor = {}
-        if kwargs.get("cursor"):
-            cursor = decode_cursor(kwargs["cursor"])
-        message_primary_key = {
-            "PK": {"S": PrimaryKeyPrefix.PRIVATE_CHAT + private_chat_id}
-        }
-        query_results = self._dynamodb_client.query(
+        return self._get_chat_messages(
+            private_chat_id,
             limit,
-            cursor,
-            {
-                "pk_name": "PK", 
-                "pk_value": message_primary_key["PK"], 
-                "sk_name": "SK",
-                "sk_value": {"S": PrimaryKeyPrefix.PRIVATE_CHAT_MESSAGE},
-            },
-            scan_forward=False
+            self._private_chat_message_mapper,
+            self._private_chat_message_bucket_mapper,
+            PrimaryKeyPrefix.PRIVATE_CHAT_MESSAGE,
+            ItemType.PRIVATE_CHAT_MESSAGE.name,
+            kwargs.get("cursor"),
+            kwargs.get("schema")
         )
-        return self._process_query_or_scan_results(
-            query_results, 
-            self._private_chat_message_mapper, 
-            ItemType.PRIVATE_CHAT_MESSAGE.name
-        )
-        
+
     def get_chat_message(self, chat_id, message_id, message_type):
         """Return an instance of a Message model."""
-        if message_type == MessageType.PRIVATE_CHAT:
-            mapper = self._private_chat_message_mapper
-        else:
-            mapper = self._group_chat_message_mapper
-        primary_key = mapper.key(chat_id, message_id)
+        mapper, _ = self._chat_message_mappers(message_type)
+        try:
+            primary_key = self._chat_message_key(mapper, chat_id, message_id)
+        except NotFoundException:
+            return None
         item = self._dynamodb_client.get_item(primary_key)
         if not item:
             return None
         return mapper.deserialize_to_model(item)
 
     def add_chat_message(self, message):
-        """Add a chat message to DynamoDB."""
-        if message.message_type == MessageType.PRIVATE_CHAT:
-            mapper = self._private_chat_message_mapper
-        else:
-            mapper = self._group_chat_message_mapper
-        additional_attributes = {"USERS_GSI_PK": PrimaryKeyPrefix.USER + message.user_id}
-        if mapper == self._private_chat_message_mapper:
-            gsi_sort_key = PrimaryKeyPrefix.PRIVATE_CHAT_MESSAGE + message.id
-        else:
-            gsi_sort_key = PrimaryKeyPrefix.GROUP_CHAT_MESSAGE + message.id
-        
-        additional_attributes["USERS_GSI_SK"] = gsi_sort_key
-        message_item = mapper.serialize_from_model(message, additional_attributes=additional_attributes)
-        response = self._dynamodb_client.put_item(message_item)
+        """Add a chat message to DynamoDB and add its content to the
+        chat's message search index.
+        """
+        mapper, bucket_mapper = self._chat_message_mappers(message.message_type)
+        # The directory item is written first so that a message is never
+        # stored in a bucket that paging can't reach
+        self._add_message_bucket(
+            bucket_mapper, 
+            MessageBucket(message.chat_id, mapper.bucket(message.id), message.timestamp)
+        )
+        response = self._dynamodb_client.put_item(self._serialize_chat_message(message))
+        self._update_message_search_index(mapper, message, added_terms=tokenize(message.content))
+        return response
+
+    def update_chat_message(self, message, previous_content=None):
+        """Overwrite an existing chat message in DynamoDB. If the message's
+        content was edited, its previous content is needed to update the
+        chat's message search index.
+        """
+        mapper, _ = self._chat_message_mappers(message.message_type)
+        # The message is updated rather than replaced so that its reaction
+        # counters are left as they are
+        response = self._dynamodb_client.update_item(
+            *self._serialize_update(
+                mapper, message, self._chat_message_index_attributes(message)
+            )
+        )
+        if previous_content is not None and previous_content != message.content:
+            previous_terms = tokenize(previous_content)
+            terms = tokenize(message.content)
+            self._update_message_search_index(
+                mapper, 
+                message, 
+                added_terms=terms - previous_terms, 
+                removed_terms=previous_terms - terms
+            )
         return response
         
     def remove_chat_message(self, message):
-        """Delete a chat message from DynamoDB."""
+        """Delete a chat message from DynamoDB and remove its content
+        from the chat's message search index and its reactions.
+        """
+        mapper, _ = self._chat_message_mappers(message.message_type)
+        primary_key = mapper.key(message.chat_id, message.id)
+        response = self._dynamodb_client.delete_item(primary_key)
+        self._remove_chat_message_references(mapper, message)
+        return response
+
+    def edit_chat_message(self, chat_id, message_type, message_id, sender_id, content):
+        """Edit the content of a chat message sent by the given user and
+        return the edited message. The message's existence and sender are
+        conditions of the update, so an edit costs a single write. Raise a
+        NotFoundException if the message doesn't exist and a
+        NotOwnerException if another user sent it.
+        """
+        mapper, _ = self._chat_message_mappers(message_type)
+        primary_key = self._chat_message_key(mapper, chat_id, message_id)
+        message_item = self._dynamodb_client.update_owned_item(
+            primary_key,
+            {"_content": {"S": content}, "_editted": {"BOOL": True}},
+            "_user_id",
+            sender_id
+        )
+        if not message_item:
+            self._raise_chat_message_write_error(primary_key)
+        message = mapper.deserialize_to_model(message_item)
+        previous_terms = tokenize(message.content)
+        message.edit(content)
+        terms = tokenize(content)
+        self._update_message_search_index(
+            mapper,
+            message,
+            added_terms=terms - previous_terms,
+            removed_terms=previous_terms - terms
+        )
+        return message
+
+    def delete_chat_message(self, chat_id, message_type, message_id, sender_id):
+        """Delete a chat message sent by the given user and return it. The
+        message's existence and sender are conditions of the delete, so it
+        costs a single write. Raise a NotFoundException if the message
+        doesn't exist and a NotOwnerException if another user sent it.
+        """
+        mapper, _ = self._chat_message_mappers(message_type)
+        primary_key = self._chat_message_key(mapper, chat_id, message_id)
+        message_item = self._dynamodb_client.delete_owned_item(
+            primary_key, "_user_id", sender_id
+        )
+        if not message_item:
+            self._raise_chat_message_write_error(primary_key)
+        message = mapper.deserialize_to_model(message_item)
+        self._remove_chat_message_references(mapper, message)
+        return message
+
+    def get_chat_message_reaction(self, message_id, user_id):
+        """Return a user's reaction to a chat message, or None if the user
+        hasn't reacted to it.
+        """
+        primary_key = self._reaction_mapper.key(message_id, user_id)
+        reaction_item = self._dynamodb_client.get_item(primary_key)
+        if not reaction_item:
+            return None
+        return self._reaction_mapper.deserialize_to_model(reaction_item)
+
+    def add_chat_message_reaction(self, chat_id, message_type, reaction):
+        """Add a user's reaction to a chat message, replacing the user's
+        previous reaction to it. The reaction item is written and the
+        message's counter of the reaction's type is incremented in a single
+        transaction, without reading the message. Return the user's
+        reaction and raise a NotFoundException if the message doesn't exist.
+        """
+        mapper, _ = self._chat_message_mappers(message_type)
+        message_key = self._chat_message_key(mapper, chat_id, reaction.message_id)
+        reaction_item = self._reaction_mapper.serialize_from_model(reaction)
+        counter = mapper.reaction_count_attribute(reaction.reaction_type)
+        response = self._dynamodb_client.add_message_reaction(
+            message_key, reaction_item, counter
+        )
+        if response.get("item"):
+            previous_reaction = self._reaction_mapper.deserialize_to_model(response["item"])
+            if previous_reaction.reaction_type == reaction.reaction_type:
+                return previous_reaction
+            replaced_reaction = (
+                response["item"]["reaction_type"],
+                mapper.reaction_count_attribute(previous_reaction.reaction_type),
+            )
+            response = self._dynamodb_client.add_message_reaction(
+                message_key, reaction_item, counter, replaced_reaction
+            )
+        if "error" in response:
+            if response["error_type"] == ErrorType.NOT_FOUND:
+                raise NotFoundException(response["error"])
+            raise DatabaseException(response["error"])
+        return reaction
+
+    def remove_chat_message_reaction(self, chat_id, message_type, message_id, user_id):
+        """Remove a user's reaction to a chat message. The reaction item is
+        deleted and the message's counter of the reaction's type is
+        decremented in a single transaction. Return the removed reaction,
+        or None if the user hasn't reacted to the message, and raise a
+        NotFoundException if the message doesn't exist.
+        """
+        mapper, _ = self._chat_message_mappers(message_type)
+        message_key = self._chat_message_key(mapper, chat_id, message_id)
+        primary_key = self._reaction_mapper.key(message_id, user_id)
+        reaction_item = self._dynamodb_client.get_item(primary_key)
+        if not reaction_item:
+            return None
+        reaction = self._reaction_mapper.deserialize_to_model(reaction_item)
+        response = self._dynamodb_client.remove_message_reaction(
+            primary_key,
+            message_key,
+            reaction_item["reaction_type"],
+            mapper.reaction_count_attribute(reaction.reaction_type),
+        )
+        if "error" in response:
+            if "item" in response and not response["item"]:
+                # The reaction was removed since it was read
+                return None
+            if response["error_type"] == ErrorType.NOT_FOUND:
+                raise NotFoundException(response["error"])
+            raise DatabaseException(response["error"])
+        return reaction
+
+    def search_chat_messages(self, chat_id, message_type, query, limit, cursor=None):
+        """Return a page of a chat's messages that contain every term in
+        the query, newest first. Only the postings of the query's terms and
+        the matching messages are read.
+        """
+        mapper, _ = self._chat_message_mappers(message_type)
+        terms = sorted(tokenize(query))
+        cursor_context = "search_chat_messages:" + chat_id + ":" + " ".join(terms)
+        cursor = decode_cursor(cursor, cursor_context) if cursor else {}
+        before = cursor.get("before")
+        message_ids = []
+        has_next = False
+        start_key = {}
+        if before and terms:
+            # Sorts right after the bucket of the last returned message,
+            # so reading buckets newest first starts with that bucket
+            start_key = postings_key(chat_id, terms[0], mapper.bucket(before) + "~")
+        while terms:
+            results = self._dynamodb_client.query(
+                self.SEARCH_BUCKETS_PER_READ,
+                start_key,
+                {
+                    "pk_name": "PK",
+                    "pk_value": postings_key(chat_id, terms[0], "")["PK"],
+                },
+                scan_forward=False
+            )
+            postings_items = results["Items"]
+            other_postings = self._get_other_postings(chat_id, terms[1:], postings_items)
+            for position, item in enumerate(postings_items):
+                bucket = item["SK"]["S"][len(PrimaryKeyPrefix.MESSAGE_BUCKET):]
+                postings = set(item.get("postings", {}).get("BS", []))
+                for term in terms[1:]:
+                    postings &= other_postings.get((term, bucket), set())
+                bucket_message_ids = sorted(
+                    (decode_message_id(posting) for posting in postings), reverse=True
+                )
+                if before:
+                    bucket_message_ids = [
+                        message_id for message_id in bucket_message_ids if message_id < before
+                    ]
+                message_ids.extend(bucket_message_ids)
+                if len(message_ids) >= limit:
+                    has_next = (
+                        len(message_ids) > limit
+                        or position < len(postings_items) - 1
+                        or results["LastEvaluatedKey"] is not None
+                    )
+                    break
+            start_key = results["LastEvaluatedKey"]
+            if len(message_ids) >= limit or not start_key:
+                break
+
+        message_ids = message_ids[:limit]
+        message_items = self._batch_get_items(
+            [mapper.key(chat_id, message_id) for message_id in message_ids]
+        )
+        models = sorted(
+            (mapper.deserialize_to_model(item) for item in message_items),
+            key=lambda message: message.id,
+            reverse=True
+        )
+        next_cursor = {"before": message_ids[-1]} if has_next else {}
+        return {
+            "models": models,
+            "next": encode_cursor(next_cursor, cursor_context),
+            "has_next": has_next,
+            "total": len(models),
+        }
+
+    def _get_other_postings(self, chat_id, terms, postings_items):
+        """Return the postings of the other terms of a search in the
+        buckets of the given postings items, by term and bucket.
+        """
+        buckets = [
+            item["SK"]["S"][len(PrimaryKeyPrefix.MESSAGE_BUCKET):] for item in postings_items
+        ]
+        keys = [postings_key(chat_id, term, bucket) for term in terms for bucket in buckets]
+        other_postings = {}
+        for item in self._batch_get_items(keys):
+            term = item["PK"]["S"].rpartition("#")[2]
+            bucket = item["SK"]["S"][len(PrimaryKeyPrefix.MESSAGE_BUCKET):]
+            other_postings[(term, bucket)] = set(item.get("postings", {}).get("BS", []))
+        return other_postings
+
+    def _batch_get_items(self, keys):
+        """Return the items with the given keys, in no particular order.
+        Raise a DatabaseException if some of the items couldn't be read.
+        """
+        results = self._dynamodb_client.batch_get_items(keys)
+        if results.get("UnprocessedKeys"):
+            raise DatabaseException("Could not read every item")
+        return results["Responses"][self._table_name]
+
+    def _update_message_search_index(self, mapper, message, added_terms=(), removed_terms=()):
+        """Add the message to the postings of the added terms and remove
+        it from the postings of the removed terms.
+        """
+        bucket = mapper.bucket(message.id)
+        posting = encode_message_id(message.id)
+        updates = [
+            (postings_key(message.chat_id, term, bucket), "ADD", [posting])
+            for term in added_terms
+        ]
+        updates.extend(
+            (postings_key(message.chat_id, term, bucket), "DELETE", [posting])
+            for term in removed_terms
+        )
+        if updates:
+            self._dynamodb_client.update_message_postings(updates, MAX_POSTINGS_PER_ITEM)
+
+    def _chat_message_mappers(self, message_type):
+        """Return the message mapper and the message bucket mapper
+        of the given type of chat.
+        """
+        if message_type == MessageType.PRIVATE_CHAT:
+            return self._private_chat_message_mapper, self._private_chat_message_bucket_mapper
+        return self._group_chat_message_mapper, self._group_chat_message_bucket_mapper
+
+    def _serialize_chat_message(self, message):
+        """Return the item of a chat message, including the attributes
+        that place it in the users index.
+        """
+        mapper, _ = self._chat_message_mappers(message.message_type)
+        return mapper.serialize_from_model(
+            message, additional_attributes=self._chat_message_index_attributes(message)
+        )
+
+    def _chat_message_index_attributes(self, message):
+        """Return the attributes that place a chat message item in the
+        users index.
+        """
         if message.message_type == MessageType.PRIVATE_CHAT:
-            mapper = self._private_chat_message_mapper
+            gsi_sort_key = PrimaryKeyPrefix.PRIVATE_CHAT_MESSAGE + message.id
         else:
-            mapper = self._group_chat_message_mapper
-        primary_key = mapper.key(message.chat_id, message.id)
-        return self._dynamodb_client.delete_item(primary_key)
+            gsi_sort_key = PrimaryKeyPrefix.GROUP_CHAT_MESSAGE + message.id
+        return {
+            "USERS_GSI_PK": PrimaryKeyPrefix.USER + message.user_id,
+            "USERS_GSI_SK": gsi_sort_key,
+        }
+
+    def _remove_chat_message_references(self, mapper, message):
+        """Remove a deleted chat message's content from the chat's message
+        search index and delete its reactions.
+        """
+        self._update_message_search_index(
+            mapper, message, removed_terms=tokenize(message.content)
+        )
+        if message.has_reactions():
+            self._remove_chat_message_reactions(message.id)
+
+    @staticmethod
+    def _chat_message_key(mapper, chat_id, message_id):
+        """Return the primary key of a chat message. Message ids sent by
+        clients are only trusted to name a bucket if they begin with a
+        date, so raise a NotFoundException for ids that don't.
+        """
+        try:
+            if message_id:
+                return mapper.key(chat_id, message_id)
+        except ValueError:
+            pass
+        raise NotFoundException("Chat message not found")
+
+    def _raise_chat_message_write_error(self, primary_key):
+        """Raise the error that explains why a conditional write to a chat
+        message failed. The message is only read once a write has failed.
+        """
+        if not self._dynamodb_client.get_item(primary_key):
+            raise NotFoundException("Chat message not found")
+        raise NotOwnerException("User is not the sender of this message")
+
+    def _remove_chat_message_reactions(self, message_id):
+        """Delete every reaction item of a chat message, a page at a time."""
+        start_key = {}
+        while True:
+            results = self._dynamodb_client.query(
+                self.REACTIONS_PER_DELETE,
+                start_key,
+                {
+                    "pk_name": "PK",
+                    "pk_value": self._reaction_mapper.key(message_id)["PK"],
+                }
+            )
+            if results["Items"]:
+                self._dynamodb_client.batch_write_items([
+                    ("DeleteRequest", {"PK": item["PK"], "SK": item["SK"]})
+                    for item in results["Items"]
+                ])
+            start_key = results["LastEvaluatedKey"]
+            if not start_key:
+                break
     
+    def _add_message_bucket(self, bucket_mapper, message_bucket):
+        """Add a bucket to a chat's message bucket directory if it
+        isn't already known to exist.
+        """
+        primary_key = bucket_mapper.key(message_bucket.chat_id, message_bucket.bucket)
+        cache_key = primary_key["PK"]["S"] + primary_key["SK"]["S"]
+        if cache_key in self._known_message_buckets:
+            self._known_message_buckets.move_to_end(cache_key)
+            return
+        bucket_item = bucket_mapper.serialize_from_model(message_bucket)
+        # Concurrent writers may race to create the same bucket, which is
+        # harmless since the item contents only depend on its key
+        self._dynamodb_client.put_item(bucket_item)
+        self._known_message_buckets[cache_key] = True
+        if len(self._known_message_buckets) > self.MAX_KNOWN_MESSAGE_BUCKETS:
+            self._known_message_buckets.popitem(last=False)
+
+    def _get_message_bucket(self, chat_id, bucket_mapper, before=None):
+        """Return the newest bucket in a chat's message bucket directory,
+        or the newest bucket older than the given bucket. Return None if
+        there is no such bucket.
+        """
+        start_key = {}
+        if before:
+            start_key = bucket_mapper.key(chat_id, before)
+        query_results = self._dynamodb_client.query(
+            1,
+            start_key,
+            {
+                "pk_name": "PK",
+                "pk_value": bucket_mapper.key(chat_id)["PK"],
+                "sk_name": "SK",
+                "sk_value": {"S": PrimaryKeyPrefix.MESSAGE_BUCKET}
+            },
+            scan_forward=False
+        )
+        if not query_results["Items"]:
+            return None
+        return query_results["Items"][0]["bucket"]["S"]
+
+    def _get_chat_messages(
+        self, 
+        chat_id, 
+        limit, 
+        mapper, 
+        bucket_mapper, 
+        sort_key_prefix, 
+        item_type, 
+        cursor=None, 
+        schema=None
+    ):
+        """Return a page of a chat's messages, newest first. Pages are filled
+        from the bucket the cursor points to and continue into older buckets
+        until the page is full or the chat's history is exhausted. If a
+        schema class is given, the messages are returned already dumped.
+        """
+        cursor_context = "get_chat_messages:" + sort_key_prefix + chat_id
+        cursor = decode_cursor(cursor, cursor_context) if cursor else {}
+        bucket = cursor.get("bucket") or self._get_message_bucket(chat_id, bucket_mapper)
+        start_key = cursor.get("start_key", {})
+        items = []
+        while bucket and len(items) < limit:
+            query_results = self._dynamodb_client.query(
+                limit - len(items),
+                start_key,
+                {
+                    "pk_name": "PK", 
+                    "pk_value": mapper.bucket_key(chat_id, bucket)["PK"], 
+                    "sk_name": "SK",
+                    "sk_value": {"S": sort_key_prefix},
+                },
+                scan_forward=False,
+                item_type=item_type
+            )
+            items.extend(query_results["Items"])
+            if query_results["LastEvaluatedKey"]:
+                start_key = query_results["LastEvaluatedKey"]
+            else:
+                bucket = self._get_message_bucket(chat_id, bucket_mapper, before=bucket)
+                start_key = {}
+        next_cursor = None
+        if bucket:
+            next_cursor = {"bucket": bucket, "start_key": start_key}
+        return self._process_query_or_scan_results(
+            {"Items": items, "LastEvaluatedKey": next_cursor}, 
+            mapper, 
+            item_type, 
+            cursor_context=cursor_context,
+            schema=schema
+        )
+
     def get_group_chat(self, community_id, group_chat_id):
         """Return a group chat model."""
         primary_key = self._group_chat_mapper.key(community_id, group_chat_id)
@@ -881,18 +1600,26 @@ class _DynamoDBRepository(AbstractDatabaseRepository):
             "chat_member": chat_member_item,
             "group_chat": group_chat_item
         }
-        keys = {"community_membership_key": community_membership_key}
+        keys = {
+            "community_membership_key": community_membership_key,
+            "community_key": self._community_mapper.key(community_id, community_id)
+        }
         response = self._dynamodb_client.create_group_chat(keys, items)
         if "error" in response:
+            if response["error_type"] == ErrorType.NOT_FOUND:
+                raise NotFoundException(response["error"])
             raise DatabaseException(response["error"])
 
     def update_group_chat(self, group_chat, updated_group_chat_data):
         """Update group chat attributes."""
+        old_group_chat_item = self._group_chat_mapper.serialize_from_model(group_chat)
         for attribute in updated_group_chat_data:
             setattr(group_chat, attribute, updated_group_chat_data[attribute])
-        group_chat_item = self._group_chat_mapper.serialize_from_model(group_chat)
-        response = self._dynamodb_client.put_item(group_chat_item)
-        return response
+        return self._write_update(
+            *self._serialize_update(
+                self._group_chat_mapper, group_chat, old_item=old_group_chat_item
+            )
+        )
 
     def get_group_chat_member(self, group_chat_id, user_id):
         """Return a user who is a member of the given group chat."""
@@ -902,8 +1629,10 @@ class _DynamoDBRepository(AbstractDatabaseRepository):
             return None
         return self.get_user(item["user_id"]["S"])
     
-    def add_group_chat_member(self, community_id, group_chat_id, user_id):
-        """Add a new user to a group chat."""
+    def add_group_chat_member(self, community_id, group_chat_id, user_id, capacity=None):
+        """Add a new user to a group chat. If a capacity is given, the user
+        is only added if the group chat has fewer members than the capacity.
+        """
         membership_additional_attributes={
             "INVERTED_GSI_PK": PrimaryKeyPrefix.USER + user_id,
             "INVERTED_GSI_SK": PrimaryKeyPrefix.GROUP_CHAT + group_chat_id
@@ -917,66 +1646,60 @@ class _DynamoDBRepository(AbstractDatabaseRepository):
             "user_key": self._user_mapper.key(user_id, user_id),
             "community_membership_key": self._community_membership_mapper.key(community_id, user_id)
         }
-        response = self._dynamodb_client.add_group_chat_member(keys, item)
+        response = self._dynamodb_client.add_group_chat_member(keys, item, capacity)
         if "error" in response:
             if response["error_type"] == ErrorType.UNIQUE_CONSTRAINT:
                 raise UniqueConstraintException(response["error"])
             elif response["error_type"] == ErrorType.NOT_FOUND:
                 raise NotFoundException(response["error"])
+            elif response["error_type"] == ErrorType.CAPACITY_EXCEEDED:
+                raise CapacityExceededException(response["error"])
             else:
                 raise DatabaseException(response["error"])
         return True
     
     def remove_group_chat_member(self, group_chat_id, user_id):
-        """Remove a GroupChatMember item from DynamoDB."""
+        """Remove a GroupChatMember item from DynamoDB and decrement the
+        group chat's member count in the same transaction. The membership is
+        read first since the group chat's key includes its community's id.
+        """
         primary_key = self._group_chat_membership_mapper.key(group_chat_id, user_id)
-        if not self._dynamodb_client.delete_item(primary_key):
+        membership_item = self._dynamodb_client.get_item(primary_key)
+        if not membership_item:
             raise NotFoundException("User is not a member of the given group chat")
+        keys = {
+            "group_chat_membership_key": primary_key,
+            "group_chat_key": self._group_chat_mapper.key(
+                membership_item["community_id"]["S"], group_chat_id
+            ),
+        }
+        response = self._dynamodb_client.remove_group_chat_member(keys)
+        if "error" in response:
+            raise NotFoundException(response["error"])
+        return True
 
     def get_group_chat_messages(self, community_id, group_chat_id, limit, **kwargs):
-        """Return a collection of group chat messages."""
-        cursor = {}
-        if kwargs.get("cursor"):
-            cursor = decode_cursor(kwargs["cursor"])
-        group_chat = self.get_group_chat(community_id, group_chat_id)
-        if not group_chat:
-            raise NotFoundException("Group chat not found")
-        primary_key = self._group_chat_mapper.key(community_id, group_chat_id)
-        query_results = self._dynamodb_client.query(
+        """Return a collection of group chat messages. Callers check that
+        the user is a member of the group chat, which implies that it exists.
+        """
+        return self._get_chat_messages(
+            group_chat_id,
             limit,
-            cursor,
-            {
-                "pk_name": "PK", 
-                "pk_value": primary_key["SK"], 
-                "sk_name": "SK",
-                "sk_value": {"S": PrimaryKeyPrefix.GROUP_CHAT_MESSAGE},
-            },
-            scan_forward=False
+            self._group_chat_message_mapper,
+            self._group_chat_message_bucket_mapper,
+            PrimaryKeyPrefix.GROUP_CHAT_MESSAGE,
+            ItemType.GROUP_CHAT_MESSAGE.name,
+            kwargs.get("cursor"),
+            kwargs.get("schema")
         )
-        if not query_results["Items"]:
-            response = {
-                "models": [],
-                "total": 0
-            }
-        else:
-            response = self._process_query_or_scan_results(
-                query_results, 
-                self._group_chat_message_mapper, 
-                ItemType.GROUP_CHAT_MESSAGE.name
-            )
-        response["has_next"] = query_results["LastEvaluatedKey"] is not None
-        response["next"] = encode_cursor(query_results["LastEvaluatedKey"] or {})
-        return response
     
     def get_user_group_chats(self, user_id, limit, **kwargs):
         """Return a collection of a user's group chats."""
-        user = self.get_user(user_id)
-        if not user:
-            raise NotFoundException("User not found")
+        cursor_context = "get_user_group_chats:" + user_id
         cursor = {}
         if kwargs.get("cursor"):
-            cursor = decode_cursor(kwargs["cursor"])
-        primary_key = self._user_mapper.key(user_id)
+            cursor = decode_cursor(kwargs["cursor"], cursor_context)
+        primary_key = self._user_mapper.key(user_id, user_id)
         query_results = self._dynamodb_client.query(
             limit,
             cursor,
@@ -989,6 +1712,7 @@ class _DynamoDBRepository(AbstractDatabaseRepository):
             index="InvertedIndex"
         )
         if not query_results["Items"]:
+            self._get_list_parent(primary_key, "User not found")
             response = {"total": 0, "models": []}
         else:
             group_chat_keys = [
@@ -1000,18 +1724,16 @@ class _DynamoDBRepository(AbstractDatabaseRepository):
                 batch_results, self._group_chat_mapper, ItemType.GROUP_CHAT.name
             )
         response["has_next"] = query_results["LastEvaluatedKey"] is not None
-        response["next"] = encode_cursor(query_results["LastEvaluatedKey"] or {})
+        response["next"] = encode_cursor(query_results["LastEvaluatedKey"] or {}, cursor_context)
         return response
 
     def get_group_chat_members(self, community_id, group_chat_id, limit, **kwargs):
         """Return a collection of users who are in the given group chat."""
-        primary_key = self._group_chat_mapper.key(community_id, group_chat_id)
-        group_chat_item = self._dynamodb_client.get_item(primary_key)
-        if not group_chat_item:
-            raise NotFoundException("Group chat not found")
+        cursor_context = "get_group_chat_members:" + group_chat_id
         cursor = {}
         if kwargs.get("cursor"):
-            cursor = decode_cursor(kwargs["cursor"])
+            cursor = decode_cursor(kwargs["cursor"], cursor_context)
+        primary_key = self._group_chat_mapper.key(community_id, group_chat_id)
         query_results = self._dynamodb_client.query(
             limit,
             cursor,
@@ -1023,31 +1745,37 @@ class _DynamoDBRepository(AbstractDatabaseRepository):
             }
         )
         if not query_results["Items"]:
-            response = {"total": 0, "models": []}
+            group_chat_item = self._get_list_parent(
+                primary_key, "Group chat not found", attributes=["_member_count"]
+            )
+            response = {"models": []}
         else:
+            # The group chat is read in the same batch as its members
             user_keys = [
                 self._user_mapper.key(item["user_id"]["S"], item["user_id"]["S"])
                 for item in query_results["Items"]
             ]
             
-            batch_results = self._dynamodb_client.batch_get_items(user_keys)
+            batch_results = self._dynamodb_client.batch_get_items(user_keys + [primary_key])
+            group_chat_item = self._pop_batch_parent(
+                batch_results, primary_key, "Group chat not found", attributes=["_member_count"]
+            )
             
             response = self._process_batch_results(
                 batch_results, self._user_mapper, ItemType.USER.name
             )
+        response["total"] = self._counter_value(group_chat_item, "_member_count")
         response["has_next"] = query_results["LastEvaluatedKey"] is not None
-        response["next"] = encode_cursor(query_results["LastEvaluatedKey"] or {})
+        response["next"] = encode_cursor(query_results["LastEvaluatedKey"] or {}, cursor_context)
         return response
 
     def get_community_group_chats(self, community_id, limit, **kwargs):
         """Return a collection of the community's group chats.""" 
+        cursor_context = "get_community_group_chats:" + community_id
         cursor = {}
         if kwargs.get("cursor"):
-            cursor = decode_cursor(kwargs["cursor"])
-        community = self.get_community(community_id)
-        if not community:
-            raise NotFoundException("Community not found")
-        primary_key = self._community_mapper.key(community_id)
+            cursor = decode_cursor(kwargs["cursor"], cursor_context)
+        primary_key = self._community_mapper.key(community_id, community_id)
         query_results = self._dynamodb_client.query(
             limit,
             cursor,
@@ -1056,28 +1784,250 @@ class _DynamoDBRepository(AbstractDatabaseRepository):
                 "pk_value": primary_key["PK"], 
                 "sk_name": "SK",
                 "sk_value": {"S":PrimaryKeyPrefix.GROUP_CHAT},
-            }
+            },
+            item_type=ItemType.GROUP_CHAT.name
         )
+        if not query_results["Items"]:
+            self._get_list_parent(primary_key, "Community not found")
         response = self._process_query_or_scan_results(
-            query_results, self._group_chat_mapper, ItemType.GROUP_CHAT.name
+            query_results, 
+            self._group_chat_mapper, 
+            ItemType.GROUP_CHAT.name,
+            cursor_context=cursor_context
         )
         return response
 
-    def _process_query_or_scan_results(self, results, mapper, item_type):
-        next_cursor = encode_cursor(results["LastEvaluatedKey"] or {})
+    def _serialize_update(self, mapper, model, additional_attributes={}, old_item=None):
+        """Serialize a model for an update that overwrites an existing item.
+        Return the item's key, the attributes to set and the attributes to
+        remove. Counter attributes are left out since they are only ever
+        changed atomically. If the item the model was serialized to before
+        it changed is given, only the attributes that differ from it are
+        set or removed.
+        """
+        item = mapper.serialize_from_model(
+            model, additional_attributes=additional_attributes
+        )
+        key = {"PK": item.pop("PK"), "SK": item.pop("SK")}
+        if old_item is not None:
+            return (key, *mapper.diff(old_item, item))
+        for field in mapper.counter_fields:
+            item.pop(field, None)
+        # Empty collections aren't serialized, so they are removed instead
+        attributes_to_remove = [
+            field for field in mapper.fields 
+            if field not in item and field not in mapper.counter_fields
+        ]
+        return key, item, attributes_to_remove
+
+    def _add_revoked_token(self, token):
+        """Add the revocation of a token to DynamoDB. The sort key orders
+        the revocations of a day by the time they were made.
+        """
+        revoked_token = RevokedToken(
+            token.jti, token.user_id, token.expires_on_date, datetime.now()
+        )
+        revoked_at = revoked_token.revoked_at.isoformat(timespec="microseconds")
+        revoked_token_item = self._revoked_token_mapper.serialize_from_model(
+            revoked_token,
+            partition_key_value=revoked_token.revoked_at.date().isoformat(),
+            sort_key_value=revoked_at + "#" + token.jti
+        )
+        return self._dynamodb_client.put_item(revoked_token_item)
+
+    def _search_directory(self, partition, prefix, limit, mapper, item_type):
+        """Return the models of the first items in a directory partition
+        whose sort keys begin with the lowercased prefix, in a single query.
+        """
+        results = self._dynamodb_client.query(
+            limit,
+            {},
+            {
+                "pk_name": "DIRECTORY_GSI_PK",
+                "pk_value": {"S": partition},
+                "sk_name": "DIRECTORY_GSI_SK",
+                "sk_value": {"S": prefix.lower()},
+            },
+            index="DirectoryIndex",
+        )
         models = [
-            mapper.deserialize_to_model(item) 
+            mapper.deserialize_to_model(item)
             for item in results["Items"]
             if item["type"]["S"] == item_type
         ]
+        return {"models": models, "total": len(models)}
+
+    def _write_update(self, key, item, attributes_to_remove):
+        """Write an update to an existing item, unless nothing changed."""
+        if not item and not attributes_to_remove:
+            return True
+        return self._dynamodb_client.update_item(key, item, attributes_to_remove)
+
+    def _replace_image(self, mapper, model, additional_attributes, old_item, image_type,
+                       not_found_message):
+        """Write a user's or community's new image and return the image of
+        that type the item held right before the write, or None if it had
+        none. Raise NotFoundException if the item doesn't exist.
+        """
+        key, item, attributes_to_remove = self._serialize_update(
+            mapper, model, additional_attributes, old_item=old_item
+        )
+        replaced_item = self._dynamodb_client.replace_item_attributes(
+            key, item, attributes_to_remove
+        )
+        if replaced_item is None:
+            raise NotFoundException(not_found_message)
+        replaced_model = mapper.deserialize_to_model(replaced_item)
+        if image_type in (ImageType.USER_PROFILE_PHOTO, ImageType.COMMUNITY_PROFILE_PHOTO):
+            return replaced_model.avatar
+        return replaced_model.cover_photo
+
+    def _serialize_user(self, user):
+        """Serialize a user to the item it's stored as."""
+        return self._user_mapper.serialize_from_model(
+            user, additional_attributes=self._user_index_attributes(user)
+        )
+
+    def _serialize_community(self, community):
+        """Serialize a community to the item it's stored as."""
+        return self._community_mapper.serialize_from_model(
+            community, additional_attributes=self._community_index_attributes(community)
+        )
+
+    def _user_index_attributes(self, user):
+        """Return the attributes that place a user item in the users
+        index and the user directory, which lists users by username.
+        """
+        return {
+            "USERS_GSI_PK": PrimaryKeyPrefix.USER + user.id,
+            "USERS_GSI_SK": user.username,
+            "DIRECTORY_GSI_PK": DirectoryPartition.USERS,
+            "DIRECTORY_GSI_SK": directory_sort_key(user.username, user.id),
+        }
+
+    def _community_index_attributes(self, community):
+        """Return the attributes that place a community item in the
+        communities by topic and by location indexes and the community
+        directory, which lists communities by name. Communities with
+        coordinates are also placed in the geohash index, which is
+        partitioned by the coarse geohash cell they are in.
+        """
+        attributes = {
+            "COMMUNITIES_BY_TOPIC_GSI_PK": PrimaryKeyPrefix.TOPIC + community.topic.name,
+            "COMMUNITIES_BY_TOPIC_GSI_SK": PrimaryKeyPrefix.COMMUNITY + community.id,
+            "COMMUNITIES_BY_LOCATION_GSI_PK": PrimaryKeyPrefix.COUNTRY
+            + community.location.country,
+            "COMMUNITIES_BY_LOCATION_GSI_SK": (
+                PrimaryKeyPrefix.STATE
+                + community.location.state
+                + PrimaryKeyPrefix.CITY
+                + community.location.city
+            ),
+            "DIRECTORY_GSI_PK": DirectoryPartition.COMMUNITIES,
+            "DIRECTORY_GSI_SK": directory_sort_key(community.name, community.id),
+        }
+        if community.location.latitude is not None:
+            community_geohash = geohash.encode(
+                community.location.latitude, community.location.longitude
+            )
+            attributes["GEOHASH_GSI_PK"] = (
+                PrimaryKeyPrefix.GEOHASH + community_geohash[:geohash.PARTITION_PRECISION]
+            )
+            attributes["GEOHASH_GSI_SK"] = community_geohash
+        return attributes
+
+    def _process_query_or_scan_results(
+        self, results, mapper, item_type, cursor_context="", schema=None
+    ):
+        """Return a page of the models the items of the given type map to.
+        If a schema class is given, the items are transcoded straight to the
+        data the schema would dump for their models instead.
+        """
+        next_cursor = encode_cursor(results["LastEvaluatedKey"] or {}, cursor_context)
+        items = [item for item in results["Items"] if item["type"]["S"] == item_type]
         response = {
-            "models": models,
             "next": next_cursor,
             "has_next": results["LastEvaluatedKey"] is not None,
-            "total": len(models),
+            "total": len(items),
         }
+        if schema is None:
+            response["models"] = [mapper.deserialize_to_model(item) for item in items]
+        else:
+            response["serialized_models"] = self._item_transcoder(
+                mapper, schema
+            ).transcode_many(items)
         return response
 
+    def _item_transcoder(self, mapper, schema):
+        """Return the transcoder that dumps the mapper's items with the
+        given schema class, creating it the first time it's needed.
+        """
+        key = (mapper, schema)
+        if key not in self._item_transcoders:
+            post_dump_hooks = {}
+            if mapper in (self._private_chat_message_mapper, self._group_chat_message_mapper):
+                post_dump_hooks["inject_extra_fields"] = functools.partial(
+                    self._dump_reaction_counts, mapper
+                )
+            self._item_transcoders[key] = ItemTranscoder(mapper, schema(), post_dump_hooks)
+        return self._item_transcoders[key]
+
+    @staticmethod
+    def _dump_reaction_counts(mapper, data, item):
+        """Add the reaction counts of a transcoded message, as the message
+        schema adds them to a dumped message.
+        """
+        data["reaction_counts"] = {
+            reaction_type.name: count
+            for reaction_type, count in mapper.reaction_counts(item).items()
+        }
+
+    def _get_list_parent(self, key, error_message, attributes=()):
+        """Return the item a list of items belongs to with only its key and
+        the given attributes. Lists are queried before their parent is read,
+        so this is only needed to tell an empty page of a list apart from a
+        list whose parent doesn't exist.
+        """
+        item = self._dynamodb_client.get_item(key, attributes=["PK", *attributes])
+        if not item:
+            raise NotFoundException(error_message)
+        return item
+
+    def _pop_batch_item(self, results, key):
+        """Remove the item with the given key from the results of a batch get
+        and return it, or None if it wasn't found.
+        """
+        items = results["Responses"][self._table_name]
+        for index, item in enumerate(items):
+            if all(item.get(name) == value for name, value in key.items()):
+                return items.pop(index)
+        return None
+
+    def _pop_batch_parent(self, results, key, error_message, attributes=()):
+        """Remove the item a list of items belongs to from the results of
+        the batch get its page was read with and return it. If the batch
+        get couldn't read the item, it's read on its own, so it's only
+        reported as missing if that read confirms it.
+        """
+        item = self._pop_batch_item(results, key)
+        if item is None and self._is_unprocessed(results, key):
+            item = self._get_list_parent(key, error_message, attributes)
+        return item
+
+    def _is_unprocessed(self, results, key):
+        """Return whether a key was left unprocessed by a batch get."""
+        unprocessed_keys = results.get("UnprocessedKeys", {}).get(self._table_name, {})
+        return key in unprocessed_keys.get("Keys", [])
+
+    @staticmethod
+    def _counter_value(item, attribute):
+        """Return the value of a counter attribute of an item, which is 0 if
+        the item or the attribute doesn't exist.
+        """
+        if not item or attribute not in item:
+            return 0
+        return int(item[attribute]["N"])
+
     def _process_batch_results(self, results, mapper, item_type):
         models = [
             mapper.deserialize_to_model(item) 
@@ -1120,6 +2070,11 @@ database_repository = _DynamoDBRepository(
     group_chat_message_mapper=GroupChatMessageMapper(),
     group_chat_membership_mapper=GroupChatMembershipMapper(),
     group_chat_mapper=GroupChatMapper(),
-    token_mapper=TokenMapper()
+    token_mapper=TokenMapper(),
+    revoked_token_mapper=RevokedTokenMapper(),
+    image_blob_mapper=ImageBlobMapper(),
+    private_chat_message_bucket_mapper=PrivateChatMessageBucketMapper(),
+    group_chat_message_bucket_mapper=GroupChatMessageBucketMapper(),
+    reaction_mapper=ReactionMapper(),
 )
 
@@ -13,4 +13,22 @@ class UniqueConstraintException(DatabaseException):
     """
     
 class NotFoundException(DatabaseException):
-    """Raised when an item could not be found in the database."""
\ No newline at end of file
+    """Raised when an item could not be found in the database."""
+
+
+class NotOwnerException(DatabaseException):
+    """Raised when a user tries to change an item that belongs
+    to another user.
+    """
+
+
+class CapacityExceededException(DatabaseException):
+    """Raised when adding an item would take a collection
+    above its capacity.
+    """
+
+
+class InvalidCursorException(DatabaseException):
+    """Raised when a pagination cursor is malformed or its
+    signature doesn't match the query it is used with.
+    """
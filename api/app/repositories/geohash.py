@@ -0,0 +1,130 @@
+"""This module contains functions for encoding coordinates as geohashes
+and finding the geohash cells that cover a circle on the earth's surface.
+
+A geohash interleaves the bits of a point's longitude and latitude and
+encodes them in base 32, so the longer a geohash the smaller the cell it
+names and every cell's geohash begins with the geohash of the cell that
+contains it. That lets an index sorted by geohash answer "every point in
+this cell" with a single begins_with query.
+"""
+
+
+import math
+
+
+# Precision of the geohashes stored for communities
+STORED_PRECISION = 9
+# Precision of the cells that partition the geohash index. Each cell is
+# roughly 156 km across at the equator.
+PARTITION_PRECISION = 3
+# Most cells a search area is covered by. Close to the poles, where cells
+# are narrowest, larger areas can't be searched.
+MAX_COVERING_CELLS = 32
+EARTH_RADIUS_KM = 6371.0088
+_KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def encode(latitude, longitude, precision=STORED_PRECISION):
+    """Return the geohash of the cell of the given precision that
+    contains the point.
+    """
+    latitude_range = [-90.0, 90.0]
+    longitude_range = [-180.0, 180.0]
+    characters = []
+    bits = 0
+    num_bits = 0
+    is_longitude_bit = True
+    while len(characters) < precision:
+        value, value_range = (
+            (longitude, longitude_range) if is_longitude_bit else (latitude, latitude_range)
+        )
+        middle = (value_range[0] + value_range[1]) / 2
+        bits <<= 1
+        if value >= middle:
+            bits |= 1
+            value_range[0] = middle
+        else:
+            value_range[1] = middle
+        is_longitude_bit = not is_longitude_bit
+        num_bits += 1
+        if num_bits == 5:
+            characters.append(_BASE32[bits])
+            bits = 0
+            num_bits = 0
+    return "".join(characters)
+
+
+def cell_size(precision):
+    """Return the height and width in degrees of the geohash cells of
+    the given precision.
+    """
+    num_bits = 5 * precision
+    latitude_bits = num_bits // 2
+    longitude_bits = num_bits - latitude_bits
+    return 180.0 / 2 ** latitude_bits, 360.0 / 2 ** longitude_bits
+
+
+def distance_km(latitude1, longitude1, latitude2, longitude2):
+    """Return the great circle distance between two points in kilometers
+    using the haversine formula.
+    """
+    phi1 = math.radians(latitude1)
+    phi2 = math.radians(latitude2)
+    delta_phi = phi2 - phi1
+    delta_lambda = math.radians(longitude2 - longitude1)
+    a = (
+        math.sin(delta_phi / 2) ** 2
+        + math.cos(phi1) * math.cos(phi2) * math.sin(delta_lambda / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def covering_cells(latitude, longitude, radius_km):
+    """Return the geohashes of the cells that cover every point within
+    the radius of the given point.
+
+    The cells are the finest, no finer than the stored geohashes and no
+    coarser than the index partitions, that are at least as tall and as
+    wide as the radius, so the circle's bounding box overlaps at most
+    three rows and three columns of them. Close to the poles, where even
+    partition cells are narrower than the radius, more columns are needed.
+    Raise a ValueError if more than MAX_COVERING_CELLS cells are needed.
+    """
+    latitude_delta = radius_km / _KM_PER_DEGREE
+    south = max(-90.0, latitude - latitude_delta)
+    north = min(90.0, latitude + latitude_delta)
+    # Cells are narrowest at the edge of the box closest to a pole
+    widest_latitude = min(89.9, max(abs(south), abs(north)))
+    km_per_longitude_degree = _KM_PER_DEGREE * math.cos(math.radians(widest_latitude))
+    longitude_delta = min(180.0, radius_km / km_per_longitude_degree)
+
+    precision = PARTITION_PRECISION
+    for candidate in range(STORED_PRECISION, PARTITION_PRECISION - 1, -1):
+        height, width = cell_size(candidate)
+        if (
+            height * _KM_PER_DEGREE >= radius_km
+            and width * km_per_longitude_degree >= radius_km
+        ):
+            precision = candidate
+            break
+    height, width = cell_size(precision)
+    num_columns = round(360.0 / width)
+    first_row = math.floor((south + 90.0) / height)
+    last_row = min(math.floor((north + 90.0) / height), round(180.0 / height) - 1)
+    first_column = math.floor((longitude - longitude_delta + 180.0) / width)
+    last_column = math.floor((longitude + longitude_delta + 180.0) / width)
+    last_column = min(last_column, first_column + num_columns - 1)
+    if (last_row - first_row + 1) * (last_column - first_column + 1) > MAX_COVERING_CELLS:
+        raise ValueError("The search area is covered by too many cells")
+
+    cells = []
+    for row in range(first_row, last_row + 1):
+        cell_latitude = -90.0 + (row + 0.5) * height
+        for column in range(first_column, last_column + 1):
+            # Columns past the antimeridian wrap around to the other side
+            cell_longitude = -180.0 + (column % num_columns + 0.5) * width
+            cell = encode(cell_latitude, cell_longitude, precision)
+            if cell not in cells:
+                cells.append(cell)
+    return cells
@@ -0,0 +1,219 @@
+"""This module contains a class that turns DynamoDB items straight into the
+data a marshmallow schema dumps for the models the items map to. Read-only
+collections such as message history are dumped this way, since building
+the models is most of the cost of serializing them.
+"""
+
+
+import inspect
+import re
+from flask_marshmallow.fields import URLFor
+from marshmallow import fields, missing
+from marshmallow.decorators import PRE_DUMP, POST_DUMP
+from app.schemas.enum_field import EnumField
+from app.schemas.url_for_field import CachedURLFor
+
+
+# The datetime, date and time formats of mappers that don't set their own
+DEFAULT_FORMATS = ("%Y-%m-%dT%H:%M:%S.%f", "%Y-%m-%d", "%H:%M:%S.%f")
+
+# Mappers try to parse every string attribute as a datetime, date or time,
+# so strings that could match their default formats are deserialized by
+# the mapper to keep the output identical
+_DATE_OR_TIME_PATTERN = re.compile(
+    r"\d{4}-\d{1,2}-[ \d]?\d(t\d{1,2}:\d{1,2}:\d{1,2}\.\d{1,6})?"
+    r"|\d{1,2}:\d{1,2}:\d{1,2}\.\d{1,6}",
+    re.IGNORECASE
+)
+# Datetimes the mappers wrote with their default format, which only
+# differ from their ISO format when the microseconds are 0
+_DATETIME_PATTERN = re.compile(r"\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d\.\d{6}")
+
+
+class _SlowPath(Exception):
+    """Exception raised when an item can't be transcoded and has to be
+    deserialized to a model and dumped instead.
+    """
+
+    pass
+
+
+class ItemTranscoder:
+    """Class that dumps DynamoDB items the way a schema dumps the models a
+    mapper deserializes them to, without building the models. Each of the
+    schema's fields is planned once from the mapper's options and the
+    field's type. Values the plan doesn't cover, such as strings the mapper
+    would parse as dates, go through the mapper and the schema field, and
+    items that can't be transcoded at all are deserialized and dumped.
+
+    Post dump hooks of the schema need the model, so a function that adds
+    the hook's data to the dumped data given the item must be given for
+    each of them.
+    """
+
+    def __init__(self, mapper, schema, post_dump_hooks=None):
+        self._mapper = mapper
+        self._schema = schema
+        self._post_dump_hooks = list((post_dump_hooks or {}).values())
+        options = mapper._options
+        self._check_supported(mapper, schema, post_dump_hooks or {})
+        self._uses_default_formats = (
+            options.datetime_format, options.date_format, options.time_format
+        ) == DEFAULT_FORMATS
+        self._mapper_fields = set(options.fields)
+        self._model_parameters = inspect.signature(options.model).parameters
+        self._plan = []
+        self._url_fields = []
+        for name, field in schema.dump_fields.items():
+            attribute = field.attribute or name
+            data_key = field.data_key if field.data_key is not None else name
+            if isinstance(field, URLFor):
+                self._url_fields.append((data_key, self._plan_url_field(field)))
+                continue
+            step = self._plan_field(attribute, field)
+            if step is not None:
+                self._plan.append((data_key, step))
+
+    def transcode_many(self, items):
+        """Return the dumped data of each of the items."""
+        return [self._transcode(item) for item in items]
+
+    def _transcode(self, item):
+        try:
+            data = {data_key: step(item) for data_key, step in self._plan}
+            for data_key, field in self._url_fields:
+                data[data_key] = self._url(item, field)
+        except _SlowPath:
+            return self._schema.dump(self._mapper.deserialize_to_model(item), many=False)
+        for hook in self._post_dump_hooks:
+            hook(data, item)
+        return data
+
+    @staticmethod
+    def _check_supported(mapper, schema, post_dump_hooks):
+        """Raise a ValueError if the mapper or schema does something the
+        transcoder can't do without a model.
+        """
+        if mapper._options.attributes_to_monkey_patch:
+            raise ValueError("Mappers that monkey patch attributes can't be transcoded")
+        for (tag, _), hook_names in schema._hooks.items():
+            if (tag == PRE_DUMP and hook_names) or (
+                tag == POST_DUMP and set(hook_names) - set(post_dump_hooks)
+            ):
+                raise ValueError(
+                    f"The {tag} hooks of {type(schema).__name__} need a function to transcode them"
+                )
+
+    def _plan_field(self, attribute, field):
+        """Return a function that returns the dumped value of the field
+        from an item, or None if the field is never dumped.
+        """
+        parameter = self._model_parameters.get(attribute.lstrip("_"))
+        if attribute in self._mapper_fields:
+            read = self._value_reader(attribute, field)
+            default = self._dumped_default(attribute, field, parameter)
+
+            def step(item):
+                value = item.get(attribute)
+                if value is None:
+                    return default()
+                return read(value, item)
+
+            return step
+        if parameter is not None:
+            default = self._dumped_default(attribute, field, parameter)
+            return lambda item: default()
+        if hasattr(self._mapper._options.model, attribute):
+            raise ValueError(f"{attribute} isn't stored in items and can't be transcoded")
+        # The model doesn't have the attribute, so the field's default is dumped
+        if field.default is missing:
+            return None
+        return lambda item: field.serialize(attribute, {})
+
+    def _dumped_default(self, attribute, field, parameter):
+        """Return a function that returns the dumped value of an attribute
+        the model is given its default value for.
+        """
+        if parameter is None or parameter.default is inspect.Parameter.empty:
+            def default():
+                raise _SlowPath()
+            return default
+        dumped_default = field.serialize(attribute, {attribute: parameter.default})
+        return lambda: dumped_default
+
+    def _value_reader(self, attribute, field):
+        """Return a function that returns the dumped value of the field
+        given its value in an item.
+        """
+        def read_slowly(value, item):
+            deserialized_value = self._mapper._handle_deserialization(attribute, value, item)
+            return field.serialize(attribute, {attribute: deserialized_value})
+
+        if not self._uses_default_formats:
+            return read_slowly
+        serialize = type(field)._serialize
+        if isinstance(field, EnumField):
+            if self._mapper.ENUMS.get(attribute) is not field.enum:
+                return read_slowly
+            return self._enum_reader(field, read_slowly)
+        if serialize is fields.String._serialize:
+            def read_string(value, item):
+                string = value.get("S")
+                if string is None or _DATE_OR_TIME_PATTERN.fullmatch(string):
+                    return read_slowly(value, item)
+                return string
+            return read_string
+        if serialize is fields.Boolean._serialize:
+            def read_boolean(value, item):
+                boolean = value.get("BOOL")
+                if boolean is None:
+                    return read_slowly(value, item)
+                return boolean
+            return read_boolean
+        if serialize is fields.DateTime._serialize and field.format in (None, "iso"):
+            def read_datetime(value, item):
+                string = value.get("S")
+                if string is None or not _DATETIME_PATTERN.fullmatch(string):
+                    return read_slowly(value, item)
+                return string[:-7] if string.endswith(".000000") else string
+            return read_datetime
+        return read_slowly
+
+    def _enum_reader(self, field, read_slowly):
+        """Return a function that returns the dumped enum member given its
+        name or value in an item.
+        """
+        dumped_members = {}
+        for member in field.enum:
+            dumped_members[str(member.value)] = field._serialize(member, None, None)
+        for member in field.enum:
+            # Mappers look members up by name before value
+            dumped_members[member.name] = field._serialize(member, None, None)
+
+        def read_enum(value, item):
+            string = value.get("S", value.get("N"))
+            if string not in dumped_members:
+                return read_slowly(value, item)
+            return dumped_members[string]
+
+        return read_enum
+
+    def _plan_url_field(self, field):
+        """Return the field that builds the links of a URLFor field, which
+        builds them from the same cached templates the schema does.
+        """
+        if not isinstance(field, CachedURLFor):
+            field = CachedURLFor(field.endpoint, values=field.values)
+        for _, attribute in field._attributes:
+            if attribute not in self._mapper_fields:
+                raise ValueError(f"The URL of {field.endpoint} can't be transcoded")
+        return field
+
+    def _url(self, item, field):
+        param_values = dict(field._static_values)
+        for name, attribute in field._attributes:
+            value = item.get(attribute, {}).get("S")
+            if value is None or _DATE_OR_TIME_PATTERN.fullmatch(value):
+                raise _SlowPath()
+            param_values[name] = value
+        return field.url(param_values)
@@ -0,0 +1,92 @@
+"""This module contains functions for maintaining and reading the
+inverted index used to search the content of chat messages.
+
+For every chat, term and message time bucket the index holds a postings
+item whose binary set attribute holds the ids of the messages in that
+bucket containing the term. Message ids are stored in a compact binary
+form, so a postings item holds far more ids than their string form would
+allow, and sets can be added to and deleted from in a single update
+without reading the item first.
+"""
+
+
+import re
+import uuid
+from datetime import datetime, timedelta
+from app.dynamodb_mappers.constants import PrimaryKeyPrefix
+
+
+# Terms shorter or longer than these are not indexed or searched for
+MIN_TERM_LENGTH = 2
+MAX_TERM_LENGTH = 32
+# Most distinct terms indexed for a single message
+MAX_TERMS_PER_MESSAGE = 100
+# Most message ids a postings item holds. Compact ids take 25 bytes, so a
+# full item stays well below DynamoDB's 400 KB item size limit. Messages
+# containing a term whose postings item is full aren't found by it.
+MAX_POSTINGS_PER_ITEM = 12000
+STOP_WORDS = frozenset(
+    (
+        "a", "an", "and", "are", "as", "at", "be", "but", "by", "for", "if",
+        "in", "is", "it", "of", "on", "or", "so", "the", "to", "was", "we",
+    )
+)
+_TERM_PATTERN = re.compile(r"\w+")
+
+# Message ids are an ISO formatted creation time and a uuid4 hex joined
+# by a dash. Ids in that form are packed into a tag byte, 8 bytes of
+# microseconds since the epoch and the 16 bytes of the uuid. Any other
+# id is stored as is after a tag byte.
+_RAW, _COMPACT = range(2)
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def tokenize(content):
+    """Return the set of searchable terms in a message's content."""
+    terms = set()
+    for term in _TERM_PATTERN.findall(content.lower()):
+        if MIN_TERM_LENGTH <= len(term) <= MAX_TERM_LENGTH and term not in STOP_WORDS:
+            terms.add(term)
+            if len(terms) == MAX_TERMS_PER_MESSAGE:
+                break
+    return terms
+
+
+def postings_key(chat_id, term, bucket):
+    """Return the primary key of the postings item of a term in one of
+    a chat's message time buckets.
+    """
+    return {
+        "PK": {"S": PrimaryKeyPrefix.SEARCH_TERM + chat_id + "#" + term},
+        "SK": {"S": PrimaryKeyPrefix.MESSAGE_BUCKET + bucket},
+    }
+
+
+def encode_message_id(message_id):
+    """Return the message id in its compact binary form."""
+    timestamp, _, hex_id = message_id.rpartition("-")
+    try:
+        created_at = datetime.fromisoformat(timestamp)
+        unique_id = uuid.UUID(hex=hex_id)
+    except ValueError:
+        created_at = None
+    if (
+        created_at is None
+        or created_at.tzinfo is not None
+        or unique_id.hex != hex_id
+        or created_at.isoformat() != timestamp
+    ):
+        return bytes([_RAW]) + message_id.encode("utf-8")
+    microseconds = (created_at - _EPOCH) // _MICROSECOND
+    return bytes([_COMPACT]) + microseconds.to_bytes(8, "big", signed=True) + unique_id.bytes
+
+
+def decode_message_id(value):
+    """Return the message id from its compact binary form."""
+    value = bytes(value)
+    if value[0] == _RAW:
+        return value[1:].decode("utf-8")
+    microseconds = int.from_bytes(value[1:9], "big", signed=True)
+    created_at = _EPOCH + _MICROSECOND * microseconds
+    return created_at.isoformat() + "-" + uuid.UUID(bytes=value[9:25]).hex
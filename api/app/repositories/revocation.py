@@ -0,0 +1,180 @@
+"""This module contains the in-memory list of revoked tokens that lets
+each worker verify tokens without reading from the database.
+
+Every worker holds the ids of the tokens revoked before they expire in
+a Bloom filter, which answers "not revoked" for almost every token with
+a few bit lookups, backed by an exact set that rules out the filter's
+false positives. The list is loaded from the database the first time it
+is used and then kept up to date by reading only the revocations made
+since it was last synced.
+"""
+
+
+import hashlib
+import math
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from config import BaseConfig
+from app.repositories.dynamodb_repository import database_repository
+
+
+# Seconds between reads of the revocations made by other workers
+SYNC_INTERVAL = float(os.environ.get("TOKEN_REVOCATION_SYNC_INTERVAL", 5))
+# Revocations made this long before the last one seen are read again on
+# every sync, so revocations stamped by a worker whose clock is behind
+# aren't missed
+CLOCK_SKEW = timedelta(seconds=30)
+
+
+class BloomFilter:
+    """Class to represent a set of strings that may report strings that
+    were never added as members, at the given rate, but never misses one
+    that was added.
+    """
+
+    def __init__(self, capacity, error_rate=0.001):
+        self.capacity = max(capacity, 1)
+        self._num_bits = math.ceil(
+            -self.capacity * math.log(error_rate) / math.log(2) ** 2
+        )
+        self._num_hashes = max(1, round(self._num_bits / self.capacity * math.log(2)))
+        self._bits = bytearray((self._num_bits + 7) // 8)
+        self.size = 0
+
+    def add(self, value):
+        """Add a string to the set."""
+        for position in self._positions(value):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.size += 1
+
+    def __contains__(self, value):
+        return all(
+            self._bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(value)
+        )
+
+    def _positions(self, value):
+        """Return the bits of the string, derived from two halves of a
+        single hash.
+        """
+        digest = hashlib.blake2b(value.encode("utf-8"), digest_size=16).digest()
+        first_hash = int.from_bytes(digest[:8], "big")
+        second_hash = int.from_bytes(digest[8:], "big") | 1
+        return [
+            (first_hash + index * second_hash) % self._num_bits
+            for index in range(self._num_hashes)
+        ]
+
+
+class RevocationList:
+    """Class to represent the tokens revoked before they expire, as
+    known to this worker.
+    """
+
+    INITIAL_CAPACITY = 1024
+
+    def __init__(self, repository, max_token_lifespan, sync_interval=SYNC_INTERVAL):
+        self._repository = repository
+        self._max_token_lifespan = max_token_lifespan
+        self._sync_interval = sync_interval
+        # Only held while the in-memory list is read or changed
+        self._lock = threading.Lock()
+        self._syncing = False
+        self._revoked = {} # Maps the id of a revoked token to its expiration
+        self._filter = BloomFilter(self.INITIAL_CAPACITY)
+        self._last_revoked_at = None
+        self._next_sync = None
+
+    def is_revoked(self, jti):
+        """Return True if the token with the given id has been revoked."""
+        self._sync_if_due()
+        if jti not in self._filter:
+            return False
+        return jti in self._revoked
+
+    def revoke(self, token):
+        """Revoke a token, which takes effect on this worker immediately
+        and on the others once they next sync.
+        """
+        self._repository.remove_token(token)
+        if token.jti is not None:
+            with self._lock:
+                self._add(token.jti, token.expires_on_date)
+
+    def _sync_if_due(self):
+        """Read the revocations made since the last sync, or every
+        revocation of an unexpired token when first used.
+
+        The lock is never held while the repository is read. Under the
+        eventlet server's tpool mode, reads yield to other green threads
+        on the same native thread, which would block the whole server
+        waiting on a native lock held by a yielding green thread. Until
+        the list is first loaded every request reads it itself, and after
+        that a single request syncs while the others carry on.
+        """
+        with self._lock:
+            if self._next_sync is not None and (
+                self._syncing or time.monotonic() < self._next_sync
+            ):
+                return
+            self._syncing = True
+            if self._last_revoked_at is None:
+                since = datetime.now() - timedelta(seconds=self._max_token_lifespan)
+            else:
+                since = self._last_revoked_at - CLOCK_SKEW
+        try:
+            revoked_tokens = list(self._repository.get_revoked_tokens(since))
+        except Exception:
+            with self._lock:
+                self._syncing = False
+            raise
+        with self._lock:
+            for revoked_token in revoked_tokens:
+                self._add(revoked_token.jti, revoked_token.expires_on_date)
+                if (
+                    self._last_revoked_at is None
+                    or revoked_token.revoked_at > self._last_revoked_at
+                ):
+                    self._last_revoked_at = revoked_token.revoked_at
+            if self._last_revoked_at is None:
+                self._last_revoked_at = since
+            self._prune()
+            self._next_sync = time.monotonic() + self._sync_interval
+            self._syncing = False
+
+    def _add(self, jti, expires_on_date):
+        if jti in self._revoked:
+            return
+        self._revoked[jti] = expires_on_date
+        if self._filter.size >= self._filter.capacity:
+            self._rebuild_filter()
+        else:
+            self._filter.add(jti)
+
+    def _prune(self):
+        """Forget the revocations of tokens that have expired, since
+        they can't be verified anymore anyway.
+        """
+        now = datetime.now().timestamp()
+        expired = [jti for jti, expires_on_date in self._revoked.items() if expires_on_date <= now]
+        for jti in expired:
+            del self._revoked[jti]
+        if expired:
+            self._rebuild_filter()
+
+    def _rebuild_filter(self):
+        """Replace the Bloom filter with one sized for the revocations
+        currently held.
+        """
+        capacity = self.INITIAL_CAPACITY
+        while capacity < 2 * len(self._revoked):
+            capacity *= 2
+        bloom_filter = BloomFilter(capacity)
+        for jti in self._revoked:
+            bloom_filter.add(jti)
+        self._filter = bloom_filter
+
+
+revoked_tokens = RevocationList(database_repository, BaseConfig.REFRESH_TOKEN_LIFESPAN)
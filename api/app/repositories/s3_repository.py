@@ -4,40 +4,106 @@ on file storage in S3.
 
 
 import os
-import boto3
+from boto3.s3.transfer import TransferConfig
 from botocore.exceptions import ClientError
+from app.clients.boto_client import BotoClient
 from app.repositories.abstract_repository import FileStorageRepository
 from app.repositories.utils import encode_file_contents
 
 
+# Files larger than this are copied in parts, several at a time
+TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=8 * 1024 * 1024,
+    multipart_chunksize=8 * 1024 * 1024,
+    max_concurrency=int(os.environ.get("AWS_S3_TRANSFER_CONCURRENCY", 10)),
+)
+
+
 class _S3Repository(FileStorageRepository):
     """Class to interact with the S3 client from the boto3 library."""
 
     def __init__(self, region):
-        self._s3_client = boto3.client("s3", region)
+        self._s3_client = BotoClient("s3", region_name=region)
         self._bucket_name = os.environ.get("AWS_S3_BUCKET_NAME")
 
-    def get(self, file_id):
-        """Return the contents of a file from S3 as bytes."""
+    def get(self, file_id, byte_range=None):
+        """Return the contents of a file from S3 as bytes. If a byte range
+        is given as a tuple of the first and last byte, only those bytes
+        are returned.
+        """
+        parameters = {"Key": file_id, "Bucket": self._bucket_name}
+        if byte_range is not None:
+            parameters["Range"] = "bytes=%d-%d" % byte_range
         try:
-            response = self._s3_client.get_object(Key=file_id, Bucket=self._bucket_name)
+            response = self._s3_client.get_object(**parameters)
             return response["Body"].read()
         except ClientError:
             return None
 
-    def add(self, file_id, file_contents):
+    def get_metadata(self, file_id):
+        """Return the size and content type of a file in S3 without
+        reading it, or None if it doesn't exist.
+        """
+        try:
+            response = self._s3_client.head_object(Key=file_id, Bucket=self._bucket_name)
+        except ClientError:
+            return None
+        return {"size": response["ContentLength"], "content_type": response.get("ContentType")}
+
+    def add(self, file_id, file_contents, content_type=None, cache_control=None):
         """Add a new file to S3. If a file with the given file_id already exists,
         it is replaced. File contents should be in bytes.
         """
-        response = self._s3_client.put_object(
-            Body=file_contents,
-            Bucket="chat-app-images",
-            Key=file_id,
-            StorageClass="STANDARD",
-            ContentMD5=encode_file_contents(file_contents),
+        parameters = {
+            "Body": file_contents,
+            "Bucket": self._bucket_name,
+            "Key": file_id,
+            "StorageClass": "STANDARD",
+            "ContentMD5": encode_file_contents(file_contents),
+        }
+        if content_type is not None:
+            parameters["ContentType"] = content_type
+        if cache_control is not None:
+            parameters["CacheControl"] = cache_control
+        response = self._s3_client.put_object(**parameters)
+        return True
+
+    def copy(self, source_file_id, file_id, content_type=None, cache_control=None):
+        """Copy a file within S3 without downloading it. Large files are
+        copied in parts concurrently.
+        """
+        extra_args = {}
+        if content_type is not None or cache_control is not None:
+            extra_args["MetadataDirective"] = "REPLACE"
+        if content_type is not None:
+            extra_args["ContentType"] = content_type
+        if cache_control is not None:
+            extra_args["CacheControl"] = cache_control
+        self._s3_client.copy(
+            {"Bucket": self._bucket_name, "Key": source_file_id},
+            self._bucket_name,
+            file_id,
+            ExtraArgs=extra_args,
+            Config=TRANSFER_CONFIG,
         )
         return True
 
+    def create_upload(self, file_id, content_type, max_size, expires_in):
+        """Return the url and form fields of a presigned POST that lets a
+        client upload a file of the given content type and at most
+        max_size bytes directly to S3.
+        """
+        return self._s3_client.generate_presigned_post(
+            self._bucket_name,
+            file_id,
+            Fields={"Content-Type": content_type},
+            Conditions=[
+                {"Content-Type": content_type},
+                ["content-length-range", 1, max_size],
+            ],
+            ExpiresIn=expires_in,
+        )
+
     def remove(self, file_id):
         """Delete a file from S3."""
         response = self._s3_client.delete_object(Bucket=self._bucket_name, Key=file_id)
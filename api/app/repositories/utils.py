@@ -1,23 +1,276 @@
 """This module utility functions for the repository layer"""
 
 
-import json
+import hmac
+import zlib
 import base64
 import hashlib
+import binascii
+from flask import current_app
+from app.repositories.exceptions import InvalidCursorException
 
 
-def encode_cursor(value):
-    """Return the value as a base 64 encoded JSON string."""
-    encoded_json_string = json.dumps(value).encode("utf-8")
-    return base64.b64encode(encoded_json_string).decode("utf-8")
+# Cursor layout: version byte, flags byte, payload, truncated HMAC-SHA256.
+# The whole cursor is then base64url encoded without padding. The version
+# changes whenever cursors written before the change would decode wrongly.
+CURSOR_VERSION = 2
+CURSOR_SIGNATURE_LENGTH = 12
+CURSOR_MAX_LENGTH = 2048
+_FLAG_COMPRESSED = 0x01
 
+# Value tags. DynamoDB "S", "N" and "B" wrappers are elided into their tags.
+_NONE, _TRUE, _FALSE, _INT, _STR, _STR_REF, _DICT, _LIST, _ATTR_S, _ATTR_N, _ATTR_B = range(11)
 
-def decode_cursor(value):
-    """Given a base 64 encoded string, convert and return
-    it to its original python primitive value.
+# Key names that appear in start keys and cursors, encoded as a single byte.
+# Other keys are encoded by name, so keys may be appended to this list
+# without changing how existing cursors decode, but never reordered.
+_KNOWN_KEYS = (
+    "PK",
+    "SK",
+    "USERS_GSI_PK",
+    "USERS_GSI_SK",
+    "INVERTED_GSI_PK",
+    "INVERTED_GSI_SK",
+    "COMMUNITIES_BY_TOPIC_GSI_PK",
+    "COMMUNITIES_BY_TOPIC_GSI_SK",
+    "COMMUNITIES_BY_LOCATION_GSI_PK",
+    "COMMUNITIES_BY_LOCATION_GSI_SK",
+    "bucket",
+    "start_key",
+    "segments",
+    "DIRECTORY_GSI_PK",
+    "DIRECTORY_GSI_SK",
+)
+_KNOWN_KEY_CODES = {key: code for code, key in enumerate(_KNOWN_KEYS)}
+# Strings shorter than this are cheaper to repeat than to reference
+_MIN_REF_LENGTH = 4
+
+
+def encode_cursor(value, context=""):
+    """Return the value as a compact, signed cursor string. The
+    signature binds the cursor to the given context, so a cursor
+    can only be used with the query that produced it.
+    """
+    payload = _CursorWriter().write(value)
+    flags = 0
+    compressed_payload = zlib.compress(payload, 9)
+    if len(compressed_payload) < len(payload):
+        payload = compressed_payload
+        flags |= _FLAG_COMPRESSED
+    body = bytes((CURSOR_VERSION, flags)) + payload
+    cursor = body + _sign_cursor(body, context)
+    return base64.urlsafe_b64encode(cursor).rstrip(b"=").decode("ascii")
+
+
+def decode_cursor(value, context=""):
+    """Given a cursor string created by encode_cursor with the same
+    context, convert and return it to its original python primitive
+    value. Raise InvalidCursorException if the cursor is malformed,
+    was signed for another context, or has been tampered with.
     """
-    byte_string = base64.b64decode(value)
-    return json.loads(byte_string.decode("utf-8"))
+    if not isinstance(value, str) or len(value) > CURSOR_MAX_LENGTH:
+        raise InvalidCursorException("Invalid cursor")
+    try:
+        cursor = base64.urlsafe_b64decode(value + "=" * (-len(value) % 4))
+    except (binascii.Error, ValueError):
+        raise InvalidCursorException("Invalid cursor")
+    if len(cursor) < 2 + CURSOR_SIGNATURE_LENGTH:
+        raise InvalidCursorException("Invalid cursor")
+    body = cursor[:-CURSOR_SIGNATURE_LENGTH]
+    signature = cursor[-CURSOR_SIGNATURE_LENGTH:]
+    if not hmac.compare_digest(signature, _sign_cursor(body, context)):
+        raise InvalidCursorException("Invalid cursor")
+    version, flags = body[0], body[1]
+    if version != CURSOR_VERSION:
+        raise InvalidCursorException("Unsupported cursor version")
+    payload = body[2:]
+    try:
+        if flags & _FLAG_COMPRESSED:
+            payload = zlib.decompress(payload)
+        return _CursorReader(payload).read()
+    except (zlib.error, IndexError, ValueError, UnicodeDecodeError):
+        raise InvalidCursorException("Invalid cursor")
+
+
+def _sign_cursor(body, context):
+    """Return the truncated signature of a cursor body for the given context."""
+    secret_key = current_app.config["SECRET_KEY"]
+    if isinstance(secret_key, str):
+        secret_key = secret_key.encode("utf-8")
+    message = context.encode("utf-8") + b"\x00" + body
+    digest = hmac.new(secret_key, message, hashlib.sha256).digest()
+    return digest[:CURSOR_SIGNATURE_LENGTH]
+
+
+class _CursorWriter:
+    """Class to encode cursor values to bytes."""
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._strings = {}
+
+    def write(self, value):
+        """Encode the value and return the resulting bytes."""
+        self._write_value(value)
+        return bytes(self._buffer)
+
+    def _write_value(self, value):
+        if value is None:
+            self._buffer.append(_NONE)
+        elif value is True:
+            self._buffer.append(_TRUE)
+        elif value is False:
+            self._buffer.append(_FALSE)
+        elif isinstance(value, int):
+            self._buffer.append(_INT)
+            self._write_varint((value << 1) ^ (value >> 63))
+        elif isinstance(value, str):
+            self._write_string(value)
+        elif isinstance(value, (list, tuple)):
+            self._buffer.append(_LIST)
+            self._write_varint(len(value))
+            for element in value:
+                self._write_value(element)
+        elif isinstance(value, dict):
+            self._write_dict(value)
+        else:
+            raise TypeError("Cannot encode value of type %s in a cursor" % type(value))
+
+    def _write_dict(self, value):
+        if len(value) == 1:
+            data_type, attribute = next(iter(value.items()))
+            if data_type in ("S", "N") and isinstance(attribute, str):
+                self._buffer.append(_ATTR_S if data_type == "S" else _ATTR_N)
+                self._write_string(attribute)
+                return
+            if data_type == "B" and isinstance(attribute, bytes):
+                self._buffer.append(_ATTR_B)
+                self._write_varint(len(attribute))
+                self._buffer.extend(attribute)
+                return
+        self._buffer.append(_DICT)
+        self._write_varint(len(value))
+        for key, element in value.items():
+            self._write_key(key)
+            self._write_value(element)
+
+    def _write_key(self, key):
+        # The low bit tells known key codes apart from the lengths of
+        # keys that are written by name
+        code = _KNOWN_KEY_CODES.get(key)
+        if code is not None:
+            self._write_varint(code << 1)
+        else:
+            encoded_key = key.encode("utf-8")
+            self._write_varint((len(encoded_key) << 1) | 1)
+            self._buffer.extend(encoded_key)
+
+    def _write_string(self, value):
+        index = self._strings.get(value)
+        if index is not None:
+            self._buffer.append(_STR_REF)
+            self._write_varint(index)
+            return
+        if len(value) >= _MIN_REF_LENGTH:
+            self._strings[value] = len(self._strings)
+        encoded_value = value.encode("utf-8")
+        self._buffer.append(_STR)
+        self._write_varint(len(encoded_value))
+        self._buffer.extend(encoded_value)
+
+    def _write_varint(self, number):
+        while number > 0x7F:
+            self._buffer.append((number & 0x7F) | 0x80)
+            number >>= 7
+        self._buffer.append(number)
+
+
+class _CursorReader:
+    """Class to decode bytes created by _CursorWriter."""
+
+    def __init__(self, payload):
+        self._payload = payload
+        self._position = 0
+        self._strings = []
+
+    def read(self):
+        """Decode and return the value. Raise ValueError if the
+        payload is malformed.
+        """
+        value = self._read_value()
+        if self._position != len(self._payload):
+            raise ValueError("Trailing bytes in cursor")
+        return value
+
+    def _read_value(self):
+        tag = self._read_byte()
+        if tag == _NONE:
+            return None
+        if tag == _TRUE:
+            return True
+        if tag == _FALSE:
+            return False
+        if tag == _INT:
+            number = self._read_varint()
+            return (number >> 1) ^ -(number & 1)
+        if tag in (_STR, _STR_REF):
+            return self._read_string(tag)
+        if tag == _ATTR_S:
+            return {"S": self._read_string(self._read_byte())}
+        if tag == _ATTR_N:
+            return {"N": self._read_string(self._read_byte())}
+        if tag == _ATTR_B:
+            return {"B": self._read_bytes(self._read_varint())}
+        if tag == _LIST:
+            return [self._read_value() for _ in range(self._read_varint())]
+        if tag == _DICT:
+            value = {}
+            for _ in range(self._read_varint()):
+                key = self._read_key()
+                value[key] = self._read_value()
+            return value
+        raise ValueError("Unknown tag in cursor")
+
+    def _read_key(self):
+        code = self._read_varint()
+        if code & 1:
+            return self._read_bytes(code >> 1).decode("utf-8")
+        return _KNOWN_KEYS[code >> 1]
+
+    def _read_string(self, tag):
+        if tag == _STR_REF:
+            return self._strings[self._read_varint()]
+        if tag != _STR:
+            raise ValueError("Expected a string in cursor")
+        value = self._read_bytes(self._read_varint()).decode("utf-8")
+        if len(value) >= _MIN_REF_LENGTH:
+            self._strings.append(value)
+        return value
+
+    def _read_byte(self):
+        byte = self._payload[self._position]
+        self._position += 1
+        return byte
+
+    def _read_bytes(self, length):
+        end = self._position + length
+        if end > len(self._payload):
+            raise ValueError("Truncated cursor")
+        value = self._payload[self._position:end]
+        self._position = end
+        return bytes(value)
+
+    def _read_varint(self):
+        number = 0
+        shift = 0
+        while True:
+            byte = self._read_byte()
+            number |= (byte & 0x7F) << shift
+            if not byte & 0x80:
+                return number
+            shift += 7
+            if shift > 63:
+                raise ValueError("Varint too long in cursor")
 
 
 def encode_file_contents(file_contents):
@@ -26,4 +279,18 @@ def encode_file_contents(file_contents):
     """
     md = hashlib.md5(file_contents).digest()
     contents_md5 = base64.b64encode(md).decode("utf-8")
-    return contents_md5
\ No newline at end of file
+    return contents_md5
+
+def hash_file_contents(file_contents):
+    """Return the hex encoded MD5 hash of the file contents, which
+    identifies files by their content.
+    """
+    return hashlib.md5(file_contents).hexdigest()
+
+
+def directory_sort_key(name, item_id):
+    """Return the sort key of a user or community in its directory. Items
+    are sorted by name ignoring case, and the item's id keeps the sort
+    keys of names that only differ in case unique.
+    """
+    return name.lower() + "#" + item_id
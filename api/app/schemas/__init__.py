@@ -5,8 +5,16 @@ deserializing models.
 
 from app.schemas.user import UserSchema
 from app.schemas.location import LocationSchema
-from app.schemas.image import ImageSchema
-from app.schemas.url_parameters import UrlParamsSchema, CommunityUrlParamsSchema, GroupChatUrlParamsSchema
+from app.schemas.image import ImageSchema, ImageVariantSchema, ImageUploadSchema
+from app.schemas.url_parameters import (
+    UrlParamsSchema,
+    UserUrlParamsSchema,
+    SearchUrlParamsSchema,
+    MessageSearchUrlParamsSchema,
+    NearbyUrlParamsSchema,
+    CommunityUrlParamsSchema,
+    GroupChatUrlParamsSchema
+)
 from app.schemas.community import CommunitySchema
 from app.schemas.notification import NotificationSchema
 from app.schemas.message import PrivateChatMessageSchema, GroupChatMessageSchema, MessageSchema, ReactionSchema
@@ -0,0 +1,17 @@
+"""This module contains the base schema of the application's marshmallow
+schemas.
+"""
+
+
+from app import json_backend
+from app.extensions import ma
+
+
+class BaseSchema(ma.Schema):
+    """Base class of the application's schemas, which dump and load JSON
+    with the JSON backend. Schemas with options of their own subclass
+    BaseSchema.Meta so they keep rendering with it.
+    """
+
+    class Meta:
+        render_module = json_backend
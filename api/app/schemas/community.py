@@ -4,20 +4,22 @@ deserialize Community models.
 
 
 from app.extensions import ma
+from app.schemas.base import BaseSchema
 from marshmallow import validate, EXCLUDE, pre_load
 from app.models.community import CommunityTopic
 from app.schemas.image import ImageSchema
 from app.schemas.location import LocationSchema
 from app.schemas.enum_field import EnumField
+from app.schemas.url_for_field import CachedURLFor
 
 
-class CommunitySchema(ma.Schema):
+class CommunitySchema(BaseSchema):
     """Class to serialize and deserialize Community models."""
 
     COLLECTION_NAME = "communities"
     RESOURCE_NAME = "community"
 
-    class Meta:
+    class Meta(BaseSchema.Meta):
         unknown = EXCLUDE
 
     _id = ma.UUID(data_key="id", dump_only=True)
@@ -31,13 +33,14 @@ class CommunitySchema(ma.Schema):
     _created_at = ma.DateTime(
         data_key="founded_on", dump_only=True
     )  # defaults to ISO 8601
+    _member_count = ma.Int(data_key="member_count", dump_only=True)
     resource_type = ma.Str(default="Community", dump_only=True)
 
     # Links
-    self_url = ma.URLFor("api.get_community", community_id="<_id>")
-    founder_url = ma.URLFor("api.get_user", user_id="<_founder_id>")
-    members_url = ma.URLFor("api.get_community_members", community_id="<_id>")
-    group_chats_url = ma.URLFor("api.get_community_group_chats", community_id="<_id>")
+    self_url = CachedURLFor("api.get_community", community_id="<_id>")
+    founder_url = CachedURLFor("api.get_user", user_id="<_founder_id>")
+    members_url = CachedURLFor("api.get_community_members", community_id="<_id>")
+    group_chats_url = CachedURLFor("api.get_community_group_chats", community_id="<_id>")
 
     @pre_load
     def strip_unwanted_fields(self, data, many, **kwargs):
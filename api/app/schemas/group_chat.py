@@ -5,31 +5,34 @@ and deserializing group chat models.
 
 import uuid
 from app.extensions import ma
+from app.schemas.base import BaseSchema
 from marshmallow import validate, EXCLUDE, pre_load, post_load
+from app.schemas.url_for_field import CachedURLFor
 
 
-class GroupChatSchema(ma.Schema):
+class GroupChatSchema(BaseSchema):
     """Class for serializing and deserializing GroupChat models."""
 
     RESOURCE_NAME = "group_chat"
     COLLECTION_NAME = "group_chats"
 
-    class Meta:
+    class Meta(BaseSchema.Meta):
         unknown = EXCLUDE
     
     _id = ma.UUID(required=True, data_key="id")
     _community_id = ma.UUID(required=True, data_key="community_id")
     name = ma.Str(required=True, validate=validate.Length(min=1, max=32))
     description = ma.Str(required=True, validate=validate.Length(min=1, max=140))
+    _member_count = ma.Int(data_key="member_count", dump_only=True)
     resource_type = ma.Str(default="GroupChat", dump_only=True)
 
     # Links
-    self_url = ma.URLFor(
+    self_url = CachedURLFor(
         "api.get_community_group_chat", community_id="<_community_id>", group_chat_id="<_id>"
     )
-    messages_url = ma.URLFor("api.get_group_chat_messages", group_chat_id="<_id>")
-    community_url = ma.URLFor("api.get_community", community_id="<_id>")
-    members_url = ma.URLFor("api.get_community_group_chat_members", community_id="<_community_id>", group_chat_id="<_id>")
+    messages_url = CachedURLFor("api.get_group_chat_messages", group_chat_id="<_id>")
+    community_url = CachedURLFor("api.get_community", community_id="<_id>")
+    members_url = CachedURLFor("api.get_community_group_chat_members", community_id="<_community_id>", group_chat_id="<_id>")
 
 
     @post_load
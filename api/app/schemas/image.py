@@ -4,13 +4,32 @@ serializing and deserializing Image models.
 
 
 from app.extensions import ma
+from app.schemas.base import BaseSchema
 from marshmallow import validate
 
 
-class ImageSchema(ma.Schema):
+class ImageUploadSchema(BaseSchema):
+    """Class to deserialize requests to upload an image directly to
+    file storage.
+    """
+
+    content_type = ma.Str(required=True, validate=validate.OneOf(["image/jpeg", "image/png"]))
+
+
+class ImageVariantSchema(BaseSchema):
+    """Class to serialize image variant models."""
+
+    url = ma.Url(dump_only=True)
+    height = ma.Integer(dump_only=True)
+    width = ma.Integer(dump_only=True)
+    format = ma.Str(dump_only=True)
+
+
+class ImageSchema(BaseSchema):
     """Class to serialize and deserialize image models."""
 
     url = ma.Url(required=True)
     height = ma.Integer(required=True, validate=validate.Range(min=1, max=2000))
     width = ma.Integer(required=True, validate=validate.Range(min=1, max=2000))
+    variants = ma.List(ma.Nested(ImageVariantSchema), dump_only=True)
     
\ No newline at end of file
@@ -4,12 +4,22 @@ and deserializing Location models.
 
 
 from app.extensions import ma
-from marshmallow import validate
+from app.schemas.base import BaseSchema
+from marshmallow import validate, validates_schema, ValidationError
 
 
-class LocationSchema(ma.Schema):
+class LocationSchema(BaseSchema):
     """Class to serialize and deserialize Location models."""
 
     city = ma.Str(required=True, validate=validate.Length(min=1, max=64))
     state = ma.Str(required=True, validate=validate.Length(min=1, max=32))
-    country = ma.Str(required=True, validate=validate.Length(min=1, max=32))
\ No newline at end of file
+    country = ma.Str(required=True, validate=validate.Length(min=1, max=32))
+    latitude = ma.Float(allow_none=True, validate=validate.Range(min=-90, max=90))
+    longitude = ma.Float(allow_none=True, validate=validate.Range(min=-180, max=180))
+
+    @validates_schema
+    def validate_coordinates(self, data, **kwargs):
+        """Raise a ValidationError if only one of the coordinates is given."""
+        if (data.get("latitude") is None) != (data.get("longitude") is None):
+            raise ValidationError("Please provide both a latitude and a longitude")
+        return data
@@ -4,22 +4,35 @@ deserializing message models.
 
 
 import uuid
+from datetime import date
 from app.extensions import ma
-from marshmallow import validate, EXCLUDE, pre_load, post_load, post_dump
+from app.schemas.base import BaseSchema
+from marshmallow import validate, ValidationError, EXCLUDE, pre_load, post_load, post_dump
 from app.schemas.enum_field import EnumField
 from app.models import Reaction, ReactionType, MessageType
+from app.schemas.url_for_field import CachedURLFor
 
 
-class ReactionSchema(ma.Schema):
+def validate_message_id(message_id):
+    """Validate that a message id begins with the ISO formatted date the
+    message was created on, which the bucket it's stored in is named after.
+    """
+    try:
+        date.fromisoformat(message_id[:10])
+    except ValueError:
+        raise ValidationError("Not a valid message id.")
+
+
+class ReactionSchema(BaseSchema):
     """Class to serialize and deserialize Reaction models."""
 
-    class Meta:
+    class Meta(BaseSchema.Meta):
         unknown = EXCLUDE
 
     user_id = ma.UUID(dump_only=True, required=True)
     created_at = ma.DateTime(dump_only=True, data_key="timestamp")
     reaction_type = EnumField(ReactionType, required=True)
-    message_id = ma.Str(load_only=True, required=True)
+    message_id = ma.Str(load_only=True, required=True, validate=validate_message_id)
     message_type = EnumField(MessageType, required=True)
     chat_id = ma.UUID(load_only=True, required=True)
 
@@ -33,10 +46,10 @@ class ReactionSchema(ma.Schema):
         return data
 
 
-class MessageSchema(ma.Schema):
+class MessageSchema(BaseSchema):
     """Class to serialize and deserialize message models."""
 
-    _id = ma.Str(required=True, data_key="id")
+    _id = ma.Str(required=True, data_key="id", validate=validate_message_id)
     _chat_id = ma.UUID(required=True, data_key="chat_id")
     _content = ma.Str(
         data_key="content", validate=validate.Length(min=1, max=500), required=True
@@ -47,17 +60,17 @@ class MessageSchema(ma.Schema):
     _editted = ma.Boolean(dump_only=True)
 
     # Links
-    user_url = ma.URLFor("api.get_user", user_id="<_user_id>")
+    user_url = CachedURLFor("api.get_user", user_id="<_user_id>")
 
     @post_dump(pass_original=True)
     def inject_extra_fields(self, data, original_model, **kwargs):
         """Post processing method to inject extra fields into the
         serialized data.
         """
-        reaction_schema = ReactionSchema()
-        data["reactions"] = [
-            reaction_schema.dump(reaction) for reaction in original_model.reactions
-        ]
+        data["reaction_counts"] = {
+            reaction_type.name: count
+            for reaction_type, count in original_model.reaction_counts.items()
+        }
         return data
 
     @post_load
@@ -78,11 +91,11 @@ class PrivateChatMessageSchema(MessageSchema):
     RESOURCE_NAME = "private_chat_message"
     COLLECTION_NAME = "private_chat_messages"
 
-    class Meta:
+    class Meta(BaseSchema.Meta):
         unknown = EXCLUDE
 
     resource_type = ma.Str(dump_only=True, default="PrivateChatMessage")
-    self_url = ma.URLFor(
+    self_url = CachedURLFor(
         "api.get_private_chat_message", private_chat_id="<_chat_id>", message_id="<_id>"
     )
 
@@ -95,12 +108,12 @@ class GroupChatMessageSchema(MessageSchema):
     RESOURCE_NAME = "group_chat_message"
     COLLECTION_NAME = "group_chat_messages"
 
-    class Meta:
+    class Meta(BaseSchema.Meta):
         unknown = EXCLUDE
 
     community_id = ma.UUID(load_only=True, required=True)
     resource_type = ma.Str(dump_only=True, default="GroupChatMessage")
-    self_url = ma.URLFor(
+    self_url = CachedURLFor(
         "api.get_group_chat_message", group_chat_id="<_chat_id>", message_id="<_id>"
     )
 
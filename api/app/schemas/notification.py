@@ -4,12 +4,13 @@ and deserializing notification models.
 
 
 from app.extensions import ma
+from app.schemas.base import BaseSchema
 from app.schemas.enum_field import EnumField
 from app.models import NotificationType
 from marshmallow import validate, EXCLUDE, ValidationError, validates_schema, pre_load
 
 
-class NotificationSchema(ma.Schema):
+class NotificationSchema(BaseSchema):
     """Class to serialize and deserialize notification
     models.
     """
@@ -17,7 +18,7 @@ class NotificationSchema(ma.Schema):
     RESOURCE_NAME = "notification"
     COLLECTION_NAME = "notifications"
 
-    class Meta:
+    class Meta(BaseSchema.Meta):
         unknown = EXCLUDE
 
     _id = ma.Str(required=True, data_key="id", dump_only=True)
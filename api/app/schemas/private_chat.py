@@ -5,11 +5,13 @@ serialize PrivateChat models.
 
 import uuid
 from app.extensions import ma
+from app.schemas.base import BaseSchema
 from app.schemas.user import UserSchema
 from marshmallow import post_load
+from app.schemas.url_for_field import CachedURLFor
 
 
-class PrivateChatSchema(ma.Schema):
+class PrivateChatSchema(BaseSchema):
     """Class to serialize PrivateChat models."""
 
     RESOURCE_NAME = "private_chat"
@@ -21,7 +23,7 @@ class PrivateChatSchema(ma.Schema):
     resource_type = ma.Str(dump_only=True, default="PrivateChat")
 
     # Links
-    messages_url = ma.URLFor("api.get_private_chat_messages", private_chat_id="<_id>")
+    messages_url = CachedURLFor("api.get_private_chat_messages", private_chat_id="<_id>")
 
 
     @post_load
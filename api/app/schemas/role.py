@@ -4,15 +4,16 @@ and deserializing Role models.
 
 
 from app.extensions import ma
+from app.schemas.base import BaseSchema
 from app.schemas.enum_field import EnumField
 from app.models import RolePermission, RoleName
 from marshmallow import EXCLUDE
 
 
-class RoleSchema(ma.Schema):
+class RoleSchema(BaseSchema):
     """Class to serialize and deserialize role models."""
 
-    class Meta:
+    class Meta(BaseSchema.Meta):
         unknown = EXCLUDE
 
     name = EnumField(RoleName, dump_only=True)
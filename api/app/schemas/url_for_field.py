@@ -0,0 +1,148 @@
+"""This module contains a custom field for serializing links to endpoints
+from URL templates that are built once and formatted for each model.
+"""
+
+
+import re
+from flask import url_for, _app_ctx_stack, _request_ctx_stack
+from flask_marshmallow.fields import URLFor, _tpl
+from marshmallow.utils import get_value, missing
+from werkzeug.routing import BuildError
+from werkzeug.urls import url_quote
+
+
+# Templates are cached for each host a request is made to, so the cache
+# is cleared once it holds this many rather than growing without bound
+MAX_CACHED_TEMPLATES = 512
+# Characters the default converter leaves unquoted, so values made only of
+# them, such as hex ids, don't need to be quoted
+_SAFE_VALUE_PATTERN = re.compile(r"[A-Za-z0-9_.~/:-]*")
+
+
+def _quote(value):
+    """Quote a value the way the default converter does."""
+    value = str(value)
+    if _SAFE_VALUE_PATTERN.fullmatch(value):
+        return value
+    return url_quote(value)
+
+
+class CachedURLFor(URLFor):
+    """Field that outputs the URL for an endpoint the same way URLFor
+    does, from a template the URL is built with once for each endpoint
+    and context instead of with url_for each time.
+
+    The template is built by calling url_for with placeholders for the
+    values taken from the model, so it includes the script root, server
+    name and scheme url_for would use in the current context. Endpoints
+    whose URLs can't be built from placeholders, such as ones with
+    converters other than the default string converter, or with values
+    in the query string, are built with url_for.
+    """
+
+    def __init__(self, endpoint, values=None, **kwargs):
+        super().__init__(endpoint, values=values, **kwargs)
+        self._attributes = []
+        self._static_values = {}
+        for name, attr_tpl in self.values.items():
+            attr_name = _tpl(str(attr_tpl))
+            if attr_name:
+                self._attributes.append((name, attr_name))
+            else:
+                self._static_values[name] = attr_tpl
+        self._attribute_names = tuple(name for name, _ in self._attributes)
+        # Schemas get copies of their fields, so templates are cached by
+        # what the URL is built from rather than by field
+        self._endpoint_key = (
+            self.endpoint, tuple(self._static_values.items()), self._attribute_names
+        )
+        try:
+            hash(self._endpoint_key)
+        except TypeError:
+            self._endpoint_key = None
+
+    def _serialize(self, value, key, obj, **kwargs):
+        """Output the URL for the endpoint, given the values passed to
+        ``__init__``.
+        """
+        param_values = dict(self._static_values)
+        for name, attr_name in self._attributes:
+            attribute_value = get_value(obj, attr_name, default=missing)
+            if attribute_value is None:
+                return None
+            if attribute_value is missing:
+                return super()._serialize(value, key, obj, **kwargs)
+            param_values[name] = attribute_value
+        return self.url(param_values)
+
+    def url(self, param_values):
+        """Return the URL for the endpoint given the values of all of its
+        parameters, from the cached template if it can be built from one.
+        """
+        template = self._url_template(param_values)
+        if template is None:
+            return url_for(self.endpoint, **param_values)
+        return template.format(**{
+            name: _quote(param_values[name]) for name in self._attribute_names
+        })
+
+    def _url_template(self, param_values):
+        """Return the cached template of the endpoint's URL in the current
+        context, building it if needed, or None if the URL can't be built
+        from a template.
+        """
+        request_context = _request_ctx_stack.top
+        app_context = _app_ctx_stack.top
+        if (
+            app_context is None
+            or app_context.app.url_default_functions
+            or self._endpoint_key is None
+        ):
+            return None
+        url_adapter = (request_context or app_context).url_adapter
+        if url_adapter is None:
+            return None
+        cache_key = (
+            self._endpoint_key,
+            request_context is not None,
+            request_context.request.blueprint
+            if request_context is not None and self.endpoint.startswith(".") else None,
+            url_adapter.server_name,
+            url_adapter.script_name,
+            url_adapter.subdomain,
+            url_adapter.url_scheme,
+        )
+        templates = app_context.app.extensions.setdefault("url_templates", {})
+        try:
+            return templates[cache_key]
+        except KeyError:
+            pass
+        template = self._build_url_template(param_values)
+        if len(templates) >= MAX_CACHED_TEMPLATES:
+            templates.clear()
+        templates[cache_key] = template
+        return template
+
+    def _build_url_template(self, param_values):
+        """Return a template the endpoint's URL can be formatted from, or
+        None if the URL built from it doesn't match the URL url_for builds
+        for the given values.
+        """
+        if not all(name.isidentifier() for name in self._attribute_names):
+            return None
+        placeholders = {name: f"__urlfor_{name}__" for name in self._attribute_names}
+        try:
+            url = url_for(self.endpoint, **{**param_values, **placeholders})
+        except (BuildError, ValueError):
+            return None
+        if "?" in url or any(url.count(placeholder) != 1 for placeholder in placeholders.values()):
+            return None
+        template = url.replace("{", "{{").replace("}", "}}")
+        for name, placeholder in placeholders.items():
+            template = template.replace(placeholder, "{" + name + "}")
+        formatted_url = template.format(**{
+            name: _quote(param_values[name]) for name in self._attribute_names
+        })
+        if formatted_url != url_for(self.endpoint, **param_values):
+            return None
+        return template
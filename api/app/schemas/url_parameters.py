@@ -5,16 +5,17 @@ information from url parameters
 
 import uuid
 from app.extensions import ma
+from app.schemas.base import BaseSchema
 from app.schemas.enum_field import EnumField
 from app.schemas.location import LocationSchema
 from app.models import CommunityTopic
 from marshmallow import EXCLUDE, validates_schema, ValidationError, validate, post_load
 
 
-class UrlParamsSchema(ma.Schema):
+class UrlParamsSchema(BaseSchema):
     """Class to parse and validate information from url parameters"""
 
-    class Meta:
+    class Meta(BaseSchema.Meta):
         unknown = EXCLUDE
 
     per_page = ma.Integer()
@@ -24,7 +25,7 @@ class UrlParamsSchema(ma.Schema):
 class GroupChatUrlParamsSchema(UrlParamsSchema):
     """Class to parse and validate information from Group Chat url parameters."""
 
-    class Meta:
+    class Meta(BaseSchema.Meta):
         unknown = EXCLUDE
     
     community_id = ma.UUID(required=True)
@@ -39,6 +40,81 @@ class GroupChatUrlParamsSchema(UrlParamsSchema):
         return data
 
 
+class UserUrlParamsSchema(UrlParamsSchema):
+    """Class to Deserialize information from url parameters
+    for user resources.
+    """
+
+    username = ma.Str(validate=validate.Length(min=1, max=32))
+
+
+class SearchUrlParamsSchema(BaseSchema):
+    """Class to Deserialize information from url parameters
+    for prefix searches.
+    """
+
+    class Meta(BaseSchema.Meta):
+        unknown = EXCLUDE
+
+    query = ma.Str(data_key="q")
+    limit = ma.Integer()
+
+    @validates_schema
+    def validate_query(self, data, **kwargs):
+        """Raise a ValidationError if the search query or the limit on
+        the number of results is invalid.
+        """
+        if not 1 <= len(data.get("query", "")) <= 64:
+            raise ValidationError("Please provide a search query of 1 to 64 characters")
+        if not 1 <= data.get("limit", 1) <= 25:
+            raise ValidationError("The limit must be between 1 and 25")
+        return data
+
+
+class MessageSearchUrlParamsSchema(UrlParamsSchema):
+    """Class to Deserialize information from url parameters
+    for chat message searches.
+    """
+
+    query = ma.Str(data_key="q")
+
+    @validates_schema
+    def validate_query(self, data, **kwargs):
+        """Raise a ValidationError if the search query is invalid."""
+        if not 1 <= len(data.get("query", "")) <= 256:
+            raise ValidationError("Please provide a search query of 1 to 256 characters")
+        return data
+
+
+class NearbyUrlParamsSchema(BaseSchema):
+    """Class to Deserialize information from url parameters
+    for nearby community searches.
+    """
+
+    class Meta(BaseSchema.Meta):
+        unknown = EXCLUDE
+
+    latitude = ma.Float()
+    longitude = ma.Float()
+    radius = ma.Float()
+    limit = ma.Integer()
+
+    @validates_schema
+    def validate_point(self, data, **kwargs):
+        """Raise a ValidationError if the point, the radius in kilometers
+        or the limit on the number of results is invalid.
+        """
+        if "latitude" not in data or "longitude" not in data:
+            raise ValidationError("Please provide a latitude and a longitude")
+        if not -90 <= data["latitude"] <= 90 or not -180 <= data["longitude"] <= 180:
+            raise ValidationError("The given coordinates are invalid")
+        if not 0 < data.get("radius", 1) <= 100:
+            raise ValidationError("The radius must be between 0 and 100 kilometers")
+        if not 1 <= data.get("limit", 1) <= 50:
+            raise ValidationError("The limit must be between 1 and 50")
+        return data
+
+
 class CommunityUrlParamsSchema(UrlParamsSchema):
     """Class to Deserialize information from url parameters
     for community resources.
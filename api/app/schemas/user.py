@@ -4,18 +4,20 @@ User models.
 
 
 from app.extensions import ma
+from app.schemas.base import BaseSchema
 from app.schemas.location import LocationSchema
 from app.schemas.image import ImageSchema
 from marshmallow import validate, pre_load, post_load, post_dump, EXCLUDE
+from app.schemas.url_for_field import CachedURLFor
 
 
-class UserSchema(ma.Schema):
+class UserSchema(BaseSchema):
     """Class to serialize and deserialize User models."""
 
     COLLECTION_NAME = "users"
     RESOURCE_NAME = "user"
 
-    class Meta:
+    class Meta(BaseSchema.Meta):
         unknown = EXCLUDE
 
     _id = ma.UUID(data_key="id", dump_only=True)
@@ -32,11 +34,11 @@ class UserSchema(ma.Schema):
     cover_photo = ma.Nested(ImageSchema, dump_only=True)
 
     # links
-    self_url = ma.URLFor("api.get_user", user_id="<_id>")
-    communities_url= ma.URLFor("api.get_user_communities", user_id="<_id>")
-    notifications_url = ma.URLFor("api.get_user_notifications", user_id="<_id>")
-    private_chats_url = ma.URLFor("api.get_user_private_chats", user_id="<_id>")
-    group_chats_url = ma.URLFor("api.get_user_group_chats", user_id="<_id>")
+    self_url = CachedURLFor("api.get_user", user_id="<_id>")
+    communities_url= CachedURLFor("api.get_user_communities", user_id="<_id>")
+    notifications_url = CachedURLFor("api.get_user_notifications", user_id="<_id>")
+    private_chats_url = CachedURLFor("api.get_user_private_chats", user_id="<_id>")
+    group_chats_url = CachedURLFor("api.get_user_group_chats", user_id="<_id>")
 
     @pre_load
     def strip_unwanted_fields(self, data, many, **kwargs):
@@ -1,3 +1,4 @@
+from datetime import datetime
 from flask import Blueprint, g, request, render_template
 from app.extensions import socketio
 from app.decorators.auth import socketio_jwt_required
@@ -18,16 +19,13 @@ def connect_handler():
     The user's session is saved in the database for as long as the 
     connection is alive.
     """
-    g.current_user.ping()
-    g.current_user.socketio_session_id = request.sid
-    g.current_user.add_room(request.sid)
     database_repository.update_user(
         g.current_user,
         {
-            "socketio_session_id": g.current_user.socketio_session_id,
-            "is_online": g.current_user.is_online,
-            "last_seen_at": g.current_user.last_seen_at,
-            "rooms": g.current_user.rooms
+            "socketio_session_id": request.sid,
+            "is_online": True,
+            "last_seen_at": datetime.now(),
+            "rooms": g.current_user.rooms + [request.sid],
         },
     )
     print(f"{g.current_user.username} connected to server!")
@@ -39,16 +37,9 @@ def disconnect_handler():
     necessary cleanup when the client disconnects from the server.
     """
     print("User disconnected from server!")
-    g.current_user.is_online = False
-    g.current_user.socketio_session_id = ""
-    g.current_user.clear_rooms()
     database_repository.update_user(
         g.current_user,
-        {
-            "socketio_session_id": g.current_user.socketio_session_id,
-            "is_online": g.current_user.is_online,
-            "rooms": g.current_user.rooms,
-        },
+        {"socketio_session_id": "", "is_online": False, "rooms": []},
     )
 
 
@@ -56,10 +47,8 @@ def disconnect_handler():
 @socketio_jwt_required(TokenType.ACCESS_TOKEN)
 def ping_user():
     """Clients must send this event periodically to keep the user online."""
-    g.current_user.ping()
     database_repository.update_user(
-        g.current_user, 
-        {"is_online": g.current_user.is_online, "last_seen_at": g.current_user.last_seen_at}
+        g.current_user, {"is_online": True, "last_seen_at": datetime.now()}
     )
 
 
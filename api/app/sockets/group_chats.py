@@ -1,7 +1,6 @@
 """This module contains socketio event handlers for group chats."""
 
 
-import json
 from datetime import datetime
 from uuid import uuid4
 from http import HTTPStatus
@@ -24,13 +23,13 @@ def create_group_chat_message(message_data, message_schema):
     """Create a new group chat message."""
     group_chat = database_repository.get_group_chat(message_data["community_id"], message_data["_chat_id"])
     if not group_chat:
-        emit("error", json.dumps({"error": "Group chat not found"}))
+        emit("error", {"error": "Group chat not found"})
     else:
         member = database_repository.get_group_chat_member(message_data["_chat_id"], g.current_user.id)
         if not member:
-            emit("error", json.dumps({"error": "User is not a member of this group chat"}))
+            emit("error", {"error": "User is not a member of this group chat"})
         elif not member.in_room(group_chat.id):
-            emit("error", json.dumps({"error": "User has not joined the group chat"})) 
+            emit("error", {"error": "User has not joined the group chat"}) 
         else:
             now = datetime.now()
             chat_message = Message(
@@ -45,7 +44,7 @@ def create_group_chat_message(message_data, message_schema):
 
             emit(
                 "new_chat_message",
-                message_schema.dumps(chat_message),
+                message_schema.dump(chat_message),
                 room=chat_message.chat_id
             )
             target_url = url_for(
@@ -69,18 +68,19 @@ def join_group_chat(group_chat_data, chat_schema):
     community_id = group_chat_data["_community_id"]
     group_chat = database_repository.get_group_chat(community_id, group_chat_id)
     if not group_chat:
-        emit("error", json.dumps({"error": "Group chat not found"}))
+        emit("error", {"error": "Group chat not found"})
     else:
         member = database_repository.get_group_chat_member(group_chat_id, g.current_user.id)
         if not member:
-            emit("error", json.dumps({"error": "User is not a member of this group chat"}))    
+            emit("error", {"error": "User is not a member of this group chat"})    
         else:
-            member.add_room(group_chat_id)
-            database_repository.update_user(member, {"rooms": member.rooms})
+            database_repository.update_user(
+                member, {"rooms": member.rooms + [group_chat_id]}
+            )
             join_room(group_chat_id)
             emit(
                 "joined_group_chat", 
-                json.dumps({"message": f"{g.current_user.username} has entered the chat!"}),
+                {"message": f"{g.current_user.username} has entered the chat!"},
                 room=group_chat_id
             )
 
@@ -94,20 +94,20 @@ def leave_group_chat(group_chat_data, chat_schema):
     community_id = group_chat_data["_community_id"]
     group_chat = database_repository.get_group_chat(community_id, group_chat_id)
     if not group_chat:
-        emit("error", json.dumps({"error": "Group chat not found"}))
+        emit("error", {"error": "Group chat not found"})
     else:
         member = database_repository.get_group_chat_member(group_chat_id, g.current_user.id)
         if not member:
-            emit("error", json.dumps({"error": "User is not a member of this group chat"}))
+            emit("error", {"error": "User is not a member of this group chat"})
         elif not member.in_room(group_chat_id):
-            emit("error", json.dumps({"error": "User has not joined this group chat"}))
+            emit("error", {"error": "User has not joined this group chat"})
         else:
-            member.remove_room(group_chat_id)
-            database_repository.update_user(member, {"rooms": member.rooms})
+            rooms = [room for room in member.rooms if room != group_chat_id]
+            database_repository.update_user(member, {"rooms": rooms})
             leave_room(group_chat_id)
             emit(
                 "left_group_chat", 
-                json.dumps({"message": f"{g.current_user.username} has left the chat"}),
+                {"message": f"{g.current_user.username} has left the chat"},
                 room=group_chat_id
             )
 
@@ -31,7 +31,7 @@ def send_group_chat_notifications(target_url, current_user, chat_message, group_
             if member.socketio_session_id:
                 emit(
                     "new_notification",
-                    notification_schema.dumps(notification),
+                    notification_schema.dump(notification),
                     room=member.socketio_session_id,
                 )
 
@@ -55,6 +55,6 @@ def send_private_chat_notifications(target_url, current_user, chat_message, priv
     if other_user.socketio_session_id:
         emit(
             "new_notification",
-            notification_schema.dumps(notification),
+            notification_schema.dump(notification),
             room=other_user.socketio_session_id,
         )
@@ -1,7 +1,6 @@
 """This module contains socketio event handlers for chat messages."""
 
 
-import json
 from flask import g
 from flask_socketio import emit
 from app.extensions import socketio
@@ -10,6 +9,9 @@ from app.decorators.views import socketio_handle_arguments
 from app.models import TokenType, RolePermission, Reaction, MessageType
 from app.schemas import GroupChatMessageSchema, PrivateChatMessageSchema, MessageSchema, ReactionSchema
 from app.repositories import database_repository
+from app.repositories.exceptions import (
+    DatabaseException, NotFoundException, NotOwnerException
+)
 
 
 @socketio.event
@@ -18,27 +20,30 @@ from app.repositories import database_repository
 @socketio_handle_arguments(MessageSchema())
 def update_chat_message(message_data, message_schema):
     """Update the content of a chat message."""
-    chat_message = database_repository.get_chat_message(
-        message_data["_chat_id"], message_data["_id"], message_data["message_type"]
-    )
-    if not chat_message:
-        emit("error", json.dumps({"error": "Chat message not found"}))
-    elif chat_message.user_id != g.current_user.id:
-        emit("error", json.dumps({"error": "User is not the sender of this message"}))
-    elif not g.current_user.in_room(chat_message.chat_id):
-        emit("error", json.dumps({"error": "User has not joined the chat"}))
+    chat_id = message_data["_chat_id"]
+    if not g.current_user.in_room(chat_id):
+        emit("error", {"error": "User has not joined the chat"})
     else:
-        chat_message.edit(message_data["_content"])
-        database_repository.add_chat_message(chat_message)
-        if chat_message.message_type == MessageType.PRIVATE_CHAT:
-            schema = PrivateChatMessageSchema()
+        try:
+            chat_message = database_repository.edit_chat_message(
+                chat_id,
+                message_data["message_type"],
+                message_data["_id"],
+                g.current_user.id,
+                message_data["_content"]
+            )
+        except (NotFoundException, NotOwnerException) as err:
+            emit("error", {"error": str(err)})
         else:
-            schema = GroupChatMessageSchema()
-        emit(
-            "chat_message_editted",
-            schema.dumps(chat_message),
-            room=chat_message.chat_id
-        )
+            if chat_message.message_type == MessageType.PRIVATE_CHAT:
+                schema = PrivateChatMessageSchema()
+            else:
+                schema = GroupChatMessageSchema()
+            emit(
+                "chat_message_editted",
+                schema.dump(chat_message),
+                room=chat_id
+            )
 
 
 @socketio.event
@@ -47,22 +52,22 @@ def update_chat_message(message_data, message_schema):
 @socketio_handle_arguments(MessageSchema(only=["_id", "_chat_id", "message_type"]))
 def delete_chat_message(message_data, message_schema):
     """Delete an existing chat message."""
-    chat_message = database_repository.get_chat_message(
-        message_data["_chat_id"], message_data["_id"], message_data["message_type"]
-    )
-    if not chat_message:
-        emit("error", json.dumps({"error": "Chat message not found"}))
-    elif chat_message.user_id != g.current_user.id:
-        emit("error", json.dumps({"error": "User is not the sender of this message"}))
-    elif not g.current_user.in_room(chat_message.chat_id):
-        emit("error", json.dumps({"error": "User has not joined the chat"}))
+    chat_id = message_data["_chat_id"]
+    if not g.current_user.in_room(chat_id):
+        emit("error", {"error": "User has not joined the chat"})
     else:
-        database_repository.remove_chat_message(chat_message)
-        emit(
-            "chat_message_deleted",
-            json.dumps({"message_id": chat_message.id, "message_type": message_data["message_type"].name}),
-            room=chat_message.chat_id
-        )
+        try:
+            chat_message = database_repository.delete_chat_message(
+                chat_id, message_data["message_type"], message_data["_id"], g.current_user.id
+            )
+        except (NotFoundException, NotOwnerException) as err:
+            emit("error", {"error": str(err)})
+        else:
+            emit(
+                "chat_message_deleted",
+                {"message_id": chat_message.id, "message_type": message_data["message_type"].name},
+                room=chat_id
+            )
 
 
 @socketio.event
@@ -70,23 +75,30 @@ def delete_chat_message(message_data, message_schema):
 @socketio_permission_required(RolePermission.WRITE_CHAT_MESSAGE)
 @socketio_handle_arguments(ReactionSchema())
 def react_to_chat_message(reaction_data, reaction_schema):
-    """Add a new reaction to a group chat message."""
-    chat_message = database_repository.get_chat_message(
-        reaction_data["chat_id"], reaction_data["message_id"], reaction_data["message_type"]
-    )
-    if not chat_message:
-        emit("error", json.dumps({"error": "Chat message not found"}))
-    elif not g.current_user.in_room(chat_message.chat_id):
-        emit("error", json.dumps({"error": "User has not joined the chat"}))
+    """Add a new reaction to a chat message, replacing the user's previous
+    reaction to it.
+    """
+    chat_id = reaction_data["chat_id"]
+    if not g.current_user.in_room(chat_id):
+        emit("error", {"error": "User has not joined the chat"})
     else:
-        reaction = Reaction(g.current_user.id, reaction_data["reaction_type"])
-        chat_message.add_reaction(reaction)
-        database_repository.add_chat_message(chat_message)
-        emit(
-            "new_chat_message_reaction",
-            reaction_schema.dumps(reaction),
-            room=chat_message.chat_id,
+        reaction = Reaction(
+            reaction_data["message_id"], g.current_user.id, reaction_data["reaction_type"]
         )
+        try:
+            database_repository.add_chat_message_reaction(
+                chat_id, reaction_data["message_type"], reaction
+            )
+        except NotFoundException:
+            emit("error", {"error": "Chat message not found"})
+        except DatabaseException:
+            emit("error", {"error": "Could not react to chat message"})
+        else:
+            emit(
+                "new_chat_message_reaction",
+                reaction_schema.dump(reaction),
+                room=chat_id,
+            )
 
 
 @socketio.event
@@ -95,24 +107,30 @@ def react_to_chat_message(reaction_data, reaction_schema):
 @socketio_handle_arguments(ReactionSchema(partial=["reaction_type"]))
 def unreact_to_chat_message(reaction_data, reaction_schema):
     """Remove a reaction from a chat message."""
-    chat_message = database_repository.get_chat_message(
-        reaction_data["chat_id"], reaction_data["message_id"], reaction_data["message_type"]
-    )
-    if not chat_message:
-        emit("error", json.dumps({"error": "Chat message not found"}))
-    elif not g.current_user.in_room(chat_message.chat_id):
-        emit("error", json.dumps({"error": "User has not joined the chat"}))
+    chat_id = reaction_data["chat_id"]
+    if not g.current_user.in_room(chat_id):
+        emit("error", {"error": "User has not joined the chat"})
     else:
-        reaction = chat_message.remove_reaction(g.current_user.id)
-        if not reaction:
-            emit("error", json.dumps({"error": "User has not yet reacted to this message"}))
-        else:
-            database_repository.add_chat_message(chat_message)
-            emit(
-                "removed_chat_message_reaction",
-                reaction_schema.dumps(reaction),
-                room=chat_message.chat_id,
+        try:
+            reaction = database_repository.remove_chat_message_reaction(
+                chat_id,
+                reaction_data["message_type"],
+                reaction_data["message_id"],
+                g.current_user.id
             )
+        except NotFoundException:
+            emit("error", {"error": "Chat message not found"})
+        except DatabaseException:
+            emit("error", {"error": "Could not remove reaction from chat message"})
+        else:
+            if not reaction:
+                emit("error", {"error": "User has not yet reacted to this message"})
+            else:
+                emit(
+                    "removed_chat_message_reaction",
+                    reaction_schema.dump(reaction),
+                    room=chat_id,
+                )
 
 
 
@@ -0,0 +1,136 @@
+"""This module contains the Socket.IO server that lets each client choose
+whether its packets are serialized as JSON or MessagePack.
+
+Clients that use socket.io-msgpack-parser ask for MessagePack with the
+serializer=msgpack query parameter when they connect. Each packet sent to
+them is a MessagePack map of the packet's type, namespace, id and data,
+and each binary message they send is decoded the same way. Every other
+client keeps using JSON text packets. MessagePack is only offered when
+the msgpack package is installed and the SOCKETIO_MSGPACK config value
+is set.
+"""
+
+
+import logging
+from urllib.parse import parse_qs
+import socketio
+from socketio import packet
+from app import json_backend
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover
+    msgpack = None
+
+
+logger = logging.getLogger(__name__)
+
+
+_TEXT_PACKET_TYPES = {packet.BINARY_EVENT: packet.EVENT, packet.BINARY_ACK: packet.ACK}
+
+
+class PacketSerializer:
+    """Class that holds constants of the serializers clients can ask for."""
+
+    JSON = "json"
+    MSGPACK = "msgpack"
+
+
+def requested_serializer(environ):
+    """Return the serializer the client asked for in its connection's
+    query string, defaulting to JSON.
+    """
+    query = parse_qs(environ.get("QUERY_STRING", ""))
+    serializer = query.get("serializer", [PacketSerializer.JSON])[0]
+    return serializer if serializer == PacketSerializer.MSGPACK else PacketSerializer.JSON
+
+
+class MsgPackPacket(packet.Packet):
+    """Socket.IO packet serialized with MessagePack, in the format of
+    socket.io-msgpack-parser. Binary data is encoded natively, so it never
+    needs to be sent as attachments.
+    """
+
+    def encode(self):
+        encoded_packet = {
+            "type": self.packet_type,
+            "data": self.data,
+            "nsp": self.namespace or "/",
+        }
+        if self.id is not None:
+            encoded_packet["id"] = self.id
+        return msgpack.packb(encoded_packet, default=json_backend.to_serializable)
+
+    def decode(self, encoded_packet):
+        decoded_packet = msgpack.unpackb(encoded_packet)
+        self.packet_type = decoded_packet["type"]
+        self.data = decoded_packet.get("data")
+        self.namespace = decoded_packet.get("nsp", "/")
+        self.id = decoded_packet.get("id")
+        return 0
+
+    def _data_is_binary(self, data):
+        return False
+
+
+class PacketNegotiatingServer(socketio.Server):
+    """Socket.IO server that sends and receives MessagePack packets for
+    the connections that asked for them and JSON packets for the rest.
+    """
+
+    def _handle_eio_connect(self, eio_sid, environ):
+        super()._handle_eio_connect(eio_sid, environ)
+        if requested_serializer(environ) == PacketSerializer.MSGPACK:
+            self._msgpack_eio_sids.add(eio_sid)
+
+    def _handle_eio_message(self, eio_sid, data):
+        if eio_sid not in self._msgpack_eio_sids or not isinstance(data, bytes):
+            return super()._handle_eio_message(eio_sid, data)
+        pkt = MsgPackPacket(encoded_packet=data)
+        if pkt.packet_type == packet.CONNECT:
+            self._handle_connect(eio_sid, pkt.namespace)
+        elif pkt.packet_type == packet.DISCONNECT:
+            self._handle_disconnect(eio_sid, pkt.namespace)
+        elif pkt.packet_type == packet.EVENT:
+            self._handle_event(eio_sid, pkt.namespace, pkt.id, pkt.data)
+        elif pkt.packet_type == packet.ACK:
+            self._handle_ack(eio_sid, pkt.namespace, pkt.id, pkt.data)
+        else:
+            raise ValueError("Unexpected packet type")
+
+    def _handle_eio_disconnect(self, eio_sid):
+        super()._handle_eio_disconnect(eio_sid)
+        self._msgpack_eio_sids.discard(eio_sid)
+
+    def _send_packet(self, eio_sid, pkt):
+        if eio_sid not in self._msgpack_eio_sids:
+            return super()._send_packet(eio_sid, pkt)
+        # Binary data doesn't need attachments in MessagePack
+        packet_type = _TEXT_PACKET_TYPES.get(pkt.packet_type, pkt.packet_type)
+        msgpack_packet = MsgPackPacket(
+            packet_type, pkt.data, namespace=pkt.namespace, id=pkt.id, binary=False
+        )
+        self.eio.send(eio_sid, msgpack_packet.encode())
+
+
+def init_packet_serializers(app, socketio_extension):
+    """Let the clients of the extension's server ask for MessagePack
+    packets if the app's config allows it and msgpack is installed. Must
+    be called after the extension is initialized with the app.
+    """
+    if not app.config.get("SOCKETIO_MSGPACK", False):
+        return
+    if msgpack is None:
+        logger.warning("msgpack isn't installed, Socket.IO packets will only be sent as JSON")
+        return
+    server = socketio_extension.server
+    if isinstance(server, PacketNegotiatingServer):
+        return
+    # Flask-SocketIO builds a socketio.Server itself, so the server it
+    # built becomes a PacketNegotiatingServer and its Engine.IO handlers
+    # are registered again to use the overridden methods
+    server.__class__ = PacketNegotiatingServer
+    server._msgpack_eio_sids = set()
+    server.eio.on("connect", server._handle_eio_connect)
+    server.eio.on("message", server._handle_eio_message)
+    server.eio.on("disconnect", server._handle_eio_disconnect)
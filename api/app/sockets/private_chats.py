@@ -1,7 +1,6 @@
 """This module contains socketio event handlers for private chats."""
 
 
-import json
 from datetime import datetime
 from uuid import uuid4
 from http import HTTPStatus
@@ -24,9 +23,9 @@ def create_private_chat_message(message_data, message_schema):
     """Create a new private chat message."""
     private_chat = database_repository.get_private_chat(message_data["_chat_id"])
     if not private_chat:
-        emit("error", json.dumps({"error": "Private chat not found"}))
+        emit("error", {"error": "Private chat not found"})
     elif not g.current_user.in_room(private_chat.id):
-        emit("error", json.dumps({"error": "User has not joined the private chat"}))
+        emit("error", {"error": "User has not joined the private chat"})
     else:
         now = datetime.now()
         
@@ -42,7 +41,7 @@ def create_private_chat_message(message_data, message_schema):
         
         emit(
             "new_chat_message",
-            message_schema.dumps(chat_message),
+            message_schema.dump(chat_message),
             room=chat_message.chat_id,
         )
         target_url = url_for(
@@ -63,14 +62,15 @@ def join_private_chat(private_chat_data, chat_schema):
     """Add a user to a socketio room. Rooms are identified by private chat ids."""
     private_chat = database_repository.get_private_chat(private_chat_data["_id"])
     if not private_chat:
-        emit("error", json.dumps({"error": "Private chat not found"}))
+        emit("error", {"error": "Private chat not found"})
     else:
-        g.current_user.add_room(private_chat.id)
-        database_repository.update_user(g.current_user, {"rooms": g.current_user.rooms})
+        database_repository.update_user(
+            g.current_user, {"rooms": g.current_user.rooms + [private_chat.id]}
+        )
         join_room(private_chat.id)
         emit(
             "joined_private_chat",
-            json.dumps({"message": f"{g.current_user.username} has entered the chat!"}),
+            {"message": f"{g.current_user.username} has entered the chat!"},
             room=private_chat.id,
         )
 
@@ -82,15 +82,15 @@ def leave_private_chat(private_chat_data, chat_schema):
     """Remove a user from a socketio room. Roomas are identified by private chat ids."""
     private_chat = database_repository.get_private_chat(private_chat_data["_id"])
     if not private_chat:
-        emit("error", json.dumps({"error": "Private chat not found"}))
+        emit("error", {"error": "Private chat not found"})
     elif not g.current_user.in_room(private_chat.id):
-        emit("error", json.dumps({"error": "User has not joined this private chat"}))
+        emit("error", {"error": "User has not joined this private chat"})
     else:
-        g.current_user.remove_room(private_chat.id)
-        database_repository.update_user(g.current_user, {"rooms": g.current_user.rooms})
+        rooms = [room for room in g.current_user.rooms if room != private_chat.id]
+        database_repository.update_user(g.current_user, {"rooms": rooms})
         leave_room(private_chat.id)
         emit(
             "left_private_chat",
-            json.dumps({"message": f"{g.current_user.username} has left the chat"}),
+            {"message": f"{g.current_user.username} has left the chat"},
             room=private_chat.id,
         )
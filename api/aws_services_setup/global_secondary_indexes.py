@@ -58,12 +58,38 @@ INVERTED_GSI = {
     },
 }
 
+DIRECTORY_GSI = {
+    "IndexName": "DirectoryIndex",
+    "KeySchema": [
+        {"AttributeName": "DIRECTORY_GSI_PK", "KeyType": "HASH"},
+        {"AttributeName": "DIRECTORY_GSI_SK", "KeyType": "RANGE"},
+    ],
+    "Projection": {"ProjectionType": "ALL"},
+    "ProvisionedThroughput": {
+        "ReadCapacityUnits": int(os.environ.get("AWS_DYNAMODB_INDEX_RCU", 25)),
+        "WriteCapacityUnits": int(os.environ.get("AWS_DYNAMODB_INDEX_WCU", 25)),
+    },
+}
 
+GEOHASH_GSI = {
+    "IndexName": "CommunitiesByGeohash",
+    "KeySchema": [
+        {"AttributeName": "GEOHASH_GSI_PK", "KeyType": "HASH"},
+        {"AttributeName": "GEOHASH_GSI_SK", "KeyType": "RANGE"},
+    ],
+    "Projection": {"ProjectionType": "ALL"},
+    "ProvisionedThroughput": {
+        "ReadCapacityUnits": int(os.environ.get("AWS_DYNAMODB_INDEX_RCU", 25)),
+        "WriteCapacityUnits": int(os.environ.get("AWS_DYNAMODB_INDEX_WCU", 25)),
+    },
+}
 
 
 GSI_LIST = [
     USERS_GSI,
     COMMUNITIES_BY_LOCATION_GSI,
     COMMUNITIES_BY_TOPIC_GSI,
-    INVERTED_GSI
+    INVERTED_GSI,
+    DIRECTORY_GSI,
+    GEOHASH_GSI
 ]
\ No newline at end of file
@@ -0,0 +1,289 @@
+"""This file contains functions for migrating items that are already
+stored in DynamoDB to newer table layouts.
+"""
+
+
+from aws_services_setup.utils import dynamodb_client, TABLE_NAME
+from app.models import MessageBucket
+from app.dynamodb_mappers import (
+    PrivateChatMessageMapper,
+    GroupChatMessageMapper,
+    PrivateChatMessageBucketMapper,
+    GroupChatMessageBucketMapper,
+)
+from app.dynamodb_mappers.constants import ItemType, PrimaryKeyPrefix, DirectoryPartition
+from app.repositories.utils import directory_sort_key
+from app.repositories.message_search import (
+    tokenize,
+    postings_key,
+    encode_message_id,
+    MAX_POSTINGS_PER_ITEM,
+)
+
+
+def migrate_messages_to_buckets():
+    """Move chat messages that are stored in a single partition per chat
+    into time bucketed partitions and add each bucket to its chat's
+    bucket directory. Messages that are already bucketed are skipped.
+    Return the number of messages that were moved.
+    """
+    mappers = {
+        ItemType.PRIVATE_CHAT_MESSAGE.name: (
+            PrivateChatMessageMapper(), PrivateChatMessageBucketMapper()
+        ),
+        ItemType.GROUP_CHAT_MESSAGE.name: (
+            GroupChatMessageMapper(), GroupChatMessageBucketMapper()
+        ),
+    }
+    known_buckets = set()
+    num_moved = 0
+    paginator = dynamodb_client.get_paginator("scan")
+    pages = paginator.paginate(
+        TableName=TABLE_NAME,
+        FilterExpression="#type IN (:private_chat_message, :group_chat_message)",
+        ExpressionAttributeNames={"#type": "type"},
+        ExpressionAttributeValues={
+            ":private_chat_message": {"S": ItemType.PRIVATE_CHAT_MESSAGE.name},
+            ":group_chat_message": {"S": ItemType.GROUP_CHAT_MESSAGE.name},
+        },
+    )
+    for page in pages:
+        for item in page["Items"]:
+            mapper, bucket_mapper = mappers[item["type"]["S"]]
+            chat_id = item["_chat_id"]["S"]
+            message_id = item["_id"]["S"]
+            primary_key = mapper.key(chat_id, message_id)
+            if primary_key["PK"] == item["PK"]:
+                continue
+            bucket = mapper.bucket(message_id)
+            if (chat_id, bucket) not in known_buckets:
+                dynamodb_client.put_item(
+                    TableName=TABLE_NAME,
+                    Item=bucket_mapper.serialize_from_model(
+                        MessageBucket(chat_id, bucket)
+                    ),
+                )
+                known_buckets.add((chat_id, bucket))
+            _move_item(item, primary_key)
+            num_moved += 1
+    return num_moved
+
+
+def _move_item(item, primary_key):
+    """Move an item to a new primary key in a single transaction."""
+    dynamodb_client.transact_write_items(
+        TransactItems=[
+            {
+                "Put": {
+                    "TableName": TABLE_NAME,
+                    "Item": {**item, **primary_key},
+                    "ConditionExpression": "attribute_not_exists(PK)",
+                }
+            },
+            {
+                "Delete": {
+                    "TableName": TABLE_NAME,
+                    "Key": {"PK": item["PK"], "SK": item["SK"]},
+                }
+            },
+        ]
+    )
+
+
+def backfill_counters():
+    """Set the member counts of communities and group chats and the unread
+    notification counts of users from the items they count. Meant to be run
+    once for items created before the counters existed, while writes are
+    paused, since concurrent changes to the counted items may be missed.
+    Return the number of items that were updated.
+    """
+    counters = {
+        ItemType.COMMUNITY.name: (
+            "_member_count", lambda item: item["PK"], PrimaryKeyPrefix.USER, None
+        ),
+        ItemType.GROUP_CHAT.name: (
+            "_member_count", 
+            lambda item: {"S": PrimaryKeyPrefix.GROUP_CHAT + item["_id"]["S"]},
+            PrimaryKeyPrefix.USER,
+            None
+        ),
+        ItemType.USER.name: (
+            "_unread_notification_count", 
+            lambda item: item["PK"], 
+            PrimaryKeyPrefix.NOTIFICATION, 
+            "#read = :false"
+        ),
+    }
+    num_updated = 0
+    paginator = dynamodb_client.get_paginator("scan")
+    pages = paginator.paginate(
+        TableName=TABLE_NAME,
+        FilterExpression="#type IN (:community, :group_chat, :user)",
+        ExpressionAttributeNames={"#type": "type"},
+        ExpressionAttributeValues={
+            ":community": {"S": ItemType.COMMUNITY.name},
+            ":group_chat": {"S": ItemType.GROUP_CHAT.name},
+            ":user": {"S": ItemType.USER.name},
+        },
+    )
+    for page in pages:
+        for item in page["Items"]:
+            attribute, partition_key, sort_key_prefix, filter_expression = counters[
+                item["type"]["S"]
+            ]
+            count = _count_items(partition_key(item), sort_key_prefix, filter_expression)
+            dynamodb_client.update_item(
+                TableName=TABLE_NAME,
+                Key={"PK": item["PK"], "SK": item["SK"]},
+                UpdateExpression="SET #counter = :count",
+                ExpressionAttributeNames={"#counter": attribute},
+                ExpressionAttributeValues={":count": {"N": str(count)}},
+            )
+            num_updated += 1
+    return num_updated
+
+
+def _count_items(partition_key, sort_key_prefix, filter_expression=None):
+    """Return the number of items in a partition whose sort key begins
+    with the given prefix.
+    """
+    parameters = {
+        "TableName": TABLE_NAME,
+        "Select": "COUNT",
+        "KeyConditionExpression": "PK = :pk AND begins_with(SK, :sk)",
+        "ExpressionAttributeValues": {":pk": partition_key, ":sk": {"S": sort_key_prefix}},
+    }
+    if filter_expression:
+        parameters["FilterExpression"] = filter_expression
+        parameters["ExpressionAttributeNames"] = {"#read": "_read"}
+        parameters["ExpressionAttributeValues"][":false"] = {"BOOL": False}
+    count = 0
+    for page in dynamodb_client.get_paginator("query").paginate(**parameters):
+        count += page["Count"]
+    return count
+
+
+def backfill_directory_index():
+    """Add user and community items that were created before the directory
+    existed to it, so that they are listed and searchable by the sparse
+    DirectoryIndex. Items that are already in the directory are skipped, so
+    this is safe to run more than once. Return the number of items that were
+    added.
+    """
+    directories = {
+        ItemType.USER.name: (DirectoryPartition.USERS, "username"),
+        ItemType.COMMUNITY.name: (DirectoryPartition.COMMUNITIES, "name"),
+    }
+    num_added = 0
+    paginator = dynamodb_client.get_paginator("scan")
+    pages = paginator.paginate(
+        TableName=TABLE_NAME,
+        FilterExpression=(
+            "#type IN (:user, :community) AND attribute_not_exists(DIRECTORY_GSI_PK)"
+        ),
+        ExpressionAttributeNames={"#type": "type"},
+        ExpressionAttributeValues={
+            ":user": {"S": ItemType.USER.name},
+            ":community": {"S": ItemType.COMMUNITY.name},
+        },
+    )
+    for page in pages:
+        for item in page["Items"]:
+            partition, name_attribute = directories[item["type"]["S"]]
+            sort_key = directory_sort_key(item[name_attribute]["S"], item["_id"]["S"])
+            try:
+                dynamodb_client.update_item(
+                    TableName=TABLE_NAME,
+                    Key={"PK": item["PK"], "SK": item["SK"]},
+                    UpdateExpression="SET DIRECTORY_GSI_PK = :pk, DIRECTORY_GSI_SK = :sk",
+                    ConditionExpression="attribute_exists(PK)",
+                    ExpressionAttributeValues={
+                        ":pk": {"S": partition},
+                        ":sk": {"S": sort_key},
+                    },
+                )
+            except dynamodb_client.exceptions.ConditionalCheckFailedException:
+                # The item was deleted after the scan read it
+                continue
+            num_added += 1
+    return num_added
+
+
+def rebuild_message_search_index():
+    """Delete every message search postings item and rebuild the postings
+    from the chat messages in the table. Meant to be run while writes are
+    paused, since messages added during the rebuild may be left out of the
+    index. Return the number of messages that were indexed.
+    """
+    mappers = {
+        ItemType.PRIVATE_CHAT_MESSAGE.name: PrivateChatMessageMapper(),
+        ItemType.GROUP_CHAT_MESSAGE.name: GroupChatMessageMapper(),
+    }
+    paginator = dynamodb_client.get_paginator("scan")
+    pages = paginator.paginate(
+        TableName=TABLE_NAME,
+        FilterExpression="#type = :postings",
+        ProjectionExpression="PK, SK",
+        ExpressionAttributeNames={"#type": "type"},
+        ExpressionAttributeValues={":postings": {"S": ItemType.MESSAGE_POSTINGS.name}},
+    )
+    for page in pages:
+        for start in range(0, len(page["Items"]), 25):
+            _batch_delete(page["Items"][start:start + 25])
+
+    num_indexed = 0
+    pages = paginator.paginate(
+        TableName=TABLE_NAME,
+        FilterExpression="#type IN (:private_chat_message, :group_chat_message)",
+        ExpressionAttributeNames={"#type": "type"},
+        ExpressionAttributeValues={
+            ":private_chat_message": {"S": ItemType.PRIVATE_CHAT_MESSAGE.name},
+            ":group_chat_message": {"S": ItemType.GROUP_CHAT_MESSAGE.name},
+        },
+    )
+    for page in pages:
+        # Postings are grouped by item within a page so that messages in
+        # the same chat and bucket share a single update per term
+        postings = {}
+        for item in page["Items"]:
+            mapper = mappers[item["type"]["S"]]
+            chat_id = item["_chat_id"]["S"]
+            message_id = item["_id"]["S"]
+            bucket = mapper.bucket(message_id)
+            for term in tokenize(item.get("_content", {}).get("S", "")):
+                postings.setdefault((chat_id, term, bucket), set()).add(
+                    encode_message_id(message_id)
+                )
+            num_indexed += 1
+        for (chat_id, term, bucket), message_ids in postings.items():
+            # Compact ids sort by creation time, so when there are more ids
+            # than a postings item holds, the newest of them are added
+            message_ids = sorted(message_ids)[-MAX_POSTINGS_PER_ITEM:]
+            try:
+                dynamodb_client.update_item(
+                    TableName=TABLE_NAME,
+                    Key=postings_key(chat_id, term, bucket),
+                    UpdateExpression="ADD postings :postings SET #type = :type",
+                    ConditionExpression=(
+                        "attribute_not_exists(postings) OR size(postings) <= :max_existing"
+                    ),
+                    ExpressionAttributeNames={"#type": "type"},
+                    ExpressionAttributeValues={
+                        ":postings": {"BS": message_ids},
+                        ":type": {"S": ItemType.MESSAGE_POSTINGS.name},
+                        ":max_existing": {"N": str(MAX_POSTINGS_PER_ITEM - len(message_ids))},
+                    },
+                )
+            except dynamodb_client.exceptions.ConditionalCheckFailedException:
+                # The postings item holds the most message ids it can
+                continue
+    return num_indexed
+
+
+def _batch_delete(keys):
+    """Delete up to 25 items by key, retrying unprocessed deletes."""
+    requests = [{"DeleteRequest": {"Key": {"PK": key["PK"], "SK": key["SK"]}}} for key in keys]
+    while requests:
+        response = dynamodb_client.batch_write_item(RequestItems={TABLE_NAME: requests})
+        requests = response.get("UnprocessedItems", {}).get(TABLE_NAME, [])
+
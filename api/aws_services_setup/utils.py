@@ -7,7 +7,7 @@ import os
 import time
 import boto3
 from botocore.exceptions import ClientError
-from aws_services_setup.global_secondary_indexes import GSI_LIST
+from aws_services_setup.global_secondary_indexes import GSI_LIST, DIRECTORY_GSI, GEOHASH_GSI
 
 
 TABLE_NAME = os.environ.get("AWS_DYNAMODB_TABLE_NAME")
@@ -40,6 +40,10 @@ def create_dynamodb_table():
             {"AttributeName": "COMMUNITIES_BY_LOCATION_GSI_SK", "AttributeType": "S"},
             {"AttributeName": "INVERTED_GSI_PK", "AttributeType": "S"},
             {"AttributeName": "INVERTED_GSI_SK", "AttributeType": "S"},
+            {"AttributeName": "DIRECTORY_GSI_PK", "AttributeType": "S"},
+            {"AttributeName": "DIRECTORY_GSI_SK", "AttributeType": "S"},
+            {"AttributeName": "GEOHASH_GSI_PK", "AttributeType": "S"},
+            {"AttributeName": "GEOHASH_GSI_SK", "AttributeType": "S"},
         ],
         GlobalSecondaryIndexes=GSI_LIST,
         ProvisionedThroughput={
@@ -65,17 +69,70 @@ def create_dynamodb_table():
     return table
 
 
+def create_dynamodb_directory_index():
+    """Add the sparse directory GSI to an application table that
+    was created before it existed.
+    """
+    return dynamodb_client.update_table(
+        TableName=TABLE_NAME,
+        AttributeDefinitions=[
+            {"AttributeName": "DIRECTORY_GSI_PK", "AttributeType": "S"},
+            {"AttributeName": "DIRECTORY_GSI_SK", "AttributeType": "S"},
+        ],
+        GlobalSecondaryIndexUpdates=[{"Create": DIRECTORY_GSI}],
+    )
+
+
+def create_dynamodb_geohash_index():
+    """Add the sparse geohash GSI, which locates communities by their
+    coordinates, to an application table that was created before it existed.
+    """
+    return dynamodb_client.update_table(
+        TableName=TABLE_NAME,
+        AttributeDefinitions=[
+            {"AttributeName": "GEOHASH_GSI_PK", "AttributeType": "S"},
+            {"AttributeName": "GEOHASH_GSI_SK", "AttributeType": "S"},
+        ],
+        GlobalSecondaryIndexUpdates=[{"Create": GEOHASH_GSI}],
+    )
+
+
 def delete_dynamodb_table():
     """Delete the application's single table from DynamoDB"""
     return dynamodb_client.delete_table(TableName=TABLE_NAME)
     
 
 def create_s3_bucket():
-    """Create a bucket in S3."""
-    return s3_client.create_bucket(
+    """Create a bucket in S3 that browsers can upload images to directly
+    and that deletes uploads that were never completed.
+    """
+    response = s3_client.create_bucket(
         Bucket=BUCKET_NAME,
         CreateBucketConfiguration={"LocationConstraint": BUCKET_LOCATION},
     )
+    s3_client.put_bucket_cors(
+        Bucket=BUCKET_NAME,
+        CORSConfiguration={
+            "CORSRules": [
+                {"AllowedMethods": ["POST"], "AllowedOrigins": ["*"], "AllowedHeaders": ["*"]}
+            ]
+        },
+    )
+    s3_client.put_bucket_lifecycle_configuration(
+        Bucket=BUCKET_NAME,
+        LifecycleConfiguration={
+            "Rules": [
+                {
+                    "ID": "ExpireUploads",
+                    "Filter": {"Prefix": "uploads/"},
+                    "Status": "Enabled",
+                    "Expiration": {"Days": 1},
+                    "AbortIncompleteMultipartUpload": {"DaysAfterInitiation": 1},
+                }
+            ]
+        },
+    )
+    return response
 
 
 def delete_s3_bucket():
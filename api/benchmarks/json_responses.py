@@ -0,0 +1,107 @@
+"""This file contains a benchmark of how long large responses take to
+encode with each JSON backend: a page of users dumped by
+UserSchema(many=True) and a page of message history dumped by
+GroupChatMessageSchema(many=True).
+
+The dumped data is built once, so the times are only those of encoding
+it, through the same handle_serialization call the views make, and of
+the schemas' dumps. Run it from the api directory:
+
+    python -m benchmarks.json_responses --users 1000 --messages 1000
+"""
+
+
+import argparse
+import os
+import time
+from datetime import datetime, timedelta
+from statistics import median
+
+
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+
+
+from app import create_app
+from app.decorators.views import handle_serialization
+from app.json_backend import JSONBackend, set_json_backend, orjson
+from app.models import User, Location, Image, ImageType, Message, MessageType
+from app.models.role import regular_user_role
+from app.schemas import UserSchema, GroupChatMessageSchema
+
+
+def make_users(num_users):
+    users = []
+    for index in range(num_users):
+        username = f"user{index}"
+        users.append(User(
+            f"{index:032x}", username, "Brad", username + "@gmail.com", regular_user_role,
+            location=Location("Philadelphia", "PA", "USA"),
+            avatar=Image(f"avatar{index}", ImageType.USER_PROFILE_PHOTO, "url", 100, 100),
+            cover_photo=Image(f"cover{index}", ImageType.USER_COVER_PHOTO, "url", 100, 100),
+            bio="Just a guy who likes to chat about things with people " * 3,
+        ))
+    return users
+
+
+def make_messages(num_messages):
+    created_at = datetime(2021, 1, 21, 20, 11, 59)
+    return [
+        Message(
+            f"{index:032x}",
+            "5678",
+            f"{index % 10:032x}",
+            f"Message number {index}, with a few more words to make it realistic",
+            MessageType.GROUP_CHAT,
+            created_at=created_at + timedelta(seconds=index),
+        )
+        for index in range(num_messages)
+    ]
+
+
+def time_call(func, repeat):
+    """Return the median duration of the function over repeat calls."""
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+    return median(durations)
+
+
+def report(name, backend, duration, num_bytes):
+    print(f"{name:<24} {backend:<8} {duration * 1000:8.2f} ms  {num_bytes / 1024:8.1f} KiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--messages", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    app = create_app("testing")
+    backends = [JSONBackend.STDLIB] + ([JSONBackend.ORJSON] if orjson is not None else [])
+    with app.test_request_context():
+        cases = [
+            ("users response", UserSchema(many=True), make_users(args.users)),
+            ("message history response", GroupChatMessageSchema(many=True), make_messages(args.messages)),
+        ]
+        for name, schema, models in cases:
+            results = {
+                schema.COLLECTION_NAME: schema.dump(models),
+                "next_cursor": "a" * 40,
+            }
+            for backend in backends:
+                set_json_backend(backend)
+                num_bytes = len(handle_serialization(results, schema, 200).get_data())
+                duration = time_call(
+                    lambda: handle_serialization(results, schema, 200), args.repeat
+                )
+                report(name, backend, duration, num_bytes)
+                num_bytes = len(schema.dumps(models).encode())
+                duration = time_call(lambda: schema.dumps(models), args.repeat)
+                report("  schema dumps", backend, duration, num_bytes)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""This file contains a benchmark of how long the eventlet hub stalls
+while a burst of logins verifies passwords, with the passwords verified
+inline on the hub and in the password hashing pool.
+
+A ticker green thread that asks to wake up every few milliseconds stands
+in for the sockets served by the hub. The time it wakes up late is the
+latency every socket would see. Run it from the api directory:
+
+    python -m benchmarks.login_storm --logins 200
+"""
+
+
+import argparse
+import os
+import time
+import eventlet
+from statistics import quantiles
+
+
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+
+
+from app import create_app
+from app.extensions import bcrypt
+from app.concurrency import password_hashing_pool
+from app.models import User, Location
+from app.models.role import regular_user_role
+
+
+TICK = 0.005
+
+
+def tick(lags, running):
+    """Record how late the hub wakes the ticker up, until stopped."""
+    while running[0]:
+        start = time.perf_counter()
+        eventlet.sleep(TICK)
+        lags.append(time.perf_counter() - start - TICK)
+
+
+def run_storm(verify, num_logins, concurrency):
+    """Verify a password num_logins times from concurrent green threads
+    and return the duration of the storm and the ticker's lag.
+    """
+    lags = []
+    running = [True]
+    ticker = eventlet.spawn(tick, lags, running)
+    eventlet.sleep(TICK * 4)
+    lags.clear()
+    pool = eventlet.GreenPool(concurrency)
+    start = time.perf_counter()
+    assert all(pool.imap(lambda _: verify(), range(num_logins)))
+    duration = time.perf_counter() - start
+    running[0] = False
+    ticker.wait()
+    return duration, lags
+
+
+def report(name, duration, lags, num_logins):
+    percentiles = quantiles(lags, n=100, method="inclusive")
+    print(
+        f"{name:<8} {num_logins / duration:8.1f} logins/s   ticker lag ms: "
+        f"p50 {percentiles[49] * 1000:7.2f}  p99 {percentiles[98] * 1000:7.2f}  "
+        f"max {max(lags) * 1000:7.2f}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--logins", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+
+    app = create_app("testing")
+    user = User(
+        "1234", "brad345", "Brad", "brad@gmail.com", regular_user_role,
+        location=Location("Philadelphia", "PA", "USA")
+    )
+    with app.app_context():
+        user.password = "password"
+        print(
+            f"bcrypt work factor {app.config['BCRYPT_LOG_ROUNDS']}, "
+            f"{app.config['PASSWORD_HASHING_WORKERS']} password hashing workers"
+        )
+        inline = lambda: bcrypt.check_password_hash(user._password_hash, "password")
+        report("inline", *run_storm(inline, args.logins, args.concurrency), args.logins)
+        report(
+            "pool",
+            *run_storm(lambda: user.verify_password("password"), args.logins, args.concurrency),
+            args.logins
+        )
+        print(password_hashing_pool.stats())
+
+
+if __name__ == "__main__":
+    main()
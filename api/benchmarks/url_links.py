@@ -0,0 +1,83 @@
+"""This file contains a benchmark of how long UserSchema(many=True).dump
+takes for a page of users, with the five links of each user built by
+url_for through Werkzeug's routing map and built from cached URL
+templates. Run it from the api directory:
+
+    python -m benchmarks.url_links --users 100
+"""
+
+
+import argparse
+import os
+import time
+from statistics import median
+
+
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+
+
+from flask_marshmallow.fields import URLFor
+from app import create_app
+from app.models import User, Location, Image, ImageType
+from app.models.role import regular_user_role
+from app.schemas import UserSchema
+from app.schemas.url_for_field import CachedURLFor
+
+
+class UncachedUserSchema(UserSchema):
+    """UserSchema with links built by url_for for every user."""
+
+    self_url = URLFor("api.get_user", user_id="<_id>")
+    communities_url = URLFor("api.get_user_communities", user_id="<_id>")
+    notifications_url = URLFor("api.get_user_notifications", user_id="<_id>")
+    private_chats_url = URLFor("api.get_user_private_chats", user_id="<_id>")
+    group_chats_url = URLFor("api.get_user_group_chats", user_id="<_id>")
+
+
+def make_users(num_users):
+    users = []
+    for index in range(num_users):
+        username = f"user{index}"
+        users.append(User(
+            f"{index:032x}", username, "Brad", username + "@gmail.com", regular_user_role,
+            location=Location("Philadelphia", "PA", "USA"),
+            avatar=Image(f"avatar{index}", ImageType.USER_PROFILE_PHOTO, "url", 100, 100),
+            cover_photo=Image(f"cover{index}", ImageType.USER_COVER_PHOTO, "url", 100, 100),
+        ))
+    return users
+
+
+def time_dump(schema, users, repeat):
+    """Return the median duration of dumping the users over repeat dumps."""
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        schema.dump(users)
+        durations.append(time.perf_counter() - start)
+    return median(durations)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    app = create_app("testing")
+    users = make_users(args.users)
+    with app.test_request_context("/", base_url="https://chat.example.com/chat/"):
+        uncached_schema, cached_schema = UncachedUserSchema(many=True), UserSchema(many=True)
+        assert all(isinstance(cached_schema.fields[name], CachedURLFor) for name in (
+            "self_url", "communities_url", "notifications_url", "private_chats_url", "group_chats_url"
+        ))
+        assert uncached_schema.dump(users) == cached_schema.dump(users)
+        for name, schema in (("url_for", uncached_schema), ("cached", cached_schema)):
+            duration = time_dump(schema, users, args.repeat)
+            print(
+                f"{name:<8} {duration * 1000:8.2f} ms per page of {args.users} users  "
+                f"{duration / args.users * 1e6:7.1f} us per user"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -9,6 +9,17 @@ from dotenv import load_dotenv
 load_dotenv()
 
 
+from config import CONCURRENCY_MODE
+
+
+if CONCURRENCY_MODE == "green":
+    # Sockets, threads and locks have to be patched before boto3 and the
+    # app are imported, or their I/O blocks the event loop
+    import eventlet
+
+    eventlet.monkey_patch()
+
+
 from app import create_app
 from app.models import (
     PrivateChat,
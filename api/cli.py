@@ -13,10 +13,19 @@ import click
 from aws_services_setup.utils import (
     create_dynamodb_table,
     delete_dynamodb_table,
+    create_dynamodb_directory_index,
+    create_dynamodb_geohash_index,
     create_s3_bucket,
     delete_s3_bucket,
 )
+from aws_services_setup.migrations import (
+    migrate_messages_to_buckets,
+    backfill_counters,
+    backfill_directory_index,
+    rebuild_message_search_index,
+)
 from botocore.exceptions import ClientError
+from app.api.image_pipeline import image_pipeline
 
 
 @click.group()
@@ -67,5 +76,77 @@ def delete_bucket():
         print(err, "\n")
 
 
+@app_setup.command()
+def migrate_message_buckets():
+    """Move existing chat messages into time bucketed partitions."""
+    try:
+        num_moved = migrate_messages_to_buckets()
+        print(f"Successfully moved {num_moved} chat messages into buckets")
+    except ClientError as err:
+        print(err, "\n")
+
+
+@app_setup.command()
+def backfill_item_counters():
+    """Set member and unread notification counters from existing items."""
+    try:
+        num_updated = backfill_counters()
+        print(f"Successfully updated the counters of {num_updated} items")
+    except ClientError as err:
+        print(err, "\n")
+
+
+@app_setup.command()
+def create_directory_index():
+    """Add the sparse directory index to an existing table."""
+    try:
+        response = create_dynamodb_directory_index()
+        status = response["TableDescription"]["TableStatus"]
+        print(f"Successfully started creating the directory index - {status}")
+    except ClientError as err:
+        print(err, "\n")
+
+
+@app_setup.command()
+def create_geohash_index():
+    """Add the sparse geohash index of communities to an existing table."""
+    try:
+        response = create_dynamodb_geohash_index()
+        status = response["TableDescription"]["TableStatus"]
+        print(f"Successfully started creating the geohash index - {status}")
+    except ClientError as err:
+        print(err, "\n")
+
+
+@app_setup.command()
+def backfill_directory():
+    """Add existing users and communities to the directory."""
+    try:
+        num_added = backfill_directory_index()
+        print(f"Successfully added {num_added} items to the directory")
+    except ClientError as err:
+        print(err, "\n")
+
+
+@app_setup.command()
+def rebuild_message_search():
+    """Rebuild the chat message search index from the stored messages."""
+    try:
+        num_indexed = rebuild_message_search_index()
+        print(f"Successfully indexed {num_indexed} chat messages")
+    except ClientError as err:
+        print(err, "\n")
+
+
+@app_setup.command()
+def collect_image_garbage():
+    """Delete stored images that no user or community refers to anymore."""
+    try:
+        num_collected = image_pipeline.collect_garbage()
+        print(f"Successfully deleted {num_collected} unused images")
+    except ClientError as err:
+        print(err, "\n")
+
+
 if __name__ == "__main__":
     app_setup()
@@ -5,6 +5,10 @@ import os
 
 
 PROJECT_ROOT_DIRECTORY = os.path.abspath(os.path.dirname(__file__))
+# How boto3 calls avoid blocking the event loop: green, tpool or none.
+# Read at module level since the entrypoint needs it before the app is
+# imported.
+CONCURRENCY_MODE = os.environ.get("CONCURRENCY_MODE", "green")
 
 
 class BaseConfig:
@@ -13,12 +17,32 @@ class BaseConfig:
     # Make sure this is set for production
     SECRET_KEY = os.environ.get("SECRET_KEY", "hard to guess string")
     RESULTS_PER_PAGE = 20
+    SEARCH_RESULTS_LIMIT = 10
+    NEARBY_RADIUS_KM = 25
     ALLOWED_FILE_EXTENSIONS = {"png", "jpg", "jpeg"}
     MAX_CONTENT_LENGTH = 1024 * 1024
     MAX_GROUP_CHAT_CAPACITY = 10
     ACCESS_TOKEN_LIFESPAN = 60 * 60 # 1 hour
     REFRESH_TOKEN_LIFESPAN = 60 * 60 * 24 * 7 # 7 days
     ADMIN_EMAIL = "brad@gmail.com"
+    CONCURRENCY_MODE = CONCURRENCY_MODE
+    # Package responses, schemas and socket payloads are encoded with:
+    # orjson, falling back to json if it isn't installed, or json
+    JSON_BACKEND = os.environ.get("JSON_BACKEND", "orjson")
+    # Whether Socket.IO clients can ask for MessagePack packets, which
+    # needs the msgpack package
+    SOCKETIO_MSGPACK = os.environ.get("SOCKETIO_MSGPACK", "true").lower() == "true"
+    # Raising the work factor upgrades each password hash on its next login
+    BCRYPT_LOG_ROUNDS = int(os.environ.get("BCRYPT_LOG_ROUNDS", 12))
+    PASSWORD_HASHING_WORKERS = int(os.environ.get("PASSWORD_HASHING_WORKERS", 4))
+    PASSWORD_HASHING_MAX_QUEUE = int(os.environ.get("PASSWORD_HASHING_MAX_QUEUE", 64))
+    IMAGE_PROCESSING_WORKERS = int(os.environ.get("IMAGE_PROCESSING_WORKERS", 2))
+    IMAGE_PROCESSING_MAX_QUEUE = int(os.environ.get("IMAGE_PROCESSING_MAX_QUEUE", 16))
+    # Largest image, in bytes, that can be uploaded directly to storage
+    IMAGE_UPLOAD_MAX_SIZE = int(os.environ.get("IMAGE_UPLOAD_MAX_SIZE", 20 * 1024 * 1024))
+    IMAGE_UPLOAD_EXPIRATION = 60 * 10 # 10 minutes
+    # Seconds an image blob is kept after its last reference is dropped
+    IMAGE_GC_GRACE_PERIOD = int(os.environ.get("IMAGE_GC_GRACE_PERIOD", 60 * 60))
 
 
 class DevelopmentConfig(BaseConfig):
@@ -35,6 +59,7 @@ class TestingConfig(BaseConfig):
     """
 
     TESTING = True
+    CONCURRENCY_MODE = "none"
 
 
 class ProductionConfig(BaseConfig):
@@ -0,0 +1,164 @@
+"""This file contains integration tests for enforcing the capacity of
+a group chat inside the transaction that adds a group chat member.
+
+Note: The concurrency test needs a local DynamoDB backend listening on
+AWS_DYNAMODB_ENDPOINT_URL (e.g. the dynamodb-local docker-compose service)
+and is skipped otherwise.
+"""
+
+
+import copy
+import os
+import socket
+import time
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+from uuid import uuid4
+from unittest.mock import patch
+from botocore.exceptions import ClientError
+from app.clients import dynamodb_client
+from app.clients.dynamodb_client import _DynamoDBClient
+from app.repositories import database_repository
+from app.repositories.exceptions import (
+    CapacityExceededException,
+    NotFoundException,
+    DatabaseException
+)
+
+
+CAPACITY = 5
+# Number of times a join cancelled by a conflicting transaction is retried
+MAX_JOIN_ATTEMPTS = 20
+COMMUNITY_ID = "community"
+GROUP_CHAT_ID = "groupchat"
+
+
+def _transaction_cancelled(reasons):
+    error_response = {
+        "Error": {"Code": "TransactionCanceledException", "Message": ""},
+        "CancellationReasons": reasons,
+    }
+    return ClientError(error_response, "TransactWriteItems")
+
+
+def _backend_is_reachable():
+    endpoint_url = os.environ.get("AWS_DYNAMODB_ENDPOINT_URL")
+    if not endpoint_url:
+        return False
+    endpoint = urlparse(endpoint_url)
+    try:
+        with socket.create_connection((endpoint.hostname, endpoint.port or 80), timeout=1):
+            return True
+    except OSError:
+        return False
+
+
+def test_capacity_condition_on_member_count_increment():
+    """Test that the member count increment only succeeds while the count
+    is below the capacity and returns the old item when it fails.
+    """
+    with patch.object(dynamodb_client, "_execute_transact_write") as transact_write:
+        transact_write.return_value = {}
+        database_repository.add_group_chat_member(
+            COMMUNITY_ID, GROUP_CHAT_ID, "user", capacity=CAPACITY
+        )
+    update = transact_write.call_args[0][0][1]["Update"]
+    assert update["ConditionExpression"].endswith(
+        "AND (attribute_not_exists(#counter) OR #counter <= :limit)"
+    )
+    assert update["ExpressionAttributeValues"][":limit"] == {"N": str(CAPACITY - 1)}
+    assert update["ReturnValuesOnConditionCheckFailure"] == "ALL_OLD"
+
+
+def test_full_group_chat_raises_capacity_exceeded():
+    """Test that a failed increment of an existing group chat means the
+    group chat is full, while a failed increment of a missing group chat
+    means it could not be found.
+    """
+    full = {"Code": "ConditionalCheckFailed", "Item": {"_member_count": {"N": "5"}}}
+    missing = {"Code": "ConditionalCheckFailed"}
+    for reason, exception in [(full, CapacityExceededException), (missing, NotFoundException)]:
+        reasons = [{"Code": "None"}, reason, {"Code": "None"}, {"Code": "None"}]
+        with patch.object(dynamodb_client, "_execute_transact_write") as transact_write:
+            transact_write.side_effect = _transaction_cancelled(reasons)
+            with pytest.raises(exception):
+                database_repository.add_group_chat_member(
+                    COMMUNITY_ID, GROUP_CHAT_ID, "user", capacity=CAPACITY
+                )
+
+
+@pytest.fixture
+def local_repository(monkeypatch):
+    """Return a repository backed by a temporary table on the local
+    DynamoDB backend, seeded with a group chat holding one member and
+    more community members than the group chat can hold.
+    """
+    if not _backend_is_reachable():
+        pytest.skip("A local DynamoDB backend is not available")
+    table_name = "GroupChatCapacity" + uuid4().hex
+    monkeypatch.setenv("AWS_DYNAMODB_TABLE_NAME", table_name)
+    client = _DynamoDBClient(
+        os.environ.get("AWS_DEFAULT_REGION"), os.environ.get("AWS_DYNAMODB_ENDPOINT_URL")
+    )
+    client._dynamodb.create_table(
+        TableName=table_name,
+        KeySchema=[
+            {"AttributeName": "PK", "KeyType": "HASH"},
+            {"AttributeName": "SK", "KeyType": "RANGE"},
+        ],
+        AttributeDefinitions=[
+            {"AttributeName": "PK", "AttributeType": "S"},
+            {"AttributeName": "SK", "AttributeType": "S"},
+        ],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    repository = copy.copy(database_repository)
+    repository._dynamodb_client = client
+    repository._table_name = table_name
+
+    group_chat_key = repository._group_chat_mapper.key(COMMUNITY_ID, GROUP_CHAT_ID)
+    client._dynamodb.put_item(
+        TableName=table_name, Item={**group_chat_key, "_member_count": {"N": "1"}}
+    )
+    for index in range(CAPACITY * 3):
+        user_id = f"user{index}"
+        client._dynamodb.put_item(
+            TableName=table_name, Item=repository._user_mapper.key(user_id, user_id)
+        )
+        client._dynamodb.put_item(
+            TableName=table_name,
+            Item=repository._community_membership_mapper.key(COMMUNITY_ID, user_id)
+        )
+    yield repository
+    client._dynamodb.delete_table(TableName=table_name)
+
+
+def test_concurrent_joins_never_exceed_capacity(local_repository):
+    """Test that concurrent joins fill a group chat up to its capacity
+    and no further.
+    """
+
+    def join(user_id):
+        for attempt in range(MAX_JOIN_ATTEMPTS):
+            try:
+                local_repository.add_group_chat_member(
+                    COMMUNITY_ID, GROUP_CHAT_ID, user_id, capacity=CAPACITY
+                )
+                return True
+            except CapacityExceededException:
+                return False
+            except DatabaseException as err:
+                # Transactions touching the same item at the same time are
+                # cancelled with a conflict and can be retried
+                if isinstance(err, NotFoundException) or attempt == MAX_JOIN_ATTEMPTS - 1:
+                    raise
+                time.sleep(0.01 * (attempt + 1))
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(join, [f"user{index}" for index in range(CAPACITY * 3)]))
+
+    assert results.count(True) == CAPACITY - 1
+    group_chat_key = local_repository._group_chat_mapper.key(COMMUNITY_ID, GROUP_CHAT_ID)
+    group_chat_item = local_repository._dynamodb_client.get_item(group_chat_key)
+    assert group_chat_item["_member_count"]["N"] == str(CAPACITY)
@@ -0,0 +1,61 @@
+"""This file contains integration tests for serializing chat messages
+to DynamoDB items partitioned by time bucket.
+
+Note: These tests are dependent on the functionality of the boto3 libary
+"""
+
+
+from datetime import datetime
+from app.models import Message, MessageType
+from app.dynamodb_mappers import PrivateChatMessageMapper, GroupChatMessageMapper
+from app.dynamodb_mappers.message_mapper import message_bucket
+from app.dynamodb_mappers.constants import MessageBucketGranularity
+
+
+MESSAGE_ID = "2020-12-31T23:59:59.999999-0123456789abcdef0123456789abcdef"
+
+
+def test_message_bucket_by_day():
+    """Test that a message's day bucket is the date the message id
+    begins with.
+    """
+    assert message_bucket(MESSAGE_ID) == "2020-12-31"
+
+
+def test_message_bucket_by_week():
+    """Test that a message's week bucket is the ISO week of the date
+    the message id begins with, including weeks that span two years.
+    """
+    bucket = message_bucket(MESSAGE_ID, MessageBucketGranularity.WEEK)
+    assert bucket == "2020-W53"
+    assert message_bucket("2021-01-03" + MESSAGE_ID[10:], "week") == "2020-W53"
+
+
+def test_message_key_is_bucketed():
+    """Test that a message's partition key includes the chat id and
+    the message's time bucket.
+    """
+    mapper = GroupChatMessageMapper()
+    primary_key = mapper.key("1234", MESSAGE_ID)
+    assert primary_key["PK"]["S"] == "GROUPCHAT#1234#2020-12-31"
+    assert primary_key["SK"]["S"] == "GROUP_CHAT_MESSAGE#" + MESSAGE_ID
+
+
+def test_serialized_message_uses_bucketed_key():
+    """Test that a serialized message is stored under the same key
+    that is used to look it up by chat and message id.
+    """
+    mapper = PrivateChatMessageMapper()
+    message = Message(
+        MESSAGE_ID, 
+        "1234", 
+        "5678", 
+        "Hello", 
+        MessageType.PRIVATE_CHAT, 
+        created_at=datetime(2020, 12, 31, 23, 59, 59)
+    )
+    item = mapper.serialize_from_model(message)
+    primary_key = mapper.key(message.chat_id, message.id)
+    assert item["PK"] == primary_key["PK"]
+    assert item["SK"] == primary_key["SK"]
+    assert mapper.bucket_key("1234", "2020-12-31")["PK"] == item["PK"]
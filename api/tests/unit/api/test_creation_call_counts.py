@@ -0,0 +1,151 @@
+"""This file contains regression tests for the number of DynamoDB calls
+the endpoints that create chats, or read a chat's messages, make.
+"""
+
+
+from http import HTTPStatus
+from unittest.mock import patch
+from botocore.exceptions import ClientError
+from flask import g
+from app import create_app
+from app.api import private_chats, communities, group_chats
+from app.clients import dynamodb_client
+from app.models import User, Location, Image, ImageType, GroupChatMembership
+from app.models.role import regular_user_role
+from app.repositories import database_repository
+
+
+def _user(id, username):
+    return User(
+        id, username, "Brad", username + "@gmail.com", regular_user_role,
+        location=Location("Philadelphia", "PA", "USA"),
+        avatar=Image("avatar", ImageType.USER_PROFILE_PHOTO, "url", 100, 100),
+        cover_photo=Image("cover", ImageType.USER_COVER_PHOTO, "url", 100, 100),
+    )
+
+
+def _cancelled(reasons):
+    return ClientError(
+        {
+            "Error": {"Code": "TransactionCanceledException", "Message": ""},
+            "CancellationReasons": reasons,
+        },
+        "TransactWriteItems"
+    )
+
+
+def _calls(dynamodb):
+    return [call[0] for call in dynamodb.method_calls]
+
+
+CURRENT_USER = _user("1" * 32, "brad345")
+OTHER_USER = _user("2" * 32, "jill345")
+
+
+def _request(app, **kwargs):
+    context = app.test_request_context(**kwargs)
+    context.push()
+    g.current_user = CURRENT_USER
+    return context
+
+
+def test_creating_a_private_chat_reads_only_the_other_user():
+    """Test that creating a private chat reads the other user for the
+    response and leaves checking for an existing chat to the transaction.
+    """
+    app = create_app("testing")
+    context = _request(app, method="POST", json={"other_user_id": OTHER_USER.id})
+    try:
+        with patch.object(dynamodb_client, "_dynamodb") as dynamodb:
+            dynamodb.get_item.return_value = {
+                "Item": database_repository._serialize_user(OTHER_USER)
+            }
+            dynamodb.transact_write_items.return_value = {}
+            response = private_chats.create_private_chat()
+            assert response.status_code == HTTPStatus.CREATED
+            assert _calls(dynamodb) == ["get_item", "transact_write_items"]
+
+        with patch.object(dynamodb_client, "_dynamodb") as dynamodb:
+            dynamodb.get_item.return_value = {
+                "Item": database_repository._serialize_user(OTHER_USER)
+            }
+            dynamodb.transact_write_items.side_effect = _cancelled([
+                {"Code": "ConditionalCheckFailed"}, {"Code": "None"}, {"Code": "None"}
+            ])
+            response = private_chats.create_private_chat()
+            assert response.status_code == HTTPStatus.BAD_REQUEST
+            assert _calls(dynamodb) == ["get_item", "transact_write_items"]
+    finally:
+        context.pop()
+
+
+def test_creating_a_group_chat_is_a_single_transaction():
+    """Test that creating a group chat checks that the community exists and
+    that the user is a member of it in the transaction, without reads.
+    """
+    app = create_app("testing")
+    community_id = "3" * 32
+    context = _request(
+        app, method="POST", json={"name": "Chat", "description": "A group chat"}
+    )
+    try:
+        with patch.object(dynamodb_client, "_dynamodb") as dynamodb:
+            dynamodb.transact_write_items.return_value = {}
+            response = communities.create_community_group_chat(community_id=community_id)
+            assert response.status_code == HTTPStatus.CREATED
+            assert _calls(dynamodb) == ["transact_write_items"]
+            condition_checks = [
+                item["ConditionCheck"]["Key"]["PK"]
+                for item in dynamodb.transact_write_items.call_args[1]["TransactItems"]
+                if "ConditionCheck" in item
+            ]
+            assert condition_checks == [
+                {"S": "COMMUNITY#" + community_id}, {"S": "COMMUNITY#" + community_id}
+            ]
+
+        with patch.object(dynamodb_client, "_dynamodb") as dynamodb:
+            dynamodb.transact_write_items.side_effect = _cancelled([
+                {"Code": "None"}, {"Code": "None"},
+                {"Code": "ConditionalCheckFailed"}, {"Code": "ConditionalCheckFailed"}
+            ])
+            response = communities.create_community_group_chat(community_id=community_id)
+            assert response.status_code == HTTPStatus.NOT_FOUND
+            assert _calls(dynamodb) == ["transact_write_items"]
+
+        with patch.object(dynamodb_client, "_dynamodb") as dynamodb:
+            dynamodb.transact_write_items.side_effect = _cancelled([
+                {"Code": "None"}, {"Code": "None"},
+                {"Code": "ConditionalCheckFailed"}, {"Code": "None"}
+            ])
+            response = communities.create_community_group_chat(community_id=community_id)
+            assert response.status_code == HTTPStatus.UNAUTHORIZED
+    finally:
+        context.pop()
+
+
+def test_reading_group_chat_messages_doesnt_reread_the_group_chat():
+    """Test that once the view has checked the user's membership, reading
+    the messages doesn't read the group chat again.
+    """
+    app = create_app("testing")
+    group_chat_id, community_id = "4" * 32, "3" * 32
+    membership_item = database_repository._group_chat_membership_mapper.serialize_from_model(
+        GroupChatMembership(group_chat_id, CURRENT_USER.id, community_id)
+    )
+    items = {
+        membership_item["PK"]["S"]: membership_item,
+        "USER#" + CURRENT_USER.id: database_repository._serialize_user(CURRENT_USER),
+    }
+    context = _request(app, method="GET", query_string={"community_id": community_id})
+    try:
+        with patch.object(dynamodb_client, "_dynamodb") as dynamodb:
+            dynamodb.get_item.side_effect = lambda **parameters: {
+                "Item": items[parameters["Key"]["PK"]["S"]]
+            } if parameters["Key"]["PK"]["S"] in items else {}
+            dynamodb.query.return_value = {"Items": []}
+            response = group_chats.get_group_chat_messages(group_chat_id=group_chat_id)
+            assert response.status_code == HTTPStatus.OK
+            # The membership, the user it belongs to and the newest message bucket
+            assert _calls(dynamodb) == ["get_item", "get_item", "query"]
+    finally:
+        context.pop()
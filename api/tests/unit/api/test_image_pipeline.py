@@ -0,0 +1,379 @@
+"""This file contains unit tests for the pipeline that turns uploaded
+images into resized variants in the background.
+"""
+
+
+import io
+from copy import copy
+import pytest
+from http import HTTPStatus
+from datetime import datetime
+from types import SimpleNamespace
+from unittest.mock import patch
+from PIL import Image as PillowImage
+from app import create_app
+from app.api import image_pipeline as image_pipeline_module
+from app.api.image_pipeline import (
+    ImagePipeline,
+    read_image_header,
+    render_variants,
+    upload_file_id,
+    complete_image_upload,
+)
+from app.concurrency import WorkerPool, WorkerPoolFullError
+from app.dynamodb_mappers import ImageMapper
+from app.models import User, Location, Image, ImageBlob, ImageType, ImageVariant
+from app.models.role import regular_user_role
+from app.repositories import database_repository
+
+
+class FakeFileRepository:
+    """Class that stores uploaded files in memory."""
+
+    def __init__(self):
+        self.files = {}
+
+    def add(self, file_id, file_contents, content_type=None, cache_control=None):
+        self.files[file_id] = (file_contents, content_type, cache_control)
+        return True
+
+    def get(self, file_id, byte_range=None):
+        if file_id not in self.files:
+            return None
+        contents = self.files[file_id][0]
+        if byte_range is not None:
+            return contents[byte_range[0]:byte_range[1] + 1]
+        return contents
+
+    def get_metadata(self, file_id):
+        if file_id not in self.files:
+            return None
+        contents, content_type, _ = self.files[file_id]
+        return {"size": len(contents), "content_type": content_type}
+
+    def copy(self, source_file_id, file_id, content_type=None, cache_control=None):
+        self.files[file_id] = (self.files[source_file_id][0], content_type, cache_control)
+        return True
+
+    def remove(self, file_id):
+        del self.files[file_id]
+        return True
+
+
+class FakeDatabaseRepository:
+    """Class that stores users and image blobs in memory like the
+    database repository does.
+    """
+
+    def __init__(self, *users):
+        self.users = {user.id: user for user in users}
+        self.blobs = {}
+        self.orphaned_at = {}
+
+    def get_user(self, user_id):
+        return self.users.get(user_id)
+
+    def update_user_image(self, user, image_data):
+        stored_user = self.users[user.id]
+        replaced_image = stored_user.avatar
+        stored_user.avatar = Image(**image_data)
+        return replaced_image
+
+    def add_image_blob(self, blob):
+        if blob.id in self.blobs:
+            return False
+        self.blobs[blob.id] = blob
+        return True
+
+    def retain_image_blob(self, blob_id):
+        blob = self.blobs.get(blob_id)
+        if blob is not None:
+            blob.ref_count += 1
+            self.orphaned_at.pop(blob_id, None)
+        return blob
+
+    def release_image_blob(self, blob_id):
+        blob = self.blobs.get(blob_id)
+        if blob is None:
+            return None
+        blob.ref_count -= 1
+        if blob.ref_count <= 0:
+            self.orphaned_at[blob_id] = datetime.now()
+        return blob.ref_count
+
+    def get_orphaned_image_blobs(self, orphaned_before):
+        return [
+            self.blobs[blob_id] for blob_id, orphaned_at in self.orphaned_at.items()
+            if orphaned_at < orphaned_before
+        ]
+
+    def remove_image_blob(self, blob_id):
+        if self.blobs[blob_id].ref_count > 0:
+            return None
+        del self.orphaned_at[blob_id]
+        return self.blobs.pop(blob_id)
+
+
+def _jpeg_with_orientation(width, height):
+    """Return a JPEG whose EXIF data says it's displayed rotated by 90
+    degrees.
+    """
+    pillow_image = PillowImage.new("RGB", (width, height), (200, 30, 30))
+    exif = PillowImage.Exif()
+    exif[0x0112] = 6  # Orientation
+    exif[0x010F] = "Camera maker"
+    buffer = io.BytesIO()
+    pillow_image.save(buffer, format="JPEG", exif=exif)
+    return buffer.getvalue()
+
+
+def _png_with_transparency(width, height):
+    pillow_image = PillowImage.new("RGBA", (width, height), (0, 0, 0, 0))
+    buffer = io.BytesIO()
+    pillow_image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def test_variants_are_oriented_resized_and_stripped_of_exif():
+    """Test that each width is rendered in every format, upright, with
+    the upload's aspect ratio and without its EXIF data.
+    """
+    rendered = render_variants(_jpeg_with_orientation(1000, 500), (64, 200, 400))
+    assert [(width, height, extension) for width, height, extension, _ in rendered] == [
+        (400, 800, "webp"), (400, 800, "jpeg"),
+        (200, 400, "webp"), (200, 400, "jpeg"),
+        (64, 128, "webp"), (64, 128, "jpeg"),
+    ]
+    for width, height, extension, contents in rendered:
+        pillow_image = PillowImage.open(io.BytesIO(contents))
+        assert pillow_image.format == extension.upper()
+        assert pillow_image.size == (width, height)
+        assert len(pillow_image.getexif()) == 0
+
+
+def test_variants_are_never_wider_than_the_upload():
+    """Test that a small upload is rendered once at its own size, with
+    its transparency laid over white.
+    """
+    rendered = render_variants(_png_with_transparency(100, 50), (640, 1280))
+    assert [(width, height) for width, height, _, _ in rendered] == [(100, 50), (100, 50)]
+    pillow_image = PillowImage.open(io.BytesIO(rendered[1][3]))
+    assert pillow_image.mode == "RGB"
+    assert pillow_image.getpixel((50, 25)) == (255, 255, 255)
+
+
+def test_only_images_with_valid_headers_are_accepted():
+    """Test that uploads are checked from their header."""
+    assert read_image_header(io.BytesIO(_png_with_transparency(100, 50))) == ("PNG", 100, 50)
+    assert read_image_header(io.BytesIO(b"not an image")) is None
+
+
+def _user(user_id, username):
+    return User(
+        user_id, username, "Brad", username + "@gmail.com", regular_user_role,
+        location=Location("Philadelphia", "PA", "USA")
+    )
+
+
+def test_identical_uploads_share_immutable_files_until_collected():
+    """Test that an upload's variants are stored once under keys of their
+    own with far-future cache headers, shared by identical uploads, and
+    deleted once no image has referred to them for the grace period.
+    """
+    app = create_app("testing")
+    first_user, second_user = _user("1234", "brad345"), _user("5678", "jill345")
+    repository = FakeDatabaseRepository(first_user, second_user)
+    file_repository = FakeFileRepository()
+    pipeline = ImagePipeline(file_repository, WorkerPool("test", app), app)
+    first_photo = _jpeg_with_orientation(1000, 500)
+    second_photo = _png_with_transparency(600, 600)
+
+    def upload(user, photo):
+        pipeline.submit(user.id, ImageType.USER_PROFILE_PHOTO, photo).join()
+
+    with patch.multiple(database_repository, **{
+        name: getattr(repository, name) for name in (
+            "get_user", "update_user_image", "add_image_blob", "retain_image_blob",
+            "release_image_blob", "get_orphaned_image_blobs", "remove_image_blob",
+        )
+    }):
+        upload(first_user, first_photo)
+        first_blob_id = first_user.avatar.id
+        assert len(file_repository.files) == 6
+        for variant in first_user.avatar.variants:
+            assert variant.id.startswith("images/" + first_blob_id + "/")
+            _, content_type, cache_control = file_repository.files[variant.id]
+            assert content_type == "image/" + variant.format
+            assert cache_control == "public, max-age=31536000, immutable"
+        assert first_user.avatar.url.endswith("/400.jpeg")
+        assert (first_user.avatar.width, first_user.avatar.height) == (400, 800)
+
+        upload(second_user, first_photo)
+        assert second_user.avatar.id == first_blob_id
+        assert second_user.avatar.variants == first_user.avatar.variants
+        assert len(file_repository.files) == 6
+        assert repository.blobs[first_blob_id].ref_count == 2
+
+        upload(first_user, second_photo)
+        upload(second_user, second_photo)
+        assert len(file_repository.files) == 12
+        assert repository.blobs[first_blob_id].ref_count == 0
+        assert repository.blobs[second_user.avatar.id].ref_count == 2
+        assert pipeline.collect_garbage() == 0
+
+        pipeline.init_app(SimpleNamespace(config={"IMAGE_GC_GRACE_PERIOD": 0}))
+        assert pipeline.collect_garbage() == 1
+        assert first_blob_id not in repository.blobs
+        assert len(file_repository.files) == 6
+        assert pipeline.pending() == 0
+
+
+def test_saving_an_image_releases_the_image_the_write_replaced():
+    """Test that when two uploads read the user before either is saved,
+    each releases the image its write replaced, so the image the user was
+    read with is released once and the first upload's image isn't leaked.
+    """
+    user = _user("1234", "brad345")
+    repository = FakeDatabaseRepository(user)
+    blobs = [
+        ImageBlob(blob_id, [ImageVariant(f"{blob_id}/400.jpeg", "url", 800, 400, "jpeg")])
+        for blob_id in ("old", "first", "second")
+    ]
+    for blob in blobs:
+        repository.add_image_blob(blob)
+        repository.retain_image_blob(blob.id)
+    user.avatar = Image(
+        "old", ImageType.USER_PROFILE_PHOTO, "url", 800, 400, variants=blobs[0].variants
+    )
+    stale_user = copy(user)
+    pipeline = ImagePipeline(FakeFileRepository(), WorkerPool("test"))
+
+    with patch.multiple(
+        database_repository,
+        get_user=lambda user_id: copy(stale_user),
+        update_user_image=repository.update_user_image,
+        release_image_blob=repository.release_image_blob,
+    ), patch.object(image_pipeline_module.socketio, "start_background_task"):
+        assert pipeline._save_image(user.id, ImageType.USER_PROFILE_PHOTO, blobs[1])
+        assert pipeline._save_image(user.id, ImageType.USER_PROFILE_PHOTO, blobs[2])
+    assert user.avatar.id == "second"
+    assert [blob.ref_count for blob in blobs] == [0, 0, 1]
+
+
+def test_orphaned_images_are_collected_by_a_single_periodic_task():
+    """Test that releasing many images starts one collector, which keeps
+    collecting garbage once every grace period even if a sweep fails.
+    """
+    repository = FakeDatabaseRepository()
+    pipeline = ImagePipeline(FakeFileRepository(), WorkerPool("test"))
+    images = []
+    for index in range(3):
+        blob = ImageBlob(
+            f"blob{index}", [ImageVariant(f"blob{index}/400.jpeg", "url", 800, 400, "jpeg")]
+        )
+        repository.add_image_blob(blob)
+        repository.retain_image_blob(blob.id)
+        images.append(Image(
+            blob.id, ImageType.USER_PROFILE_PHOTO, "url", 800, 400, variants=blob.variants
+        ))
+
+    with patch.object(database_repository, "release_image_blob", repository.release_image_blob), \
+            patch.object(image_pipeline_module.socketio, "start_background_task") as start:
+        for image in images:
+            pipeline.release_image(image)
+    start.assert_called_once_with(pipeline._collect_periodically)
+
+    with patch.object(image_pipeline_module.socketio, "sleep") as sleep, \
+            patch.object(pipeline, "collect_garbage") as collect_garbage:
+        sleep.side_effect = [None, None, None, GeneratorExit]
+        collect_garbage.side_effect = [RuntimeError, 3, 0]
+        with pytest.raises(GeneratorExit):
+            pipeline._collect_periodically()
+    sleep.assert_called_with(60 * 60)
+    assert collect_garbage.call_count == 3
+
+
+def test_direct_uploads_are_processed_and_kept_as_originals():
+    """Test that an image uploaded directly to file storage is rendered,
+    copied within storage as the blob's original and then deleted.
+    """
+    app = create_app("testing")
+    user = _user("1234", "brad345")
+    repository = FakeDatabaseRepository(user)
+    file_repository = FakeFileRepository()
+    pipeline = ImagePipeline(file_repository, WorkerPool("test", app), app)
+    file_id = upload_file_id(user.id, ImageType.USER_PROFILE_PHOTO, "a" * 32)
+    file_repository.add(file_id, _png_with_transparency(300, 300), content_type="image/png")
+
+    with patch.multiple(database_repository, **{
+        name: getattr(repository, name) for name in (
+            "get_user", "update_user_image", "add_image_blob", "retain_image_blob",
+        )
+    }):
+        pipeline.submit_upload(user.id, ImageType.USER_PROFILE_PHOTO, file_id).join()
+
+    blob = repository.blobs[user.avatar.id]
+    assert blob.original_id.endswith("/original.png")
+    assert file_repository.files[blob.original_id][1] == "image/png"
+    assert file_id not in file_repository.files
+    assert len(file_repository.files) == 7
+
+
+def test_completed_uploads_are_checked_before_processing():
+    """Test that completing a direct upload only hands it to the pipeline
+    if it's an image of the type it was uploaded as.
+    """
+    app = create_app("testing")
+    file_repository = FakeFileRepository()
+    upload_id = "b" * 32
+    file_id = upload_file_id("1234", ImageType.USER_COVER_PHOTO, upload_id)
+
+    with app.app_context(), patch.object(
+        image_pipeline_module, "file_repository", file_repository
+    ), patch.object(image_pipeline_module.image_pipeline, "submit_upload") as submit_upload:
+        file_repository.add(file_id, _png_with_transparency(300, 300), content_type="image/png")
+        response = complete_image_upload("1234", ImageType.USER_COVER_PHOTO, upload_id)
+        assert response[1] == HTTPStatus.ACCEPTED
+        submit_upload.assert_called_once_with("1234", ImageType.USER_COVER_PHOTO, file_id)
+
+        file_repository.add(file_id, _png_with_transparency(300, 300), content_type="image/jpeg")
+        response = complete_image_upload("1234", ImageType.USER_COVER_PHOTO, upload_id)
+        assert response[1] == HTTPStatus.BAD_REQUEST
+        assert file_id not in file_repository.files
+
+        response = complete_image_upload("1234", ImageType.USER_COVER_PHOTO, upload_id)
+        assert response[1] == HTTPStatus.NOT_FOUND
+        response = complete_image_upload("1234", ImageType.USER_COVER_PHOTO, "../" + upload_id)
+        assert response[1] == HTTPStatus.NOT_FOUND
+        assert submit_upload.call_count == 1
+
+
+def test_pipeline_rejects_images_once_its_queue_is_full():
+    """Test that uploads are turned away instead of queued without bound."""
+    pipeline = ImagePipeline(
+        FakeFileRepository(), WorkerPool("test"),
+        SimpleNamespace(config={"IMAGE_PROCESSING_MAX_QUEUE": 0})
+    )
+    with pytest.raises(WorkerPoolFullError):
+        pipeline.submit("1234", ImageType.USER_PROFILE_PHOTO, b"")
+    assert pipeline.pending() == 0
+
+
+def test_blob_ids_depend_on_content_and_rendition():
+    """Test that blobs are identified by the upload's content and the
+    widths it's rendered at.
+    """
+    blob_id = ImagePipeline.blob_id(b"photo", (64, 200))
+    assert blob_id == ImagePipeline.blob_id(b"photo", (64, 200))
+    assert blob_id != ImagePipeline.blob_id(b"other photo", (64, 200))
+    assert blob_id != ImagePipeline.blob_id(b"photo", (640, 1280))
+
+
+def test_image_variants_round_trip_through_the_mapper():
+    """Test that an image's variants are stored with it."""
+    image = Image(
+        "1234_USER_PROFILE_PHOTO", ImageType.USER_PROFILE_PHOTO, "https://mycdn.com/a", 800, 400,
+        variants=[ImageVariant("1234/400.webp", "https://mycdn.com/b", 800, 400, "webp")]
+    )
+    mapper = ImageMapper(ignore_partition_key=True)
+    assert mapper.deserialize_to_model(mapper.serialize_from_model(image)) == image
@@ -0,0 +1,32 @@
+"""This file contains unit tests for the endpoint that replaces a user."""
+
+
+from http import HTTPStatus
+from unittest.mock import patch
+from flask import g
+from app import create_app
+from app.api import users
+from app.concurrency import WorkerPoolFullError
+from app.models import User
+from app.models.role import regular_user_role
+
+
+def test_updating_a_user_while_the_pool_is_full_returns_service_unavailable():
+    """Test that replacing a user while the worker pool that hashes their
+    new password is full asks the client to retry instead of failing.
+    """
+    user = User("1" * 32, "brad345", "Brad", "brad@gmail.com", regular_user_role)
+    app = create_app("testing")
+    with app.test_request_context(method="PUT"):
+        g.current_user = user
+        with patch.object(users.database_repository, "get_user", return_value=user), \
+                patch.object(
+                    users.database_repository, "update_user",
+                    side_effect=WorkerPoolFullError("The bcrypt pool is full"),
+                ):
+            body, status, headers = users.update_user.__wrapped__(
+                {"password": "Cat"}, user.id
+            )
+    assert status == HTTPStatus.SERVICE_UNAVAILABLE
+    assert headers == {"Retry-After": "1"}
+    assert "error" in body
@@ -0,0 +1,178 @@
+"""This file contains unit tests for the concurrency mode boto3 calls run
+in, which decides whether slow calls stall the event loop.
+"""
+
+
+import signal
+import threading
+import time
+import eventlet
+import pytest
+from types import SimpleNamespace
+from unittest.mock import patch
+from flask import g
+from app import create_app
+from app.clients.dynamodb_client import _DynamoDBClient
+from app.concurrency import (
+    ConcurrencyMode,
+    init_concurrency,
+    get_concurrency_mode,
+    set_concurrency_mode,
+    run_blocking,
+)
+from app.decorators import auth
+from app.models import User, TokenType
+from app.models.role import regular_user_role
+from app.repositories.revocation import RevocationList
+
+
+CALL_DURATION = 0.2
+NUM_CALLS = 8
+TICK = 0.01
+
+
+class SlowDynamoDB:
+    """Class that stands in for a boto3 DynamoDB client whose queries
+    block for a while, like a slow network round trip.
+    """
+
+    def query(self, **kwargs):
+        time.sleep(CALL_DURATION)
+        return {"Items": [], "Count": 0, "ScannedCount": 0}
+
+
+@pytest.fixture
+def concurrency_mode():
+    """Restore the concurrency mode after the test changes it."""
+    mode = get_concurrency_mode()
+    yield set_concurrency_mode
+    set_concurrency_mode(mode)
+
+
+def _run_slow_queries():
+    """Run slow queries from concurrent green threads next to a ticker
+    that stands in for unrelated socket events and return the duration
+    of the queries and the ticker's longest lag.
+    """
+    lags = []
+    running = [True]
+
+    def tick():
+        while running[0]:
+            start = time.perf_counter()
+            eventlet.sleep(TICK)
+            lags.append(time.perf_counter() - start - TICK)
+
+    with patch("app.clients.boto_client.boto3.client", return_value=SlowDynamoDB()):
+        client = _DynamoDBClient("us-east-1")
+        ticker = eventlet.spawn(tick)
+        eventlet.sleep(TICK * 2)
+        lags.clear()
+        pool = eventlet.GreenPool(NUM_CALLS)
+        primary_key = {"pk_name": "PK", "pk_value": {"S": "USER#1234"}}
+        start = time.perf_counter()
+        for _ in pool.imap(lambda _: client.query(10, None, primary_key), range(NUM_CALLS)):
+            pass
+        duration = time.perf_counter() - start
+        running[0] = False
+        ticker.wait()
+    return duration, max(lags)
+
+
+def test_slow_calls_in_tpool_mode_dont_stall_the_event_loop(concurrency_mode):
+    """Test that slow boto3 calls made in the tpool mode overlap and
+    leave the event loop free to serve other green threads.
+    """
+    concurrency_mode(ConcurrencyMode.TPOOL)
+    duration, max_lag = _run_slow_queries()
+    assert duration < CALL_DURATION * NUM_CALLS / 2
+    assert max_lag < CALL_DURATION / 2
+
+
+def test_slow_calls_without_a_mode_stall_the_event_loop(concurrency_mode):
+    """Test that without a concurrency mode, slow boto3 calls made from
+    green threads block the event loop one after another.
+    """
+    concurrency_mode(ConcurrencyMode.NONE)
+    duration, max_lag = _run_slow_queries()
+    assert duration >= CALL_DURATION * NUM_CALLS
+    assert max_lag >= CALL_DURATION
+
+
+def test_green_mode_falls_back_to_tpool_without_monkey_patching(concurrency_mode):
+    """Test that the green mode is only used if the standard library was
+    patched before the app was imported.
+    """
+    app = SimpleNamespace(config={"CONCURRENCY_MODE": ConcurrencyMode.GREEN})
+    with patch("eventlet.patcher.is_monkey_patched", return_value=False):
+        init_concurrency(app)
+    assert get_concurrency_mode() == ConcurrencyMode.TPOOL
+    with patch("eventlet.patcher.is_monkey_patched", return_value=True):
+        init_concurrency(app)
+    assert get_concurrency_mode() == ConcurrencyMode.GREEN
+    with pytest.raises(ValueError):
+        set_concurrency_mode("threads")
+
+
+class SlowRevocationRepository:
+    """Class that stands in for the database repository, whose reads of
+    revoked tokens and users are slow blocking calls.
+    """
+
+    def get_revoked_tokens(self, since):
+        return run_blocking(time.sleep, CALL_DURATION) or []
+
+    def get_user(self, user_id):
+        run_blocking(time.sleep, TICK)
+        return User(user_id, "brad345", "Brad", "brad@gmail.com", regular_user_role)
+
+
+def test_authenticated_requests_in_tpool_mode_dont_deadlock(concurrency_mode):
+    """Test that concurrent authenticated requests in the tpool mode are
+    all served while the revocation list is read, rather than blocking
+    the event loop on a lock held by a green thread that yielded.
+    """
+    app = create_app("testing")
+    concurrency_mode(ConcurrencyMode.TPOOL)
+    repository = SlowRevocationRepository()
+    token = User.encode_token(
+        {"user_id": "1234", "token_type": TokenType.ACCESS_TOKEN.name},
+        app.config["SECRET_KEY"],
+        3600
+    )
+
+    @auth.jwt_required(TokenType.ACCESS_TOKEN)
+    def view():
+        return g.current_user.id
+
+    def request(_):
+        headers = {"Authorization": "Bearer " + token.raw_jwt}
+        with app.test_request_context(headers=headers):
+            return view()
+
+    def deadlocked(signum, frame):
+        raise TimeoutError
+
+    def watch(finished):
+        # Green threads blocked on a native lock can't be timed out by
+        # the event loop, but a signal sent to the main thread interrupts
+        # the wait of each of them in turn
+        timeout = 10
+        while not finished.wait(timeout):
+            signal.pthread_kill(threading.main_thread().ident, signal.SIGALRM)
+            timeout = 0.1
+
+    previous_handler = signal.signal(signal.SIGALRM, deadlocked)
+    finished = threading.Event()
+    threading.Thread(target=watch, args=(finished,), daemon=True).start()
+    try:
+        with patch.object(auth, "revoked_tokens", RevocationList(repository, 3600)), \
+                patch.object(auth, "database_repository", repository):
+            pool = eventlet.GreenPool(NUM_CALLS)
+            results = list(pool.imap(request, range(NUM_CALLS)))
+    except TimeoutError:
+        pytest.fail("Authenticated requests deadlocked the event loop")
+    finally:
+        finished.set()
+        signal.signal(signal.SIGALRM, previous_handler)
+    assert results == ["1234"] * NUM_CALLS
@@ -0,0 +1,60 @@
+"""This file contains unit tests for the bounded pool that runs CPU-heavy
+work such as password hashing.
+"""
+
+
+import threading
+import pytest
+from types import SimpleNamespace
+from app.concurrency import WorkerPool, WorkerPoolFullError
+
+
+def _app(**config):
+    return SimpleNamespace(config=config, extensions={})
+
+
+def test_pool_bounds_running_calls_and_rejects_past_queue():
+    """Test that no more calls run at once than the pool has workers,
+    that calls past the queue limit are rejected and that the pool's
+    stats count them.
+    """
+    pool = WorkerPool("test", _app(TEST_WORKERS=2, TEST_MAX_QUEUE=1))
+    release = threading.Event()
+    started = threading.Semaphore(0)
+    max_running = []
+
+    def work():
+        started.release()
+        max_running.append(pool.stats()["running"])
+        release.wait()
+        return True
+
+    threads = [threading.Thread(target=pool.run, args=(work,)) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    started.acquire()
+    started.acquire()
+    # Two calls are running and the third is waiting for a worker
+    while pool.stats()["waiting"] < 1:
+        pass
+    with pytest.raises(WorkerPoolFullError):
+        pool.run(work)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    stats = pool.stats()
+    assert max(max_running) <= 2
+    assert stats["completed"] == 3
+    assert stats["rejected"] == 1
+    assert stats["max_waiting"] == 1
+    assert stats["running"] == 0 and stats["waiting"] == 0
+
+
+def test_pool_returns_results_and_raises_errors():
+    """Test that a call's result or error is passed back to the caller."""
+    pool = WorkerPool("test", _app())
+    assert pool.run(lambda value: value * 2, 21) == 42
+    with pytest.raises(ValueError):
+        pool.run(int, "not a number")
+    assert pool.stats()["completed"] == 2
@@ -0,0 +1,88 @@
+"""This file contains unit tests for the JSON backend responses, schemas
+and socket payloads are encoded with.
+"""
+
+
+import json
+import uuid
+import pytest
+from datetime import datetime, date
+from flask import jsonify, request
+from app import create_app, json_backend
+from app.json_backend import JSONBackend, get_json_backend, set_json_backend
+from app.models import NotificationType
+from app.api.private_chats import PrivateChatGeneratedSchema
+from app.extensions import ma
+from app.schemas import UserSchema, NotificationSchema, LocationSchema
+
+
+DATA = {
+    "created_at": datetime(2021, 1, 21, 20, 11, 59, 313473),
+    "birthday": date(1990, 5, 17),
+    "id": uuid.UUID("b61072fd0d4645828ae7dec37ffb6da2"),
+    "notification_type": NotificationType.NEW_GROUP_CHAT_MESSAGE,
+    "name": "Zoë",
+}
+EXPECTED = {
+    "created_at": "2021-01-21T20:11:59.313473",
+    "birthday": "1990-05-17",
+    "id": "b61072fd-0d46-4582-8ae7-dec37ffb6da2",
+    "notification_type": NotificationType.NEW_GROUP_CHAT_MESSAGE.value,
+    "name": "Zoë",
+}
+
+
+@pytest.fixture(params=[JSONBackend.ORJSON, JSONBackend.STDLIB])
+def backend(request):
+    """Run the test with each backend and restore the backend after."""
+    previous_backend = get_json_backend()
+    set_json_backend(request.param)
+    yield request.param
+    set_json_backend(previous_backend)
+
+
+def test_backends_encode_datetimes_uuids_and_enums(backend):
+    """Test that both backends encode datetimes and dates in ISO 8601,
+    UUIDs as strings and enums as their values, and decode what they
+    encode.
+    """
+    encoded = json_backend.dumps(DATA, sort_keys=True)
+    assert json.loads(encoded) == EXPECTED
+    assert list(json.loads(encoded)) == sorted(EXPECTED)
+    assert json_backend.loads(encoded) == EXPECTED
+    assert json_backend.loads(encoded.encode()) == EXPECTED
+    assert json_backend.dumps([1, 2], separators=(",", ":")) == "[1,2]"
+    with pytest.raises(TypeError):
+        json_backend.dumps({"object": object()})
+
+
+def test_responses_and_request_bodies_use_the_backend(backend):
+    """Test that Flask responses are encoded, and request bodies decoded,
+    with the backend.
+    """
+    app = create_app("testing")
+    set_json_backend(backend)
+    with app.test_request_context(method="POST", json={"name": "Zoë"}):
+        assert request.get_json() == {"name": "Zoë"}
+        response = jsonify(DATA)
+        assert json.loads(response.get_data(as_text=True)) == EXPECTED
+
+    app.config["JSONIFY_PRETTYPRINT_REGULAR"] = True
+    with app.test_request_context():
+        encoded = jsonify({"b": 1, "a": 2}).get_data(as_text=True)
+        assert encoded.startswith('{\n  "a": 2,') and json.loads(encoded) == {"a": 2, "b": 1}
+
+
+def test_schemas_render_with_the_backend():
+    """Test that every schema dumps and loads JSON with the backend."""
+    assert UserSchema.opts.render_module is json_backend
+    assert NotificationSchema.opts.render_module is json_backend
+    assert PrivateChatGeneratedSchema.opts.render_module is json_backend
+    assert LocationSchema.opts.render_module is json_backend
+    assert ma.Schema.opts.render_module is not json_backend
+
+
+def test_unknown_backends_are_rejected():
+    """Test that setting a backend that doesn't exist raises an error."""
+    with pytest.raises(ValueError):
+        set_json_backend("simplejson")
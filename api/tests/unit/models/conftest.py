@@ -2,9 +2,24 @@
 
 
 import pytest
+from app import create_app
+from app.extensions import bcrypt
 from app.models.factories import UserFactory
 
 
+@pytest.fixture
+def app():
+    """Return a testing app inside its app context and restore the
+    bcrypt extension's state once the test is done with it.
+    """
+    bcrypt_state = dict(vars(bcrypt))
+    app = create_app("testing")
+    with app.app_context():
+        yield app
+    vars(bcrypt).clear()
+    vars(bcrypt).update(bcrypt_state)
+
+
 @pytest.fixture
 def test_user():
     """Return an instance of a user for tests."""
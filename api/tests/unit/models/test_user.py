@@ -2,6 +2,7 @@
 
 
 import pytest
+from app.extensions import bcrypt
 from app.models import User
 
 
@@ -40,4 +41,18 @@ def test_password_verification(test_user):
     """
     test_user.password = "Cat"
     assert test_user.verify_password("Cat") is True
-    assert test_user.verify_password("Dog") is False
\ No newline at end of file
+    assert test_user.verify_password("Dog") is False
+
+
+def test_password_needs_rehash_when_work_factor_changes(app, test_user):
+    """Test to confirm that a password hash is flagged for an upgrade
+    once the configured work factor differs from the one it was made with.
+    """
+    test_user.password = "Cat"
+    assert test_user.password_needs_rehash() is False
+    app.config["BCRYPT_LOG_ROUNDS"] += 1
+    assert test_user.password_needs_rehash() is True
+    # Hashes are made with the work factor the app is started with
+    bcrypt.init_app(app)
+    test_user.password = "Cat"
+    assert test_user.password_needs_rehash() is False
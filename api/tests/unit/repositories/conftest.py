@@ -0,0 +1,17 @@
+"""This file contains fixtures for running unit tests on the repositories."""
+
+
+import pytest
+from app import create_app
+
+
+@pytest.fixture(autouse=True)
+def flask_app():
+    """Create an instance of the application and push an application
+    context, since cursors are signed with the app's secret key.
+    """
+    app = create_app(config_name="testing")
+    context = app.app_context()
+    context.push()
+    yield app
+    context.pop()
@@ -0,0 +1,85 @@
+"""This file contains unit tests for editing and deleting chat messages
+with single writes conditioned on the message's sender.
+"""
+
+
+import pytest
+from unittest.mock import patch
+from botocore.exceptions import ClientError
+from app.clients import dynamodb_client
+from app.models import Message, MessageType
+from app.repositories import database_repository
+from app.repositories.exceptions import NotFoundException, NotOwnerException
+
+
+MESSAGE_ID = "2021-01-21T20:11:59.313473-b61072fd0d4645828ae7dec37ffb6da2"
+
+
+def _message_item():
+    message = Message(MESSAGE_ID, "5678", "1234", "hello world", MessageType.GROUP_CHAT)
+    return database_repository._serialize_chat_message(message)
+
+
+def _condition_failed(operation_name):
+    return ClientError(
+        {"Error": {"Code": "ConditionalCheckFailedException", "Message": ""}},
+        operation_name
+    )
+
+
+def test_edit_is_a_single_conditional_write():
+    """Test that an edit is one update conditioned on the sender, and that
+    the edited message is built from the item the update returns.
+    """
+    with patch.object(dynamodb_client, "_dynamodb") as dynamodb, \
+            patch.object(database_repository, "_update_message_search_index") as update_index:
+        dynamodb.update_item.return_value = {"Attributes": _message_item()}
+        message = database_repository.edit_chat_message(
+            "5678", MessageType.GROUP_CHAT, MESSAGE_ID, "1234", "goodbye world"
+        )
+    assert [call[0] for call in dynamodb.method_calls] == ["update_item"]
+    parameters = dynamodb.update_item.call_args[1]
+    assert parameters["ConditionExpression"].endswith("AND #owner = :owner")
+    assert parameters["ExpressionAttributeNames"]["#owner"] == "_user_id"
+    assert parameters["ExpressionAttributeValues"][":owner"] == {"S": "1234"}
+    assert message.content == "goodbye world"
+    assert message.was_editted()
+    assert update_index.call_args[1]["added_terms"] == {"goodbye"}
+    assert update_index.call_args[1]["removed_terms"] == {"hello"}
+
+
+def test_delete_is_a_single_conditional_write():
+    """Test that a delete is one delete conditioned on the sender that
+    returns the deleted message.
+    """
+    with patch.object(dynamodb_client, "_dynamodb") as dynamodb, \
+            patch.object(database_repository, "_update_message_search_index"):
+        dynamodb.delete_item.return_value = {"Attributes": _message_item()}
+        message = database_repository.delete_chat_message(
+            "5678", MessageType.GROUP_CHAT, MESSAGE_ID, "1234"
+        )
+    assert [call[0] for call in dynamodb.method_calls] == ["delete_item"]
+    assert dynamodb.delete_item.call_args[1]["ExpressionAttributeValues"] == {
+        ":owner": {"S": "1234"}
+    }
+    assert message.id == MESSAGE_ID
+
+
+def test_failed_condition_maps_to_not_found_or_not_owner():
+    """Test that a write whose condition fails raises NotOwnerException if
+    the message exists and NotFoundException if it doesn't.
+    """
+    with patch.object(dynamodb_client, "_dynamodb") as dynamodb:
+        dynamodb.update_item.side_effect = _condition_failed("UpdateItem")
+        dynamodb.get_item.return_value = {"Item": _message_item()}
+        with pytest.raises(NotOwnerException):
+            database_repository.edit_chat_message(
+                "5678", MessageType.GROUP_CHAT, MESSAGE_ID, "9999", "goodbye"
+            )
+
+        dynamodb.delete_item.side_effect = _condition_failed("DeleteItem")
+        dynamodb.get_item.return_value = {}
+        with pytest.raises(NotFoundException):
+            database_repository.delete_chat_message(
+                "5678", MessageType.GROUP_CHAT, MESSAGE_ID, "1234"
+            )
@@ -0,0 +1,72 @@
+"""This file contains unit tests for keeping counter attributes out of
+updates to existing items and maintaining them in transactions.
+"""
+
+
+from unittest.mock import patch
+from app.models import GroupChat
+from app.clients import dynamodb_client
+from app.repositories import database_repository
+
+
+def test_serialize_update_leaves_out_counters():
+    """Test that overwriting an existing group chat never writes its
+    member count or its key attributes.
+    """
+    group_chat = GroupChat("1234", "5678", "Chat", "A group chat", member_count=7)
+    key, item, attributes_to_remove = database_repository._serialize_update(
+        database_repository._group_chat_mapper, group_chat
+    )
+    assert key == {"PK": {"S": "COMMUNITY#5678"}, "SK": {"S": "GROUPCHAT#1234"}}
+    assert "_member_count" not in item
+    assert "_member_count" not in attributes_to_remove
+    assert "PK" not in item and "SK" not in item
+    assert item["name"] == {"S": "Chat"}
+
+
+def test_update_item_parameters_set_and_remove_attributes():
+    """Test that the update expression sets the given attributes and removes
+    the given attributes using placeholders for every attribute name.
+    """
+    parameters = dynamodb_client._build_update_item_parameters(
+        {"PK": {"S": "USER#1"}, "SK": {"S": "USER#1"}},
+        {"name": {"S": "Brad"}, "_rooms": {"SS": ["1"]}},
+        ["bio"]
+    )
+    assert parameters["UpdateExpression"] == "SET #a0 = :a0, #a1 = :a1 REMOVE #r0"
+    assert parameters["ExpressionAttributeNames"] == {
+        "#a0": "name", "#a1": "_rooms", "#r0": "bio"
+    }
+    assert parameters["ExpressionAttributeValues"][":a1"] == {"SS": ["1"]}
+
+
+def test_add_group_chat_member_increments_member_count_in_transaction():
+    """Test that joining a group chat increments the group chat's member count
+    in the same transaction, at the position whose failure means that the
+    group chat could not be found.
+    """
+    with patch.object(dynamodb_client, "_execute_transact_write") as transact_write:
+        transact_write.return_value = {}
+        database_repository.add_group_chat_member("5678", "1234", "9999")
+    parameters = transact_write.call_args[0][0]
+    update = parameters[1]["Update"]
+    assert update["Key"] == {"PK": {"S": "COMMUNITY#5678"}, "SK": {"S": "GROUPCHAT#1234"}}
+    assert update["UpdateExpression"] == "ADD #counter :amount"
+    assert update["ExpressionAttributeValues"] == {":amount": {"N": "1"}}
+    assert "Put" in parameters[-1]
+
+
+def test_remove_group_chat_member_decrements_member_count_in_transaction():
+    """Test that leaving a group chat deletes the membership and decrements
+    the group chat's member count in the same transaction.
+    """
+    membership_item = {"community_id": {"S": "5678"}}
+    with patch.object(dynamodb_client, "get_item", return_value=membership_item), \
+            patch.object(dynamodb_client, "_execute_transact_write") as transact_write:
+        transact_write.return_value = {}
+        database_repository.remove_group_chat_member("1234", "9999")
+    delete, update = transact_write.call_args[0][0]
+    assert delete["Delete"]["Key"] == {"PK": {"S": "GROUPCHAT#1234"}, "SK": {"S": "USER#9999"}}
+    assert "attribute_exists" in delete["Delete"]["ConditionExpression"]
+    assert update["Update"]["Key"] == {"PK": {"S": "COMMUNITY#5678"}, "SK": {"S": "GROUPCHAT#1234"}}
+    assert update["Update"]["ExpressionAttributeValues"] == {":amount": {"N": "-1"}}
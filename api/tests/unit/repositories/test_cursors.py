@@ -0,0 +1,107 @@
+"""This file contains unit tests for encoding and decoding pagination
+cursors.
+"""
+
+
+import json
+import base64
+import pytest
+from unittest.mock import patch
+from app.repositories import utils
+from app.repositories.utils import encode_cursor, decode_cursor
+from app.repositories.exceptions import InvalidCursorException
+
+
+START_KEY = {
+    "PK": {"S": "USER#0123456789abcdef0123456789abcdef"},
+    "SK": {"S": "USER#0123456789abcdef0123456789abcdef"},
+    "USERS_GSI_PK": {"S": "USER#0123456789abcdef0123456789abcdef"},
+    "USERS_GSI_SK": {"S": "brad345"},
+}
+
+
+def test_cursor_round_trip():
+    """Test that a start key decodes to the same value it was encoded from."""
+    cursor = encode_cursor(START_KEY, "get_users")
+    assert decode_cursor(cursor, "get_users") == START_KEY
+
+
+def test_cursor_round_trip_nested_values():
+    """Test that nested cursors with lists, numbers and unknown key names
+    survive a round trip.
+    """
+    value = {
+        "bucket": "2020-12-31",
+        "start_key": {"PK": {"S": "GROUPCHAT#1#2020-12-31"}, "score": {"N": "-1.5"}},
+        "segments": [None, {"PK": {"S": "COMMUNITY#1"}}, 3, -7, True, False],
+    }
+    assert decode_cursor(encode_cursor(value, "context"), "context") == value
+
+
+def test_cursor_is_smaller_than_json_cursor():
+    """Test that the cursor is smaller than the base64 encoded JSON of
+    the start key.
+    """
+    json_cursor = base64.b64encode(json.dumps(START_KEY).encode("utf-8"))
+    assert len(encode_cursor(START_KEY, "get_users")) < len(json_cursor) / 2
+
+
+def test_cursor_from_other_context_is_rejected():
+    """Test that a cursor can't be used with a different query."""
+    cursor = encode_cursor(START_KEY, "get_community_members:1")
+    with pytest.raises(InvalidCursorException):
+        decode_cursor(cursor, "get_community_members:2")
+
+
+def test_cursors_are_signed_with_the_apps_secret_key(flask_app):
+    """Test that cursors are signed with the secret key in the app's
+    config, so a cursor signed with another key is rejected.
+    """
+    flask_app.config["SECRET_KEY"] = "first secret"
+    cursor = encode_cursor(START_KEY, "get_users")
+    assert decode_cursor(cursor, "get_users") == START_KEY
+    flask_app.config["SECRET_KEY"] = "second secret"
+    with pytest.raises(InvalidCursorException):
+        decode_cursor(cursor, "get_users")
+
+
+@pytest.mark.parametrize("position", [0, 1, 5, -1])
+def test_tampered_cursor_is_rejected(position):
+    """Test that changing any byte of a cursor invalidates it."""
+    cursor = encode_cursor(START_KEY, "get_users")
+    raw_cursor = bytearray(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    raw_cursor[position] ^= 0x01
+    tampered_cursor = base64.urlsafe_b64encode(bytes(raw_cursor)).decode("ascii")
+    with pytest.raises(InvalidCursorException):
+        decode_cursor(tampered_cursor, "get_users")
+
+
+@pytest.mark.parametrize(
+    "cursor", ["", "not a cursor!", "e30=", base64.b64encode(b"{}" * 20).decode("ascii")]
+)
+def test_malformed_cursor_is_rejected(cursor):
+    """Test that malformed and legacy JSON cursors are rejected."""
+    with pytest.raises(InvalidCursorException):
+        decode_cursor(cursor, "get_users")
+
+
+def test_unknown_keys_decode_after_known_keys_are_added():
+    """Test that a cursor with key names that aren't known decodes the same
+    after more key names become known.
+    """
+    value = {"PK": {"S": "USER#1"}, "score": {"N": "1.5"}, "ab": None}
+    cursor = encode_cursor(value, "context")
+    known_keys = utils._KNOWN_KEYS + ("ANOTHER_GSI_PK", "ANOTHER_GSI_SK")
+    with patch.object(utils, "_KNOWN_KEYS", known_keys), \
+            patch.object(utils, "_KNOWN_KEY_CODES", {key: code for code, key in enumerate(known_keys)}):
+        assert decode_cursor(cursor, "context") == value
+
+
+def test_cursor_of_other_version_is_rejected():
+    """Test that cursors written with an older layout are rejected rather
+    than decoded wrongly.
+    """
+    with patch.object(utils, "CURSOR_VERSION", utils.CURSOR_VERSION - 1):
+        cursor = encode_cursor(START_KEY, "get_users")
+    with pytest.raises(InvalidCursorException):
+        decode_cursor(cursor, "get_users")
@@ -0,0 +1,88 @@
+"""This file contains unit tests for filtering queries by item type in
+DynamoDB and filling pages from continuation pages.
+"""
+
+
+from unittest.mock import patch
+from app.clients import dynamodb_client
+
+
+PRIMARY_KEY = {"pk_name": "PK", "pk_value": {"S": "USER#1234"}}
+# Every third item in the partition is a notification
+ITEMS = [
+    {
+        "PK": {"S": "USER#1234"},
+        "SK": {"S": "ITEM#%03d" % index},
+        "type": {"S": "NOTIFICATION" if index % 3 == 0 else "OTHER"},
+    }
+    for index in range(60)
+]
+
+
+def fake_query(**kwargs):
+    """Query a fake partition, applying the limit before the type
+    filter like DynamoDB does.
+    """
+    start = 0
+    if "ExclusiveStartKey" in kwargs:
+        start = ITEMS.index(
+            next(item for item in ITEMS if item["SK"] == kwargs["ExclusiveStartKey"]["SK"])
+        ) + 1
+    read = ITEMS[start:start + kwargs["Limit"]]
+    item_type = kwargs["ExpressionAttributeValues"][":type"]
+    response = {
+        "Items": [item for item in read if item["type"] == item_type],
+        "ScannedCount": len(read),
+    }
+    if start + len(read) < len(ITEMS):
+        response["LastEvaluatedKey"] = {"PK": read[-1]["PK"], "SK": read[-1]["SK"]}
+    return response
+
+
+def test_filtered_query_fills_page():
+    """Test that a filtered query keeps reading continuation pages until
+    the page is full, and the start key points right after the last
+    returned item.
+    """
+    with patch.object(dynamodb_client, "_dynamodb") as dynamodb:
+        dynamodb.query.side_effect = fake_query
+        results = dynamodb_client.query(5, {}, PRIMARY_KEY, item_type="NOTIFICATION")
+        assert [item["SK"]["S"] for item in results["Items"]] == [
+            "ITEM#000", "ITEM#003", "ITEM#006", "ITEM#009", "ITEM#012"
+        ]
+        assert results["LastEvaluatedKey"] == {
+            "PK": {"S": "USER#1234"}, "SK": {"S": "ITEM#012"}
+        }
+        parameters = dynamodb.query.call_args_list[0][1]
+        assert parameters["FilterExpression"] == "#type = :type"
+        assert parameters["ExpressionAttributeNames"] == {"#type": "type"}
+
+        next_results = dynamodb_client.query(
+            5, results["LastEvaluatedKey"], PRIMARY_KEY, item_type="NOTIFICATION"
+        )
+        assert next_results["Items"][0]["SK"]["S"] == "ITEM#015"
+
+
+def test_filtered_query_stops_at_read_budget():
+    """Test that a filtered query returns a short page with a start key
+    once it has read as many items as the read budget allows.
+    """
+    with patch.object(dynamodb_client, "_dynamodb") as dynamodb:
+        dynamodb.query.side_effect = fake_query
+        results = dynamodb_client.query(
+            20, {}, PRIMARY_KEY, item_type="NOTIFICATION", read_budget=30
+        )
+    assert 0 < len(results["Items"]) < 20
+    assert results["LastEvaluatedKey"] is not None
+    # The last read may go past the budget by at most a page
+    num_read = sum(call[1]["Limit"] for call in dynamodb.query.call_args_list)
+    assert num_read <= 30 + 20
+
+
+def test_unfiltered_query_reads_single_page():
+    """Test that a query without an item type makes a single request."""
+    with patch.object(dynamodb_client, "_dynamodb") as dynamodb:
+        dynamodb.query.return_value = {"Items": [], "LastEvaluatedKey": {"PK": {"S": "1"}}}
+        dynamodb_client.query(5, {}, PRIMARY_KEY)
+    assert dynamodb.query.call_count == 1
+    assert "FilterExpression" not in dynamodb.query.call_args[1]
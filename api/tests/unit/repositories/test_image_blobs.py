@@ -0,0 +1,51 @@
+"""This file contains unit tests for counting references to the stored
+variants of uploaded images.
+"""
+
+
+from unittest.mock import patch
+from app.clients import dynamodb_client
+from app.repositories import database_repository
+
+
+def test_released_blobs_are_listed_as_orphans_until_retained():
+    """Test that a blob whose last reference is dropped is added to the
+    orphaned blob directory only if it still has no references, and that
+    retaining it takes it out again.
+    """
+    with patch.object(dynamodb_client, "_dynamodb") as dynamodb:
+        dynamodb.update_item.side_effect = [{"Attributes": {"ref_count": {"N": "0"}}}, {}]
+        assert database_repository.release_image_blob("abc_123") == 0
+    release, orphan = (call[1] for call in dynamodb.update_item.call_args_list)
+    assert release["Key"]["PK"]["S"] == "IMAGEBLOB#abc_123"
+    assert release["UpdateExpression"] == "ADD ref_count :minus_one"
+    assert orphan["ConditionExpression"] == "ref_count <= :zero"
+    orphan_values = orphan["ExpressionAttributeValues"]
+    assert {"S": "ORPHANEDIMAGEBLOBDIRECTORY"} in orphan_values.values()
+
+    with patch.object(dynamodb_client, "_dynamodb") as dynamodb:
+        dynamodb.update_item.return_value = {"Attributes": {"ref_count": {"N": "2"}}}
+        assert database_repository.release_image_blob("abc_123") == 2
+    assert dynamodb.update_item.call_count == 1
+
+    blob_item = {
+        "PK": {"S": "IMAGEBLOB#abc_123"},
+        "SK": {"S": "IMAGEBLOB#abc_123"},
+        "id": {"S": "abc_123"},
+        "variants": {"L": [{"M": {
+            "id": {"S": "images/abc_123/f00d/64.webp"},
+            "url": {"S": "https://mycdn.com/us-east/images/abc_123/f00d/64.webp"},
+            "height": {"N": "64"},
+            "width": {"N": "64"},
+            "format": {"S": "webp"},
+        }}]},
+        "ref_count": {"N": "1"},
+        "created_at": {"S": "2020-01-01T00:00:00.000000"},
+        "type": {"S": "IMAGE_BLOB"},
+    }
+    with patch.object(dynamodb_client, "_dynamodb") as dynamodb:
+        dynamodb.update_item.return_value = {"Attributes": blob_item}
+        blob = database_repository.retain_image_blob("abc_123")
+    assert blob.id == "abc_123" and blob.ref_count == 1
+    assert blob.variants[0].width == 64
+    assert "REMOVE DIRECTORY_GSI_PK" in dynamodb.update_item.call_args[1]["UpdateExpression"]
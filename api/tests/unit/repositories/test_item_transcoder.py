@@ -0,0 +1,110 @@
+"""This file contains unit tests for transcoding DynamoDB items straight to
+the data the schemas dump for read-only collections.
+"""
+
+
+import pytest
+from datetime import datetime
+from unittest.mock import patch
+from app import create_app
+from app.models import Message, MessageType, Notification, NotificationType, ReactionType
+from app.schemas import GroupChatMessageSchema, PrivateChatMessageSchema, NotificationSchema
+from app.repositories import database_repository
+from app.repositories.item_transcoder import ItemTranscoder
+from app.schemas import url_for_field
+
+
+MESSAGE_ID = "2021-01-21T20:11:59.313473-b61072fd0d4645828ae7dec37ffb6da2"
+
+
+def _message_items(message_type):
+    mapper, _ = database_repository._chat_message_mappers(message_type)
+    contents = ["Hello", "2021-01-21T20:11:59.5", "12:30:00.1", "Let's meet at 12:30"]
+    items = []
+    for index, content in enumerate(contents):
+        message = Message(
+            MESSAGE_ID + str(index),
+            "5678",
+            "1234",
+            content,
+            message_type,
+            created_at=datetime(2021, 1, 21, 20, 11, 59, index * 100000),
+            editted=bool(index % 2),
+        )
+        items.append(database_repository._serialize_chat_message(message))
+    items[0][mapper.reaction_count_attribute(ReactionType.LIKE)] = {"N": "3"}
+    items[0][mapper.reaction_count_attribute(ReactionType.SAD)] = {"N": "0"}
+    del items[1]["_editted"]
+    items[2]["message_type"] = {"S": str(message_type.value)}
+    return mapper, items
+
+
+@pytest.mark.parametrize(
+    "message_type, schema",
+    [
+        (MessageType.GROUP_CHAT, GroupChatMessageSchema),
+        (MessageType.PRIVATE_CHAT, PrivateChatMessageSchema),
+    ]
+)
+def test_transcoded_messages_match_dumped_messages(message_type, schema):
+    """Test that transcoding message items gives the same data as
+    deserializing them and dumping the messages, including reaction
+    counts, missing attributes and strings the mapper parses as dates.
+    """
+    app = create_app("testing")
+    mapper, items = _message_items(message_type)
+    with app.test_request_context():
+        expected = schema(many=True).dump([mapper.deserialize_to_model(item) for item in items])
+        transcoder = database_repository._item_transcoder(mapper, schema)
+        assert transcoder.transcode_many(items) == expected
+    assert expected[0]["reaction_counts"] == {"LIKE": 3}
+
+
+def test_transcoded_links_are_built_from_the_schemas_cached_templates():
+    """Test that transcoded links match the schema's links for ids that
+    have to be quoted, and that their templates are built once rather
+    than for every page.
+    """
+    app = create_app("testing")
+    mapper, items = _message_items(MessageType.PRIVATE_CHAT)
+    for item in items:
+        item["_user_id"] = {"S": "brad 345/ü~"}
+    with app.test_request_context(base_url="https://chat.example.com/chat/"):
+        expected = PrivateChatMessageSchema(many=True).dump(
+            [mapper.deserialize_to_model(item) for item in items]
+        )
+        transcoder = database_repository._item_transcoder(mapper, PrivateChatMessageSchema)
+        with patch.object(url_for_field, "url_for", wraps=url_for_field.url_for) as url_for:
+            assert transcoder.transcode_many(items) == expected
+            assert transcoder.transcode_many(items) == expected
+    assert expected[0]["user_url"].endswith("/api/v1/users/brad%20345/%C3%BC~")
+    assert url_for.call_count == 0
+
+
+def test_transcoded_notifications_match_dumped_notifications():
+    """Test that transcoding notification items gives the same data as
+    deserializing them and dumping the notifications.
+    """
+    app = create_app("testing")
+    mapper = database_repository._notification_mapper
+    items = [
+        mapper.serialize_from_model(Notification(
+            str(index), "1234", NotificationType.NEW_GROUP_CHAT_MESSAGE, "A message",
+            "https://example.com", created_at=datetime(2021, 1, 21), read=bool(index)
+        ))
+        for index in range(2)
+    ]
+    with app.test_request_context():
+        expected = NotificationSchema(many=True).dump(
+            [mapper.deserialize_to_model(item) for item in items]
+        )
+        transcoder = database_repository._item_transcoder(mapper, NotificationSchema)
+        assert transcoder.transcode_many(items) == expected
+
+
+def test_schemas_with_unhandled_dump_hooks_are_rejected():
+    """Test that a schema whose post dump hook needs a model can't be
+    transcoded without a function that does the hook's work.
+    """
+    with pytest.raises(ValueError):
+        ItemTranscoder(database_repository._group_chat_message_mapper, GroupChatMessageSchema())
@@ -0,0 +1,173 @@
+"""This file contains unit tests for reading pages of lists without reading
+the user, community or chat the list belongs to first.
+"""
+
+
+import pytest
+from unittest.mock import patch
+from app.clients import dynamodb_client
+from app.models import (
+    User, Location, Image, ImageType, Community, CommunityTopic, Notification,
+    NotificationType, PrivateChatMembership
+)
+from app.models.role import regular_user_role
+from app.repositories import database_repository
+from app.repositories.exceptions import NotFoundException
+
+
+def _user(id, username):
+    return User(
+        id, username, "Brad", username + "@gmail.com", regular_user_role,
+        location=Location("Philadelphia", "PA", "USA"),
+        avatar=Image("avatar", ImageType.USER_PROFILE_PHOTO, "url", 100, 100),
+        cover_photo=Image("cover", ImageType.USER_COVER_PHOTO, "url", 100, 100),
+    )
+
+
+def _community_item(member_count):
+    community = Community(
+        "5678",
+        "Detroit",
+        "A community",
+        CommunityTopic.ANXIETY,
+        Image("avatar", ImageType.COMMUNITY_PROFILE_PHOTO, "url", 100, 100),
+        Image("cover", ImageType.COMMUNITY_COVER_PHOTO, "url", 100, 100),
+        Location("Detroit", "MI", "USA"),
+        "1234",
+    )
+    item = database_repository._serialize_community(community)
+    item["_member_count"] = {"N": str(member_count)}
+    return item
+
+
+def _calls(dynamodb):
+    return [call[0] for call in dynamodb.method_calls]
+
+
+def test_non_empty_page_reads_the_parent_in_the_members_batch_get():
+    """Test that a page of community members costs one query and one batch
+    get that also reads the community for its member count.
+    """
+    user = _user("1234", "brad345")
+    with patch.object(dynamodb_client, "_dynamodb") as dynamodb:
+        dynamodb.query.return_value = {"Items": [{"user_id": {"S": "1234"}}]}
+        dynamodb.batch_get_item.return_value = {"Responses": {"ChatApp": [
+            database_repository._serialize_user(user), _community_item(7)
+        ]}}
+        results = database_repository.get_community_members("5678", 20)
+    assert _calls(dynamodb) == ["query", "batch_get_item"]
+    keys = dynamodb.batch_get_item.call_args[1]["RequestItems"]["ChatApp"]["Keys"]
+    assert keys[-1] == {"PK": {"S": "COMMUNITY#5678"}, "SK": {"S": "COMMUNITY#5678"}}
+    assert [member.id for member in results["models"]] == ["1234"]
+    assert results["total"] == 7
+
+
+def test_empty_page_checks_that_the_parent_exists_with_a_projected_read():
+    """Test that only an empty page reads its parent, projecting just the
+    attributes it needs, and raises NotFoundException if it's missing.
+    """
+    with patch.object(dynamodb_client, "_dynamodb") as dynamodb:
+        dynamodb.query.return_value = {"Items": []}
+        dynamodb.get_item.return_value = {
+            "Item": {"PK": {"S": "COMMUNITY#5678"}, "_member_count": {"N": "3"}}
+        }
+        results = database_repository.get_community_members("5678", 20)
+    assert _calls(dynamodb) == ["query", "get_item"]
+    parameters = dynamodb.get_item.call_args[1]
+    assert parameters["ProjectionExpression"] == "#p0, #p1"
+    assert parameters["ExpressionAttributeNames"] == {"#p0": "PK", "#p1": "_member_count"}
+    assert results["models"] == [] and results["total"] == 3
+
+    with patch.object(dynamodb_client, "_dynamodb") as dynamodb:
+        dynamodb.query.return_value = {"Items": []}
+        dynamodb.get_item.return_value = {}
+        with pytest.raises(NotFoundException):
+            database_repository.get_user_group_chats("1234", 20)
+
+
+def test_private_chats_read_the_user_with_the_users_they_chat_with():
+    """Test that a page of private chats reads the user in the same batch
+    get as the other users.
+    """
+    user, other_user = _user("1234", "brad345"), _user("5678", "jill345")
+    membership = database_repository._private_chat_membership_mapper.serialize_from_model(
+        PrivateChatMembership("abcd", user.id, other_user.id)
+    )
+    with patch.object(dynamodb_client, "_dynamodb") as dynamodb:
+        dynamodb.query.return_value = {"Items": [membership]}
+        dynamodb.batch_get_item.return_value = {"Responses": {"ChatApp": [
+            database_repository._serialize_user(other_user),
+            database_repository._serialize_user(user),
+        ]}}
+        results = database_repository.get_user_private_chats(user.id, 20)
+    assert _calls(dynamodb) == ["query", "batch_get_item"]
+    [private_chat] = results["models"]
+    assert private_chat.id == "abcd"
+    assert private_chat.primary_user_id == user.id
+    assert private_chat.secondary_user_id == other_user.id
+
+
+def _unprocessed(items, key):
+    """Return a batch get response that leaves the given key unprocessed."""
+    return {
+        "Responses": {"ChatApp": items},
+        "UnprocessedKeys": {"ChatApp": {"Keys": [key]}},
+    }
+
+
+def test_parent_left_unprocessed_by_the_batch_get_is_read_on_its_own():
+    """Test that a list's parent that the batch get couldn't read is read
+    on its own rather than reported as missing or as having no members.
+    """
+    user, other_user = _user("1234", "brad345"), _user("5678", "jill345")
+    user_key = database_repository._user_mapper.key(user.id, user.id)
+    membership = database_repository._private_chat_membership_mapper.serialize_from_model(
+        PrivateChatMembership("abcd", user.id, other_user.id)
+    )
+    with patch.object(dynamodb_client, "_dynamodb") as dynamodb, \
+            patch("app.clients.dynamodb_client.time.sleep"):
+        dynamodb.query.return_value = {"Items": [membership]}
+        dynamodb.batch_get_item.side_effect = [
+            _unprocessed([database_repository._serialize_user(other_user)], user_key),
+        ] + [_unprocessed([], user_key)] * 4
+        dynamodb.get_item.return_value = {"Item": database_repository._serialize_user(user)}
+        results = database_repository.get_user_private_chats(user.id, 20)
+    assert dynamodb.get_item.call_args[1]["Key"] == user_key
+    [private_chat] = results["models"]
+    assert private_chat.primary_user_id == user.id
+
+    community_key = database_repository._community_mapper.key("5678", "5678")
+    with patch.object(dynamodb_client, "_dynamodb") as dynamodb, \
+            patch("app.clients.dynamodb_client.time.sleep"):
+        dynamodb.query.return_value = {"Items": [{"user_id": {"S": "1234"}}]}
+        dynamodb.batch_get_item.side_effect = [
+            _unprocessed([database_repository._serialize_user(user)], community_key),
+        ] + [_unprocessed([], community_key)] * 4
+        dynamodb.get_item.return_value = {
+            "Item": {"PK": {"S": "COMMUNITY#5678"}, "_member_count": {"N": "7"}}
+        }
+        results = database_repository.get_community_members("5678", 20)
+    assert [member.id for member in results["models"]] == ["1234"]
+    assert results["total"] == 7
+
+    with patch.object(dynamodb_client, "_dynamodb") as dynamodb, \
+            patch("app.clients.dynamodb_client.time.sleep"):
+        dynamodb.query.return_value = {"Items": [{"user_id": {"S": "1234"}}]}
+        dynamodb.batch_get_item.return_value = _unprocessed([], community_key)
+        dynamodb.get_item.return_value = {}
+        with pytest.raises(NotFoundException):
+            database_repository.get_community_members("5678", 20)
+
+
+def test_page_of_notifications_is_a_single_query():
+    """Test that a non-empty page of notifications is read with one query."""
+    notification = Notification(
+        "abcd", "1234", NotificationType.NEW_PRIVATE_CHAT_MESSAGE, "A message", "url"
+    )
+    with patch.object(dynamodb_client, "_dynamodb") as dynamodb:
+        dynamodb.query.return_value = {"Items": [
+            database_repository._notification_mapper.serialize_from_model(notification)
+        ]}
+        results = database_repository.get_user_notifications("1234", 20)
+    assert _calls(dynamodb) == ["query"]
+    assert len(results["models"]) == 1
@@ -0,0 +1,165 @@
+"""This file contains unit tests for storing chat messages in time bucketed
+partitions, paging through them and moving messages into them.
+"""
+
+
+import pytest
+from unittest.mock import patch
+from app.clients import dynamodb_client
+from app.models import Message, MessageBucket, MessageType, Reaction, ReactionType
+from app.repositories import database_repository
+from app.repositories.exceptions import NotFoundException
+from app.schemas import MessageSchema, ReactionSchema
+from aws_services_setup import migrations
+
+
+CHAT_ID = "b61072fd0d4645828ae7dec37ffb6da2"
+BUCKETS = ["2021-01-19", "2021-01-20", "2021-01-21"]
+
+
+def _message(bucket, index):
+    message_id = f"{bucket}T{index:02d}:00:00.000000-{index:032x}"
+    return Message(message_id, CHAT_ID, "1234", "hello", MessageType.GROUP_CHAT)
+
+
+def _table():
+    """Return the items of a group chat with three messages in each of
+    three daily buckets.
+    """
+    bucket_mapper = database_repository._group_chat_message_bucket_mapper
+    items = []
+    for bucket in BUCKETS:
+        items.append(bucket_mapper.serialize_from_model(MessageBucket(CHAT_ID, bucket)))
+        items.extend(
+            database_repository._serialize_chat_message(_message(bucket, index))
+            for index in range(3)
+        )
+    return items
+
+
+def _query(items):
+    """Return a function that answers queries on the table's primary key
+    from the given items the way DynamoDB does.
+    """
+    def query(**parameters):
+        values = parameters["ExpressionAttributeValues"]
+        matches = sorted(
+            (
+                item for item in items
+                if item["PK"] == values[":pk"]
+                and item["SK"]["S"].startswith(values[":sk"]["S"])
+            ),
+            key=lambda item: item["SK"]["S"],
+            reverse=not parameters["ScanIndexForward"],
+        )
+        if "ExclusiveStartKey" in parameters:
+            start_sk = parameters["ExclusiveStartKey"]["SK"]["S"]
+            matches = [
+                item for item in matches
+                if (item["SK"]["S"] > start_sk) == parameters["ScanIndexForward"]
+                and item["SK"]["S"] != start_sk
+            ]
+        page = matches[:parameters["Limit"]]
+        response = {"Items": page, "ScannedCount": len(page)}
+        if len(matches) > parameters["Limit"]:
+            response["LastEvaluatedKey"] = {"PK": page[-1]["PK"], "SK": page[-1]["SK"]}
+        if "FilterExpression" in parameters:
+            response["Items"] = [
+                item for item in page if item["type"] == values[":type"]
+            ]
+        return response
+    return query
+
+
+def test_pages_continue_into_older_buckets():
+    """Test that paging through a chat's messages returns every message
+    newest first, with pages that span the boundaries between buckets.
+    """
+    expected_ids = [
+        _message(bucket, index).id for bucket in reversed(BUCKETS) for index in (2, 1, 0)
+    ]
+    message_ids = []
+    cursor = None
+    with patch.object(dynamodb_client, "_dynamodb") as dynamodb:
+        dynamodb.query.side_effect = _query(_table())
+        while True:
+            page = database_repository.get_group_chat_messages(
+                "1", CHAT_ID, 4, cursor=cursor
+            )
+            message_ids.extend(message.id for message in page["models"])
+            if not page["has_next"]:
+                break
+            cursor = page["next"]
+    assert message_ids == expected_ids
+    assert len(message_ids) == 9
+
+
+def test_empty_chat_has_a_single_empty_page():
+    """Test that a chat without buckets has one empty page."""
+    with patch.object(dynamodb_client, "_dynamodb") as dynamodb:
+        dynamodb.query.side_effect = _query([])
+        page = database_repository.get_group_chat_messages("1", CHAT_ID, 4)
+    assert page["models"] == []
+    assert not page["has_next"]
+
+
+@pytest.mark.parametrize("message_id", ["", "hello", "2021-13-45T00:00:00-1234"])
+def test_malformed_message_ids_are_not_found(message_id):
+    """Test that message ids that don't begin with a date are reported as
+    messages that don't exist rather than raising a ValueError.
+    """
+    with patch.object(dynamodb_client, "_dynamodb") as dynamodb:
+        assert database_repository.get_chat_message(
+            CHAT_ID, message_id, MessageType.GROUP_CHAT
+        ) is None
+        with pytest.raises(NotFoundException):
+            database_repository.delete_chat_message(
+                CHAT_ID, MessageType.GROUP_CHAT, message_id, "1234"
+            )
+        with pytest.raises(NotFoundException):
+            database_repository.add_chat_message_reaction(
+                CHAT_ID, MessageType.GROUP_CHAT, Reaction(message_id, "1234", ReactionType.LIKE)
+            )
+    assert dynamodb.method_calls == []
+
+
+def test_schemas_reject_malformed_message_ids():
+    """Test that message ids sent to socket events are validated."""
+    errors = MessageSchema(only=["_id", "_chat_id", "message_type"]).validate(
+        {"id": "hello", "chat_id": CHAT_ID, "message_type": "GROUP_CHAT"}
+    )
+    assert "id" in errors
+    errors = ReactionSchema().validate({
+        "message_id": "hello",
+        "chat_id": CHAT_ID,
+        "message_type": "GROUP_CHAT",
+        "reaction_type": "LIKE",
+    })
+    assert "message_id" in errors
+
+
+def test_migration_moves_unbucketed_messages():
+    """Test that messages stored in a chat's single partition are moved
+    into their buckets, each bucket is added to the chat's bucket directory
+    once, and messages that are already bucketed are left alone.
+    """
+    mapper = database_repository._group_chat_message_mapper
+    unbucketed_items = []
+    for index in range(2):
+        item = database_repository._serialize_chat_message(_message(BUCKETS[0], index))
+        item["PK"] = {"S": "GROUPCHAT#" + CHAT_ID}
+        unbucketed_items.append(item)
+    bucketed_item = database_repository._serialize_chat_message(_message(BUCKETS[1], 0))
+    with patch.object(migrations, "dynamodb_client") as client:
+        client.get_paginator.return_value.paginate.return_value = [
+            {"Items": unbucketed_items + [bucketed_item]}
+        ]
+        assert migrations.migrate_messages_to_buckets() == 2
+    [bucket_put] = client.put_item.call_args_list
+    assert bucket_put[1]["Item"]["SK"] == {"S": "MESSAGE_BUCKET#" + BUCKETS[0]}
+    assert client.transact_write_items.call_count == 2
+    for item, call in zip(unbucketed_items, client.transact_write_items.call_args_list):
+        put, delete = call[1]["TransactItems"]
+        assert put["Put"]["Item"]["PK"] == mapper.key(CHAT_ID, item["_id"]["S"])["PK"]
+        assert put["Put"]["Item"]["PK"] == {"S": f"GROUPCHAT#{CHAT_ID}#{BUCKETS[0]}"}
+        assert delete["Delete"]["Key"] == {"PK": item["PK"], "SK": item["SK"]}
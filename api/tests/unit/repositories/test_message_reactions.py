@@ -0,0 +1,182 @@
+"""This file contains unit tests for storing reactions to chat messages as
+per-user reaction items and per-type counters on the message.
+"""
+
+
+import pytest
+from unittest.mock import patch
+from botocore.exceptions import ClientError
+from app.clients import dynamodb_client
+from app.models import Message, MessageType, Reaction, ReactionType
+from app.repositories import database_repository
+from app.repositories.exceptions import DatabaseException, NotFoundException
+
+
+MESSAGE_ID = "2021-01-21T20:11:59.313473-b61072fd0d4645828ae7dec37ffb6da2"
+
+
+def _cancelled(reasons):
+    return ClientError(
+        {
+            "Error": {"Code": "TransactionCanceledException", "Message": ""},
+            "CancellationReasons": reasons,
+        },
+        "TransactWriteItems"
+    )
+
+
+def _reaction_item(reaction_type):
+    return database_repository._reaction_mapper.serialize_from_model(
+        Reaction(MESSAGE_ID, "1234", reaction_type)
+    )
+
+
+def test_reacting_is_a_single_transaction_without_reads():
+    """Test that a reaction is added by putting the user's reaction item
+    and incrementing the message's counter of its type in one transaction.
+    """
+    reaction = Reaction(MESSAGE_ID, "1234", ReactionType.LIKE)
+    with patch.object(dynamodb_client, "_dynamodb") as dynamodb:
+        dynamodb.transact_write_items.return_value = {}
+        database_repository.add_chat_message_reaction("5678", MessageType.GROUP_CHAT, reaction)
+    assert [call[0] for call in dynamodb.method_calls] == ["transact_write_items"]
+    put, update = dynamodb.transact_write_items.call_args[1]["TransactItems"]
+    assert put["Put"]["Item"]["PK"] == {"S": "MESSAGEREACTION#" + MESSAGE_ID}
+    assert put["Put"]["Item"]["SK"] == {"S": "USER#1234"}
+    assert "attribute_not_exists" in put["Put"]["ConditionExpression"]
+    assert update["Update"]["UpdateExpression"] == "ADD #counter :amount"
+    assert update["Update"]["ExpressionAttributeNames"] == {"#counter": "reaction_count_LIKE"}
+
+
+def test_changing_a_reaction_moves_it_between_counters():
+    """Test that reacting with a different type replaces the user's
+    reaction and moves it from the old type's counter to the new one.
+    """
+    reaction = Reaction(MESSAGE_ID, "1234", ReactionType.HEART)
+    error = _cancelled([
+        {"Code": "ConditionalCheckFailed", "Item": _reaction_item(ReactionType.LIKE)},
+        {"Code": "None"},
+    ])
+    with patch.object(dynamodb_client, "_dynamodb") as dynamodb:
+        dynamodb.transact_write_items.side_effect = [error, {}]
+        database_repository.add_chat_message_reaction("5678", MessageType.GROUP_CHAT, reaction)
+    put, update = dynamodb.transact_write_items.call_args[1]["TransactItems"]
+    assert put["Put"]["ConditionExpression"] == "reaction_type = :replaced_type"
+    assert put["Put"]["ExpressionAttributeValues"] == {":replaced_type": {"S": "LIKE"}}
+    assert update["Update"]["UpdateExpression"] == (
+        "ADD #counter :amount, #replaced_counter :decrement"
+    )
+    assert update["Update"]["ExpressionAttributeNames"] == {
+        "#counter": "reaction_count_HEART", "#replaced_counter": "reaction_count_LIKE"
+    }
+
+
+def test_repeated_reaction_is_not_counted_twice():
+    """Test that reacting again with the same type writes nothing more."""
+    reaction = Reaction(MESSAGE_ID, "1234", ReactionType.LIKE)
+    error = _cancelled([
+        {"Code": "ConditionalCheckFailed", "Item": _reaction_item(ReactionType.LIKE)},
+        {"Code": "None"},
+    ])
+    with patch.object(dynamodb_client, "_dynamodb") as dynamodb:
+        dynamodb.transact_write_items.side_effect = [error]
+        database_repository.add_chat_message_reaction("5678", MessageType.GROUP_CHAT, reaction)
+    assert dynamodb.transact_write_items.call_count == 1
+
+
+def test_reacting_to_missing_message_raises_not_found():
+    """Test that the transaction's condition on the message existing is
+    reported as the message not being found.
+    """
+    reaction = Reaction(MESSAGE_ID, "1234", ReactionType.LIKE)
+    error = _cancelled([{"Code": "None"}, {"Code": "ConditionalCheckFailed"}])
+    with patch.object(dynamodb_client, "_dynamodb") as dynamodb:
+        dynamodb.transact_write_items.side_effect = error
+        with pytest.raises(NotFoundException):
+            database_repository.add_chat_message_reaction(
+                "5678", MessageType.GROUP_CHAT, reaction
+            )
+
+
+def test_unreacting_decrements_the_counter_of_the_removed_reaction():
+    """Test that removing a reaction deletes the user's reaction item and
+    decrements the counter of the type it had in one transaction.
+    """
+    with patch.object(dynamodb_client, "_dynamodb") as dynamodb:
+        dynamodb.get_item.return_value = {"Item": _reaction_item(ReactionType.SAD)}
+        dynamodb.transact_write_items.return_value = {}
+        reaction = database_repository.remove_chat_message_reaction(
+            "5678", MessageType.GROUP_CHAT, MESSAGE_ID, "1234"
+        )
+    assert reaction.reaction_type == ReactionType.SAD
+    assert [call[0] for call in dynamodb.method_calls] == ["get_item", "transact_write_items"]
+    delete, update = dynamodb.transact_write_items.call_args[1]["TransactItems"]
+    assert delete["Delete"]["Key"] == {
+        "PK": {"S": "MESSAGEREACTION#" + MESSAGE_ID}, "SK": {"S": "USER#1234"}
+    }
+    assert delete["Delete"]["ExpressionAttributeValues"] == {":reaction_type": {"S": "SAD"}}
+    assert update["Update"]["ExpressionAttributeNames"] == {"#counter": "reaction_count_SAD"}
+    assert update["Update"]["ExpressionAttributeValues"] == {":amount": {"N": "-1"}}
+
+
+def test_unreacting_after_a_concurrent_change_decrements_nothing():
+    """Test that a reaction removed since it was read is reported as no
+    reaction, and that one whose type changed since it was read raises
+    instead of decrementing the wrong counter.
+    """
+    with patch.object(dynamodb_client, "_dynamodb") as dynamodb:
+        dynamodb.get_item.return_value = {"Item": _reaction_item(ReactionType.SAD)}
+        dynamodb.transact_write_items.side_effect = _cancelled([
+            {"Code": "ConditionalCheckFailed"}, {"Code": "None"},
+        ])
+        assert database_repository.remove_chat_message_reaction(
+            "5678", MessageType.GROUP_CHAT, MESSAGE_ID, "1234"
+        ) is None
+
+        dynamodb.transact_write_items.side_effect = _cancelled([
+            {"Code": "ConditionalCheckFailed", "Item": _reaction_item(ReactionType.LIKE)},
+            {"Code": "None"},
+        ])
+        with pytest.raises(DatabaseException):
+            database_repository.remove_chat_message_reaction(
+                "5678", MessageType.GROUP_CHAT, MESSAGE_ID, "1234"
+            )
+
+
+def test_replacing_a_reaction_changed_concurrently_raises():
+    """Test that a replacement whose condition on the previous reaction's
+    type fails raises a DatabaseException.
+    """
+    reaction = Reaction(MESSAGE_ID, "1234", ReactionType.HEART)
+    with patch.object(dynamodb_client, "_dynamodb") as dynamodb:
+        dynamodb.transact_write_items.side_effect = [
+            _cancelled([
+                {"Code": "ConditionalCheckFailed", "Item": _reaction_item(ReactionType.LIKE)},
+                {"Code": "None"},
+            ]),
+            _cancelled([{"Code": "ConditionalCheckFailed"}, {"Code": "None"}]),
+        ]
+        with pytest.raises(DatabaseException):
+            database_repository.add_chat_message_reaction(
+                "5678", MessageType.GROUP_CHAT, reaction
+            )
+
+
+def test_message_reaction_counts_are_read_from_its_item():
+    """Test that a message's reaction summary is built from its counter
+    attributes, leaving out counters that dropped to zero, and that
+    editing a message doesn't overwrite them.
+    """
+    mapper = database_repository._group_chat_message_mapper
+    message = Message(MESSAGE_ID, "5678", "1234", "Hello", MessageType.GROUP_CHAT)
+    item = database_repository._serialize_chat_message(message)
+    item["reaction_count_LIKE"] = {"N": "3"}
+    item["reaction_count_SAD"] = {"N": "0"}
+    message = mapper.deserialize_to_model(item)
+    assert message.reaction_counts == {ReactionType.LIKE: 3}
+
+    with patch.object(dynamodb_client, "_dynamodb") as dynamodb:
+        database_repository.update_chat_message(message)
+    dynamodb.put_item.assert_not_called()
+    names = dynamodb.update_item.call_args[1]["ExpressionAttributeNames"].values()
+    assert not any(name.startswith("reaction_count_") for name in names)
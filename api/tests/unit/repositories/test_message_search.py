@@ -0,0 +1,237 @@
+"""This file contains unit tests for maintaining and searching the
+inverted index of chat message content.
+"""
+
+
+import pytest
+from datetime import datetime
+from uuid import uuid4
+from unittest.mock import patch
+from app.clients import dynamodb_client
+from app.models import Message, MessageType
+from app.repositories import database_repository
+from app.repositories.exceptions import DatabaseException
+from app.repositories.message_search import (
+    tokenize,
+    encode_message_id,
+    decode_message_id,
+    MAX_POSTINGS_PER_ITEM,
+)
+
+
+CHAT_ID = "1234"
+
+
+class FakeTable:
+    """Class that stores items in memory and answers the requests
+    the message search index makes.
+    """
+
+    def __init__(self):
+        self.items = {}
+        self.message_gets = 0
+
+    def put_item(self, TableName, Item, **kwargs):
+        self.items[(Item["PK"]["S"], Item["SK"]["S"])] = Item
+
+    def delete_item(self, TableName, Key, **kwargs):
+        self.items.pop((Key["PK"]["S"], Key["SK"]["S"]), None)
+
+    def update_item(self, TableName, Key, UpdateExpression, ExpressionAttributeValues, **kwargs):
+        item = self.items.setdefault((Key["PK"]["S"], Key["SK"]["S"]), dict(Key))
+        if ":postings" not in ExpressionAttributeValues:
+            # An edit that sets the message's attributes
+            for name, attribute in kwargs["ExpressionAttributeNames"].items():
+                if name.startswith("#a"):
+                    item[attribute] = ExpressionAttributeValues[":" + name[1:]]
+            return
+        postings = set(item.get("postings", {}).get("BS", []))
+        if UpdateExpression.startswith("ADD"):
+            postings |= set(ExpressionAttributeValues[":postings"]["BS"])
+        else:
+            postings -= set(ExpressionAttributeValues[":postings"]["BS"])
+        if postings:
+            item["postings"] = {"BS": list(postings)}
+        else:
+            item.pop("postings", None)
+
+    def query(self, KeyConditionExpression, ExpressionAttributeValues, Limit, **kwargs):
+        partition = ExpressionAttributeValues[":pk"]["S"]
+        prefix = ExpressionAttributeValues.get(":sk", {"S": ""})["S"]
+        sort_keys = sorted(
+            sort_key
+            for pk, sort_key in self.items
+            if pk == partition and sort_key.startswith(prefix)
+        )
+        forward = kwargs.get("ScanIndexForward", True)
+        if not forward:
+            sort_keys.reverse()
+        if "ExclusiveStartKey" in kwargs:
+            start = kwargs["ExclusiveStartKey"]["SK"]["S"]
+            sort_keys = [
+                sort_key for sort_key in sort_keys
+                if (sort_key > start if forward else sort_key < start)
+            ]
+        page = sort_keys[:Limit]
+        response = {"Items": [self.items[(partition, sort_key)] for sort_key in page]}
+        if len(sort_keys) > Limit:
+            response["LastEvaluatedKey"] = {"PK": {"S": partition}, "SK": {"S": page[-1]}}
+        return response
+
+    def batch_get_item(self, RequestItems):
+        table_name, request = next(iter(RequestItems.items()))
+        items = []
+        for key in request["Keys"]:
+            item = self.items.get((key["PK"]["S"], key["SK"]["S"]))
+            if item:
+                items.append(item)
+                self.message_gets += "_content" in item
+        return {"Responses": {table_name: items}}
+
+
+def _message(created_at, content):
+    message_id = created_at.isoformat() + "-" + uuid4().hex
+    return Message(
+        message_id, CHAT_ID, "5678", content, MessageType.GROUP_CHAT, created_at=created_at
+    )
+
+
+@pytest.fixture
+def table():
+    """Return an in-memory table used by the database repository."""
+    fake_table = FakeTable()
+    with patch.object(dynamodb_client, "_dynamodb", fake_table):
+        yield fake_table
+
+
+def test_tokenize_ignores_case_punctuation_and_stop_words():
+    """Test that a message's terms are lowercased words that are
+    neither too short nor stop words.
+    """
+    assert tokenize("Hello, the WORLD! a hello") == {"hello", "world"}
+
+
+def test_message_ids_are_packed_losslessly():
+    """Test that message ids round trip through their compact form,
+    including ids without microseconds and ids in an unknown form.
+    """
+    for created_at in [datetime(2020, 12, 1, 10, 30, 0, 1), datetime(2020, 12, 1)]:
+        message_id = created_at.isoformat() + "-" + uuid4().hex
+        assert len(encode_message_id(message_id)) == 25
+        assert decode_message_id(encode_message_id(message_id)) == message_id
+    assert decode_message_id(encode_message_id("not-a-message-id")) == "not-a-message-id"
+
+
+def test_search_returns_matches_newest_first_across_buckets(table):
+    """Test that searching returns only messages containing every term,
+    newest first, paging across buckets without reading other messages.
+    """
+    oldest = _message(datetime(2020, 12, 1, 9), "Hello world")
+    older = _message(datetime(2020, 12, 1, 10), "hello there")
+    newer = _message(datetime(2020, 12, 2, 9), "the world says hello")
+    newest = _message(datetime(2020, 12, 3, 9), "goodbye world")
+    for message in [oldest, older, newer, newest]:
+        database_repository.add_chat_message(message)
+
+    results = database_repository.search_chat_messages(
+        CHAT_ID, MessageType.GROUP_CHAT, "world HELLO", 1
+    )
+    assert [message.id for message in results["models"]] == [newer.id]
+    assert results["has_next"] is True
+    assert table.message_gets == 1
+
+    results = database_repository.search_chat_messages(
+        CHAT_ID, MessageType.GROUP_CHAT, "world HELLO", 1, results["next"]
+    )
+    assert [message.id for message in results["models"]] == [oldest.id]
+    assert table.message_gets == 2
+
+
+def test_edits_and_deletes_update_the_index(table):
+    """Test that editing a message moves it between the postings of its
+    old and new terms and that deleting it removes it from the index.
+    """
+    message = _message(datetime(2020, 12, 1, 9), "hello world")
+    database_repository.add_chat_message(message)
+    previous_content = message.content
+    message.edit("goodbye world")
+    database_repository.update_chat_message(message, previous_content)
+
+    search = lambda query: [
+        message.id
+        for message in database_repository.search_chat_messages(
+            CHAT_ID, MessageType.GROUP_CHAT, query, 10
+        )["models"]
+    ]
+    assert search("hello") == []
+    assert search("goodbye") == [message.id]
+
+    database_repository.remove_chat_message(message)
+    assert search("world") == []
+
+
+def test_batch_gets_are_chunked_and_retry_unprocessed_keys():
+    """Test that batch gets request at most 100 keys at a time and request
+    keys DynamoDB leaves unprocessed again.
+    """
+    keys = [{"PK": {"S": f"MESSAGE#{index}"}, "SK": {"S": "A"}} for index in range(150)]
+    responses = [
+        {
+            "Responses": {"ChatApp": [{"index": index} for index in range(90)]},
+            "UnprocessedKeys": {"ChatApp": {"Keys": keys[90:100]}},
+        },
+        {"Responses": {"ChatApp": [{"index": index} for index in range(90, 100)]}},
+        {"Responses": {"ChatApp": [{"index": index} for index in range(100, 150)]}},
+    ]
+    with patch.object(dynamodb_client, "_dynamodb") as dynamodb, \
+            patch("app.clients.dynamodb_client.time.sleep") as sleep:
+        dynamodb.batch_get_item.side_effect = responses
+        items = database_repository._batch_get_items(keys)
+    requested_keys = [
+        call[1]["RequestItems"]["ChatApp"]["Keys"]
+        for call in dynamodb.batch_get_item.call_args_list
+    ]
+    assert requested_keys == [keys[:100], keys[90:100], keys[100:]]
+    assert sleep.call_count == 1
+    assert sorted(item["index"] for item in items) == list(range(150))
+
+
+def test_batch_gets_that_stay_unprocessed_raise_database_exception():
+    """Test that items that still can't be read after every retry are
+    reported rather than treated as missing.
+    """
+    keys = [{"PK": {"S": "MESSAGE#1"}, "SK": {"S": "A"}}]
+    with patch.object(dynamodb_client, "_dynamodb") as dynamodb, \
+            patch("app.clients.dynamodb_client.time.sleep"):
+        dynamodb.batch_get_item.return_value = {
+            "Responses": {"ChatApp": []},
+            "UnprocessedKeys": {"ChatApp": {"Keys": keys}},
+        }
+        with pytest.raises(DatabaseException):
+            database_repository._batch_get_items(keys)
+
+
+def test_postings_are_only_added_to_items_below_the_limit():
+    """Test that adding message ids to a postings item is conditioned on
+    the item staying within the most ids it can hold, while deleting them
+    is not.
+    """
+    message = _message(datetime(2020, 12, 1, 9), "Hello world")
+    with patch.object(dynamodb_client, "_dynamodb") as dynamodb:
+        database_repository._update_message_search_index(
+            database_repository._group_chat_message_mapper,
+            message,
+            added_terms={"hello"},
+            removed_terms={"world"}
+        )
+    updates = {
+        call[1]["UpdateExpression"].split()[0]: call[1]
+        for call in dynamodb.update_item.call_args_list
+    }
+    assert updates["ADD"]["ConditionExpression"] == (
+        "attribute_not_exists(postings) OR size(postings) <= :max_existing"
+    )
+    assert updates["ADD"]["ExpressionAttributeValues"][":max_existing"] == {
+        "N": str(MAX_POSTINGS_PER_ITEM - 1)
+    }
+    assert "ConditionExpression" not in updates["DELETE"]
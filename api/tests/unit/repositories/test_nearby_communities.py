@@ -0,0 +1,149 @@
+"""This file contains unit tests for finding the communities near a
+point with the geohash index.
+"""
+
+
+import math
+import random
+import pytest
+from unittest.mock import patch
+from app.clients import dynamodb_client
+from app.models import Community, CommunityTopic, Location, Image, ImageType
+from app.repositories import database_repository, geohash
+from app.repositories.exceptions import DatabaseException
+
+
+DETROIT = (42.3314, -83.0458)
+COMMUNITY_COORDINATES = {
+    "Windsor": (42.3149, -83.0364),
+    "Ann Arbor": (42.2808, -83.7430),
+    "Toledo": (41.6528, -83.5379),
+    "Chicago": (41.8781, -87.6298),
+}
+
+
+def _community_item(name, latitude, longitude):
+    community = Community(
+        name.lower().replace(" ", ""),
+        name,
+        "A community",
+        CommunityTopic.ANXIETY,
+        Image("avatar", ImageType.COMMUNITY_PROFILE_PHOTO, "url", 100, 100),
+        Image("cover", ImageType.COMMUNITY_COVER_PHOTO, "url", 100, 100),
+        Location(name, "MI", "USA", latitude, longitude),
+        "founder",
+    )
+    return database_repository._community_mapper.serialize_from_model(
+        community,
+        additional_attributes=database_repository._community_index_attributes(community)
+    )
+
+
+def fake_query(**kwargs):
+    """Query a fake geohash index holding the communities."""
+    assert kwargs["IndexName"] == "CommunitiesByGeohash"
+    values = kwargs["ExpressionAttributeValues"]
+    items = [
+        item
+        for item in (
+            _community_item(name, *coordinates)
+            for name, coordinates in COMMUNITY_COORDINATES.items()
+        )
+        if item["GEOHASH_GSI_PK"] == values[":pk"]
+        and item["GEOHASH_GSI_SK"]["S"].startswith(values.get(":sk", {"S": ""})["S"])
+    ]
+    items.sort(key=lambda item: item["GEOHASH_GSI_SK"]["S"])
+    if "ExclusiveStartKey" in kwargs:
+        start = kwargs["ExclusiveStartKey"]["GEOHASH_GSI_SK"]["S"]
+        items = [item for item in items if item["GEOHASH_GSI_SK"]["S"] > start]
+    response = {"Items": items[:kwargs["Limit"]]}
+    if len(items) > kwargs["Limit"]:
+        response["LastEvaluatedKey"] = {
+            attribute: items[kwargs["Limit"] - 1][attribute]
+            for attribute in ("PK", "SK", "GEOHASH_GSI_PK", "GEOHASH_GSI_SK")
+        }
+    return response
+
+
+def test_covering_cells_contain_every_point_in_radius():
+    """Test that every point within the radius lies in one of the covering
+    cells, including near the antimeridian and the poles.
+    """
+    rng = random.Random(0)
+    for latitude, longitude, radius_km in [
+        (*DETROIT, 25), (*DETROIT, 100), (0.0, 179.9, 40), (-33.9, 18.4, 2), (84.0, 10.0, 50)
+    ]:
+        cells = geohash.covering_cells(latitude, longitude, radius_km)
+        assert len(cells) <= 9 or abs(latitude) > 70
+        for _ in range(500):
+            distance = radius_km * math.sqrt(rng.random())
+            bearing = rng.uniform(0, 2 * math.pi)
+            point_latitude = latitude + distance / 111.195 * math.cos(bearing)
+            point_longitude = longitude + distance / (
+                111.195 * math.cos(math.radians(point_latitude))
+            ) * math.sin(bearing)
+            point_longitude = (point_longitude + 180) % 360 - 180
+            if geohash.distance_km(latitude, longitude, point_latitude, point_longitude) > radius_km:
+                continue
+            point_geohash = geohash.encode(point_latitude, point_longitude)
+            assert any(point_geohash.startswith(cell) for cell in cells)
+
+
+def test_nearby_communities_are_sorted_by_distance():
+    """Test that a nearby search queries the covering cells of the geohash
+    index and returns the communities in the radius, closest first.
+    """
+    with patch.object(dynamodb_client, "_dynamodb") as dynamodb:
+        dynamodb.query.side_effect = fake_query
+        results = database_repository.get_nearby_communities(*DETROIT, 60, 10)
+    assert [community.name for community in results["models"]] == ["Windsor", "Ann Arbor"]
+    assert dynamodb.query.call_count == len(geohash.covering_cells(*DETROIT, 60))
+    assert results["models"][0].location.latitude == COMMUNITY_COORDINATES["Windsor"][0]
+
+
+def test_communities_without_coordinates_are_not_indexed():
+    """Test that only communities with coordinates are added to the
+    sparse geohash index.
+    """
+    item = _community_item("Detroit", *DETROIT)
+    assert item["GEOHASH_GSI_PK"]["S"] == "GEOHASH#" + geohash.encode(*DETROIT)[:3]
+    assert item["GEOHASH_GSI_SK"]["S"] == geohash.encode(*DETROIT)
+    item = _community_item("Detroit", None, None)
+    assert "GEOHASH_GSI_PK" not in item
+
+
+def test_cells_with_more_communities_than_a_query_reads_are_paged():
+    """Test that a cell that holds more communities than a single query
+    reads is queried until every community in it is read, so the closest
+    communities aren't dropped for being later in geohash order.
+    """
+    with patch.object(dynamodb_client, "_dynamodb") as dynamodb, \
+            patch.object(database_repository, "NEARBY_CANDIDATES_PER_CELL", 1):
+        dynamodb.query.side_effect = fake_query
+        results = database_repository.get_nearby_communities(*DETROIT, 60, 10)
+    assert [community.name for community in results["models"]] == ["Windsor", "Ann Arbor"]
+    assert dynamodb.query.call_count > len(geohash.covering_cells(*DETROIT, 60))
+
+
+def test_search_areas_with_too_many_communities_are_rejected():
+    """Test that a search that would read more than the most communities
+    a search reads fails instead of returning some of them.
+    """
+    with patch.object(dynamodb_client, "_dynamodb") as dynamodb, \
+            patch.object(database_repository, "NEARBY_CANDIDATES_PER_CELL", 1), \
+            patch.object(database_repository, "MAX_NEARBY_CANDIDATES", 1):
+        dynamodb.query.side_effect = fake_query
+        with pytest.raises(DatabaseException):
+            database_repository.get_nearby_communities(*DETROIT, 60, 10)
+
+
+def test_search_areas_near_the_poles_are_clamped():
+    """Test that search areas close to the poles that need more than the
+    most covering cells are rejected without querying the index.
+    """
+    with pytest.raises(ValueError):
+        geohash.covering_cells(89.0, 10.0, 100)
+    with patch.object(dynamodb_client, "_dynamodb") as dynamodb:
+        with pytest.raises(DatabaseException):
+            database_repository.get_nearby_communities(89.0, 10.0, 100, 10)
+    assert dynamodb.query.call_count == 0
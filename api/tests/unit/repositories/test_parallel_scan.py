@@ -0,0 +1,73 @@
+"""This file contains unit tests for paging through scans that are split
+into segments scanned in parallel.
+"""
+
+
+from unittest.mock import patch
+from app.clients import dynamodb_client
+from app.models import User, Location, Image, ImageType
+from app.models.role import regular_user_role
+from app.repositories import database_repository
+
+
+TOTAL_SEGMENTS = 3
+ITEMS_PER_SEGMENT = 5
+
+
+def _user_item(segment, index):
+    user_id = f"{segment}-{index}"
+    user = User(
+        user_id,
+        "user" + user_id,
+        "User",
+        user_id + "@gmail.com",
+        regular_user_role,
+        location=Location("Detroit", "MI", "USA"),
+        avatar=Image(user_id, ImageType.USER_PROFILE_PHOTO, "url", 100, 100),
+        cover_photo=Image(user_id, ImageType.USER_COVER_PHOTO, "url", 100, 100),
+    )
+    return database_repository._user_mapper.serialize_from_model(user)
+
+
+def fake_scan(**kwargs):
+    """Scan a fake table whose segments each hold the same number of
+    items, keyed by their position in the segment.
+    """
+    segment = kwargs["Segment"]
+    assert kwargs["TotalSegments"] == TOTAL_SEGMENTS
+    start = 0
+    if "ExclusiveStartKey" in kwargs:
+        start = int(kwargs["ExclusiveStartKey"]["PK"]["S"].split("-")[-1]) + 1
+    end = min(start + kwargs.get("Limit", ITEMS_PER_SEGMENT), ITEMS_PER_SEGMENT)
+    response = {"Items": [_user_item(segment, index) for index in range(start, end)]}
+    if end < ITEMS_PER_SEGMENT:
+        response["LastEvaluatedKey"] = {
+            "PK": {"S": f"USER#{segment}-{end - 1}"},
+            "SK": {"S": f"USER#{segment}-{end - 1}"},
+        }
+    return response
+
+
+def test_get_items_in_segments_pages_through_every_segment():
+    """Test that paging through a scan with the returned start keys splits
+    each page between the segments and returns every item once.
+    """
+    user_ids = []
+    segment_start_keys = []
+    with patch.object(dynamodb_client, "_dynamodb") as dynamodb, \
+            patch("app.clients.dynamodb_client.SCAN_TOTAL_SEGMENTS", TOTAL_SEGMENTS):
+        dynamodb.scan.side_effect = fake_scan
+        while True:
+            results = dynamodb_client.get_items_in_segments(
+                4, segment_start_keys, "DirectoryIndex"
+            )
+            assert len(results["Items"]) <= 4
+            user_ids.extend(item["_id"]["S"] for item in results["Items"])
+            if not results["LastEvaluatedKey"]:
+                break
+            segment_start_keys = results["LastEvaluatedKey"]["segments"]
+    assert sorted(user_ids) == sorted(
+        f"{segment}-{index}"
+        for segment in range(TOTAL_SEGMENTS)
+        for index in range(ITEMS_PER_SEGMENT)
+    )
@@ -0,0 +1,180 @@
+"""This file contains unit tests for updating users, communities and
+group chats by writing only the attributes that changed.
+"""
+
+
+import pytest
+from unittest.mock import patch
+from botocore.exceptions import ClientError
+from app.clients import dynamodb_client
+from app.models import (
+    User, Location, Community, CommunityTopic, GroupChat, Image, ImageType
+)
+from app.models.role import regular_user_role
+from app.dynamodb_mappers.mapper_core.utils import are_equal_values
+from app.repositories import database_repository
+from app.repositories.exceptions import NotFoundException
+
+
+def _user():
+    user = User(
+        "1234", "brad345", "Brad", "brad@gmail.com", regular_user_role,
+        location=Location("Philadelphia", "PA", "USA"),
+        avatar=Image("avatar", ImageType.USER_PROFILE_PHOTO, "url", 100, 100),
+        cover_photo=Image("cover", ImageType.USER_COVER_PHOTO, "url", 100, 100),
+    )
+    user.add_room("5678")
+    return user
+
+
+def _community(latitude=None, longitude=None):
+    return Community(
+        "5678",
+        "Detroit",
+        "A community",
+        CommunityTopic.ANXIETY,
+        Image("avatar", ImageType.COMMUNITY_PROFILE_PHOTO, "url", 100, 100),
+        Image("cover", ImageType.COMMUNITY_COVER_PHOTO, "url", 100, 100),
+        Location("Detroit", "MI", "USA", latitude, longitude),
+        "1234",
+    )
+
+
+def _update(dynamodb):
+    """Return the attribute names an update sets and removes."""
+    parameters = dynamodb.update_item.call_args[1]
+    names = parameters["ExpressionAttributeNames"]
+    set_attributes = {names[name] for name in names if name.startswith("#a")}
+    removed_attributes = {names[name] for name in names if name.startswith("#r")}
+    return set_attributes, removed_attributes
+
+
+def test_profile_edit_sets_only_the_changed_attributes():
+    """Test that editing a user's bio writes only the bio in a single
+    update, without a transaction.
+    """
+    user = _user()
+    with patch.object(dynamodb_client, "_dynamodb") as dynamodb:
+        database_repository.update_user(user, {"bio": "Hello", "name": "Brad"})
+    dynamodb.transact_write_items.assert_not_called()
+    assert _update(dynamodb) == ({"bio"}, set())
+    assert dynamodb.update_item.call_args[1]["UpdateExpression"] == "SET #a0 = :a0"
+
+
+def test_rooms_update_sets_or_removes_only_the_rooms():
+    """Test that joining a room writes only the user's rooms, and that
+    leaving the last room removes them since empty sets aren't stored.
+    """
+    user = _user()
+    with patch.object(dynamodb_client, "_dynamodb") as dynamodb:
+        database_repository.update_user(user, {"rooms": user.rooms + ["9999"]})
+    assert _update(dynamodb) == ({"_rooms"}, set())
+    assert set(
+        dynamodb.update_item.call_args[1]["ExpressionAttributeValues"][":a0"]["SS"]
+    ) == {"5678", "9999"}
+
+    with patch.object(dynamodb_client, "_dynamodb") as dynamodb:
+        database_repository.update_user(user, {"rooms": []})
+    assert _update(dynamodb) == (set(), {"_rooms"})
+    assert "ExpressionAttributeValues" not in dynamodb.update_item.call_args[1]
+
+
+def test_unchanged_update_is_not_written():
+    """Test that an update that changes nothing makes no request."""
+    user = _user()
+    with patch.object(dynamodb_client, "_dynamodb") as dynamodb:
+        database_repository.update_user(user, {"rooms": user.rooms, "bio": user.bio})
+    assert not dynamodb.method_calls
+
+
+def test_username_change_replaces_uniqueness_item_in_transaction():
+    """Test that changing the username updates the user's changed
+    attributes and replaces the username item in one transaction.
+    """
+    user = _user()
+    with patch.object(dynamodb_client, "_execute_transact_write") as transact_write:
+        transact_write.return_value = {}
+        database_repository.update_user(user, {"username": "brad678"})
+    parameters = transact_write.call_args[0][0]
+    assert parameters[0]["Delete"]["Key"]["PK"] == {"S": "USERNAME#brad345"}
+    names = parameters[1]["Update"]["ExpressionAttributeNames"]
+    assert set(names.values()) == {"username", "USERS_GSI_SK", "DIRECTORY_GSI_SK"}
+    assert parameters[2]["Put"]["Item"]["PK"] == {"S": "USERNAME#brad678"}
+
+
+def test_removing_coordinates_removes_geohash_index_attributes():
+    """Test that removing a community's coordinates removes it from the
+    geohash index without rewriting the rest of the item.
+    """
+    community = _community(42.3314, -83.0458)
+    location = {"city": "Detroit", "state": "MI", "country": "USA"}
+    with patch.object(dynamodb_client, "_dynamodb") as dynamodb:
+        database_repository.update_community(community, {"location": location})
+    dynamodb.transact_write_items.assert_not_called()
+    assert _update(dynamodb) == (
+        {"location"}, {"GEOHASH_GSI_PK", "GEOHASH_GSI_SK"}
+    )
+
+
+def test_image_and_group_chat_updates_set_only_the_changed_attributes():
+    """Test that replacing a community's avatar and renaming a group chat
+    each write a single attribute.
+    """
+    community = _community()
+    image_data = {
+        "id": "new", "image_type": ImageType.COMMUNITY_PROFILE_PHOTO,
+        "url": "url", "height": 100, "width": 100,
+    }
+    with patch.object(dynamodb_client, "_dynamodb") as dynamodb:
+        dynamodb.update_item.return_value = {
+            "Attributes": database_repository._serialize_community(_community())
+        }
+        database_repository.update_community_image(community, image_data)
+    assert _update(dynamodb) == ({"avatar"}, set())
+
+    group_chat = GroupChat("1234", "5678", "Chat", "A group chat", member_count=7)
+    with patch.object(dynamodb_client, "_dynamodb") as dynamodb:
+        database_repository.update_group_chat(group_chat, {"name": "Renamed"})
+    assert _update(dynamodb) == ({"name"}, set())
+
+
+def test_image_updates_return_the_image_they_replaced():
+    """Test that replacing a user's avatar returns the avatar the write
+    replaced rather than the one the user was read with, and that
+    replacing the image of a user that no longer exists raises.
+    """
+    user = _user()
+    stored_user = _user()
+    stored_user.avatar = Image("concurrent", ImageType.USER_PROFILE_PHOTO, "url", 100, 100)
+    image_data = {
+        "id": "new", "image_type": ImageType.USER_PROFILE_PHOTO,
+        "url": "url", "height": 100, "width": 100,
+    }
+    with patch.object(dynamodb_client, "_dynamodb") as dynamodb:
+        dynamodb.update_item.return_value = {
+            "Attributes": database_repository._serialize_user(stored_user)
+        }
+        replaced_image = database_repository.update_user_image(user, image_data)
+    assert replaced_image.id == "concurrent"
+    assert dynamodb.update_item.call_args[1]["ReturnValues"] == "ALL_OLD"
+
+    with patch.object(dynamodb_client, "_dynamodb") as dynamodb:
+        dynamodb.update_item.side_effect = ClientError(
+            {"Error": {"Code": "ConditionalCheckFailedException", "Message": ""}},
+            "UpdateItem",
+        )
+        with pytest.raises(NotFoundException):
+            database_repository.update_user_image(_user(), image_data)
+
+
+def test_equal_values_ignore_set_order():
+    """Test that serialized sets are equal regardless of element order,
+    including sets nested in maps and lists.
+    """
+    assert are_equal_values({"SS": ["a", "b"]}, {"SS": ["b", "a"]})
+    assert are_equal_values(
+        {"M": {"roles": {"L": [{"SS": ["a", "b"]}]}}},
+        {"M": {"roles": {"L": [{"SS": ["b", "a"]}]}}},
+    )
+    assert not are_equal_values({"SS": ["a"]}, {"SS": ["a", "b"]})
+    assert not are_equal_values({"S": "a"}, None)
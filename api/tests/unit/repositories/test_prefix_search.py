@@ -0,0 +1,43 @@
+"""This file contains unit tests for searching users and communities
+by prefix in the directory index.
+"""
+
+
+from types import SimpleNamespace
+from unittest.mock import patch
+from app.clients import dynamodb_client
+from app.models import CommunityTopic, Location
+from app.repositories import database_repository
+
+
+def test_search_communities_is_a_single_prefix_query():
+    """Test that searching communities makes a single query for the
+    lowercased prefix in the community directory, limited to top K.
+    """
+    with patch.object(dynamodb_client, "_dynamodb") as dynamodb:
+        dynamodb.query.return_value = {"Items": []}
+        results = database_repository.search_communities("RUN", 5)
+    assert dynamodb.query.call_count == 1
+    parameters = dynamodb.query.call_args[1]
+    assert parameters["IndexName"] == "DirectoryIndex"
+    assert parameters["Limit"] == 5
+    assert parameters["ExpressionAttributeValues"] == {
+        ":pk": {"S": "COMMUNITYDIRECTORY"}, ":sk": {"S": "run"}
+    }
+    assert results == {"models": [], "total": 0}
+
+
+def test_community_items_are_added_to_the_directory():
+    """Test that community items carry the attributes that add them to
+    the community directory, next to their other index attributes.
+    """
+    community = SimpleNamespace(
+        id="1234",
+        name="Runners",
+        topic=CommunityTopic.ANXIETY,
+        location=Location("Detroit", "MI", "USA"),
+    )
+    attributes = database_repository._community_index_attributes(community)
+    assert attributes["DIRECTORY_GSI_PK"] == "COMMUNITYDIRECTORY"
+    assert attributes["DIRECTORY_GSI_SK"] == "runners#1234"
+    assert attributes["COMMUNITIES_BY_TOPIC_GSI_SK"] == "COMMUNITY#1234"
@@ -0,0 +1,88 @@
+"""This file contains unit tests for the S3 file repository, run against
+a stubbed S3 client instead of S3 itself.
+"""
+
+
+import io
+import json
+import base64
+from botocore.response import StreamingBody
+from botocore.stub import Stubber
+from app.clients.boto_client import BotoClient
+from app.repositories.s3_repository import _S3Repository
+
+
+BUCKET_NAME = "chat-app-images"
+
+
+def _repository():
+    """Return a repository whose client has credentials, so requests can
+    be signed without reading them from the environment.
+    """
+    repository = _S3Repository("us-east-1")
+    repository._bucket_name = BUCKET_NAME
+    repository._s3_client = BotoClient(
+        "s3", region_name="us-east-1", aws_access_key_id="test", aws_secret_access_key="test"
+    )
+    return repository
+
+
+def test_presigned_uploads_are_restricted_to_the_type_and_size():
+    """Test that a presigned POST only accepts files of the requested
+    content type up to the maximum size at the given key.
+    """
+    upload = _repository().create_upload("uploads/1234/USER_PROFILE_PHOTO/abc", "image/png", 1024, 600)
+    assert upload["fields"]["key"] == "uploads/1234/USER_PROFILE_PHOTO/abc"
+    assert upload["fields"]["Content-Type"] == "image/png"
+    policy = json.loads(base64.b64decode(upload["fields"]["policy"]))
+    assert ["content-length-range", 1, 1024] in policy["conditions"]
+    assert {"Content-Type": "image/png"} in policy["conditions"]
+    assert {"bucket": BUCKET_NAME} in policy["conditions"]
+
+
+def test_uploads_are_checked_and_copied_within_storage():
+    """Test that an upload's metadata and header are read without
+    downloading the whole file and that it is copied server side.
+    """
+    repository = _repository()
+    stubber = Stubber(repository._s3_client._get_client())
+    upload_id = "uploads/1234/USER_PROFILE_PHOTO/abc"
+    stubber.add_response(
+        "head_object",
+        {"ContentLength": 5000, "ContentType": "image/png"},
+        {"Bucket": BUCKET_NAME, "Key": upload_id},
+    )
+    stubber.add_response(
+        "get_object",
+        {"Body": StreamingBody(io.BytesIO(b"header"), 6)},
+        {"Bucket": BUCKET_NAME, "Key": upload_id, "Range": "bytes=0-5"},
+    )
+    stubber.add_response(
+        "head_object",
+        {"ContentLength": 5000},
+        {"Bucket": BUCKET_NAME, "Key": upload_id},
+    )
+    stubber.add_response(
+        "copy_object",
+        {},
+        {
+            "Bucket": BUCKET_NAME,
+            "Key": "images/abc/original.png",
+            "CopySource": {"Bucket": BUCKET_NAME, "Key": upload_id},
+            "ContentType": "image/png",
+            "CacheControl": "public, max-age=31536000, immutable",
+            "MetadataDirective": "REPLACE",
+        },
+    )
+    stubber.add_client_error("head_object", "404", expected_params={"Bucket": BUCKET_NAME, "Key": "missing"})
+    with stubber:
+        assert repository.get_metadata(upload_id) == {"size": 5000, "content_type": "image/png"}
+        assert repository.get(upload_id, byte_range=(0, 5)) == b"header"
+        assert repository.copy(
+            upload_id,
+            "images/abc/original.png",
+            content_type="image/png",
+            cache_control="public, max-age=31536000, immutable",
+        )
+        assert repository.get_metadata("missing") is None
+    stubber.assert_no_pending_responses()
@@ -0,0 +1,123 @@
+"""This file contains unit tests for verifying tokens against the
+in-memory list of revoked tokens.
+"""
+
+
+import jwt
+from datetime import datetime, timedelta
+from unittest.mock import patch
+from app.clients import dynamodb_client
+from app.models import User, TokenType, RevokedToken
+from app.repositories import database_repository
+from app.repositories.revocation import BloomFilter, RevocationList
+
+
+SECRET = "secret"
+
+
+def _token(user_id="1234", token_type=TokenType.ACCESS_TOKEN):
+    return User.encode_token(
+        {"user_id": user_id, "token_type": token_type.name}, SECRET, 3600
+    )
+
+
+class FakeRepository:
+    """Class that stores revocations in memory like the database
+    repository does.
+    """
+
+    def __init__(self):
+        self.revoked_tokens = []
+        self.num_syncs = 0
+
+    def remove_token(self, token):
+        self.revoked_tokens.append(
+            RevokedToken(token.jti, token.user_id, token.expires_on_date, datetime.now())
+        )
+
+    def get_revoked_tokens(self, since):
+        self.num_syncs += 1
+        return [
+            revoked_token for revoked_token in self.revoked_tokens
+            if revoked_token.revoked_at >= since
+        ]
+
+
+def test_bloom_filter_never_misses_a_member():
+    """Test that every string added to the filter is reported as a member
+    and that few strings that weren't added are.
+    """
+    bloom_filter = BloomFilter(1000)
+    members = [f"member{index}" for index in range(1000)]
+    for member in members:
+        bloom_filter.add(member)
+    assert all(member in bloom_filter for member in members)
+    false_positives = sum(f"other{index}" in bloom_filter for index in range(10000))
+    assert false_positives < 100
+
+
+def test_tokens_carry_an_id_and_tokens_without_one_are_rejected():
+    """Test that issued tokens have a unique jti claim and that tokens
+    without one don't decode.
+    """
+    token = _token()
+    decoded_token = User.decode_token(token.raw_jwt, SECRET)
+    assert decoded_token.jti == token.jti
+    assert decoded_token.jti != _token().jti
+
+    claims = {"user_id": "1234", "token_type": "ACCESS_TOKEN", "exp": token.expires_on_date, "iat": 0}
+    assert User.decode_token(jwt.encode(claims, SECRET, algorithm="HS256"), SECRET) is None
+
+
+def test_revocations_by_this_and_other_workers_are_seen():
+    """Test that a worker sees its own revocations immediately and those
+    of other workers once it syncs, reading only new revocations.
+    """
+    repository = FakeRepository()
+    revoked_by_other_worker = _token()
+    repository.remove_token(revoked_by_other_worker)
+    revocation_list = RevocationList(repository, 3600, sync_interval=60)
+
+    assert revocation_list.is_revoked(revoked_by_other_worker.jti)
+    token = _token()
+    assert not revocation_list.is_revoked(token.jti)
+    revocation_list.revoke(token)
+    assert revocation_list.is_revoked(token.jti)
+    assert repository.num_syncs == 1
+
+    later_revoked = _token()
+    repository.remove_token(later_revoked)
+    assert not revocation_list.is_revoked(later_revoked.jti)
+    revocation_list._next_sync = 0
+    assert revocation_list.is_revoked(later_revoked.jti)
+    assert repository.num_syncs == 2
+
+
+def test_expired_revocations_are_forgotten():
+    """Test that revocations of expired tokens are dropped on sync."""
+    repository = FakeRepository()
+    expired_token = _token()
+    expired_token.expires_on_date = int((datetime.now() - timedelta(minutes=1)).timestamp())
+    repository.remove_token(expired_token)
+    revocation_list = RevocationList(repository, 3600, sync_interval=0)
+    assert not revocation_list.is_revoked(expired_token.jti)
+    assert expired_token.jti not in revocation_list._revoked
+
+
+def test_replacing_a_token_revokes_the_old_token():
+    """Test that adding a user's new token revokes the unexpired token it
+    replaces, and that the token item is no longer indexed by its raw JWT.
+    """
+    old_token = _token()
+    old_token_item = database_repository._token_mapper.serialize_from_model(
+        old_token, item_type="JWT_ACCESS_TOKEN", sort_key_prefix="JWT_ACCESS_TOKEN#"
+    )
+    new_token = _token()
+    with patch.object(dynamodb_client, "_dynamodb") as dynamodb:
+        dynamodb.put_item.side_effect = [{"Attributes": old_token_item}, {}]
+        database_repository.add_token(new_token)
+    token_item = dynamodb.put_item.call_args_list[0][1]["Item"]
+    assert "INVERTED_GSI_PK" not in token_item
+    revoked_token_item = dynamodb.put_item.call_args_list[1][1]["Item"]
+    assert revoked_token_item["PK"]["S"] == "REVOKEDTOKENS#" + datetime.now().date().isoformat()
+    assert revoked_token_item["jti"]["S"] == old_token.jti
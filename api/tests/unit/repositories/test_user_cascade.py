@@ -0,0 +1,113 @@
+"""This file contains unit tests for deleting the items that belong to a
+user when the user is removed.
+"""
+
+
+from unittest.mock import patch
+from app.clients import dynamodb_client
+from app.models import User, Location, Message, MessageType
+from app.models.role import regular_user_role
+from app.repositories import database_repository
+
+
+USER_ID = "1234"
+MESSAGE_ID = "2021-01-21T20:11:59.313473-b61072fd0d4645828ae7dec37ffb6da2"
+
+
+def _user():
+    return User(
+        USER_ID, "brad345", "Brad", "brad@gmail.com", regular_user_role,
+        location=Location("Philadelphia", "PA", "USA"),
+    )
+
+
+def _table():
+    """Return the items that belong to a user with 30 notifications, more
+    than a page of the cascade's queries, and a message in each kind of
+    chat.
+    """
+    items = [
+        {
+            "PK": {"S": "USER#" + USER_ID},
+            "SK": {"S": f"NOTIFICATION#{index:032x}"},
+            "_user_id": {"S": USER_ID},
+            "_id": {"S": f"{index:032x}"},
+        }
+        for index in range(30)
+    ]
+    for message_type in (MessageType.PRIVATE_CHAT, MessageType.GROUP_CHAT):
+        message = Message(MESSAGE_ID, "5678", USER_ID, "Hello", message_type)
+        items.append(database_repository._serialize_chat_message(message))
+    return items
+
+
+class FakeTable:
+    """Class that answers queries and batch deletes from items in memory
+    the way DynamoDB does.
+    """
+
+    def __init__(self, items):
+        self.items = items
+
+    def query(self, **parameters):
+        values = parameters["ExpressionAttributeValues"]
+        pk_name, sk_name = ("PK", "SK")
+        if parameters.get("IndexName") == "UsersIndex":
+            pk_name, sk_name = ("USERS_GSI_PK", "USERS_GSI_SK")
+        matches = sorted(
+            (
+                item for item in self.items
+                if item.get(pk_name) == values[":pk"]
+                and item.get(sk_name, {}).get("S", "").startswith(values[":sk"]["S"])
+            ),
+            key=lambda item: item[sk_name]["S"],
+        )
+        page = matches[:parameters["Limit"]]
+        response = {"Items": page}
+        if len(matches) > parameters["Limit"]:
+            response["LastEvaluatedKey"] = {"PK": page[-1]["PK"], "SK": page[-1]["SK"]}
+        return response
+
+    def batch_write_item(self, RequestItems):
+        [requests] = RequestItems.values()
+        assert len(requests) <= 25
+        keys = [request["DeleteRequest"]["Key"] for request in requests]
+        self.items = [
+            item for item in self.items
+            if {"PK": item["PK"], "SK": item["SK"]} not in keys
+        ]
+        return {"UnprocessedItems": {}}
+
+
+def test_removing_a_user_deletes_the_items_that_belong_to_them():
+    """Test that removing a user deletes their messages and notifications
+    with batch writes made through the DynamoDB client.
+    """
+    table = FakeTable(_table())
+    with patch.object(dynamodb_client, "_dynamodb") as dynamodb:
+        dynamodb.query.side_effect = table.query
+        dynamodb.batch_write_item.side_effect = table.batch_write_item
+        database_repository.remove_user(_user())
+    assert table.items == []
+    assert dynamodb.transact_write_items.call_count == 1
+
+
+def test_batch_deletes_are_chunked_and_retried():
+    """Test that keys are deleted 25 at a time and that deletes left
+    unprocessed are sent again.
+    """
+    keys = [{"PK": {"S": f"ITEM#{index}"}, "SK": {"S": "ITEM"}} for index in range(30)]
+    unprocessed = [{"DeleteRequest": {"Key": keys[0]}}]
+    with patch.object(dynamodb_client, "_dynamodb") as dynamodb, \
+            patch("app.clients.dynamodb_client.time.sleep"):
+        dynamodb.batch_write_item.side_effect = [
+            {"UnprocessedItems": {"ChatApp": unprocessed}},
+            {"UnprocessedItems": {}},
+            {"UnprocessedItems": {}},
+        ]
+        assert dynamodb_client.batch_delete_items(keys)
+    requests = [
+        call[1]["RequestItems"]["ChatApp"] for call in dynamodb.batch_write_item.call_args_list
+    ]
+    assert [len(request) for request in requests] == [25, 1, 5]
+    assert requests[1] == unprocessed
@@ -0,0 +1,58 @@
+"""This file contains unit tests for listing users from the sparse
+user directory index.
+"""
+
+
+from types import SimpleNamespace
+from unittest.mock import patch
+from app.clients import dynamodb_client
+from app.repositories import database_repository
+from app.repositories.utils import directory_sort_key
+
+
+def test_directory_sort_key_ignores_case():
+    """Test that usernames that differ only in case sort together and
+    keep unique sort keys.
+    """
+    assert directory_sort_key("Brad", "1") == "brad#1"
+    assert directory_sort_key("brad", "2") == "brad#2"
+
+
+def test_get_users_queries_the_directory():
+    """Test that listing users queries the user directory partition
+    rather than scanning an index.
+    """
+    with patch.object(dynamodb_client, "_dynamodb") as dynamodb:
+        dynamodb.query.return_value = {"Items": []}
+        results = database_repository.get_users(20)
+    parameters = dynamodb.query.call_args[1]
+    assert parameters["IndexName"] == "DirectoryIndex"
+    assert parameters["KeyConditionExpression"] == "DIRECTORY_GSI_PK = :pk"
+    assert parameters["ExpressionAttributeValues"][":pk"] == {"S": "USERDIRECTORY"}
+    assert parameters["Limit"] == 20
+    assert not dynamodb.scan.called
+    assert results["has_next"] is False
+
+
+def test_get_users_seeks_to_prefix():
+    """Test that listing users by a username prefix seeks to the
+    lowercased prefix in the directory's sort key.
+    """
+    with patch.object(dynamodb_client, "_dynamodb") as dynamodb:
+        dynamodb.query.return_value = {"Items": []}
+        database_repository.get_users(20, prefix="BR")
+    parameters = dynamodb.query.call_args[1]
+    assert parameters["KeyConditionExpression"] == (
+        "DIRECTORY_GSI_PK = :pk AND begins_with(DIRECTORY_GSI_SK, :sk)"
+    )
+    assert parameters["ExpressionAttributeValues"][":sk"] == {"S": "br"}
+
+
+def test_user_items_are_added_to_the_directory():
+    """Test that user items carry the attributes that add them to
+    the user directory.
+    """
+    user = SimpleNamespace(id="1234", username="Brad")
+    attributes = database_repository._user_index_attributes(user)
+    assert attributes["DIRECTORY_GSI_PK"] == "USERDIRECTORY"
+    assert attributes["DIRECTORY_GSI_SK"] == "brad#1234"
@@ -0,0 +1,92 @@
+"""This file contains unit tests for the field that serializes links from
+cached URL templates.
+"""
+
+
+import pytest
+from unittest.mock import patch
+from flask_marshmallow.fields import URLFor
+from app import create_app
+from app.models import User, Location
+from app.models.role import regular_user_role
+from app.schemas import UserSchema, GroupChatSchema
+from app.schemas import url_for_field
+from app.schemas.url_for_field import CachedURLFor
+
+
+def _user(id):
+    return User(
+        id, "brad345", "Brad", "brad@gmail.com", regular_user_role,
+        location=Location("Philadelphia", "PA", "USA"),
+    )
+
+
+def _links(schema, obj):
+    """Return the URLs URLFor builds for each of the schema's links."""
+    return {
+        name: URLFor(field.endpoint, values=field.values)._serialize(None, name, obj)
+        for name, field in schema.fields.items()
+        if isinstance(field, CachedURLFor)
+    }
+
+
+@pytest.mark.parametrize(
+    "context_kwargs",
+    [
+        {"base_url": "http://localhost/"},
+        {"base_url": "https://chat.example.com/chat/"},
+    ]
+)
+def test_cached_links_match_url_for_in_requests(context_kwargs):
+    """Test that links match the ones url_for builds with the request's
+    script root, including ids that have to be quoted.
+    """
+    app = create_app("testing")
+    users = [_user("b61072fd0d4645828ae7dec37ffb6da2"), _user("brad 345/ü")]
+    with app.test_request_context("/", **context_kwargs):
+        for user in users:
+            dumped_user = UserSchema().dump(user)
+            for name, url in _links(UserSchema(), user).items():
+                assert dumped_user[name] == url
+        assert dumped_user["self_url"].endswith("/api/v1/users/brad%20345/%C3%BC")
+
+
+def test_cached_links_match_url_for_outside_requests():
+    """Test that links built in an app context are external URLs on the
+    configured server name and application root.
+    """
+    app = create_app("testing")
+    app.config["SERVER_NAME"] = "chat.example.com"
+    app.config["APPLICATION_ROOT"] = "/chat"
+    app.config["PREFERRED_URL_SCHEME"] = "https"
+    user = _user("b61072fd0d4645828ae7dec37ffb6da2")
+    with app.app_context():
+        dumped_user = UserSchema().dump(user)
+        assert dumped_user["self_url"] == (
+            "https://chat.example.com/chat/api/v1/users/b61072fd0d4645828ae7dec37ffb6da2"
+        )
+        for name, url in _links(UserSchema(), user).items():
+            assert dumped_user[name] == url
+
+
+def test_templates_are_built_once_per_endpoint():
+    """Test that dumping a page of users builds each link's template once
+    instead of calling url_for for every user.
+    """
+    app = create_app("testing")
+    users = [_user(f"{index:032x}") for index in range(20)]
+    with app.test_request_context("/"), \
+            patch.object(url_for_field, "url_for", wraps=url_for_field.url_for) as url_for:
+        UserSchema(many=True).dump(users)
+        # Each of the five links is built with placeholders and checked once
+        assert url_for.call_count == 10
+        UserSchema(many=True).dump(users)
+        assert url_for.call_count == 10
+
+
+def test_links_without_values_are_null():
+    """Test that a link whose value is None is serialized as None."""
+    app = create_app("testing")
+    with app.test_request_context("/"):
+        field = GroupChatSchema().fields["self_url"]
+        assert field._serialize(None, "self_url", {"_id": None, "_community_id": "1234"}) is None
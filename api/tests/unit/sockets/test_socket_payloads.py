@@ -0,0 +1,94 @@
+"""This file contains unit tests for the payloads Socket.IO events send and
+receive, which are objects rather than JSON encoded strings.
+"""
+
+
+import pytest
+from unittest.mock import patch
+from flask import request
+from socketio import packet
+from app import create_app
+from app.extensions import socketio
+from app.decorators.views import socketio_handle_arguments
+from app.models import Message, MessageType, PrivateChat, User, Location
+from app.models.role import regular_user_role
+from app.schemas import PrivateChatSchema
+from app.sockets import helpers
+from app.sockets.packets import PacketNegotiatingServer
+
+
+def _user(id, username, socketio_session_id=""):
+    return User(
+        id, username, "Brad", username + "@gmail.com", regular_user_role,
+        location=Location("Philadelphia", "PA", "USA"),
+        socketio_session_id=socketio_session_id,
+    )
+
+
+CHAT_ID = "b61072fd0d4645828ae7dec37ffb6da2"
+
+
+@pytest.mark.parametrize("argument", [{"id": CHAT_ID}, '{"id": "%s"}' % CHAT_ID])
+def test_arguments_are_loaded_from_objects_and_strings(argument):
+    """Test that event arguments are loaded whether the client sends an
+    object or a JSON encoded string.
+    """
+    app = create_app("testing")
+    handler = socketio_handle_arguments(PrivateChatSchema(only=["_id"]))(
+        lambda data, schema: data
+    )
+    with app.test_request_context():
+        request.event = {"message": "join_private_chat", "args": [argument]}
+        assert handler() == {"_id": CHAT_ID}
+
+
+def test_notifications_are_emitted_as_objects():
+    """Test that a notification is emitted as the schema's dumped data
+    rather than a JSON string.
+    """
+    app = create_app("testing")
+    user, other_user = _user("1234", "brad345"), _user("5678", "jill345", "sid")
+    chat_message = Message("abcd", "efgh", user.id, "Hello", MessageType.PRIVATE_CHAT)
+    private_chat = PrivateChat("efgh", user, other_user)
+    with app.test_request_context(), \
+            patch.object(helpers, "database_repository"), \
+            patch.object(helpers, "emit") as emit:
+        helpers.send_private_chat_notifications("url", user, chat_message, private_chat)
+        [(event, payload), kwargs] = emit.call_args
+        assert event == "new_notification"
+        assert isinstance(payload, dict)
+        assert payload["message"] == "brad345 sent you a new message"
+        assert kwargs == {"room": "sid"}
+
+
+def test_clients_that_ask_for_msgpack_get_msgpack_packets():
+    """Test that only the connections that asked for MessagePack are sent
+    MessagePack packets, and that their packets are decoded with it.
+    """
+    msgpack = pytest.importorskip("msgpack")
+    create_app("testing")
+    server = socketio.server
+    assert isinstance(server, PacketNegotiatingServer)
+    server._handle_eio_connect("msgpack_sid", {"QUERY_STRING": "token=abc&serializer=msgpack"})
+    server._handle_eio_connect("json_sid", {"QUERY_STRING": "token=abc"})
+    event = packet.Packet(packet.EVENT, data=["new_chat_message", {"content": "Hello"}])
+    try:
+        with patch.object(server.eio, "send") as send:
+            server._send_packet("msgpack_sid", event)
+            server._send_packet("json_sid", event)
+        [msgpack_call, json_call] = send.call_args_list
+        assert msgpack.unpackb(msgpack_call[0][1]) == {
+            "type": packet.EVENT, "data": ["new_chat_message", {"content": "Hello"}], "nsp": "/"
+        }
+        assert json_call[0][1] == '2["new_chat_message",{"content":"Hello"}]'
+
+        encoded_packet = msgpack.packb(
+            {"type": packet.EVENT, "data": ["ping_user"], "nsp": "/", "id": 3}
+        )
+        with patch.object(server, "_handle_event") as handle_event:
+            server._handle_eio_message("msgpack_sid", encoded_packet)
+        handle_event.assert_called_once_with("msgpack_sid", "/", 3, ["ping_user"])
+    finally:
+        server._handle_eio_disconnect("msgpack_sid")
+        server._handle_eio_disconnect("json_sid")
+    assert not server._msgpack_eio_sids